@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark FarmData construction and group assignment.
+
+Compares, per farm:
+1. Validated construction (IOUtils.row_to_farm_data for every row) with the
+   trusted path (bulk validation + FarmData.model_construct)
+2. Validated group assignment (farm.group = ...) with FarmData.assign_group()
+
+Reports time in microseconds and retained memory in bytes per farm object.
+
+Usage:
+    uv run python benchmark_farm_data.py [n_farms]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from muka_analysis.classifier import FarmClassifier
+from muka_analysis.io_utils import IOUtils
+from muka_analysis.models import FarmData
+from muka_analysis.output import ColorScheme, init_output
+
+
+def make_farm_frame(n_farms: int, seed: int = 42) -> pd.DataFrame:
+    """Create a synthetic input DataFrame with the CSV column names."""
+    rng = np.random.default_rng(seed)
+    days = rng.uniform(0, 365 * 80, size=(n_farms, 3)).round(1)
+    df = pd.DataFrame(
+        {
+            "tvd": np.arange(1_000_000, 1_000_000 + n_farms),
+            "farmTypeName": rng.choice(["Milchproduktion", "Mutterkuhhaltung", "Mast"], n_farms),
+            "Jahr": rng.integers(2018, 2025, n_farms),
+            "n_animals_total": rng.integers(0, 400, n_farms),
+            "n_females_age3_dairy": rng.integers(0, 120, n_farms),
+            "n_days_female_age3_dairy": days[:, 0],
+            "n_days_female_age3_double": days[:, 1],
+            "n_days_female_age3_dairydouble_V2": days[:, 2],
+            "prop_days_female_age3_dairy": rng.uniform(0, 1, n_farms).round(3),
+            "n_females_age3_total": rng.integers(0, 150, n_farms),
+            "n_total_entries_younger85": rng.integers(0, 50, n_farms),
+            "n_total_leavings_younger51": rng.integers(0, 50, n_farms),
+            "n_females_younger731": rng.integers(0, 80, n_farms),
+            "prop_females_slaughterings_younger731": rng.uniform(0, 1, n_farms).round(3),
+            "n_animals_from51_to730": rng.integers(0, 200, n_farms),
+        }
+    )
+    for column in [
+        "1_femaleDairyCattle_V2",
+        "2_femaleCattle",
+        "3_calf85Arrivals",
+        "5_calf51nonSlaughterLeavings",
+        "6_female731Slaughterings",
+        "7_young51to730Slaughterings",
+    ]:
+        df[column] = rng.integers(0, 2, n_farms)
+    return df
+
+
+def validated_farms(df: pd.DataFrame) -> List[FarmData]:
+    """Build farms the way dataframe_to_farm_data() did before the trusted path."""
+    return [IOUtils.row_to_farm_data(row) for _, row in df.iterrows()]
+
+
+def measure_construction(
+    build: Callable[[pd.DataFrame], List[FarmData]], df: pd.DataFrame
+) -> Tuple[List[FarmData], float, float]:
+    """Return (farms, microseconds per farm, retained bytes per farm)."""
+    gc.collect()
+    start = time.perf_counter()
+    farms = build(df)
+    elapsed = time.perf_counter() - start
+
+    # Separate traced run: tracemalloc slows allocation down considerably
+    del farms
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    farms = build(df)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return farms, elapsed / len(farms) * 1e6, retained / len(farms)
+
+
+def measure_assignment(farms: List[FarmData], trusted: bool) -> float:
+    """Return microseconds per farm for assigning the classification result."""
+    classifier = FarmClassifier()
+    groups = [classifier.classify_farm(farm) for farm in farms]
+    start = time.perf_counter()
+    if trusted:
+        for farm, group in zip(farms, groups):
+            farm.assign_group(group)
+    else:
+        for farm, group in zip(farms, groups):
+            farm.group = group
+    return (time.perf_counter() - start) / len(farms) * 1e6
+
+
+def main() -> None:
+    """Run the benchmark and print a comparison table."""
+    output = init_output(color_scheme=ColorScheme.DARK, verbose=False)
+    n_farms = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    df = make_farm_frame(n_farms)
+
+    output.section(f"FarmData benchmark ({n_farms:,} farms)")
+
+    validated, validated_us, validated_bytes = measure_construction(validated_farms, df)
+    trusted, trusted_us, trusted_bytes = measure_construction(IOUtils.dataframe_to_farm_data, df)
+    if [farm.model_dump() for farm in validated] != [farm.model_dump() for farm in trusted]:
+        raise RuntimeError("Trusted construction produced different farms")
+
+    setattr_us = measure_assignment(validated, trusted=False)
+    assign_us = measure_assignment(trusted, trusted=True)
+
+    table = output.create_table(
+        "Per-farm cost",
+        [("Step", "header"), ("Before", "data"), ("After", "data"), ("Speedup", "highlight")],
+    )
+    table.add_row(
+        "Construction (µs)",
+        f"{validated_us:.1f}",
+        f"{trusted_us:.1f}",
+        f"{validated_us / trusted_us:.1f}x",
+    )
+    table.add_row(
+        "Group assignment (µs)",
+        f"{setattr_us:.2f}",
+        f"{assign_us:.2f}",
+        f"{setattr_us / assign_us:.1f}x",
+    )
+    table.add_row(
+        "Object memory (bytes)",
+        f"{validated_bytes:,.0f}",
+        f"{trusted_bytes:,.0f}",
+        f"{validated_bytes / trusted_bytes:.2f}x",
+    )
+    output.show_table(table)
+
+
+if __name__ == "__main__":
+    main()
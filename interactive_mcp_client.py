@@ -7,7 +7,6 @@ Just run and start asking questions!
 """
 
 import asyncio
-import json
 import logging
 from pathlib import Path
 from typing import Any, Dict
@@ -27,17 +26,26 @@ from mcp_server.server import (
     DataContext,
     handle_aggregate,
     handle_answer_question,
+    handle_benchmark_farm,
     handle_calculate_statistics,
+    handle_cancel_job,
     handle_classify_farms,
+    handle_cluster_unclassified_farms,
     handle_compare_groups,
     handle_custom_metric,
     handle_export,
+    handle_find_outliers,
+    handle_find_similar_farms,
     handle_get_data_info,
     handle_get_farm_details,
     handle_get_insights,
+    handle_get_job_status,
     handle_load_data,
     handle_query_farms,
+    handle_sql_query,
 )
+from mcp_server.serialization import to_json
+from muka_analysis.analyzer import FarmAnalyzer
 from muka_analysis.config import init_config
 
 console = Console()
@@ -56,11 +64,18 @@ class MukaCompleter(Completer):
             "stats",
             "question",
             "insights",
+            "outliers",
             "farm",
+            "benchmark",
+            "similar",
+            "clusters",
             "compare",
             "aggregate",
             "metric",
+            "sql",
             "export",
+            "jobs",
+            "cancel",
             "examples",
             "help",
             "quit",
@@ -78,9 +93,23 @@ class MukaCompleter(Completer):
                 "focus=general",
                 "group=",
             ],
+            "outliers": [
+                "field=",
+                "group=",
+                "direction=high",
+                "direction=low",
+                "threshold=",
+                "limit=",
+            ],
             "farm": ["tvd="],
+            "benchmark": ["tvd=", "year=", "mode=", "group="],
+            "similar": ["tvd=", "year=", "mode=", "group=", "k=", "n_animals_total="],
+            "clusters": ["mode=", "k=", "seed="],
             "aggregate": ["group_by=", "aggregate="],
             "metric": ["expression=", "filter=", "group_by="],
+            "export": ["format=", "file_path=", "include_data="],
+            "jobs": ["job_id=", "wait_seconds="],
+            "cancel": ["job_id="],
         }
 
         self.group_values = [
@@ -167,11 +196,18 @@ class MCPClient:
             "stats": handle_calculate_statistics,
             "question": handle_answer_question,
             "insights": handle_get_insights,
+            "outliers": handle_find_outliers,
             "farm": handle_get_farm_details,
+            "benchmark": handle_benchmark_farm,
+            "similar": handle_find_similar_farms,
+            "clusters": handle_cluster_unclassified_farms,
             "compare": handle_compare_groups,
             "aggregate": handle_aggregate,
             "metric": handle_custom_metric,
+            "sql": handle_sql_query,
             "export": handle_export,
+            "jobs": handle_get_job_status,
+            "cancel": handle_cancel_job,
         }
 
     def show_help(self) -> None:
@@ -216,21 +252,56 @@ class MCPClient:
             "Get data insights",
             "insights focus=outliers",
         )
+        table.add_row(
+            "outliers",
+            "Find farms unusual within their group",
+            "outliers group=Muku field=n_animals_total",
+        )
+        table.add_row(
+            "clusters",
+            "Cluster unclassified farms",
+            "clusters mode=4-indicators k=5",
+        )
         table.add_row(
             "farm",
             "Get details for specific farm",
             "farm tvd=12345",
         )
+        table.add_row(
+            "benchmark",
+            "Rank a farm within its group",
+            "benchmark tvd=12345 mode=4-indicators",
+        )
+        table.add_row(
+            "similar",
+            "Find the most similar farms",
+            "similar tvd=12345 k=5",
+        )
         table.add_row(
             "compare",
             "Compare groups",
             "compare",
         )
+        table.add_row(
+            "sql",
+            "Run a read-only SQL query (table farms)",
+            'sql SELECT "group", COUNT(*) FROM farms GROUP BY 1',
+        )
         table.add_row(
             "export",
-            "Export analysis to Excel",
+            "Export analysis in the background",
             "export output.xlsx",
         )
+        table.add_row(
+            "jobs",
+            "Show background jobs (exports)",
+            "jobs job_id=<id> wait_seconds=30",
+        )
+        table.add_row(
+            "cancel",
+            "Cancel a background job",
+            "cancel job_id=<id>",
+        )
         table.add_row(
             "examples",
             "Show comprehensive usage examples",
@@ -317,6 +388,12 @@ class MCPClient:
                 "[green]Tip:[/green] Use query to find TVD IDs first:\n"
                 "  → query group=Muku limit=5\n"
                 "  → farm tvd=<id_from_query>\n\n"
+                "[green]Compare with its group:[/green] Percentile ranks on every metric\n"
+                "  → benchmark tvd=123456\n"
+                "  → benchmark tvd=123456 mode=4-indicators group=Milchvieh\n\n"
+                "[green]Similar farms:[/green] Nearest farms by standardized metrics\n"
+                "  → similar tvd=123456 k=5\n"
+                "  → similar n_animals_total=120 n_total_entries_younger85=30\n\n"
                 "[dim]Returns comprehensive data:[/dim]\n"
                 "  • TVD ID, year, and assigned group\n"
                 "  • 6 binary classification indicators\n"
@@ -402,6 +479,12 @@ class MCPClient:
                 "  → insights focus=distribution\n\n"
                 "[green]Example 4:[/green] Group-specific insights\n"
                 "  → insights group=Milchvieh\n\n"
+                "[green]Example 5:[/green] Most unusual farms within their group\n"
+                "  → outliers\n"
+                "  → outliers group=Muku field=n_total_entries_younger85 direction=high\n\n"
+                "[green]Example 6:[/green] Clusters of unclassified farms (profile candidates)\n"
+                "  → clusters\n"
+                "  → clusters mode=4-indicators k=5\n\n"
                 "[dim]Focus options:[/dim] general, outliers, trends, distribution",
                 title="💡 Insights",
                 border_style="green",
@@ -455,16 +538,40 @@ class MCPClient:
             )
         )
 
+        # SQL
+        console.print(
+            Panel(
+                "[bold yellow]SQL Queries[/bold yellow]\n\n"
+                "[cyan]sql <SELECT statement>[/cyan]\n\n"
+                "[green]Example 1:[/green] Farms per group and year\n"
+                '  → sql SELECT "group", year, COUNT(*) AS n FROM farms GROUP BY 1, 2\n\n'
+                "[green]Example 2:[/green] Farms that changed group between years\n"
+                '  → sql SELECT tvd FROM farms GROUP BY tvd HAVING COUNT(DISTINCT "group") > 1\n\n'
+                "[green]Example 3:[/green] Year-over-year herd change (self-join)\n"
+                "  → sql SELECT a.tvd, b.n_animals_total - a.n_animals_total AS change\n"
+                "    FROM farms a JOIN farms b ON a.tvd = b.tvd AND b.year = a.year + 1\n\n"
+                "[dim]Read-only SQLite; one group column per indicator mode, "
+                "e.g. group_4_indicators[/dim]",
+                title="🗄️  SQL",
+                border_style="green",
+            )
+        )
+
         # 10. Export
         console.print(
             Panel(
                 "[bold yellow]10. Export Results[/bold yellow]\n\n"
-                "[cyan]export <filename>[/cyan]\n\n"
+                "[cyan]export <filename>[/cyan] or [cyan]export format=<format>[/cyan]\n\n"
                 "[green]Example 1:[/green] Default export\n"
                 "  → export\n"
                 "  Saves to: output/analysis_summary.xlsx\n\n"
                 "[green]Example 2:[/green] Custom filename\n"
                 "  → export my_analysis.xlsx\n\n"
+                "[green]Example 3:[/green] Classified data or all indicator modes\n"
+                "  → export format=csv\n"
+                "  → export format=all_modes include_data=false\n\n"
+                "Exports run in the background; follow them with [cyan]jobs[/cyan]\n"
+                "and stop them with [cyan]cancel job_id=<id>[/cyan]\n\n"
                 "[dim]Exports include:[/dim]\n"
                 "  • Summary statistics by group\n"
                 "  • Detailed farm-level data\n"
@@ -536,9 +643,12 @@ class MCPClient:
             # Special handling for 'question' command
             if cmd == "question":
                 params["question"] = args
-            # Special handling for 'export' command
-            elif cmd == "export":
+            # Special handling for 'export' command (a bare file name)
+            elif cmd == "export" and "=" not in args:
                 params["file_path"] = args
+            # Special handling for 'sql' command (the statement may contain '=')
+            elif cmd == "sql":
+                params["sql"] = args
             # Parse key=value pairs
             elif "=" in args:
                 for pair in args.split():
@@ -551,6 +661,15 @@ class MCPClient:
                             params[key] = value.lower() == "true"
                         else:
                             params[key] = value
+                # Metric values given to 'similar' describe a hypothetical farm
+                if cmd == "similar":
+                    profile = {
+                        key: params.pop(key)
+                        for key in list(params)
+                        if key in FarmAnalyzer.NUMERIC_FIELDS
+                    }
+                    if profile:
+                        params["profile"] = profile
             else:
                 # Assume it's a single parameter value
                 params["value"] = args
@@ -649,7 +768,7 @@ class MCPClient:
             if "statistics" in result:
                 console.print(
                     Panel(
-                        json.dumps(result["statistics"], indent=2),
+                        to_json(result["statistics"], indent=True),
                         title="Statistics",
                         style="blue",
                     )
@@ -666,7 +785,7 @@ class MCPClient:
                 )
             if "data" in result:
                 console.print("\n[dim]Supporting data:[/dim]")
-                console.print(json.dumps(result["data"], indent=2))
+                console.print(to_json(result["data"], indent=True))
 
         elif cmd == "insights":
             if "insights" in result:
@@ -682,10 +801,133 @@ class MCPClient:
                 if "focus" in result:
                     console.print(f"[dim]Focus: {result['focus']}[/dim]")
 
+        elif cmd == "outliers" and "farms" in result:
+            table = Table(
+                title=f"Outliers ({result['total_outliers']} farms, |z| > {result['threshold']:g})"
+            )
+            for column in ("TVD", "Year", "Group", "Field", "Value", "Group Median", "z"):
+                table.add_column(column, style="cyan")
+            for farm in result["farms"]:
+                table.add_row(
+                    str(farm["tvd"]),
+                    str(farm["year"]),
+                    farm["group"],
+                    farm["field"],
+                    f"{farm['value']:g}",
+                    f"{farm['group_median']:g}",
+                    f"{farm['score']:+.1f}",
+                )
+            console.print(table)
+
+        elif cmd == "benchmark" and "metrics" in result:
+            table = Table(
+                title=(
+                    f"Farm {result['tvd']} ({result['year']}, {result['farm_group']}) vs "
+                    f"{result['peers']} {result['peer_group']} farms ({result['mode']})"
+                )
+            )
+            for column in ("Metric", "Value", "Percentile", "P25", "Median", "P75"):
+                table.add_column(column, style="cyan")
+
+            def fmt(value: Any) -> str:
+                return "-" if value is None else f"{value:g}"
+
+            for field, metric in result["metrics"].items():
+                table.add_row(
+                    field,
+                    fmt(metric["value"]),
+                    fmt(metric["percentile"]),
+                    fmt(metric["group_p25"]),
+                    fmt(metric["group_median"]),
+                    fmt(metric["group_p75"]),
+                )
+            console.print(table)
+
+        elif cmd == "similar" and "neighbours" in result:
+            query = result["query"]
+            if "tvd" in query:
+                title = f"Farms similar to {query['tvd']} ({query['year']}, {query['group']})"
+            else:
+                title = "Farms similar to " + ", ".join(
+                    f"{field}={value}" for field, value in query["profile"].items()
+                )
+            table = Table(title=f"{title} ({result['mode']})")
+            for column in ("TVD", "Year", "Group", "Distance"):
+                table.add_column(column, style="cyan")
+            for farm in result["neighbours"]:
+                table.add_row(
+                    str(farm["tvd"]), str(farm["year"]), farm["group"], f"{farm['distance']:.3f}"
+                )
+            console.print(table)
+            groups = ", ".join(f"{g} {n}" for g, n in result["neighbour_groups"].items())
+            console.print(f"[dim]Neighbour groups: {groups}[/dim]")
+
+        elif cmd == "clusters" and "clusters" in result:
+            table = Table(
+                title=(
+                    f"Clusters of {result['unclassified_farms']} unclassified farms "
+                    f"({result['mode']}, {result['iterations']} iterations)"
+                )
+            )
+            for column in ("Cluster", "Farms", "Share", "Pattern", "Nearest", "Mismatched"):
+                table.add_column(column, style="cyan")
+            for cluster in result["clusters"]:
+                table.add_row(
+                    str(cluster["cluster"]),
+                    str(cluster["farms"]),
+                    f"{cluster['share'] * 100:.1f}%",
+                    cluster["pattern"],
+                    f"{cluster['nearest_profile']} ({cluster['profile_distance']:.2f})",
+                    ", ".join(
+                        field.removeprefix("indicator_")
+                        for field in cluster["mismatched_indicators"]
+                    ),
+                )
+            console.print(table)
+
+        elif cmd == "sql":
+            if "rows" in result:
+                table = Table(title=f"SQL Result ({result['row_count']} rows)")
+                for column in result["columns"]:
+                    table.add_column(str(column), style="cyan")
+                for row in result["rows"][:50]:
+                    table.add_row(*("NULL" if value is None else str(value) for value in row))
+                console.print(table)
+                if result["row_count"] > 50:
+                    console.print(f"[dim]... and {result['row_count'] - 50} more[/dim]")
+                if result.get("truncated"):
+                    console.print("[yellow]Result truncated at the row limit[/yellow]")
+            elif "error" in result:
+                console.print(f"[red]{result['error']}[/red]")
+
+        elif cmd == "export" and "job_id" in result:
+            console.print(
+                Panel(
+                    f"Job {result['job_id']}: {result['format']} export to {result['file']}\n"
+                    f"Check progress with: jobs job_id={result['job_id']}",
+                    title="💾 Export Started",
+                    style="green",
+                )
+            )
+
+        elif cmd == "jobs" and "jobs" in result:
+            table = Table(title="Background Jobs")
+            for column in ("Job", "State", "Progress", "Step", "Description"):
+                table.add_column(column, style="cyan")
+            for job in result["jobs"]:
+                table.add_row(
+                    job["job_id"],
+                    job["state"],
+                    f"{job['progress']:.0%}",
+                    job.get("error") or job["message"],
+                    job["description"],
+                )
+            console.print(table)
+
         elif cmd == "info":
             console.print(
                 Panel(
-                    json.dumps(result, indent=2),
+                    to_json(result, indent=True),
                     title="Data Information",
                     style="blue",
                 )
@@ -695,7 +937,7 @@ class MCPClient:
             # Default: pretty print JSON
             console.print(
                 Panel(
-                    json.dumps(result, indent=2),
+                    to_json(result, indent=True),
                     title=f"{cmd.title()} Result",
                     style="blue",
                 )
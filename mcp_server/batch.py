@@ -0,0 +1,353 @@
+"""
+Several read-only requests evaluated over one shared row selection.
+
+LLM clients often ask for statistics per group, then a comparison, then an
+aggregate: near-identical tool calls that each filter and group the data
+again. BatchScope applies a filter once and keeps the selected column values
+and every grouping (row codes per key combination) it computes, so the
+requests of a ``batch`` tool call share those scans. calculate_custom_metric
+evaluates through a BatchScope as well.
+
+Grouped metrics evaluate the expression once per group, so their cost grows
+with rows x groups; requests above ``mcp.max_group_cost`` are rejected before
+the evaluation starts (see check_group_cost()).
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from mcp_server.dispatch import check_deadline
+from mcp_server.expressions import CompiledExpression, ExpressionError, frame_columns
+from mcp_server.serialization import column_values, encode_columns, encode_table, to_jsonable
+from muka_analysis.analyzer import FarmAnalyzer
+from muka_analysis.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Operations a batch can contain
+BATCH_OPERATIONS: List[str] = ["query", "aggregate", "statistics", "metric"]
+
+# Aggregation functions accepted by the aggregate operation
+AGGREGATIONS: List[str] = ["sum", "mean", "median", "min", "max", "count", "std", "nunique"]
+
+# Statistics of the statistics operation (as in FarmAnalyzer.calculate_group_statistics())
+GROUP_STATISTICS: List[str] = ["min", "max", "mean", "median"]
+
+# Groups of a grouped metric evaluated between two time budget checks
+DEADLINE_CHECK_GROUPS = 256
+
+
+class CostLimitError(ValueError):
+    """Raised for grouped computations above mcp.max_group_cost."""
+
+
+def check_group_cost(n_rows: int, n_groups: int, group_by: List[str]) -> None:
+    """
+    Reject a grouped computation whose estimated cost (rows x groups) is too high.
+
+    Args:
+        n_rows: Number of rows to group
+        n_groups: Number of groups
+        group_by: Key columns (for the error message)
+
+    Raises:
+        CostLimitError: If the cost exceeds mcp.max_group_cost
+    """
+    limit = get_config().mcp.max_group_cost
+    cost = n_rows * n_groups
+    if limit and cost > limit:
+        raise CostLimitError(
+            f"Grouping {n_rows:,} rows by {', '.join(group_by)} gives {n_groups:,} groups "
+            f"(estimated cost {cost:.2g}, limit {limit:.2g}). Narrow the rows with a "
+            f"filter (e.g. year == 2023) or group by fewer or coarser fields."
+        )
+
+
+class Grouping:
+    """
+    Rows of a BatchScope grouped by one or more key columns.
+
+    Attributes:
+        keys: Key columns
+        labels: Distinct key values in sorted order (one entry per group)
+        codes: Group number of every selected row (-1 if a key is missing)
+        rows: Row numbers (within the scope) of each group
+    """
+
+    def __init__(self, keys: List[str], key_columns: Dict[str, np.ndarray]) -> None:
+        """
+        Factorize the key columns.
+
+        Args:
+            keys: Key columns
+            key_columns: Values of the key columns for the selected rows
+        """
+        grouper = pd.DataFrame(key_columns, columns=keys).groupby(keys, sort=True)
+        self.keys = keys
+        self.labels: pd.Index = grouper.size().index
+        codes = grouper.ngroup().to_numpy()
+        # Rows with a missing key get NaN (float codes) and belong to no group
+        self.codes = np.where(np.isnan(codes), -1, codes).astype(np.int64)
+        order = np.argsort(self.codes, kind="stable")
+        order = order[self.codes[order] >= 0]
+        bounds = np.cumsum(np.bincount(self.codes[order], minlength=len(self.labels)))
+        self.rows: List[np.ndarray] = np.split(order, bounds[:-1])
+
+    def label(self, i: int) -> Any:
+        """JSON-ready label of group i (multi-column keys are joined with ' | ')."""
+        key = self.labels[i]
+        if isinstance(key, tuple):
+            return " | ".join(str(to_jsonable(part)) for part in key)
+        return to_jsonable(key)
+
+    def key_frame(self) -> pd.DataFrame:
+        """Key values of all groups as a DataFrame (one row per group)."""
+        return self.labels.to_frame(index=False)
+
+
+class BatchScope:
+    """
+    The rows selected by a filter, with column values and groupings cached.
+
+    Attributes:
+        df: Source DataFrame (analyzer.df of a pinned snapshot)
+        positions: Selected row positions in df, or None for all rows
+        n_rows: Number of selected rows
+        groupings_computed: Number of groupings built (each is reused afterwards)
+    """
+
+    def __init__(self, df: pd.DataFrame, condition: Optional[CompiledExpression] = None) -> None:
+        """
+        Select the rows matching a condition.
+
+        Args:
+            df: Source DataFrame
+            condition: Compiled boolean expression, or None for all rows
+
+        Raises:
+            ExpressionError: If the condition does not produce a boolean per row
+        """
+        self.df = df
+        self.positions: Optional[np.ndarray] = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self._groupings: Dict[Tuple[str, ...], Grouping] = {}
+        self.groupings_computed = 0
+        if condition is not None:
+            mask = np.broadcast_to(condition.evaluate(self.columns(condition.columns)), (len(df),))
+            if mask.dtype != np.bool_:
+                raise ExpressionError("the filter must be a condition (e.g. year == 2023)")
+            self.positions = np.flatnonzero(mask)
+            # The filter read whole columns; later reads are restricted to the selection
+            self._columns = {}
+        self.n_rows = len(df) if self.positions is None else len(self.positions)
+
+    def columns(self, names: Any) -> Dict[str, np.ndarray]:
+        """
+        Get the values of columns for the selected rows.
+
+        Args:
+            names: Column names
+
+        Returns:
+            Dictionary of column arrays
+
+        Raises:
+            ExpressionError: If a column does not exist
+        """
+        missing = frozenset(names) - set(self._columns)
+        if missing:
+            self._columns.update(frame_columns(self.df, missing, self.positions))
+        return {name: self._columns[name] for name in names}
+
+    def grouping(self, keys: List[str]) -> Grouping:
+        """
+        Get the grouping of the selected rows by key columns, building it once.
+
+        Args:
+            keys: Key columns
+
+        Returns:
+            Grouping of the selected rows
+
+        Raises:
+            ExpressionError: If a key column does not exist
+        """
+        if not keys:
+            raise ValueError("group_by needs at least one field")
+        grouping = self._groupings.get(tuple(keys))
+        if grouping is None:
+            grouping = Grouping(list(keys), self.columns(keys))
+            self._groupings[tuple(keys)] = grouping
+            self.groupings_computed += 1
+        return grouping
+
+    def row_labels(self) -> List[Any]:
+        """Index labels of the selected rows."""
+        index = self.df.index if self.positions is None else self.df.index[self.positions]
+        return index.tolist()
+
+    def metric(self, expression: CompiledExpression, group_by: Optional[List[str]] = None) -> Any:
+        """
+        Evaluate an expression on the selected rows, optionally once per group.
+
+        Args:
+            expression: Compiled expression (see expressions.compile_expression())
+            group_by: Key columns, or None
+
+        Returns:
+            JSON-ready result; per-group results are keyed by group label and
+            elementwise results by row label
+
+        Raises:
+            ExpressionError: If the expression reads unknown columns
+            CostLimitError: If the grouping is too expensive (see check_group_cost())
+            ToolTimeout: If the tool call's time budget runs out
+        """
+        columns = self.columns(expression.columns)
+        if group_by:
+            grouping = self.grouping(group_by)
+            check_group_cost(self.n_rows, len(grouping.labels), group_by)
+            result = {}
+            for i, rows in enumerate(grouping.rows):
+                if i % DEADLINE_CHECK_GROUPS == 0:
+                    check_deadline()
+                result[grouping.label(i)] = to_jsonable(
+                    expression.evaluate({name: values[rows] for name, values in columns.items()})
+                )
+            return result
+
+        result = expression.evaluate(columns)
+        # Elementwise results are reported per row, keyed by row index
+        if isinstance(result, np.ndarray) and result.ndim == 1 and len(result) == self.n_rows:
+            return dict(zip(self.row_labels(), column_values(result)))
+        return to_jsonable(result)
+
+    def aggregate(
+        self, group_by: List[str], aggregations: Dict[str, Any], layout: str = "records"
+    ) -> Any:
+        """
+        Aggregate fields per group, like DataFrame.groupby(group_by).agg(aggregations).
+
+        Args:
+            group_by: Key columns
+            aggregations: Field -> function name or list of names (see AGGREGATIONS)
+            layout: Table layout (see serialization.encode_columns())
+
+        Returns:
+            Table with the key columns and one column per field and function
+
+        Raises:
+            ValueError: If an aggregation function is not supported
+            CostLimitError: If the grouping is too expensive (see check_group_cost())
+        """
+        for field, functions in aggregations.items():
+            for function in functions if isinstance(functions, list) else [functions]:
+                if function not in AGGREGATIONS:
+                    raise ValueError(
+                        f"Unsupported aggregation '{function}' for '{field}'. "
+                        f"Supported: {', '.join(AGGREGATIONS)}"
+                    )
+
+        grouping = self.grouping(group_by)
+        check_group_cost(self.n_rows, len(grouping.labels), group_by)
+        valid = grouping.codes >= 0
+        values = pd.DataFrame(
+            {name: column[valid] for name, column in self.columns(list(aggregations)).items()}
+        )
+        result = values.groupby(grouping.codes[valid], sort=True).agg(aggregations)
+        keys = grouping.key_frame().iloc[result.index].reset_index(drop=True)
+        columns: Dict[Any, Any] = {name: keys[name] for name in keys.columns}
+        columns.update({name: result[name] for name in result.columns})
+        return encode_columns(columns, layout)
+
+    def statistics(
+        self,
+        group: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        layout: str = "records",
+    ) -> Any:
+        """
+        Calculate min, max, mean and median per farm group.
+
+        The layout matches FarmAnalyzer.calculate_group_statistics(): one row
+        per group with count and <field>_<statistic> columns, unclassified
+        farms excluded.
+
+        Args:
+            group: Only this group, or None for all groups
+            fields: Numeric fields, or None for FarmAnalyzer.NUMERIC_FIELDS
+            layout: Table layout (see serialization.encode_columns())
+
+        Returns:
+            Statistics table
+
+        Raises:
+            ValueError: If the group does not occur in the selected rows
+        """
+        fields = fields or [f for f in FarmAnalyzer.NUMERIC_FIELDS if f in self.df.columns]
+        grouping = self.grouping(["group"])
+        groups = list(range(len(grouping.labels)))
+        if group is not None:
+            if group not in grouping.labels:
+                raise ValueError(f"No farms of group '{group}' in the selection")
+            position = grouping.labels.get_loc(group)
+            if not isinstance(position, int):
+                # Group labels come from a groupby, so a slice or mask means a broken grouping
+                raise ValueError(f"Group '{group}' does not name a single group")
+            groups = [position]
+
+        valid = grouping.codes >= 0
+        values = pd.DataFrame(
+            {name: column[valid] for name, column in self.columns(fields).items()}
+        )
+        stats = values.groupby(grouping.codes[valid], sort=True).agg(GROUP_STATISTICS)
+
+        table = pd.DataFrame(
+            {
+                "group": grouping.labels[groups],
+                "count": [len(grouping.rows[i]) for i in groups],
+            }
+        )
+        for field in fields:
+            for statistic in GROUP_STATISTICS:
+                table[f"{field}_{statistic}"] = stats[(field, statistic)].reindex(groups).to_numpy()
+        return encode_table(FarmAnalyzer.order_by_group(table).astype({"group": str}), layout)
+
+    def query(
+        self,
+        fields: List[str],
+        limit: int,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        layout: str = "records",
+    ) -> Dict[str, Any]:
+        """
+        Get the first rows of the selection.
+
+        Args:
+            fields: Fields to return
+            limit: Maximum number of rows
+            order_by: Numeric field to sort by (row order breaks ties), or None
+            descending: Sort in descending order
+            layout: Table layout (see serialization.encode_columns())
+
+        Returns:
+            Dictionary with count, total_matches and farms
+
+        Raises:
+            ExpressionError: If a field does not exist
+        """
+        rows = np.arange(self.n_rows)
+        if order_by is not None:
+            values = self.columns([order_by])[order_by].astype(np.float64)
+            rows = np.lexsort((rows, -values if descending else values))
+        page = rows[:limit]
+        columns = self.columns(fields)
+        return {
+            "count": len(page),
+            "total_matches": self.n_rows,
+            "farms": encode_columns({name: columns[name][page] for name in fields}, layout),
+        }
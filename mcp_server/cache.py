@@ -0,0 +1,153 @@
+"""
+Result cache for the MCP server's analytical tools.
+
+LLM clients tend to call the same tool with the same arguments several times
+in one conversation. ResultCache keeps recent tool results in LRU order,
+keyed by tool name, normalized arguments and the data version, within a
+memory budget.
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from mcp_server.serialization import to_json
+from muka_analysis.config import get_config
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str, int]
+
+
+class ResultCache:
+    """
+    LRU cache for JSON-serializable tool results with a memory budget.
+
+    Entry sizes are measured as the length of the JSON-serialized result,
+    which is what the server sends to the client. Cached results are shared
+    between callers and must not be modified.
+
+    Attributes:
+        max_bytes: Memory budget (0 disables caching)
+        max_entries: Maximum number of entries
+        hits: Number of lookups answered from the cache
+        misses: Number of lookups not found in the cache
+        evictions: Number of entries dropped to stay within the limits
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int) -> None:
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_bytes: Memory budget in bytes (0 disables caching)
+            max_entries: Maximum number of entries
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[CacheKey, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "ResultCache":
+        """Create a cache with the limits from the [mcp] configuration section."""
+        config = get_config()
+        return cls(config.mcp.cache_max_bytes, config.mcp.cache_max_entries)
+
+    @staticmethod
+    def make_key(tool: str, arguments: Dict[str, Any], data_version: int) -> CacheKey:
+        """
+        Build the cache key of a tool call.
+
+        Arguments are normalized so that equivalent calls share an entry:
+        None values are dropped and keys are sorted.
+
+        Args:
+            tool: Tool name
+            arguments: Tool arguments
+            data_version: Version of the loaded data
+
+        Returns:
+            Hashable cache key
+        """
+        normalized = {k: v for k, v in (arguments or {}).items() if v is not None}
+        return (tool, json.dumps(normalized, sort_keys=True, default=str), data_version)
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """
+        Look up a result, marking it as most recently used.
+
+        Args:
+            key: Cache key from make_key()
+
+        Returns:
+            Cached result, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: CacheKey, result: Any) -> None:
+        """
+        Store a result, evicting least recently used entries as needed.
+
+        Results larger than the whole budget are not cached.
+
+        Args:
+            key: Cache key from make_key()
+            result: JSON-serializable tool result
+        """
+        if self.max_bytes == 0:
+            return
+        size = len(to_json(result))
+        if size > self.max_bytes:
+            logger.debug(f"Not caching {key[0]} result of {size} bytes (budget exceeded)")
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache usage counters.
+
+        Returns:
+            Dictionary with hits, misses, hit rate, evictions, entry count and size
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.max_bytes > 0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+            }
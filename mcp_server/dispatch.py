@@ -0,0 +1,292 @@
+"""
+Executor dispatch for MCP tool handlers.
+
+Tool handlers do synchronous pandas work. ToolDispatcher runs them on thread
+pools so the stdio event loop stays responsive:
+
+- lookups (point queries, status) use a small dedicated pool and never wait
+  behind long aggregations
+- compute tools (statistics, custom metrics, exports) share a bounded pool,
+  with a per-tool concurrency limit
+- write tools (loading and classifying data) run one at a time; they publish
+  new data snapshots and never block readers, which hold their own snapshot
+
+Read-only tools also run under a time budget. Threads cannot be killed, so
+cancellation is cooperative: handlers call check_deadline() between steps of
+long computations (e.g. between groups of a grouped metric), which raises
+ToolTimeout once the budget is used up. If a handler does not reach such a
+check in time, the caller gets the timeout error anyway shortly after the
+budget, and the handler's thread finishes in the background. It keeps its
+slot of the tool's concurrency limit until then, so timed-out calls cannot
+pile up on the pool.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from muka_analysis.config import get_config
+
+logger = logging.getLogger(__name__)
+
+TOOL_KINDS: List[str] = ["lookup", "compute", "write"]
+
+# Seconds the caller waits past a time budget for the handler to stop by itself
+TIMEOUT_GRACE_SECONDS = 2.0
+
+# Deadline of the tool call running on the current thread
+_current = threading.local()
+
+
+class ToolTimeout(Exception):
+    """Raised when a tool call exceeds its time budget."""
+
+    def __init__(self, tool: str, budget: float) -> None:
+        """
+        Initialize the error.
+
+        Args:
+            tool: Tool name
+            budget: Time budget in seconds
+        """
+        super().__init__(
+            f"{tool} stopped after its time budget of {budget:g}s. Narrow the request "
+            f"(e.g. with a filter or fewer group_by fields) or raise mcp.tool_time_budgets."
+        )
+        self.tool = tool
+        self.budget = budget
+
+
+def check_deadline() -> None:
+    """
+    Stop the current tool call if its time budget is used up.
+
+    Handlers call this between steps of long computations; outside a
+    budgeted tool call it does nothing.
+
+    Raises:
+        ToolTimeout: If the budget of the current call is used up
+    """
+    deadline = getattr(_current, "deadline", None)
+    if deadline is not None and time.monotonic() > deadline[0]:
+        raise ToolTimeout(deadline[1], deadline[2])
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left in the current tool call's budget (None if unlimited)."""
+    deadline = getattr(_current, "deadline", None)
+    if deadline is None:
+        return None
+    return max(deadline[0] - time.monotonic(), 0.0)
+
+
+def _run_with_deadline(
+    tool: str, budget: float, func: Callable[[Dict[str, Any]], Any], arguments: Dict[str, Any]
+) -> Any:
+    """Run a handler on a pool thread with its deadline set (budget 0: no deadline)."""
+    _current.deadline = (time.monotonic() + budget, tool, budget) if budget > 0 else None
+    try:
+        return func(arguments)
+    finally:
+        _current.deadline = None
+
+
+def _release_on_loop(
+    loop: asyncio.AbstractEventLoop, semaphore: asyncio.Semaphore, _job: Future
+) -> None:
+    """Release a tool's semaphore from a pool thread once its handler finished."""
+    try:
+        loop.call_soon_threadsafe(semaphore.release)
+    except RuntimeError:
+        # The loop is closed; the dispatcher makes new semaphores for the next loop
+        pass
+
+
+class ToolDispatcher:
+    """
+    Run synchronous tool handlers on thread pools with concurrency limits.
+
+    Asyncio primitives belong to one event loop; they are created lazily and
+    recreated when the dispatcher is used from a new loop (e.g. successive
+    asyncio.run() calls in scripts).
+
+    Attributes:
+        workers: Threads for compute and write tools
+        lookup_workers: Threads reserved for lookup tools
+        tool_limits: Maximum concurrent calls per tool name
+        default_limit: Limit for tools not listed in tool_limits
+        time_budgets: Time budget in seconds per tool name
+        default_time_budget: Budget of read-only tools not listed in time_budgets
+            (0: unlimited; write tools are never limited)
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        lookup_workers: int,
+        tool_limits: Optional[Dict[str, int]] = None,
+        default_limit: int = 2,
+        time_budgets: Optional[Dict[str, float]] = None,
+        default_time_budget: float = 0.0,
+    ) -> None:
+        """
+        Initialize the dispatcher.
+
+        Args:
+            workers: Threads for compute and write tools
+            lookup_workers: Threads reserved for lookup tools
+            tool_limits: Maximum concurrent calls per tool name
+            default_limit: Limit for tools not listed in tool_limits
+            time_budgets: Time budget in seconds per tool name
+            default_time_budget: Budget of read-only tools not listed in time_budgets
+        """
+        self.workers = workers
+        self.lookup_workers = lookup_workers
+        self.tool_limits = dict(tool_limits or {})
+        self.default_limit = default_limit
+        self.time_budgets = dict(time_budgets or {})
+        self.default_time_budget = default_time_budget
+
+        self._compute_pool = ThreadPoolExecutor(workers, thread_name_prefix="muka-tool")
+        self._lookup_pool = ThreadPoolExecutor(lookup_workers, thread_name_prefix="muka-lookup")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._write_lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def from_config(cls) -> "ToolDispatcher":
+        """Create a dispatcher with the limits from the [mcp] configuration section."""
+        config = get_config()
+        return cls(
+            workers=config.mcp.executor_workers,
+            lookup_workers=config.mcp.lookup_workers,
+            tool_limits=config.mcp.tool_concurrency,
+            default_limit=config.mcp.default_tool_concurrency,
+            time_budgets=config.mcp.tool_time_budgets,
+            default_time_budget=config.mcp.default_time_budget_seconds,
+        )
+
+    def time_budget(self, tool: str, kind: str) -> float:
+        """
+        Get the time budget of a tool.
+
+        Args:
+            tool: Tool name
+            kind: One of TOOL_KINDS
+
+        Returns:
+            Budget in seconds (0: unlimited)
+        """
+        if kind == "write":
+            return 0.0
+        return self.time_budgets.get(tool, self.default_time_budget)
+
+    async def run(
+        self, tool: str, kind: str, func: Callable[[Dict[str, Any]], Any], arguments: Dict[str, Any]
+    ) -> Any:
+        """
+        Run a synchronous handler on the pool for its kind of tool.
+
+        Args:
+            tool: Tool name (selects the concurrency limit)
+            kind: One of TOOL_KINDS
+            func: Synchronous handler
+            arguments: Tool arguments
+
+        Returns:
+            Handler result
+
+        Raises:
+            ToolTimeout: If the call exceeds the tool's time budget
+        """
+        write_lock = self._bind_loop()
+        pool = self._lookup_pool if kind == "lookup" else self._compute_pool
+        budget = self.time_budget(tool, kind)
+
+        semaphore = self._semaphore(tool)
+        await semaphore.acquire()
+        submitted = False
+        try:
+            async with AsyncExitStack() as stack:
+                if kind == "write":
+                    await stack.enter_async_context(write_lock)
+                call = functools.partial(_run_with_deadline, tool, budget, func, arguments)
+                job = pool.submit(call)
+                submitted = True
+                # The slot is freed when the thread finishes, not when the caller stops waiting
+                job.add_done_callback(
+                    functools.partial(_release_on_loop, asyncio.get_running_loop(), semaphore)
+                )
+                future = asyncio.wrap_future(job)
+                if budget <= 0:
+                    return await future
+                try:
+                    return await asyncio.wait_for(future, budget + TIMEOUT_GRACE_SECONDS)
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"{tool} exceeded its time budget of {budget:g}s without reaching "
+                        f"a cancellation point; it finishes in the background"
+                    )
+                    raise ToolTimeout(tool, budget) from None
+        finally:
+            if not submitted:
+                semaphore.release()
+
+    def shutdown(self) -> None:
+        """Stop the thread pools after running handlers finish."""
+        self._compute_pool.shutdown(wait=True)
+        self._lookup_pool.shutdown(wait=True)
+
+    def _semaphore(self, tool: str) -> asyncio.Semaphore:
+        """Get the concurrency semaphore of a tool."""
+        if tool not in self._semaphores:
+            self._semaphores[tool] = asyncio.Semaphore(
+                self.tool_limits.get(tool, self.default_limit)
+            )
+        return self._semaphores[tool]
+
+    def _bind_loop(self) -> asyncio.Lock:
+        """(Re)create asyncio primitives for the running loop and return the write lock."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop or self._write_lock is None:
+            self._loop = loop
+            self._semaphores = {}
+            self._write_lock = asyncio.Lock()
+        return self._write_lock
+
+
+def offloaded(
+    dispatcher: ToolDispatcher, tool: str, kind: str = "compute"
+) -> Callable[[Callable[[Dict[str, Any]], Any]], Callable[[Dict[str, Any]], Awaitable[Any]]]:
+    """
+    Turn a synchronous tool handler into a coroutine function run by a dispatcher.
+
+    Args:
+        dispatcher: Dispatcher that runs the handler
+        tool: Tool name
+        kind: One of TOOL_KINDS
+
+    Returns:
+        Decorator producing an async handler with the same signature
+
+    Raises:
+        ValueError: If kind is not one of TOOL_KINDS
+    """
+    if kind not in TOOL_KINDS:
+        raise ValueError(f"Unknown tool kind '{kind}'. Must be one of: {TOOL_KINDS}")
+
+    def decorator(
+        func: Callable[[Dict[str, Any]], Any],
+    ) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(arguments: Dict[str, Any]) -> Any:
+            return await dispatcher.run(tool, kind, func, arguments)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,182 @@
+"""
+Export writers run as background jobs by the export_analysis tool.
+
+Each writer takes the Job it runs in and reports its progress between steps
+(see jobs.Job.report()), where a cancellation takes effect. Files are written
+under a temporary name and renamed when complete, so a cancelled or failed
+export never leaves a truncated file behind.
+
+Formats:
+
+- ``excel``: summary workbook (Summary, Detailed_Stats, Group_Counts sheets)
+- ``csv``: the classified farm data, written in chunks
+- ``parquet``: the classified farm data (needs pyarrow or fastparquet)
+- ``all_modes``: workbook comparing all indicator modes, as written by the
+  analyze-all-modes command
+"""
+
+import importlib.util
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from mcp_server.jobs import Job
+from muka_analysis.analyzer import FarmAnalyzer, MultiModeAnalyzer
+from muka_analysis.classifier import GROUP_LABELS
+from muka_analysis.config import get_config
+from muka_analysis.io_utils import IOUtils
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS: List[str] = ["excel", "csv", "parquet", "all_modes"]
+
+# Rows written between progress reports of a CSV export
+CSV_CHUNK_ROWS = 50_000
+
+
+def check_export_format(export_format: Optional[str]) -> str:
+    """
+    Validate an export format argument.
+
+    Args:
+        export_format: One of EXPORT_FORMATS, or None (excel)
+
+    Returns:
+        The format
+
+    Raises:
+        ValueError: If the format is unknown or its writer is not installed
+    """
+    export_format = export_format or "excel"
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Unknown format '{export_format}'. Must be one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    if export_format == "parquet" and not any(
+        importlib.util.find_spec(engine) for engine in ("pyarrow", "fastparquet")
+    ):
+        raise ValueError("Parquet export needs the pyarrow (or fastparquet) package")
+    return export_format
+
+
+def default_export_path(export_format: str) -> Path:
+    """
+    Get the default output file of a format (in the configured output directory).
+
+    Args:
+        export_format: One of EXPORT_FORMATS
+
+    Returns:
+        Output file path
+    """
+    paths = get_config().paths
+    if export_format == "all_modes":
+        return paths.get_all_modes_output_path()
+    if export_format == "csv":
+        return paths.get_classified_output_path()
+    if export_format == "parquet":
+        return paths.get_classified_output_path().with_suffix(".parquet")
+    return paths.get_summary_output_path()
+
+
+def run_export(
+    job: Job,
+    analyzer: FarmAnalyzer,
+    export_format: str,
+    file_path: Path,
+    include_data: bool = True,
+) -> Dict[str, Any]:
+    """
+    Write an export file.
+
+    Args:
+        job: Job the export runs in (receives progress reports)
+        analyzer: Analyzer of the classified data to export
+        export_format: One of EXPORT_FORMATS
+        file_path: Output file
+        include_data: Include the farm data sheets (all_modes only)
+
+    Returns:
+        Dictionary with the file, format, exported rows and file size
+
+    Raises:
+        JobCancelled: If the job was cancelled
+    """
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    # Same suffix, so writers that pick the format by extension still work
+    partial_path = file_path.with_name(f".{file_path.stem}.partial{file_path.suffix}")
+    try:
+        if export_format == "excel":
+            _write_summary(job, analyzer, partial_path)
+        elif export_format == "csv":
+            _write_csv(job, analyzer.df, partial_path)
+        elif export_format == "parquet":
+            job.report(0.1, "Writing Parquet file")
+            analyzer.df.to_parquet(partial_path, index=False)
+        else:
+            _write_all_modes(job, analyzer.df, partial_path, include_data)
+        job.report(0.99, "Finishing")
+        partial_path.replace(file_path)
+    finally:
+        partial_path.unlink(missing_ok=True)
+
+    logger.info(f"Exported {export_format} to {file_path}")
+    return {
+        "file": str(file_path),
+        "format": export_format,
+        "rows": len(analyzer.df),
+        "size_bytes": file_path.stat().st_size,
+    }
+
+
+def _write_summary(job: Job, analyzer: FarmAnalyzer, file_path: Path) -> None:
+    """Write the summary workbook of FarmAnalyzer.export_summary_to_excel()."""
+    job.report(0.05, "Calculating group statistics")
+    detailed_stats = analyzer.calculate_group_statistics()
+    group_counts = analyzer.get_group_counts()
+    job.report(0.4, "Writing Excel workbook")
+    FarmAnalyzer.write_summary_workbook(
+        str(file_path),
+        summary=FarmAnalyzer.summarize_statistics(detailed_stats),
+        detailed_stats=detailed_stats,
+        group_counts=group_counts,
+    )
+
+
+def _write_csv(job: Job, df: pd.DataFrame, file_path: Path) -> None:
+    """Write a DataFrame as UTF-8 CSV with BOM (as IOUtils.write_csv()), chunk by chunk."""
+    with open(file_path, "w", encoding="utf-8-sig", newline="") as f:
+        for start in range(0, max(len(df), 1), CSV_CHUNK_ROWS):
+            job.report(start / max(len(df), 1), f"Writing rows {start:,} of {len(df):,}")
+            df.iloc[start : start + CSV_CHUNK_ROWS].to_csv(f, index=False, header=start == 0)
+
+
+def _write_all_modes(job: Job, df: pd.DataFrame, file_path: Path, include_data: bool) -> None:
+    """Write the all-modes workbook (see cli.analyze_all_modes)."""
+    job.report(0.05, "Aggregating statistics for all modes")
+    multi_analyzer = MultiModeAnalyzer(df)
+    mode_results = multi_analyzer.get_mode_results()
+
+    if include_data:
+        labels = np.asarray(GROUP_LABELS, dtype=object)
+        for i, mode in enumerate(multi_analyzer.modes):
+            job.report(0.1 + 0.1 * i / len(multi_analyzer.modes), f"Preparing data for {mode}")
+            data_df = df.copy()
+            data_df["group"] = labels[multi_analyzer.get_group_codes(mode)]
+            mode_results[mode]["data_df"] = data_df
+
+    job.report(0.2, "Creating comparison summary")
+    comparison_df = FarmAnalyzer.create_comparison_summary(mode_results)
+
+    def sheet_progress(written: int, total: int, sheet_name: str) -> None:
+        job.report(0.25 + 0.7 * written / max(total, 1), f"Writing sheet {sheet_name}")
+
+    IOUtils.write_all_modes_excel(
+        mode_results=mode_results,
+        file_path=file_path,
+        comparison_summary=comparison_df,
+        progress=sheet_progress,
+    )
@@ -0,0 +1,488 @@
+"""
+Safe expression engine for the calculate_custom_metric tool.
+
+Metric and filter expressions are parsed with Python's ``ast`` module and
+checked against a whitelist: column names (also as ``df.column`` or
+``df['column']``), numeric and string constants, arithmetic, comparisons,
+boolean logic, a fixed set of functions and pandas-style methods such as
+``between()``, ``sum()`` or ``quantile()``. Anything else (attribute access,
+imports, lambdas, comprehensions, ...) is rejected, so no arbitrary code is
+ever executed.
+
+String constants may only be compared, listed for ``in`` / ``isin()`` or
+passed to ``fillna()`` of a text column; arithmetic on text (``'ab' * 10**9``) would build
+huge strings in a single call that no time budget can interrupt.
+
+A validated expression is compiled once into a tree of closures that operate
+on NumPy column arrays; compiled plans are cached by expression text.
+"""
+
+import ast
+import functools
+import logging
+import operator
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Longer expressions are rejected before parsing
+MAX_EXPRESSION_LENGTH = 1000
+
+# Number of compiled plans kept in the cache
+PLAN_CACHE_SIZE = 256
+
+# Methods whose arguments may be string constants
+STRING_ARGUMENT_METHODS: FrozenSet[str] = frozenset(
+    {"gt", "ge", "lt", "le", "eq", "ne", "between", "fillna"}
+)
+
+Columns = Dict[str, np.ndarray]
+Evaluator = Callable[[Columns], Any]
+
+
+class ExpressionError(ValueError):
+    """Raised for expressions outside the supported language."""
+
+
+def _empty_nan(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a NaN-aware reduction so that empty input yields NaN (as in pandas)."""
+
+    def reduce(values: Any, *args: Any) -> Any:
+        if np.size(values) == 0:
+            return np.nan
+        return func(values, *args)
+
+    return reduce
+
+
+def _not_na(values: Any) -> Any:
+    """Elementwise mask of non-missing values."""
+    return ~pd.isna(values)
+
+
+def _fill_missing(values: Any, value: Any) -> Any:
+    """fillna(): replace missing values, keeping the other values and their type."""
+    if isinstance(value, str) and np.asarray(values).dtype.kind not in "OUS":
+        raise ExpressionError("fillna() with text needs a text column")
+    missing = pd.isna(values)
+    if not np.any(missing):
+        return values
+    return np.where(missing, value, values)
+
+
+DESCRIBE_KEYS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+def _describe(values: Any) -> Dict[str, Any]:
+    """Summary statistics in the layout of pandas Series.describe()."""
+    data = np.asarray(values, dtype=np.float64)
+    data = data[~np.isnan(data)]
+    if data.size == 0:
+        return {key: (0.0 if key == "count" else np.nan) for key in DESCRIBE_KEYS}
+    q25, q50, q75 = np.quantile(data, [0.25, 0.5, 0.75])
+    return {
+        "count": float(data.size),
+        "mean": data.mean(),
+        "std": data.std(ddof=1) if data.size > 1 else np.nan,
+        "min": data.min(),
+        "25%": q25,
+        "50%": q50,
+        "75%": q75,
+        "max": data.max(),
+    }
+
+
+BINARY_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    # Powers are taken in floating point so large integer powers cannot wrap around
+    ast.Pow: np.float_power,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+}
+
+UNARY_OPERATORS: Dict[type, Callable[[Any], Any]] = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+    ast.Invert: operator.invert,
+    ast.Not: np.logical_not,
+}
+
+COMPARISON_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+# name -> (implementation, min args, max args)
+FUNCTIONS: Dict[str, Tuple[Callable[..., Any], int, int]] = {
+    "abs": (np.abs, 1, 1),
+    "sqrt": (np.sqrt, 1, 1),
+    "log": (np.log, 1, 1),
+    "log10": (np.log10, 1, 1),
+    "exp": (np.exp, 1, 1),
+    "round": (np.round, 1, 2),
+    "minimum": (np.minimum, 2, 2),
+    "maximum": (np.maximum, 2, 2),
+    "where": (np.where, 3, 3),
+}
+
+# Methods called on a column or sub-expression: name -> (implementation, min args, max args)
+METHODS: Dict[str, Tuple[Callable[..., Any], int, int]] = {
+    # Elementwise
+    "gt": (operator.gt, 1, 1),
+    "ge": (operator.ge, 1, 1),
+    "lt": (operator.lt, 1, 1),
+    "le": (operator.le, 1, 1),
+    "eq": (operator.eq, 1, 1),
+    "ne": (operator.ne, 1, 1),
+    "between": (lambda v, low, high: (v >= low) & (v <= high), 2, 2),
+    "isin": (lambda v, values: np.isin(v, values), 1, 1),
+    "abs": (np.abs, 0, 0),
+    "round": (np.round, 0, 1),
+    "clip": (np.clip, 2, 2),
+    "isna": (pd.isna, 0, 0),
+    "isnull": (pd.isna, 0, 0),
+    "notna": (_not_na, 0, 0),
+    "notnull": (_not_na, 0, 0),
+    "fillna": (_fill_missing, 1, 1),
+    # Aggregates (missing values are skipped, as in pandas)
+    "sum": (np.nansum, 0, 0),
+    "count": (lambda v: int(np.count_nonzero(_not_na(v))), 0, 0),
+    "nunique": (lambda v: len(pd.unique(np.asarray(v)[_not_na(v)])), 0, 0),
+    "mean": (_empty_nan(np.nanmean), 0, 0),
+    "median": (_empty_nan(np.nanmedian), 0, 0),
+    "min": (_empty_nan(np.nanmin), 0, 0),
+    "max": (_empty_nan(np.nanmax), 0, 0),
+    "std": (_empty_nan(lambda v: np.nanstd(v, ddof=1)), 0, 0),
+    "var": (_empty_nan(lambda v: np.nanvar(v, ddof=1)), 0, 0),
+    "quantile": (_empty_nan(lambda v, q=0.5: np.nanquantile(v, q)), 0, 1),
+    "any": (np.any, 0, 0),
+    "all": (np.all, 0, 0),
+    "describe": (_describe, 0, 0),
+}
+
+
+class CompiledExpression:
+    """
+    A validated expression, ready to evaluate on column arrays.
+
+    Attributes:
+        text: Expression text
+        columns: Column names the expression reads
+    """
+
+    def __init__(self, text: str, evaluator: Evaluator, columns: FrozenSet[str]) -> None:
+        """
+        Initialize a compiled expression.
+
+        Args:
+            text: Expression text
+            evaluator: Compiled evaluation function
+            columns: Column names the expression reads
+        """
+        self.text = text
+        self.columns = columns
+        self._evaluator = evaluator
+
+    def evaluate(self, columns: Columns) -> Any:
+        """
+        Evaluate the expression.
+
+        Args:
+            columns: Arrays of (at least) all columns in self.columns, of equal length
+
+        Returns:
+            Array for elementwise expressions, scalar or dict for aggregates
+        """
+        with np.errstate(all="ignore"):
+            return self._evaluator(columns)
+
+
+@functools.lru_cache(maxsize=PLAN_CACHE_SIZE)
+def compile_expression(text: str) -> CompiledExpression:
+    """
+    Parse, validate and compile an expression (cached by text).
+
+    Args:
+        text: Expression text, e.g. "(n_animals_total > 100).sum()"
+
+    Returns:
+        Compiled expression
+
+    Raises:
+        ExpressionError: If the expression is invalid or uses unsupported syntax
+    """
+    text = text.strip()
+    if not text:
+        raise ExpressionError("Expression is empty")
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f"Expression is longer than {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(text, mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid syntax: {e.msg}") from None
+
+    compiler = _Compiler()
+    evaluator = compiler.compile(tree.body)
+    logger.debug(f"Compiled expression '{text}' over columns {sorted(compiler.columns)}")
+    return CompiledExpression(text, evaluator, frozenset(compiler.columns))
+
+
+def evaluate_on_frame(
+    expression: CompiledExpression, df: pd.DataFrame, positions: Optional[np.ndarray] = None
+) -> Any:
+    """
+    Evaluate an expression on (some rows of) a DataFrame without copying it.
+
+    Only the columns the expression reads are taken from the frame.
+
+    Args:
+        expression: Compiled expression
+        df: Data to evaluate on
+        positions: Row positions to use, or None for all rows
+
+    Returns:
+        Result of CompiledExpression.evaluate()
+
+    Raises:
+        ExpressionError: If the expression reads columns the frame does not have
+    """
+    return expression.evaluate(frame_columns(df, expression.columns, positions))
+
+
+def frame_columns(
+    df: pd.DataFrame, names: FrozenSet[str], positions: Optional[np.ndarray] = None
+) -> Columns:
+    """
+    Get column arrays of a DataFrame, optionally restricted to some rows.
+
+    Args:
+        df: Source DataFrame
+        names: Columns to get
+        positions: Row positions, or None for all rows
+
+    Returns:
+        Dictionary of column arrays
+
+    Raises:
+        ExpressionError: If a column does not exist
+    """
+    missing = sorted(names - set(df.columns))
+    if missing:
+        raise ExpressionError(
+            f"Unknown column(s): {', '.join(missing)}. Available: {', '.join(df.columns)}"
+        )
+    columns = {}
+    for name in names:
+        values = df[name].to_numpy()
+        columns[name] = values if positions is None else values[positions]
+    return columns
+
+
+class _Compiler:
+    """Translate a whitelisted AST into nested evaluation closures."""
+
+    def __init__(self) -> None:
+        """Initialize the compiler."""
+        self.columns: Set[str] = set()
+
+    def compile(self, node: ast.AST) -> Evaluator:
+        """
+        Compile one AST node.
+
+        Raises:
+            ExpressionError: If the node is not supported
+        """
+        if isinstance(node, ast.Constant):
+            value = self._constant(node.value)
+            if isinstance(value, str):
+                raise ExpressionError(
+                    f"String constant {value!r} may only be compared, listed for 'in' / isin() "
+                    "or passed to fillna()"
+                )
+            return lambda columns: value
+        if isinstance(node, ast.Name):
+            return self._column(node.id)
+        if isinstance(node, (ast.Attribute, ast.Subscript)):
+            return self._column(self._df_column(node))
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+            return self._binary(BINARY_OPERATORS[type(node.op)], node.left, node.right)
+        if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+            func = UNARY_OPERATORS[type(node.op)]
+            operand = self.compile(node.operand)
+            return lambda columns: func(operand(columns))
+        if isinstance(node, ast.BoolOp):
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            operands = [self.compile(value) for value in node.values]
+            return lambda columns: functools.reduce(combine, (op(columns) for op in operands))
+        if isinstance(node, ast.Compare):
+            return self._compare(node)
+        if isinstance(node, ast.Call):
+            return self._call(node)
+        raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+
+    @staticmethod
+    def _constant(value: Any) -> Any:
+        """Convert a literal; integers become int64 so that '**' cannot run away."""
+        if isinstance(value, bool):
+            return np.bool_(value)
+        if isinstance(value, int):
+            if abs(value) >= 2**63:
+                raise ExpressionError(f"Integer constant {value} is too large")
+            return np.int64(value)
+        if isinstance(value, float):
+            return np.float64(value)
+        if isinstance(value, str):
+            return value
+        raise ExpressionError(f"Unsupported constant: {value!r}")
+
+    def _operand(self, node: ast.AST) -> Evaluator:
+        """Compile an operand that may also be a string constant."""
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            value = node.value
+            return lambda columns: value
+        return self.compile(node)
+
+    def _literal_list(self, node: ast.AST) -> List[Any]:
+        """Evaluate a list or tuple of constants (right-hand side of 'in')."""
+        values = []
+        for element in getattr(node, "elts", None) or []:
+            if not isinstance(element, ast.Constant):
+                break
+            values.append(self._constant(element.value))
+        else:
+            if isinstance(node, (ast.List, ast.Tuple)):
+                return values
+        raise ExpressionError("'in' and isin() need a list of constants")
+
+    def _column(self, name: str) -> Evaluator:
+        """Reference a column by name."""
+        if name == "df":
+            raise ExpressionError("Use df.column or df['column'] to reference a column")
+        if name in FUNCTIONS:
+            raise ExpressionError(f"Function '{name}' must be called")
+        self.columns.add(name)
+        return lambda columns: columns[name]
+
+    @staticmethod
+    def _df_column(node: ast.AST) -> str:
+        """Resolve df.column and df['column'] to the column name."""
+        value = node.value  # type: ignore[attr-defined]
+        if not (isinstance(value, ast.Name) and value.id == "df"):
+            raise ExpressionError("Only df.column and df['column'] may be accessed")
+        if isinstance(node, ast.Attribute):
+            return node.attr
+        key = node.slice  # type: ignore[attr-defined]
+        if isinstance(key, ast.Constant) and isinstance(key.value, str):
+            return key.value
+        raise ExpressionError("df[...] needs a column name in quotes")
+
+    def _binary(self, func: Callable[[Any, Any], Any], left: ast.AST, right: ast.AST) -> Evaluator:
+        """Compile a binary operation."""
+        return functools.partial(self._arithmetic, func, self.compile(left), self.compile(right))
+
+    @staticmethod
+    def _arithmetic(
+        func: Callable[[Any, Any], Any], left: Evaluator, right: Evaluator, columns: Columns
+    ) -> Any:
+        """Apply an arithmetic operator, refusing text operands (e.g. the group column)."""
+        left_value = left(columns)
+        right_value = right(columns)
+        for value in (left_value, right_value):
+            if isinstance(value, str) or (
+                isinstance(value, np.ndarray) and value.dtype.kind in "OUS"
+            ):
+                raise ExpressionError("Arithmetic needs numeric operands, not text columns")
+        return func(left_value, right_value)
+
+    def _compare(self, node: ast.Compare) -> Evaluator:
+        """Compile a (possibly chained) comparison, or an 'in' / 'not in' test."""
+        if any(isinstance(op, (ast.In, ast.NotIn)) for op in node.ops):
+            if len(node.ops) != 1:
+                raise ExpressionError("'in' cannot be chained with other comparisons")
+            return functools.partial(
+                self._isin,
+                self._operand(node.left),
+                self._literal_list(node.comparators[0]),
+                isinstance(node.ops[0], ast.NotIn),
+            )
+
+        steps: List[Evaluator] = []
+        left_eval = self._operand(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in COMPARISON_OPERATORS:
+                raise ExpressionError(f"Unsupported comparison: {type(op).__name__}")
+            right_eval = self._operand(comparator)
+            steps.append(
+                functools.partial(
+                    self._apply2, COMPARISON_OPERATORS[type(op)], left_eval, right_eval
+                )
+            )
+            left_eval = right_eval
+
+        if len(steps) == 1:
+            return steps[0]
+        return lambda columns: functools.reduce(np.logical_and, (step(columns) for step in steps))
+
+    @staticmethod
+    def _apply2(
+        func: Callable[[Any, Any], Any], left: Evaluator, right: Evaluator, columns: Columns
+    ) -> Any:
+        """Apply a binary function to two evaluated operands."""
+        return func(left(columns), right(columns))
+
+    @staticmethod
+    def _isin(left: Evaluator, values: List[Any], negate: bool, columns: Columns) -> Any:
+        """Elementwise membership test."""
+        result = np.isin(left(columns), values)
+        return ~result if negate else result
+
+    def _call(self, node: ast.Call) -> Evaluator:
+        """Compile a whitelisted function or method call."""
+        if node.keywords:
+            raise ExpressionError("Keyword arguments are not supported; pass them by position")
+
+        if isinstance(node.func, ast.Name):
+            name = node.func.id
+            if name not in FUNCTIONS:
+                raise ExpressionError(
+                    f"Unknown function '{name}'. Available: {', '.join(sorted(FUNCTIONS))}"
+                )
+            func, min_args, max_args = FUNCTIONS[name]
+            receiver: Optional[Evaluator] = None
+        elif isinstance(node.func, ast.Attribute):
+            name = node.func.attr
+            if name not in METHODS:
+                raise ExpressionError(
+                    f"Unknown method '{name}'. Available: {', '.join(sorted(METHODS))}"
+                )
+            func, min_args, max_args = METHODS[name]
+            receiver = self.compile(node.func.value)
+        else:
+            raise ExpressionError("Only functions and column methods can be called")
+
+        if not min_args <= len(node.args) <= max_args:
+            expected = str(min_args) if min_args == max_args else f"{min_args}-{max_args}"
+            raise ExpressionError(f"{name}() takes {expected} argument(s), got {len(node.args)}")
+
+        if receiver is None:
+            args = [self.compile(arg) for arg in node.args]
+            return lambda columns: func(*(arg(columns) for arg in args))
+        if name == "isin":
+            return functools.partial(self._isin, receiver, self._literal_list(node.args[0]), False)
+
+        compile_arg = self._operand if name in STRING_ARGUMENT_METHODS else self.compile
+        args = [compile_arg(arg) for arg in node.args]
+        return lambda columns: func(receiver(columns), *(arg(columns) for arg in args))
@@ -0,0 +1,313 @@
+"""
+Lookup indexes for the MCP server's farm data.
+
+FarmIndex is built once when data is classified and answers point lookups
+(by TVD) in O(1) and equality/range filters in O(log n + k) instead of
+scanning the list of FarmData objects on every tool call.
+"""
+
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from muka_analysis.analyzer import FarmAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# Inclusive (min, max) bounds; None leaves that side open
+RangeBounds = Tuple[Optional[float], Optional[float]]
+
+
+class FarmIndex:
+    """
+    Hash, posting-list and sorted indexes over a classified farm DataFrame.
+
+    Positions returned by the index are row positions in the DataFrame the
+    index was built from (and therefore in the farm list it was built from).
+
+    Attributes:
+        n_rows: Number of indexed rows
+        range_fields: Numeric fields with a sorted index
+    """
+
+    POSTING_FIELDS: List[str] = ["group", "year"]
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        """
+        Build all indexes for a DataFrame.
+
+        Args:
+            df: Farm DataFrame as produced by FarmAnalyzer.farms_to_dataframe()
+        """
+        self.n_rows = len(df)
+
+        # tvd -> slice of the tvd-sorted permutation (a farm has one row per year)
+        tvd = df["tvd"].to_numpy(dtype=np.int64)
+        self._tvd_order = np.argsort(tvd, kind="stable")
+        keys, starts, counts = np.unique(
+            tvd[self._tvd_order], return_index=True, return_counts=True
+        )
+        self._tvd_keys = keys
+        self._tvd_starts = starts.astype(np.int64)
+        self._tvd_stops = (starts + counts).astype(np.int64)
+        self._tvd_slices: Optional[Dict[int, Tuple[int, int]]] = dict(
+            zip(keys.tolist(), zip(self._tvd_starts.tolist(), self._tvd_stops.tolist()))
+        )
+
+        # value -> ascending row positions (unclassified farms have no group posting)
+        self._postings: Dict[str, Dict[Any, np.ndarray]] = {
+            field: {
+                key: np.asarray(positions, dtype=np.int64)
+                for key, positions in df.groupby(field, sort=False).indices.items()
+            }
+            for field in self.POSTING_FIELDS
+        }
+
+        # field -> (permutation sorting the field, sorted values); NaN sorts last
+        self.range_fields: List[str] = [
+            field for field in ["year"] + FarmAnalyzer.NUMERIC_FIELDS if field in df.columns
+        ]
+        self._values: Dict[str, np.ndarray] = {}
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for field in self.range_fields:
+            values = df[field].to_numpy(dtype=np.float64)
+            order = np.argsort(values, kind="stable")
+            self._values[field] = values
+            self._sorted[field] = (order, values[order])
+
+        logger.info(
+            f"Built farm index: {self.n_rows} rows, {len(self._tvd_keys)} TVDs, "
+            f"{len(self.range_fields)} sorted fields"
+        )
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """
+        Export the index as flat arrays plus JSON-serializable metadata.
+
+        Returns:
+            Tuple of (arrays by name, metadata) accepted by from_arrays()
+        """
+        arrays: Dict[str, np.ndarray] = {
+            "tvd_order": self._tvd_order,
+            "tvd_keys": self._tvd_keys,
+            "tvd_starts": self._tvd_starts,
+            "tvd_stops": self._tvd_stops,
+        }
+        posting_keys: Dict[str, List[Any]] = {}
+        for field, postings in self._postings.items():
+            keys = list(postings)
+            lengths = [len(postings[key]) for key in keys]
+            posting_keys[field] = [k.item() if hasattr(k, "item") else k for k in keys]
+            arrays[f"posting_{field}_offsets"] = np.concatenate([[0], np.cumsum(lengths)]).astype(
+                np.int64
+            )
+            arrays[f"posting_{field}_positions"] = (
+                np.concatenate([postings[key] for key in keys])
+                if keys
+                else np.empty(0, dtype=np.int64)
+            )
+        for field in self.range_fields:
+            arrays[f"values_{field}"] = self._values[field]
+            arrays[f"sorted_{field}_order"] = self._sorted[field][0]
+            arrays[f"sorted_{field}_values"] = self._sorted[field][1]
+
+        metadata = {
+            "n_rows": self.n_rows,
+            "range_fields": self.range_fields,
+            "posting_keys": posting_keys,
+        }
+        return arrays, metadata
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> "FarmIndex":
+        """
+        Restore an index exported with to_arrays() without rebuilding it.
+
+        The arrays are used as given (e.g. memory-mapped); nothing is sorted or
+        copied. TVD lookups then use binary search on the sorted TVD keys
+        instead of a hash table, so restoring stays independent of the number
+        of farms.
+
+        Args:
+            arrays: Arrays by name from to_arrays()
+            metadata: Metadata from to_arrays()
+
+        Returns:
+            Restored FarmIndex
+        """
+        index = cls.__new__(cls)
+        index.n_rows = int(metadata["n_rows"])
+        index._tvd_order = arrays["tvd_order"]
+        index._tvd_keys = arrays["tvd_keys"]
+        index._tvd_starts = arrays["tvd_starts"]
+        index._tvd_stops = arrays["tvd_stops"]
+        index._tvd_slices = None
+        index._postings = {}
+        for field, keys in metadata["posting_keys"].items():
+            offsets = arrays[f"posting_{field}_offsets"]
+            positions = arrays[f"posting_{field}_positions"]
+            index._postings[field] = {
+                key: positions[offsets[i] : offsets[i + 1]] for i, key in enumerate(keys)
+            }
+        index.range_fields = list(metadata["range_fields"])
+        index._values = {field: arrays[f"values_{field}"] for field in index.range_fields}
+        index._sorted = {
+            field: (arrays[f"sorted_{field}_order"], arrays[f"sorted_{field}_values"])
+            for field in index.range_fields
+        }
+        return index
+
+    def iter_arrays(self) -> Iterator[np.ndarray]:
+        """Yield every array held by the index (for memory accounting)."""
+        yield from (self._tvd_order, self._tvd_keys, self._tvd_starts, self._tvd_stops)
+        for postings in self._postings.values():
+            yield from postings.values()
+        for field in self.range_fields:
+            yield self._values[field]
+            yield from self._sorted[field]
+
+    def lookup_tvd(self, tvd: int) -> np.ndarray:
+        """
+        Find all rows of a farm.
+
+        Args:
+            tvd: Farm TVD number
+
+        Returns:
+            Ascending row positions (empty if the TVD is unknown)
+        """
+        tvd = int(tvd)
+        if self._tvd_slices is not None:
+            bounds = self._tvd_slices.get(tvd)
+        else:
+            i = int(np.searchsorted(self._tvd_keys, tvd))
+            found = i < len(self._tvd_keys) and self._tvd_keys[i] == tvd
+            bounds = (int(self._tvd_starts[i]), int(self._tvd_stops[i])) if found else None
+        if bounds is None:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(self._tvd_order[bounds[0] : bounds[1]])
+
+    def lookup(self, field: str, value: Any) -> np.ndarray:
+        """
+        Find the rows where a posting-list field equals a value.
+
+        Args:
+            field: One of POSTING_FIELDS
+            value: Value to look up (e.g. a group name or year)
+
+        Returns:
+            Ascending row positions (empty if the value does not occur)
+        """
+        return self._postings[field].get(value, np.empty(0, dtype=np.int64))
+
+    def range_slice(self, field: str, bounds: RangeBounds) -> np.ndarray:
+        """
+        Find the rows where a numeric field lies within inclusive bounds.
+
+        Args:
+            field: One of range_fields
+            bounds: (min, max), either side may be None
+
+        Returns:
+            Row positions in ascending order of the field value
+
+        Raises:
+            ValueError: If the field has no sorted index
+        """
+        order, sorted_values = self._sorted_index(field)
+        start, stop = self._range_bounds(sorted_values, bounds)
+        return order[start:stop]
+
+    def query(
+        self,
+        tvd: Optional[int] = None,
+        group: Optional[str] = None,
+        year: Optional[int] = None,
+        ranges: Optional[Dict[str, RangeBounds]] = None,
+    ) -> np.ndarray:
+        """
+        Find the rows matching all given filters.
+
+        The most selective filter is resolved through its index; the remaining
+        filters are checked only on those candidate rows.
+
+        Args:
+            tvd: Farm TVD number
+            group: Farm group name
+            year: Year of data
+            ranges: Inclusive (min, max) bounds per numeric field
+
+        Returns:
+            Ascending row positions of matching farms
+
+        Raises:
+            ValueError: If a range field has no sorted index
+        """
+        equalities: List[np.ndarray] = []
+        if tvd is not None:
+            equalities.append(self.lookup_tvd(tvd))
+        if group is not None:
+            equalities.append(self.lookup("group", group))
+        if year is not None:
+            equalities.append(self.lookup("year", year))
+
+        range_filters: List[Tuple[str, RangeBounds, int, int]] = []
+        for field, bounds in (ranges or {}).items():
+            if bounds[0] is None and bounds[1] is None:
+                continue
+            start, stop = self._range_bounds(self._sorted_index(field)[1], bounds)
+            range_filters.append((field, bounds, start, stop))
+
+        if not equalities and not range_filters:
+            return np.arange(self.n_rows, dtype=np.int64)
+
+        # Pick the smallest candidate set: an equality posting or a range slice
+        eq_sizes = [len(positions) for positions in equalities]
+        range_sizes = [stop - start for _, _, start, stop in range_filters]
+        if range_sizes and (not eq_sizes or min(range_sizes) < min(eq_sizes)):
+            field, _, start, stop = range_filters.pop(int(np.argmin(range_sizes)))
+            candidates = np.sort(self._sorted[field][0][start:stop])
+        else:
+            candidates = equalities.pop(int(np.argmin(eq_sizes)))
+
+        for positions in equalities:
+            candidates = candidates[self._contains(positions, candidates)]
+        for field, (low, high), _, _ in range_filters:
+            values = self._values[field][candidates]
+            mask = np.ones(len(candidates), dtype=bool)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+            candidates = candidates[mask]
+
+        return candidates
+
+    def _sorted_index(self, field: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the sorted index of a field, raising ValueError if there is none."""
+        if field not in self._sorted:
+            raise ValueError(
+                f"Field '{field}' is not indexed. Indexed fields: {', '.join(self.range_fields)}"
+            )
+        return self._sorted[field]
+
+    @staticmethod
+    def _range_bounds(sorted_values: np.ndarray, bounds: RangeBounds) -> Tuple[int, int]:
+        """Binary-search inclusive bounds in sorted values (NaN never matches)."""
+        low, high = bounds
+        n_valid = int(np.searchsorted(sorted_values, np.nan, side="left"))
+        start = 0 if low is None else int(np.searchsorted(sorted_values, low, side="left"))
+        stop = n_valid if high is None else int(np.searchsorted(sorted_values, high, side="right"))
+        return start, max(start, min(stop, n_valid))
+
+    @staticmethod
+    def _contains(sorted_positions: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """Boolean mask of candidates that occur in an ascending position array."""
+        if len(sorted_positions) == 0:
+            return np.zeros(len(candidates), dtype=bool)
+        idx = np.searchsorted(sorted_positions, candidates)
+        idx[idx == len(sorted_positions)] = 0
+        found: np.ndarray = sorted_positions[idx] == candidates
+        return found
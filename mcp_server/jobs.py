@@ -0,0 +1,287 @@
+"""
+Background jobs for long-running MCP tools.
+
+Writing an Excel workbook for a large dataset (or one workbook for all
+indicator modes) takes minutes. Tools such as export_analysis therefore
+submit the work to a JobManager and return a job ID right away; clients
+follow the job with get_job_status and stop it with cancel_job.
+
+Jobs run on a small thread pool, so at most ``mcp.max_concurrent_jobs`` run
+at a time and further jobs wait in a bounded queue. Job functions report
+their progress through Job.report(), which is also where a requested
+cancellation takes effect: cancellation is cooperative and happens between
+steps, never in the middle of writing a file.
+"""
+
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from muka_analysis.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Job states (the last three are final)
+JOB_STATES: List[str] = ["queued", "running", "completed", "failed", "cancelled"]
+FINAL_STATES = ("completed", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function when the job has been cancelled."""
+
+
+class Job:
+    """
+    A unit of background work and its observable state.
+
+    Attributes:
+        job_id: Identifier returned to the client
+        kind: Kind of job (e.g. "export")
+        description: Human-readable summary of the work
+        state: One of JOB_STATES
+        progress: Completed fraction between 0.0 and 1.0
+        message: Description of the current step
+        result: Result of a completed job
+        error: Error message of a failed job
+        created: Submission time (UNIX timestamp)
+        started: Start time, or None while queued
+        finished: End time, or None while queued or running
+    """
+
+    def __init__(self, job_id: str, kind: str, description: str) -> None:
+        """Initialize a queued job (see attributes)."""
+        self.job_id = job_id
+        self.kind = kind
+        self.description = description
+        self.state = "queued"
+        self.progress = 0.0
+        self.message = "Queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        """Whether the job has reached a final state."""
+        return self.state in FINAL_STATES
+
+    @property
+    def cancel_requested(self) -> bool:
+        """Whether cancellation was requested."""
+        return self._cancel.is_set()
+
+    def report(self, progress: float, message: str) -> None:
+        """
+        Report progress from the job function, at a point where it may stop.
+
+        Args:
+            progress: Completed fraction between 0.0 and 1.0
+            message: Description of the step that starts now
+
+        Raises:
+            JobCancelled: If cancellation was requested
+        """
+        if self._cancel.is_set():
+            raise JobCancelled()
+        with self._lock:
+            self.progress = min(max(progress, 0.0), 1.0)
+            self.message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the job's status as a JSON-ready dictionary."""
+        with self._lock:
+            status: Dict[str, Any] = {
+                "job_id": self.job_id,
+                "kind": self.kind,
+                "description": self.description,
+                "state": self.state,
+                "progress": round(self.progress, 3),
+                "message": self.message,
+            }
+            end = self.finished or time.time()
+            if self.started is not None:
+                status["elapsed_seconds"] = round(end - self.started, 1)
+            else:
+                status["queued_seconds"] = round(end - self.created, 1)
+            if self._cancel.is_set() and not self.done:
+                status["cancel_requested"] = True
+            if self.result is not None:
+                status["result"] = self.result
+            if self.error is not None:
+                status["error"] = self.error
+            return status
+
+    def _set_state(self, state: str, message: str) -> None:
+        """Move the job to a new state."""
+        with self._lock:
+            self.state = state
+            self.message = message
+            if state == "running":
+                self.started = time.time()
+            elif state in FINAL_STATES:
+                self.finished = time.time()
+                if state == "completed":
+                    self.progress = 1.0
+
+
+class JobManager:
+    """
+    Run jobs on a bounded thread pool and keep their status.
+
+    Attributes:
+        max_concurrent: Maximum number of jobs running at a time
+        max_queued: Maximum number of jobs waiting to run
+        history: Number of finished jobs kept for status queries
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int, history: int) -> None:
+        """
+        Initialize the manager.
+
+        Args:
+            max_concurrent: Maximum number of jobs running at a time
+            max_queued: Maximum number of jobs waiting to run
+            history: Number of finished jobs kept for status queries
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.history = history
+        self._pool = ThreadPoolExecutor(max_concurrent, thread_name_prefix="muka-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "JobManager":
+        """Create a manager with the limits from the [mcp] configuration section."""
+        config = get_config().mcp
+        return cls(config.max_concurrent_jobs, config.max_queued_jobs, config.job_history)
+
+    def submit(
+        self,
+        kind: str,
+        description: str,
+        func: Callable[[Job], Dict[str, Any]],
+        on_finish: Optional[Callable[[], None]] = None,
+    ) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            kind: Kind of job (e.g. "export")
+            description: Human-readable summary of the work
+            func: Job function; gets the Job (for report()) and returns the result
+            on_finish: Called when the job ends in any state (e.g. to release data)
+
+        Returns:
+            The queued job
+
+        Raises:
+            RuntimeError: If max_queued jobs are already waiting
+        """
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job.state == "queued")
+            if queued >= self.max_queued:
+                raise RuntimeError(
+                    f"Too many queued jobs ({queued}). Wait for running jobs or cancel some."
+                )
+            job = Job(secrets.token_urlsafe(6), kind, description)
+            self._jobs[job.job_id] = job
+            self._prune()
+
+        self._pool.submit(self._run, job, func, on_finish)
+        logger.info(f"Submitted {kind} job {job.job_id}: {description}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID (None if unknown or pruned)."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        """Get all known jobs, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Job:
+        """
+        Request cancellation of a job.
+
+        A queued job is cancelled before it starts; a running job stops at
+        its next progress report.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            The job
+
+        Raises:
+            ValueError: If the job is unknown
+        """
+        job = self.get(job_id)
+        if job is None:
+            raise ValueError(f"Unknown job '{job_id}'")
+        if not job.done:
+            job._cancel.set()
+            logger.info(f"Cancellation requested for job {job_id}")
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        """Get job counts per state and the limits."""
+        with self._lock:
+            counts = {state: 0 for state in JOB_STATES}
+            for job in self._jobs.values():
+                counts[job.state] += 1
+        return {
+            **counts,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+        }
+
+    def shutdown(self) -> None:
+        """Cancel all jobs and wait for running ones to stop."""
+        for job in self.list():
+            job._cancel.set()
+        self._pool.shutdown(wait=True)
+
+    def _run(
+        self,
+        job: Job,
+        func: Callable[[Job], Dict[str, Any]],
+        on_finish: Optional[Callable[[], None]],
+    ) -> None:
+        """Run a job on a pool thread and record its outcome."""
+        try:
+            if job.cancel_requested:
+                raise JobCancelled()
+            job._set_state("running", "Started")
+            result = func(job)
+            job.result = result
+            job._set_state("completed", "Completed")
+            logger.info(f"Job {job.job_id} completed")
+        except JobCancelled:
+            job._set_state("cancelled", "Cancelled")
+            logger.info(f"Job {job.job_id} cancelled")
+        except Exception as e:
+            job.error = str(e)
+            job._set_state("failed", "Failed")
+            logger.error(f"Job {job.job_id} failed: {e}", exc_info=True)
+        finally:
+            if on_finish is not None:
+                on_finish()
+            with self._lock:
+                self._prune()
+
+    def _prune(self) -> None:
+        """Drop the oldest finished jobs beyond the history size (caller holds _lock)."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[: max(len(finished) - self.history, 0)]:
+            del self._jobs[job_id]
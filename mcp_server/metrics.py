@@ -0,0 +1,335 @@
+"""
+Per-tool metrics of the MCP server.
+
+call_tool records every call in a MetricsRegistry: call and error counts,
+latency, and the sizes of the arguments and of the response text. Latencies
+and sizes go into Histograms with logarithmic buckets, so memory stays
+constant however many calls the server handles; percentiles are estimated
+from the buckets (within one bucket width, about 19%).
+
+The get_server_metrics tool reports these together with the process memory
+and the sizes of datasets, indexes and caches. With ``mcp.metrics_file``
+set, a MetricsDumper appends the same report to a JSON-lines file at a
+fixed interval.
+"""
+
+import logging
+import math
+import os
+import resource
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from mcp_server.serialization import to_json
+from muka_analysis.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Percentiles reported for every histogram
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """
+    Histogram with logarithmic buckets.
+
+    Bucket i counts values up to ``start * factor**i``; the first bucket
+    also takes smaller values and the last one larger values.
+
+    Attributes:
+        start: Upper bound of the first bucket
+        factor: Ratio of successive bucket bounds
+        count: Number of recorded values
+        total: Sum of recorded values
+        min: Smallest recorded value
+        max: Largest recorded value
+    """
+
+    def __init__(self, start: float, factor: float = 2**0.25, buckets: int = 96) -> None:
+        """
+        Initialize an empty histogram.
+
+        Args:
+            start: Upper bound of the first bucket
+            factor: Ratio of successive bucket bounds
+            buckets: Number of buckets
+        """
+        self.start = start
+        self.factor = factor
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._buckets = [0] * buckets
+        self._log_factor = math.log(factor)
+
+    def record(self, value: float) -> None:
+        """Record a value."""
+        if value <= self.start:
+            bucket = 0
+        else:
+            bucket = math.ceil(math.log(value / self.start) / self._log_factor - 1e-9)
+        self._buckets[min(bucket, len(self._buckets) - 1)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimate a percentile as the upper bound of the bucket it falls in.
+
+        Args:
+            q: Percentile between 0 and 100
+
+        Returns:
+            Estimated value (0.0 for an empty histogram)
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(math.ceil(self.count * q / 100), 1)
+        seen = 0
+        for bucket, n in enumerate(self._buckets):
+            seen += n
+            if seen >= rank:
+                bound = self.start * self.factor**bucket
+                return min(max(bound, self.min), self.max)
+        return self.max
+
+    def summary(self, digits: int = 2) -> Dict[str, float]:
+        """
+        Summarize the histogram.
+
+        Args:
+            digits: Decimal places of the values
+
+        Returns:
+            Dictionary with count, mean, min, max and the PERCENTILES (p50, ...)
+        """
+        if self.count == 0:
+            return {"count": 0}
+        summary: Dict[str, float] = {
+            "count": self.count,
+            "mean": round(self.total / self.count, digits),
+            "min": round(self.min, digits),
+            "max": round(self.max, digits),
+        }
+        for q in PERCENTILES:
+            summary[f"p{q}"] = round(self.percentile(q), digits)
+        return summary
+
+
+class ToolMetrics:
+    """
+    Metrics of one tool.
+
+    Attributes:
+        calls: Number of finished calls
+        errors: Number of calls that failed or returned an error
+        latency_ms: Histogram of call latencies in milliseconds
+        argument_bytes: Histogram of JSON-encoded argument sizes
+        response_bytes: Histogram of response text sizes
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty metrics."""
+        self.calls = 0
+        self.errors = 0
+        self.latency_ms = Histogram(start=0.01)
+        self.argument_bytes = Histogram(start=16, factor=2**0.5, buckets=48)
+        self.response_bytes = Histogram(start=16, factor=2**0.5, buckets=48)
+
+    def to_dict(self, uptime: float) -> Dict[str, Any]:
+        """Get the metrics as a JSON-ready dictionary."""
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.calls, 4) if self.calls else 0.0,
+            "calls_per_minute": round(self.calls * 60 / uptime, 3) if uptime > 0 else 0.0,
+            "latency_ms": self.latency_ms.summary(digits=3),
+            "argument_bytes": self.argument_bytes.summary(digits=0),
+            "response_bytes": self.response_bytes.summary(digits=0),
+        }
+
+
+class MetricsRegistry:
+    """
+    Thread-safe collection of ToolMetrics, one per tool name.
+
+    Attributes:
+        started: Creation time of the registry (UNIX timestamp)
+        in_flight: Number of calls running now
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self.started = time.time()
+        self.in_flight = 0
+        self._tools: Dict[str, ToolMetrics] = {}
+        self._lock = threading.Lock()
+
+    def call_started(self) -> float:
+        """
+        Register the start of a call.
+
+        Returns:
+            Start time to pass to call_finished()
+        """
+        with self._lock:
+            self.in_flight += 1
+        return time.perf_counter()
+
+    def call_finished(
+        self,
+        tool: str,
+        started: float,
+        argument_bytes: int,
+        response_bytes: int,
+        error: bool,
+    ) -> None:
+        """
+        Record a finished call.
+
+        Args:
+            tool: Tool name (known only once the call is dispatched)
+            started: Value returned by call_started()
+            argument_bytes: Size of the JSON-encoded arguments
+            response_bytes: Size of the response text
+            error: Whether the call failed or returned an error
+        """
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.in_flight -= 1
+            metrics = self._tools.setdefault(tool, ToolMetrics())
+            metrics.calls += 1
+            metrics.errors += int(error)
+            metrics.latency_ms.record(elapsed_ms)
+            metrics.argument_bytes.record(argument_bytes)
+            metrics.response_bytes.record(response_bytes)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the metrics of all tools.
+
+        Returns:
+            Dictionary with uptime, total calls and errors, throughput and
+            per-tool metrics (sorted by tool name)
+        """
+        uptime = time.time() - self.started
+        with self._lock:
+            tools = {name: self._tools[name].to_dict(uptime) for name in sorted(self._tools)}
+            in_flight = self.in_flight
+        calls = sum(metrics["calls"] for metrics in tools.values())
+        return {
+            "uptime_seconds": round(uptime, 1),
+            "calls": calls,
+            "errors": sum(metrics["errors"] for metrics in tools.values()),
+            "calls_per_minute": round(calls * 60 / uptime, 3) if uptime > 0 else 0.0,
+            "in_flight": in_flight,
+            "tools": tools,
+        }
+
+    def reset(self) -> None:
+        """Drop all recorded metrics and restart the uptime."""
+        with self._lock:
+            self._tools = {}
+            self.started = time.time()
+
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """
+    Measure the memory of the server process.
+
+    Uses /proc/self/statm for the current resident set size where available
+    (Linux); the peak comes from getrusage().
+
+    Returns:
+        Dictionary with rss_bytes (None if unavailable) and peak_rss_bytes
+    """
+    rss: Optional[int] = None
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    peak_bytes = peak if sys.platform == "darwin" else peak * 1024
+    return {"rss_bytes": rss, "peak_rss_bytes": peak_bytes}
+
+
+class MetricsDumper:
+    """
+    Append metrics reports to a JSON-lines file at a fixed interval.
+
+    Attributes:
+        file_path: JSON-lines output file
+        interval: Seconds between reports
+    """
+
+    def __init__(
+        self, file_path: Path, interval: float, collect: Callable[[], Dict[str, Any]]
+    ) -> None:
+        """
+        Initialize the dumper (call start() to begin writing).
+
+        Args:
+            file_path: JSON-lines output file
+            interval: Seconds between reports
+            collect: Builds one report
+        """
+        self.file_path = file_path
+        self.interval = interval
+        self._collect = collect
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, collect: Callable[[], Dict[str, Any]]) -> Optional["MetricsDumper"]:
+        """
+        Create a dumper from the [mcp] configuration section.
+
+        Args:
+            collect: Builds one report
+
+        Returns:
+            The dumper, or None if mcp.metrics_file is not set
+        """
+        config = get_config().mcp
+        if config.metrics_file is None:
+            return None
+        return cls(config.metrics_file, config.metrics_interval_seconds, collect)
+
+    def start(self) -> None:
+        """Start writing reports on a daemon thread."""
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="muka-metrics", daemon=True)
+        self._thread.start()
+        logger.info(f"Writing server metrics to {self.file_path} every {self.interval:g}s")
+
+    def stop(self) -> None:
+        """Write a final report and stop the thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def dump(self) -> None:
+        """Append one report to the file."""
+        report = {"timestamp": round(time.time(), 3), **self._collect()}
+        with open(self.file_path, "a", encoding="utf-8") as f:
+            f.write(to_json(report) + "\n")
+
+    def _run(self) -> None:
+        """Write a report every interval until stopped, and once more at the end."""
+        stopping = False
+        while not stopping:
+            stopping = self._stop.wait(self.interval)
+            try:
+                self.dump()
+            except Exception as e:
+                logger.warning(f"Could not write server metrics: {e}")
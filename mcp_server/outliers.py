@@ -0,0 +1,301 @@
+"""
+Precomputed outlier index for the MCP server's farm data.
+
+OutlierIndex is built once when data is classified. For every farm group
+and every numeric metric (FarmAnalyzer.NUMERIC_FIELDS) it keeps robust
+statistics (median, MAD, quartiles), and for every farm a robust z-score per
+metric relative to its own group:
+
+    score = (value - group median) / (1.4826 * group MAD)
+
+Count metrics are often zero for most farms of a group, which makes the MAD
+zero; the scale then falls back to 1.2533 * the mean absolute deviation
+(Iglewicz and Hoaglin). Farms whose |score| exceeds a threshold (3.5 by
+default) are outliers. Farms are also ranked once by their largest |score|
+over all metrics, so the most unusual farms are read off without a scan.
+"""
+
+import logging
+import warnings
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from muka_analysis.analyzer import FarmAnalyzer
+from muka_analysis.classifier import GROUP_LABELS, UNCLASSIFIED_CODE
+
+logger = logging.getLogger(__name__)
+
+# Robust statistics kept per group and metric
+OUTLIER_STATISTICS: List[str] = ["count", "median", "mad", "q1", "q3"]
+
+# Scale factors turning the MAD and the mean absolute deviation into standard deviations
+MAD_SCALE = 1.4826
+MEAN_AD_SCALE = 1.2533
+
+# Score directions accepted by OutlierIndex.find()
+OUTLIER_DIRECTIONS: List[str] = ["both", "high", "low"]
+
+
+def group_codes(groups: pd.Series) -> np.ndarray:
+    """
+    Encode group labels as int8 codes into GROUP_LABELS (missing: UNCLASSIFIED_CODE).
+
+    Args:
+        groups: Group label of every farm (None for unclassified farms)
+
+    Returns:
+        Array of int8 group codes
+    """
+    codes = pd.Categorical(groups, categories=GROUP_LABELS[:UNCLASSIFIED_CODE]).codes
+    return np.where(codes < 0, UNCLASSIFIED_CODE, codes).astype(np.int8)
+
+
+class OutlierIndex:
+    """
+    Per-group robust statistics and per-farm outlier scores.
+
+    Row positions are positions in the DataFrame the index was built from.
+
+    Attributes:
+        n_rows: Number of indexed rows
+        fields: Numeric fields with scores (columns of scores)
+        codes: Group code of every row (see classifier.GROUP_LABELS)
+        stats: Statistic name -> float64 array of shape (len(GROUP_LABELS), len(fields))
+        scores: float32 array of shape (n_rows, len(fields)); NaN where the value is missing
+        max_scores: Largest |score| of every row over all fields (0 if all are missing)
+        max_fields: Column of scores holding the largest |score| of every row
+        order: Row positions by descending max_scores
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        """
+        Build the index for a DataFrame.
+
+        Args:
+            df: Farm DataFrame as produced by FarmAnalyzer.farms_to_dataframe()
+        """
+        self.n_rows = len(df)
+        self.fields: List[str] = [f for f in FarmAnalyzer.NUMERIC_FIELDS if f in df.columns]
+        self.codes = group_codes(df["group"])
+
+        values = df[self.fields].to_numpy(dtype=np.float64)
+        n_groups = len(GROUP_LABELS)
+        self.stats: Dict[str, np.ndarray] = {
+            name: np.full((n_groups, len(self.fields)), np.nan) for name in OUTLIER_STATISTICS
+        }
+        self.scores = np.full(values.shape, np.nan, dtype=np.float32)
+
+        order = np.argsort(self.codes, kind="stable")
+        bounds = np.cumsum(np.bincount(self.codes, minlength=n_groups))
+        with warnings.catch_warnings():
+            # Groups without values for a field yield NaN statistics
+            warnings.simplefilter("ignore", RuntimeWarning)
+            for code, rows in enumerate(np.split(order, bounds[:-1])):
+                if len(rows) == 0:
+                    continue
+                group_values = values[rows]
+                q1, median, q3 = np.nanquantile(group_values, [0.25, 0.5, 0.75], axis=0)
+                deviations = np.abs(group_values - median)
+                mad = np.nanmedian(deviations, axis=0)
+                scale = np.where(
+                    mad > 0, MAD_SCALE * mad, MEAN_AD_SCALE * np.nanmean(deviations, axis=0)
+                )
+                # A field with a single value in the group has no outliers
+                scores = np.where(
+                    scale > 0, (group_values - median) / np.where(scale > 0, scale, 1.0), 0.0
+                )
+                self.scores[rows] = np.where(np.isnan(group_values), np.nan, scores)
+                self.stats["count"][code] = np.sum(~np.isnan(group_values), axis=0)
+                self.stats["median"][code] = median
+                self.stats["mad"][code] = mad
+                self.stats["q1"][code] = q1
+                self.stats["q3"][code] = q3
+
+        magnitudes = np.nan_to_num(np.abs(self.scores), nan=0.0)
+        self.max_fields = np.argmax(magnitudes, axis=1).astype(np.int8)
+        self.max_scores = magnitudes[np.arange(self.n_rows), self.max_fields]
+        self.order = np.argsort(-self.max_scores, kind="stable")
+
+        logger.info(
+            f"Built outlier index: {self.n_rows} rows, {len(self.fields)} fields, "
+            f"{int(np.count_nonzero(np.bincount(self.codes, minlength=n_groups)))} groups"
+        )
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """
+        Export the index as flat arrays plus JSON-serializable metadata.
+
+        Returns:
+            Tuple of (arrays by name, metadata) accepted by from_arrays()
+        """
+        arrays = {
+            "codes": self.codes,
+            "scores": self.scores,
+            "max_scores": self.max_scores,
+            "max_fields": self.max_fields,
+            "order": self.order,
+        }
+        arrays.update({f"stats_{name}": self.stats[name] for name in OUTLIER_STATISTICS})
+        return arrays, {"n_rows": self.n_rows, "fields": self.fields}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> "OutlierIndex":
+        """
+        Restore an index exported with to_arrays() without rebuilding it.
+
+        Args:
+            arrays: Arrays by name from to_arrays() (e.g. memory-mapped)
+            metadata: Metadata from to_arrays()
+
+        Returns:
+            Restored OutlierIndex
+        """
+        index = cls.__new__(cls)
+        index.n_rows = int(metadata["n_rows"])
+        index.fields = list(metadata["fields"])
+        index.codes = arrays["codes"]
+        index.scores = arrays["scores"]
+        index.max_scores = arrays["max_scores"]
+        index.max_fields = arrays["max_fields"]
+        index.order = arrays["order"]
+        index.stats = {name: arrays[f"stats_{name}"] for name in OUTLIER_STATISTICS}
+        return index
+
+    def iter_arrays(self) -> Iterator[np.ndarray]:
+        """Yield every array held by the index (for memory accounting)."""
+        yield from (self.codes, self.scores, self.max_scores, self.max_fields, self.order)
+        yield from self.stats.values()
+
+    def group_code(self, group: str) -> int:
+        """
+        Get the code of a group label.
+
+        Raises:
+            ValueError: If the group is unknown
+        """
+        if group not in GROUP_LABELS:
+            raise ValueError(f"Unknown group '{group}'. Must be one of: {', '.join(GROUP_LABELS)}")
+        return GROUP_LABELS.index(group)
+
+    def field_column(self, field: str) -> int:
+        """
+        Get the column of a field in scores.
+
+        Raises:
+            ValueError: If the field has no scores
+        """
+        if field not in self.fields:
+            raise ValueError(f"Unknown field '{field}'. Must be one of: {', '.join(self.fields)}")
+        return self.fields.index(field)
+
+    def group_statistics(self, group: str) -> Dict[str, Dict[str, float]]:
+        """
+        Get the robust statistics of a group.
+
+        Args:
+            group: Group label (see classifier.GROUP_LABELS)
+
+        Returns:
+            Field -> {count, median, mad, q1, q3}
+        """
+        code = self.group_code(group)
+        return {
+            field: {name: float(self.stats[name][code, j]) for name in OUTLIER_STATISTICS}
+            for j, field in enumerate(self.fields)
+        }
+
+    def outlier_counts(
+        self, threshold: float, positions: Optional[np.ndarray] = None
+    ) -> Dict[str, int]:
+        """
+        Count the outliers of every field.
+
+        Args:
+            threshold: Minimum |score| of an outlier
+            positions: Rows to count, or None for all rows
+
+        Returns:
+            Field -> number of rows whose |score| exceeds the threshold
+        """
+        scores = self.scores if positions is None else self.scores[positions]
+        with np.errstate(invalid="ignore"):
+            counts = np.sum(np.abs(scores) > threshold, axis=0)
+        return dict(zip(self.fields, counts.tolist()))
+
+    def count_outlier_rows(self, threshold: float, positions: Optional[np.ndarray] = None) -> int:
+        """Count rows with at least one |score| above the threshold."""
+        max_scores = self.max_scores if positions is None else self.max_scores[positions]
+        return int(np.count_nonzero(max_scores > threshold))
+
+    def find(
+        self,
+        threshold: float,
+        fields: Optional[List[str]] = None,
+        group: Optional[str] = None,
+        direction: str = "both",
+        limit: int = 20,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        """
+        Find the most unusual rows.
+
+        Each row is judged by its most unusual field among the given ones:
+        the largest |score| ("both"), the largest score ("high") or the
+        smallest score ("low").
+
+        Args:
+            threshold: Minimum |score| of an outlier
+            fields: Fields to check, or None for all fields
+            group: Restrict to one group, or None for all groups
+            direction: "high" (above the median), "low" (below) or "both"
+            limit: Maximum number of rows returned
+
+        Returns:
+            Tuple of (row positions, score columns, signed scores, total
+            number of matching rows), most unusual first
+
+        Raises:
+            ValueError: If a field, the group or the direction is unknown
+        """
+        if direction not in OUTLIER_DIRECTIONS:
+            raise ValueError(
+                f"Unknown direction '{direction}'. Must be one of: {', '.join(OUTLIER_DIRECTIONS)}"
+            )
+        code = self.group_code(group) if group else None
+
+        if fields is None and direction == "both":
+            # Rows are ranked by max_scores already
+            matches = int(np.searchsorted(-self.max_scores[self.order], -threshold, side="left"))
+            positions = self.order[:matches]
+            if code is not None:
+                positions = positions[self.codes[positions] == code]
+            total = len(positions)
+            positions = positions[:limit]
+            columns = self.max_fields[positions].astype(np.int64)
+            return positions, columns, self.scores[positions, columns], total
+
+        candidates = np.array([self.field_column(f) for f in fields or self.fields], dtype=np.int64)
+        scores = self.scores[:, candidates]
+        if direction == "high":
+            keys = scores
+        elif direction == "low":
+            keys = -scores
+        else:
+            keys = np.abs(scores)
+        keys = np.nan_to_num(keys, nan=-np.inf)
+        best = np.argmax(keys, axis=1)
+        magnitudes = keys[np.arange(self.n_rows), best]
+        mask = magnitudes > threshold
+        if code is not None:
+            mask &= self.codes == code
+
+        positions = np.flatnonzero(mask)
+        total = len(positions)
+        magnitudes = magnitudes[positions]
+        if total > limit:
+            top = np.argpartition(-magnitudes, limit - 1)[:limit]
+            positions, magnitudes = positions[top], magnitudes[top]
+        positions = positions[np.argsort(-magnitudes, kind="stable")]
+        columns = candidates[best[positions]]
+        return positions, columns, self.scores[positions, columns], total
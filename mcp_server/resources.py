@@ -0,0 +1,382 @@
+"""
+Paged MCP resources for datasets and large tool results.
+
+Inlining a large table (a query_farms call with a high limit, statistics for
+many groups, an aggregation with many keys) into one TextContent bloats the
+client's context and costs serialization time. Instead, call_tool moves
+tables with more than ``mcp.inline_max_rows`` rows into a ResultStore and
+returns a reference; clients read the rows in bounded pages through the
+resource templates below.
+
+- ``muka://dataset/{name}/rows{?offset,limit,fields,layout}``: rows of a
+  loaded dataset (classified data if available, else the raw CSV rows)
+- ``muka://result/{id}{?offset,limit,layout}``: a stored tool result
+
+Every page reports the total row count and the URI of the next page.
+"""
+
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from mcp_server.serialization import check_layout, encode_columns, to_json
+from muka_analysis.config import get_config
+
+logger = logging.getLogger(__name__)
+
+SCHEME = "muka"
+
+DATASET_ROWS_TEMPLATE = f"{SCHEME}://dataset/{{name}}/rows{{?offset,limit,fields,layout}}"
+RESULT_TEMPLATE = f"{SCHEME}://result/{{id}}{{?offset,limit,layout}}"
+
+# Rows measured to estimate the memory of a stored table
+SIZE_SAMPLE_ROWS = 100
+
+# Rows of a stored table included inline with its reference
+PREVIEW_ROWS = 5
+
+# (kind, name, query parameters) of a parsed resource URI
+ResourceAddress = Tuple[str, str, Dict[str, str]]
+
+
+def dataset_rows_uri(name: str, **params: Any) -> str:
+    """Build the URI of a page of dataset rows."""
+    return _with_query(f"{SCHEME}://dataset/{name}/rows", params)
+
+
+def result_uri(result_id: str, **params: Any) -> str:
+    """Build the URI of a page of a stored result."""
+    return _with_query(f"{SCHEME}://result/{result_id}", params)
+
+
+def parse_resource_uri(uri: str) -> ResourceAddress:
+    """
+    Parse a resource URI.
+
+    Args:
+        uri: muka:// resource URI
+
+    Returns:
+        Tuple of ("dataset" or "result", dataset name or result ID, query parameters)
+
+    Raises:
+        ValueError: If the URI does not match a resource template
+    """
+    parts = urlsplit(str(uri))
+    path = [segment for segment in parts.path.split("/") if segment]
+    params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+    if parts.scheme == SCHEME:
+        if parts.netloc == "dataset" and len(path) == 2 and path[1] == "rows":
+            return "dataset", path[0], params
+        if parts.netloc == "result" and len(path) == 1:
+            return "result", path[0], params
+    raise ValueError(
+        f"Unknown resource '{uri}'. Templates: {DATASET_ROWS_TEMPLATE}, {RESULT_TEMPLATE}"
+    )
+
+
+def page_bounds(params: Dict[str, str]) -> Tuple[int, int]:
+    """
+    Read offset and limit from resource URI parameters.
+
+    Args:
+        params: Query parameters of the URI
+
+    Returns:
+        Tuple of (offset, limit), limit capped at mcp.resource_max_page_rows
+
+    Raises:
+        ValueError: If offset or limit is not a non-negative whole number
+    """
+    config = get_config().mcp
+    try:
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", config.resource_page_rows))
+    except ValueError:
+        raise ValueError("offset and limit must be whole numbers")
+    if offset < 0 or limit < 1:
+        raise ValueError("offset must be >= 0 and limit >= 1")
+    return offset, min(limit, config.resource_max_page_rows)
+
+
+def _with_query(base: str, params: Dict[str, Any]) -> str:
+    """Append the non-empty parameters as a query string."""
+    query = urlencode({key: value for key, value in params.items() if value is not None})
+    return f"{base}?{query}" if query else base
+
+
+def extract_table(result: Dict[str, Any]) -> Optional[Tuple[str, List[str], List[List[Any]]]]:
+    """
+    Find the largest table in a tool result.
+
+    Recognized tables are lists of records, {"columns", "data"} column
+    layouts, lists of rows next to a "columns" list (sql_query) and
+    dictionaries of scalars keyed by row label (calculate_custom_metric).
+    Tables with list or dict cells are not recognized and stay inline.
+
+    Args:
+        result: Tool result
+
+    Returns:
+        Tuple of (result key, column names, values per column), or None if
+        the result holds no table
+    """
+    best: Optional[Tuple[str, List[str], List[List[Any]]]] = None
+    best_rows = 0
+    for key, value in result.items():
+        table = _as_columns(value, result.get("columns"))
+        if table is not None and table[1] and len(table[1][0]) > best_rows:
+            best, best_rows = (key, table[0], table[1]), len(table[1][0])
+    return best
+
+
+def _as_columns(value: Any, sibling_columns: Any) -> Optional[Tuple[List[str], List[List[Any]]]]:
+    """Convert a result value to (names, columns) if it is a table of scalar cells."""
+    if isinstance(value, dict):
+        if isinstance(value.get("columns"), list) and isinstance(value.get("data"), list):
+            if all(isinstance(column, list) and _all_scalar(column) for column in value["data"]):
+                return list(value["columns"]), list(value["data"])
+            return None
+        if value and _all_scalar(value.values()):
+            return ["key", "value"], [list(value.keys()), list(value.values())]
+        return None
+    if not isinstance(value, list) or not value:
+        return None
+    if all(isinstance(row, dict) for row in value):
+        if not all(_all_scalar(row.values()) for row in value):
+            return None
+        names = list(dict.fromkeys(name for row in value for name in row))
+        return names, [[row.get(name) for row in value] for name in names]
+    if isinstance(sibling_columns, list) and all(isinstance(row, list) for row in value):
+        if not all(_all_scalar(row) for row in value):
+            return None
+        names = [str(name) for name in sibling_columns]
+        return names, [list(column) for column in zip(*value)] or [[] for _ in names]
+    if _all_scalar(value):
+        return ["value"], [list(value)]
+    return None
+
+
+def _all_scalar(values: Iterable[Any]) -> bool:
+    """Whether none of the values is a nested list, tuple or dict."""
+    return not any(isinstance(v, (dict, list, tuple)) for v in values)
+
+
+class StoredResult:
+    """
+    A tool result whose largest table is served as a paged resource.
+
+    Attributes:
+        result_id: Identifier in the resource URI
+        tool: Tool that produced the result
+        data_version: Data version the result was computed on
+        key: Result key the table was taken from
+        columns: Column names
+        data: Values per column
+        rows: Number of rows
+        size: Estimated memory in bytes
+        created: Creation time (UNIX timestamp)
+    """
+
+    def __init__(
+        self,
+        result_id: str,
+        tool: str,
+        data_version: int,
+        key: str,
+        columns: List[str],
+        data: List[List[Any]],
+    ) -> None:
+        """Initialize a stored result (see attributes)."""
+        self.result_id = result_id
+        self.tool = tool
+        self.data_version = data_version
+        self.key = key
+        self.columns = columns
+        self.data = data
+        self.rows = len(data[0]) if data else 0
+        sample = min(self.rows, SIZE_SAMPLE_ROWS)
+        sample_bytes = len(to_json([column[:sample] for column in data]))
+        self.size = sample_bytes * self.rows // max(sample, 1)
+        self.created = time.time()
+
+    def page(self, offset: int, limit: int, layout: str) -> Dict[str, Any]:
+        """
+        Get a page of rows.
+
+        Args:
+            offset: First row
+            limit: Maximum number of rows
+            layout: "records" or "columns"
+
+        Returns:
+            Page with the rows and the URI of the next page (None on the last page)
+        """
+        stop = min(offset + limit, self.rows)
+        rows = encode_columns(
+            {name: column[offset:stop] for name, column in zip(self.columns, self.data)},
+            layout,
+        )
+        return {
+            "result_id": self.result_id,
+            "tool": self.tool,
+            "data_version": self.data_version,
+            "offset": offset,
+            "count": max(stop - offset, 0),
+            "total_rows": self.rows,
+            "rows": rows,
+            "next": (
+                result_uri(self.result_id, offset=stop, limit=limit, layout=layout)
+                if stop < self.rows
+                else None
+            ),
+        }
+
+
+class ResultStore:
+    """
+    Server-side store of large tool results, in LRU order within a memory budget.
+
+    Attributes:
+        inline_max_rows: Tables with more rows are stored instead of inlined
+        max_bytes: Memory budget (0 disables storing; results are inlined)
+        max_entries: Maximum number of stored results
+        evictions: Number of results dropped to stay within the limits
+    """
+
+    def __init__(self, inline_max_rows: int, max_bytes: int, max_entries: int) -> None:
+        """
+        Initialize an empty store.
+
+        Args:
+            inline_max_rows: Tables with more rows are stored instead of inlined
+            max_bytes: Memory budget in bytes (0 disables storing)
+            max_entries: Maximum number of stored results
+        """
+        self.inline_max_rows = inline_max_rows
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[str, StoredResult]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "ResultStore":
+        """Create a store with the limits from the [mcp] configuration section."""
+        config = get_config().mcp
+        return cls(
+            config.inline_max_rows, config.result_store_max_bytes, config.result_store_max_entries
+        )
+
+    def offload(self, tool: str, result: Dict[str, Any], data_version: int) -> Dict[str, Any]:
+        """
+        Replace a large table in a tool result by a resource reference.
+
+        Args:
+            tool: Tool name
+            result: Tool result
+            data_version: Data version the result was computed on
+
+        Returns:
+            The result itself if it has no table over inline_max_rows rows (or
+            storing is disabled), else a copy whose table is replaced by
+            {"resource", "total_rows", "columns", "preview"}
+        """
+        if self.max_bytes == 0 or not isinstance(result, dict) or "error" in result:
+            return result
+        table = extract_table(result)
+        if table is None or len(table[2][0]) <= self.inline_max_rows:
+            return result
+
+        key, columns, data = table
+        stored = StoredResult(secrets.token_urlsafe(9), tool, data_version, key, columns, data)
+        if not self._put(stored):
+            return result
+
+        page_rows = get_config().mcp.resource_page_rows
+        reference = {
+            "resource": result_uri(stored.result_id, offset=0, limit=page_rows),
+            "total_rows": stored.rows,
+            "columns": columns,
+            "preview": stored.page(0, PREVIEW_ROWS, "records")["rows"],
+            "message": (
+                f"{stored.rows} rows stored on the server; read them in pages of up to "
+                f"{get_config().mcp.resource_max_page_rows} rows from the resource URI"
+            ),
+        }
+        offloaded = dict(result)
+        if key == "rows" and "columns" in offloaded:
+            # sql_query: the column names move into the reference
+            del offloaded["columns"]
+        offloaded[key] = reference
+        logger.info(f"Stored {stored.rows}-row {tool} result as {reference['resource']}")
+        return offloaded
+
+    def read(self, result_id: str, params: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Read a page of a stored result.
+
+        Args:
+            result_id: Stored result ID
+            params: URI query parameters (offset, limit, layout)
+
+        Returns:
+            Page of rows (see StoredResult.page())
+
+        Raises:
+            ValueError: If the result is unknown (or evicted) or a parameter is invalid
+        """
+        offset, limit = page_bounds(params)
+        layout = check_layout(params.get("layout"))
+        with self._lock:
+            stored = self._entries.get(result_id)
+            if stored is None:
+                raise ValueError(
+                    f"Unknown or expired result '{result_id}'. Run the tool again to recreate it."
+                )
+            self._entries.move_to_end(result_id)
+        return stored.page(offset, limit, layout)
+
+    def list(self) -> List[StoredResult]:
+        """Get the stored results, most recently used last."""
+        with self._lock:
+            return list(self._entries.values())
+
+    def clear(self) -> None:
+        """Drop all stored results."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get store usage counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "evictions": self.evictions,
+                "inline_max_rows": self.inline_max_rows,
+            }
+
+    def _put(self, stored: StoredResult) -> bool:
+        """Add a result, evicting least recently used ones; False if it exceeds the budget."""
+        if stored.size > self.max_bytes:
+            logger.warning(
+                f"Not storing {stored.tool} result of ~{stored.size} bytes (budget exceeded)"
+            )
+            return False
+        with self._lock:
+            self._entries[stored.result_id] = stored
+            self._bytes += stored.size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+        return True
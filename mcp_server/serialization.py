@@ -0,0 +1,225 @@
+"""
+JSON encoding of MCP tool results.
+
+Tables are converted column by column: one ``ndarray.tolist()`` call per
+column turns NumPy values into Python values, and missing values are located
+with a vectorized NaN check and replaced by None. Building one dict per row
+with ``DataFrame.to_dict(orient="records")`` and walking every value
+afterwards is avoided, and tools can return the compact columnar layout
+``{"columns": [...], "data": [[...], ...]}`` (one list per column) instead of
+records.
+
+to_json() renders tool results as JSON text for the MCP client. It uses
+orjson when it is installed and the standard library encoder otherwise;
+either way NaN and infinity become null, so the output is always valid JSON.
+"""
+
+import json
+import logging
+import math
+from datetime import date, datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    # Optional speed-up; the standard library encoder is used instead
+    orjson = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# Table layouts accepted by tools returning tables
+TABLE_LAYOUTS: List[str] = ["records", "columns"]
+
+
+def check_layout(layout: Optional[str]) -> str:
+    """
+    Validate a table layout argument.
+
+    Args:
+        layout: "records", "columns" or None (records)
+
+    Returns:
+        The layout
+
+    Raises:
+        ValueError: If the layout is unknown
+    """
+    if layout is None or layout == "":
+        return "records"
+    if layout not in TABLE_LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}'. Must be one of: {', '.join(TABLE_LAYOUTS)}")
+    return layout
+
+
+def column_values(values: Any) -> List[Any]:
+    """
+    Convert a column to JSON-ready Python values.
+
+    Args:
+        values: NumPy array, Series or Index
+
+    Returns:
+        List of Python values; missing values (NaN, None, NA) become None
+    """
+    array = values.to_numpy() if isinstance(values, (pd.Series, pd.Index)) else np.asarray(values)
+    kind = array.dtype.kind
+    if kind in "biuU":
+        return array.tolist()
+    if kind == "f":
+        out = array.tolist()
+        missing = ~np.isfinite(array)
+    elif kind == "O":
+        out = array.tolist()
+        missing = pd.isna(array)
+    else:
+        # Datetimes and other rare dtypes are converted value by value
+        series = pd.Series(array, copy=False).astype(object)
+        out = [to_jsonable(value) for value in series]
+        missing = series.isna().to_numpy()
+    for i in np.flatnonzero(missing).tolist():
+        out[i] = None
+    return out
+
+
+def encode_columns(columns: Mapping[Any, Any], layout: str = "records") -> Any:
+    """
+    Encode named columns of equal length as a table.
+
+    Args:
+        columns: Column name -> values (see column_values())
+        layout: "records" for a list of row dicts, "columns" for
+            {"columns": [names], "data": [values per column]}
+
+    Returns:
+        JSON-ready table in the requested layout
+    """
+    names = [_column_name(name) for name in columns]
+    data = [column_values(values) for values in columns.values()]
+    if layout == "columns":
+        return {"columns": names, "data": data}
+    return [dict(zip(names, row)) for row in zip(*data)]
+
+
+def encode_table(df: pd.DataFrame, layout: str = "records") -> Any:
+    """
+    Encode a DataFrame column by column (the index is dropped).
+
+    Args:
+        df: DataFrame to encode
+        layout: "records" or "columns" (see encode_columns())
+
+    Returns:
+        JSON-ready table in the requested layout
+    """
+    return encode_columns({name: df.iloc[:, i] for i, name in enumerate(df.columns)}, layout)
+
+
+def to_jsonable(obj: Any) -> Any:
+    """
+    Convert a result to JSON-compatible Python types.
+
+    Containers are converted recursively, but arrays, Series and DataFrames
+    are converted as whole columns (see column_values()).
+
+    Args:
+        obj: Object to convert
+
+    Returns:
+        JSON-serializable version of the object (non-finite floats become None)
+    """
+    if isinstance(obj, dict):
+        return {_key(key): to_jsonable(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return [to_jsonable(item) for item in obj]
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if obj is None or isinstance(obj, (str, int, bool)):
+        return obj
+    return to_jsonable(_encode_default(obj))
+
+
+def to_json(obj: Any, indent: bool = False) -> str:
+    """
+    Render a tool result as JSON text.
+
+    Args:
+        obj: Tool result (dicts, lists, scalars, NumPy and pandas objects)
+        indent: Pretty-print with two-space indentation
+
+    Returns:
+        Valid JSON (NaN and infinity are rendered as null)
+    """
+    try:
+        return _dumps(obj, indent)
+    except (TypeError, ValueError):
+        # Non-finite Python floats or non-string dict keys: clean up first
+        return _dumps(to_jsonable(obj), indent)
+
+
+def _dumps(obj: Any, indent: bool) -> str:
+    """Encode with orjson if available, else with the standard library."""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_encode_default, option=option).decode("utf-8")
+    return json.dumps(
+        obj,
+        default=_encode_default,
+        allow_nan=False,
+        ensure_ascii=False,
+        indent=2 if indent else None,
+        separators=(",", ": ") if indent else (",", ":"),
+    )
+
+
+def _encode_default(obj: Any) -> Any:
+    """Encoder fallback for types JSON encoders do not know."""
+    if isinstance(obj, np.generic):
+        value = obj.item()
+        return None if isinstance(value, float) and not math.isfinite(value) else value
+    if isinstance(obj, np.ndarray):
+        if obj.ndim == 0:
+            return _encode_default(obj[()])
+        if obj.ndim == 1:
+            return column_values(obj)
+        return [_encode_default(row) for row in obj]
+    if isinstance(obj, pd.DataFrame):
+        return encode_table(obj)
+    if isinstance(obj, pd.Series):
+        return dict(zip([_key(label) for label in obj.index], column_values(obj)))
+    if isinstance(obj, pd.Index):
+        return column_values(obj)
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    if isinstance(obj, (datetime, date, pd.Timestamp)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Path):
+        return str(obj)
+    return str(obj)
+
+
+def _key(key: Any) -> Any:
+    """Convert a dict key to a type JSON encoders accept."""
+    if isinstance(key, (str, int, float, bool)) or key is None:
+        return key
+    if isinstance(key, np.generic):
+        return key.item()
+    return _column_name(key)
+
+
+def _column_name(name: Any) -> str:
+    """Column label as a string (multi-level labels from aggregations are joined)."""
+    if isinstance(name, tuple):
+        return "_".join(str(part) for part in name if part != "")
+    return str(name)
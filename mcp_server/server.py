@@ -5,58 +5,237 @@ This server provides tools to query, analyze, and gain insights from farm data
 through natural language interactions.
 """
 
+import asyncio
+import base64
+import functools
+import hashlib
+import json
 import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 from mcp.server import Server
-from mcp.types import TextContent, Tool
-
-from muka_analysis.analyzer import FarmAnalyzer
-from muka_analysis.classifier import FarmClassifier
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+from mcp.types import Resource, ResourceTemplate, TextContent, Tool
+from pydantic import AnyUrl
+
+from mcp_server.cache import ResultCache
+from mcp_server.dispatch import (
+    ToolDispatcher,
+    ToolTimeout,
+    check_deadline,
+    offloaded,
+    remaining_time,
+)
+from mcp_server.batch import BATCH_OPERATIONS, BatchScope, CostLimitError, check_group_cost
+from mcp_server.expressions import ExpressionError, compile_expression
+from mcp_server.exports import (
+    EXPORT_FORMATS,
+    check_export_format,
+    default_export_path,
+    run_export,
+)
+from mcp_server.index import FarmIndex
+from mcp_server.jobs import JobManager
+from mcp_server.metrics import MetricsDumper, MetricsRegistry, process_memory
+from mcp_server.outliers import OUTLIER_DIRECTIONS, OutlierIndex
+from mcp_server.resources import (
+    DATASET_ROWS_TEMPLATE,
+    RESULT_TEMPLATE,
+    ResultStore,
+    dataset_rows_uri,
+    page_bounds,
+    parse_resource_uri,
+    result_uri,
+)
+from mcp_server.serialization import (
+    TABLE_LAYOUTS,
+    check_layout,
+    encode_columns,
+    encode_table,
+    to_json,
+    to_jsonable,
+)
+from mcp_server.snapshot import (
+    DEFAULT_DATASET,
+    DatasetSnapshot,
+    compute_mode_group_codes,
+    validate_dataset_name,
+)
+from mcp_server.sql import TABLE_NAME, SqlError, SqlMirror, mode_column
+from mcp_server.store import SnapshotStore
+from muka_analysis.analyzer import FarmAnalyzer, MultiModeAnalyzer
+from muka_analysis.benchmark import PeerRankTables
+from muka_analysis.classifier import GROUP_LABELS, UNCLASSIFIED_CODE, FarmClassifier
+from muka_analysis.clustering import cluster_unclassified
 from muka_analysis.config import get_config, init_config
 from muka_analysis.io_utils import IOUtils
-from muka_analysis.models import FarmData
+from muka_analysis.models import FarmData, IndicatorMode
+from muka_analysis.similarity import SimilarityIndex
 
 logger = logging.getLogger(__name__)
 
+# Fields returned by query_farms when no projection is requested
+QUERY_DEFAULT_FIELDS: List[str] = [
+    "tvd",
+    "year",
+    "group",
+    "n_animals_total",
+    "n_females_age3_dairy",
+    "n_females_age3_total",
+]
+
+# Seconds between job status checks while get_job_status waits
+JOB_POLL_SECONDS = 0.5
+
+# Words in an answer_question question about unusual farms -> metrics to check
+OUTLIER_QUESTION_FIELDS: Dict[str, List[str]] = {
+    "calf": ["n_total_entries_younger85", "n_total_leavings_younger51"],
+    "movement": ["n_total_entries_younger85", "n_total_leavings_younger51"],
+    "slaughter": ["prop_females_slaughterings_younger731"],
+    "dairy": ["n_females_age3_dairy", "prop_days_female_age3_dairy"],
+    "young": ["n_females_younger731", "n_animals_from51_to730"],
+    "animal": ["n_animals_total"],
+}
+
+# Read-only analytical tools whose results are cached per data version
+CACHED_TOOLS = {
+    "calculate_group_statistics",
+    "compare_groups",
+    "aggregate_by_field",
+    "get_data_insights",
+    "answer_question",
+    "sql_query",
+    "batch",
+    "cluster_unclassified_farms",
+}
+
+# query_farms arguments that shape the response rather than filter farms
+# (the dataset is identified by the data version in cursors)
+QUERY_PAGING_ARGUMENTS = {
+    "limit",
+    "cursor",
+    "fields",
+    "order_by",
+    "descending",
+    "dataset",
+    "layout",
+}
+
+# Schema of the dataset argument accepted by all data tools
+DATASET_PROPERTY: Dict[str, Any] = {
+    "type": "string",
+    "description": (
+        f"Name of the dataset to use (default: '{DEFAULT_DATASET}'). "
+        "get_data_info lists all datasets."
+    ),
+}
+
+# Schema of the layout argument accepted by tools returning tables
+LAYOUT_PROPERTY: Dict[str, Any] = {
+    "type": "string",
+    "enum": TABLE_LAYOUTS,
+    "description": (
+        "Table layout: 'records' (default, one object per row) or 'columns' "
+        "(compact: {columns: [names], data: [values per column]})"
+    ),
+    "default": "records",
+}
+
+
+def parse_tvd(value: Any) -> Optional[int]:
+    """
+    Convert a TVD argument (tools accept it as a string) to the stored integer.
+
+    Args:
+        value: TVD as string or integer, or None
+
+    Returns:
+        TVD number, or None if no TVD was given
+
+    Raises:
+        ValueError: If the value is not a whole number
+    """
+    if value is None or value == "":
+        return None
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Invalid TVD '{value}': expected a numeric farm ID")
+
+
+def _query_fingerprint(query_key: Dict[str, Any]) -> str:
+    """Hash the parameters that define a result order, to bind cursors to a query."""
+    payload = json.dumps(query_key, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
 
-def to_json_serializable(obj: Any) -> Any:
+def encode_cursor(offset: int, query_key: Dict[str, Any]) -> str:
     """
-    Convert numpy/pandas types to JSON-serializable Python types.
+    Create an opaque pagination cursor.
 
     Args:
-        obj: Object to convert
+        offset: Position of the next row in the ordered result
+        query_key: Filters, ordering and data version of the query
 
     Returns:
-        JSON-serializable version of the object
+        URL-safe cursor string
     """
-    if isinstance(obj, (np.integer, np.int64, np.int32)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, np.float64, np.float32)):
-        return float(obj)
-    elif isinstance(obj, np.bool_):
-        return bool(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, dict):
-        return {key: to_json_serializable(value) for key, value in obj.items()}
-    elif isinstance(obj, (list, tuple)):
-        return [to_json_serializable(item) for item in obj]
-    elif hasattr(obj, "item"):  # Other numpy/pandas scalars
-        return obj.item()
-    else:
-        return obj
+    payload = json.dumps({"offset": offset, "query": _query_fingerprint(query_key)})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str], query_key: Dict[str, Any]) -> int:
+    """
+    Read the offset from a pagination cursor.
+
+    Args:
+        cursor: Cursor from a previous response, or None for the first page
+        query_key: Filters, ordering and data version of the current query
+
+    Returns:
+        Offset of the first row of the requested page
+
+    Raises:
+        ValueError: If the cursor is malformed or belongs to another query or dataset
+    """
+    if not cursor:
+        return 0
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        offset = int(payload["offset"])
+        fingerprint = payload["query"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if fingerprint != _query_fingerprint(query_key) or offset < 0:
+        raise ValueError(
+            "Cursor does not match this query or the data was reloaded. "
+            "Repeat the query without a cursor."
+        )
+    return offset
 
 
 class DataContext:
     """
     Context manager for farm data and analysis state.
 
-    This class maintains the current state of loaded data, classifications,
-    and analysis results throughout the MCP session.
+    The server holds named datasets (DEFAULT_DATASET unless a tool names
+    another one). Each dataset's current data is published as an immutable
+    DatasetSnapshot. Readers pin a snapshot for the duration of a request
+    (pin()); loading and classifying build a new snapshot and swap it in
+    atomically, so concurrent requests always see a consistent state.
+    Superseded snapshots are released when the last request holding them
+    finishes.
+
+    When the datasets held in memory exceed the configured memory budget,
+    the least recently used ones are spilled to memory-mapped snapshots on
+    disk and restored transparently on their next use.
     """
 
     def __init__(self, auto_load: bool = False) -> None:
@@ -66,22 +245,379 @@ class DataContext:
         Args:
             auto_load: If True, automatically load and classify data on init
         """
-        self.raw_df: Optional[pd.DataFrame] = None
-        self.farms: Optional[List[FarmData]] = None
-        self.analyzer: Optional[FarmAnalyzer] = None
-        self.classifier: Optional[FarmClassifier] = None
-        self.data_loaded: bool = False
-        self.classified: bool = False
+        config = get_config()
+        self.result_cache = ResultCache.from_config()
+        self.result_store = ResultStore.from_config()
+        self.store = SnapshotStore.from_config()
+        self.memory_budget = config.mcp.dataset_memory_budget_bytes
+        # Current snapshot per dataset, least recently used first
+        self._snapshots: "OrderedDict[str, DatasetSnapshot]" = OrderedDict(
+            [(DEFAULT_DATASET, DatasetSnapshot(version=0))]
+        )
+        # Datasets spilled to disk: name -> (snapshot directory, version, rows, source)
+        self._spilled: Dict[str, Tuple[Path, int, int, Optional[Path]]] = {}
+        # Versions are unique across datasets, so cache keys and cursors never collide
+        self._last_version = 0
+        # Superseded snapshots still pinned by running requests
+        self._retired: List[DatasetSnapshot] = []
+        # Guards snapshot swaps and pin counts
+        self._lock = threading.Lock()
+        # Serializes loads and classifications (readers never take it); reentrant
+        # so that warm-up holds it across its whole load-classify-save sequence
+        self._write_lock = threading.RLock()
+        # Serializes spilling and restoring datasets
+        self._spill_lock = threading.RLock()
+        # Serializes building SQL mirrors
+        self._sql_lock = threading.Lock()
+        # Progress of the current (or last) load/classification, for get_data_info
+        self._progress: Dict[str, Any] = {"phase": "idle"}
+        self._progress_started = time.monotonic()
+        self._progress_finished: Optional[float] = None
+        # Cleared while a background warm-up is running
+        self._warmup_done = threading.Event()
+        self._warmup_done.set()
 
         if auto_load:
             self._auto_load_data()
 
-    def load_data(self, file_path: Optional[Path] = None) -> Dict[str, Any]:
+    # Rows converted between progress updates while classifying
+    PROGRESS_CHUNK_ROWS = 50_000
+    # Progress phases that end a load or classification
+    FINAL_PHASES = ("loaded", "ready", "failed")
+
+    @property
+    def snapshot(self) -> DatasetSnapshot:
+        """The current snapshot of the default dataset (use pin() to hold it during a request)."""
+        return self.current(DEFAULT_DATASET) or DatasetSnapshot(version=0)
+
+    def current(self, dataset: Optional[str] = None) -> Optional[DatasetSnapshot]:
+        """
+        Get the current in-memory snapshot of a dataset.
+
+        Args:
+            dataset: Dataset name, or None for the default dataset
+
+        Returns:
+            The snapshot, or None if the dataset is unknown or spilled to disk
+        """
+        with self._lock:
+            return self._snapshots.get(dataset or DEFAULT_DATASET)
+
+    def has_dataset(self, dataset: Optional[str]) -> bool:
+        """Whether a dataset exists (in memory or spilled to disk)."""
+        name = dataset or DEFAULT_DATASET
+        with self._lock:
+            return name in self._snapshots or name in self._spilled
+
+    def dataset_names(self) -> List[str]:
+        """Names of all datasets, in memory or spilled."""
+        with self._lock:
+            return sorted(set(self._snapshots) | set(self._spilled))
+
+    # Read-only views of the default dataset's current snapshot
+    @property
+    def raw_df(self) -> Optional[pd.DataFrame]:
+        """Raw input DataFrame of the current snapshot."""
+        return self.snapshot.raw_df
+
+    @property
+    def analyzer(self) -> Optional[FarmAnalyzer]:
+        """Analyzer of the current snapshot."""
+        return self.snapshot.analyzer
+
+    @property
+    def classifier(self) -> Optional[FarmClassifier]:
+        """Classifier of the current snapshot."""
+        return self.snapshot.classifier
+
+    @property
+    def index(self) -> Optional[FarmIndex]:
+        """Lookup index of the current snapshot."""
+        return self.snapshot.index
+
+    @property
+    def data_loaded(self) -> bool:
+        """Whether data is loaded."""
+        return self.snapshot.data_loaded
+
+    @property
+    def classified(self) -> bool:
+        """Whether the loaded farms are classified."""
+        return self.snapshot.classified
+
+    @property
+    def data_version(self) -> int:
+        """Version of the current snapshot; part of every cache key and query cursor."""
+        return self.snapshot.version
+
+    @contextmanager
+    def pin(self, dataset: Optional[str] = None) -> Iterator[DatasetSnapshot]:
+        """
+        Hold the current snapshot of a dataset for the duration of a request.
+
+        A dataset spilled to disk is restored first.
+
+        Args:
+            dataset: Dataset name, or None for the default dataset
+
+        Yields:
+            The snapshot that was current when the request started
+
+        Raises:
+            ValueError: If the dataset does not exist
+        """
+        name = dataset or DEFAULT_DATASET
+        while True:
+            with self._lock:
+                snapshot = self._snapshots.get(name)
+                if snapshot is not None:
+                    snapshot.pins += 1
+                    self._snapshots.move_to_end(name)
+                    break
+                if name not in self._spilled:
+                    known = sorted(set(self._snapshots) | set(self._spilled))
+                    raise ValueError(f"Unknown dataset '{name}'. Datasets: {', '.join(known)}")
+            self._restore_spilled(name)
+
+        try:
+            yield snapshot
+        finally:
+            self._unpin(snapshot)
+
+    def hold(self, snapshot: DatasetSnapshot) -> Callable[[], None]:
+        """
+        Pin an already pinned snapshot beyond the current request (e.g. for a background job).
+
+        Args:
+            snapshot: Snapshot pinned by the calling request
+
+        Returns:
+            Function releasing the hold; call it exactly once
+        """
+        with self._lock:
+            snapshot.pins += 1
+        return functools.partial(self._unpin, snapshot)
+
+    def _unpin(self, snapshot: DatasetSnapshot) -> None:
+        """Drop one pin, releasing a retired snapshot when its last pin is gone."""
+        with self._lock:
+            snapshot.pins -= 1
+            release = snapshot.pins == 0 and snapshot in self._retired
+            if release:
+                self._retired.remove(snapshot)
+        if release:
+            snapshot.release()
+
+    @property
+    def warming_up(self) -> bool:
+        """Whether a background warm-up is still running."""
+        return not self._warmup_done.is_set()
+
+    def start_warmup(self) -> threading.Thread:
+        """
+        Load and classify the configured data in a background thread.
+
+        Tools stay available meanwhile; get_data_info reports the progress.
+        Warm-up holds the write lock for its whole sequence, so write tools run
+        before or after it, never in between. If the default dataset was
+        loaded before warm-up got the lock, warm-up is skipped.
+
+        Returns:
+            The started warm-up thread
+        """
+        self._warmup_done.clear()
+        version = self.snapshot.version
+
+        def run() -> None:
+            try:
+                with self._write_lock:
+                    if self.snapshot.version != version:
+                        logger.info("Default dataset was loaded before warm-up, skipping warm-up")
+                        return
+                    self._auto_load_data()
+            finally:
+                self._warmup_done.set()
+
+        thread = threading.Thread(target=run, name="muka-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def wait_for_warmup(self, timeout: float) -> bool:
+        """
+        Wait until a running warm-up has finished.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if no warm-up is running anymore
+        """
+        return self._warmup_done.wait(timeout)
+
+    def get_progress(self) -> Dict[str, Any]:
+        """
+        Get the progress of the current (or last) load/classification.
+
+        Returns:
+            Dictionary with phase, rows processed, elapsed time and warm-up state
+        """
+        with self._lock:
+            progress = dict(self._progress)
+            end = self._progress_finished or time.monotonic()
+            progress["elapsed_seconds"] = round(end - self._progress_started, 1)
+        progress["warming_up"] = self.warming_up
+        return progress
+
+    def _start_progress(self, phase: str, **values: Any) -> None:
+        """Reset progress tracking for a new load or classification."""
+        with self._lock:
+            self._progress = {"phase": phase, **values}
+            self._progress_started = time.monotonic()
+            self._progress_finished = None
+
+    def _update_progress(self, **values: Any) -> None:
+        """Update fields of the current progress."""
+        with self._lock:
+            self._progress.update(values)
+            if values.get("phase") in self.FINAL_PHASES:
+                self._progress_finished = time.monotonic()
+
+    def _next_version(self) -> int:
+        """Allocate a new data version."""
+        with self._lock:
+            self._last_version += 1
+            return self._last_version
+
+    def _retire(self, snapshot: DatasetSnapshot) -> bool:
+        """
+        Retire a snapshot that is no longer current (caller holds _lock).
+
+        Returns:
+            True if the snapshot can be released right away
+        """
+        if snapshot.pins > 0:
+            self._retired.append(snapshot)
+            return False
+        return True
+
+    def _publish(self, snapshot: DatasetSnapshot, clear_cache: bool = True) -> None:
+        """
+        Make a new snapshot current for its dataset, retiring the previous one.
+
+        Args:
+            snapshot: Fully built snapshot to publish
+            clear_cache: Drop cached results (False when restoring unchanged data)
+        """
+        with self._lock:
+            previous = self._snapshots.get(snapshot.name)
+            self._snapshots[snapshot.name] = snapshot
+            self._snapshots.move_to_end(snapshot.name)
+            self._spilled.pop(snapshot.name, None)
+            release = previous is not None and self._retire(previous)
+        if clear_cache:
+            self.result_cache.clear()
+        if release and previous is not None:
+            previous.release()
+        logger.info(f"Published snapshot version {snapshot.version} of dataset '{snapshot.name}'")
+        self._enforce_memory_budget(keep=snapshot.name)
+
+    def memory_used(self) -> int:
+        """Heap memory of all in-memory datasets, as counted against the memory budget."""
+        with self._lock:
+            snapshots = list(self._snapshots.values())
+        return sum(snapshot.memory_footprint()["heap_bytes"] for snapshot in snapshots)
+
+    def _enforce_memory_budget(self, keep: str) -> None:
+        """
+        Spill least recently used datasets until the memory budget is met.
+
+        Args:
+            keep: Dataset that must stay in memory (the one just published)
+        """
+        if self.memory_budget == 0:
+            return
+        with self._spill_lock:
+            while self.memory_used() > self.memory_budget:
+                with self._lock:
+                    candidates = [
+                        name
+                        for name, snapshot in self._snapshots.items()
+                        if name != keep and snapshot.data_loaded
+                    ]
+                if not candidates:
+                    logger.warning(
+                        f"Dataset '{keep}' alone exceeds the memory budget of "
+                        f"{self.memory_budget} bytes"
+                    )
+                    return
+                if not self._spill(candidates[0]):
+                    return
+
+    def _spill(self, name: str) -> bool:
+        """
+        Move a dataset out of memory into a snapshot on disk.
+
+        Args:
+            name: Dataset name
+
+        Returns:
+            True if the dataset was spilled
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(name)
+        if snapshot is None:
+            return False
+
+        path = self.store.dataset_path(name)
+        try:
+            if snapshot.backing != path:
+                self.store.save(snapshot, path)
+        except Exception as e:
+            logger.warning(f"Could not spill dataset '{name}' to disk: {e}")
+            return False
+
+        with self._lock:
+            if self._snapshots.get(name) is not snapshot:
+                return True  # Replaced meanwhile; the new snapshot is in memory
+            del self._snapshots[name]
+            self._spilled[name] = (path, snapshot.version, snapshot.rows, snapshot.source)
+            release = self._retire(snapshot)
+        if release:
+            snapshot.release()
+        logger.info(f"Spilled dataset '{name}' to {path}")
+        return True
+
+    def _restore_spilled(self, name: str) -> None:
+        """
+        Bring a spilled dataset back into memory (memory-mapped).
+
+        Args:
+            name: Dataset name
+
+        Raises:
+            ValueError: If the spilled snapshot cannot be read
+        """
+        with self._spill_lock:
+            with self._lock:
+                spilled = self._spilled.get(name)
+            if spilled is None:
+                return  # Restored by another request meanwhile
+            path, version, _, _ = spilled
+            # Same data as before spilling: keep its version, cache entries and cursors
+            snapshot = self.store.load_path(path, version, name)
+            if snapshot is None:
+                raise ValueError(f"Spilled dataset '{name}' could not be restored from {path}")
+            self._publish(snapshot, clear_cache=False)
+
+    def load_data(
+        self, file_path: Optional[Path] = None, dataset: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Load farm data from CSV file.
 
         Args:
             file_path: Path to CSV file, or None to use default
+            dataset: Dataset to load into, or None for the default dataset
 
         Returns:
             Dictionary with load status and info
@@ -92,67 +628,134 @@ class DataContext:
             file_path = config.paths.get_default_input_path()
 
         try:
-            self.raw_df = IOUtils.read_csv(file_path)
-            self.data_loaded = True
-            self.classified = False
+            name = validate_dataset_name(dataset)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+
+        try:
+            with self._write_lock:
+                self._start_progress("reading", file=str(file_path), dataset=name)
+                raw_df = IOUtils.read_csv(file_path)
+                self._update_progress(phase="loaded", total_rows=len(raw_df))
+                self._publish(
+                    DatasetSnapshot(
+                        version=self._next_version(), name=name, source=file_path, raw_df=raw_df
+                    )
+                )
 
             return {
                 "success": True,
+                "dataset": name,
                 "file": str(file_path),
-                "rows": len(self.raw_df),
-                "columns": len(self.raw_df.columns),
-                "column_names": list(self.raw_df.columns),
+                "rows": len(raw_df),
+                "columns": len(raw_df.columns),
+                "column_names": list(raw_df.columns),
             }
         except Exception as e:
             logger.error(f"Failed to load data: {e}", exc_info=True)
+            self._update_progress(phase="failed", error=str(e))
             return {
                 "success": False,
                 "error": str(e),
             }
 
-    def classify_farms(self) -> Dict[str, Any]:
+    def classify_farms(self, dataset: Optional[str] = None) -> Dict[str, Any]:
         """
         Classify loaded farms into groups.
 
+        Args:
+            dataset: Dataset to classify, or None for the default dataset
+
         Returns:
             Dictionary with classification results
         """
-        if not self.data_loaded or self.raw_df is None:
+        name = dataset or DEFAULT_DATASET
+        if not self.has_dataset(name):
             return {
                 "success": False,
-                "error": "No data loaded. Load data first.",
+                "error": f"Unknown dataset '{name}'. Load data into it first.",
             }
 
-        try:
-            # Convert to FarmData objects
-            self.farms = IOUtils.dataframe_to_farm_data(self.raw_df)
-
-            # Classify farms
-            self.classifier = FarmClassifier()
-            self.farms = self.classifier.classify_farms(self.farms)
-
-            # Initialize analyzer
-            self.analyzer = FarmAnalyzer(self.farms)
-            self.classified = True
-
-            # Get classification summary
-            group_counts = self.analyzer.get_group_counts()
-
-            # Convert numpy types to Python types for JSON serialization
-            group_counts = {k: int(v) for k, v in group_counts.items()}
-
-            return {
-                "success": True,
-                "total_farms": len(self.farms),
-                "classified_farms": sum(1 for f in self.farms if f.group is not None),
-                "group_counts": group_counts,
-            }
-        except Exception as e:
-            logger.error(f"Classification failed: {e}", exc_info=True)
-            return {
-                "success": False,
-                "error": str(e),
-            }
+        with self._write_lock, self.pin(name) as base:
+            if not base.data_loaded or base.raw_df is None:
+                return {
+                    "success": False,
+                    "error": "No data loaded. Load data first.",
+                }
+
+            try:
+                # Convert to FarmData objects, in chunks to report progress
+                total_rows = len(base.raw_df)
+                self._start_progress(
+                    "converting", dataset=name, rows_processed=0, total_rows=total_rows
+                )
+                farms: List[FarmData] = []
+                errors: List[str] = []
+                for start in range(0, total_rows, self.PROGRESS_CHUNK_ROWS):
+                    chunk_farms, _, chunk_errors = IOUtils.convert_rows(
+                        base.raw_df.iloc[start : start + self.PROGRESS_CHUNK_ROWS]
+                    )
+                    farms.extend(chunk_farms)
+                    errors.extend(chunk_errors)
+                    self._update_progress(
+                        rows_processed=min(start + self.PROGRESS_CHUNK_ROWS, total_rows)
+                    )
+                IOUtils.report_conversion_errors(errors, total_rows)
+
+                # Classify farms
+                self._update_progress(phase="classifying")
+                classifier = FarmClassifier()
+                farms = classifier.classify_farms(farms)
+
+                # Initialize analyzer and indexes; tools read the analyzer's
+                # DataFrame, so the FarmData objects are not kept
+                self._update_progress(phase="indexing")
+                analyzer = FarmAnalyzer.from_dataframe(FarmAnalyzer.farms_to_dataframe(farms))
+                index = FarmIndex(analyzer.df)
+                outliers = OutlierIndex(analyzer.df)
+                mode_group_codes = compute_mode_group_codes(analyzer.df)
+                peer_ranks = PeerRankTables(analyzer.df, mode_group_codes)
+                similarity = SimilarityIndex(analyzer.df)
+                classified_farms = sum(1 for f in farms if f.group is not None)
+                del farms
+
+                self._update_progress(phase="ready")
+                self._publish(
+                    DatasetSnapshot(
+                        version=self._next_version(),
+                        name=name,
+                        source=base.source,
+                        raw_df=base.raw_df,
+                        classifier=classifier,
+                        analyzer=analyzer,
+                        index=index,
+                        outliers=outliers,
+                        peer_ranks=peer_ranks,
+                        similarity=similarity,
+                        mode_group_codes=mode_group_codes,
+                    )
+                )
+
+                # Get classification summary
+                group_counts = analyzer.get_group_counts()
+
+                # Convert numpy types to Python types for JSON serialization
+                group_counts = {k: int(v) for k, v in group_counts.items()}
+
+                return {
+                    "success": True,
+                    "dataset": name,
+                    "total_farms": len(analyzer.df),
+                    "classified_farms": classified_farms,
+                    "group_counts": group_counts,
+                }
+            except Exception as e:
+                logger.error(f"Classification failed: {e}", exc_info=True)
+                self._update_progress(phase="failed", error=str(e))
+                return {
+                    "success": False,
+                    "error": str(e),
+                }
 
     def _auto_load_data(self) -> None:
         """
@@ -160,6 +763,8 @@ class DataContext:
 
         This method is called during initialization if auto_load is True.
         It loads the first CSV file found in the csv directory and classifies farms.
+        If the disk snapshot is enabled, a valid snapshot of that file is
+        restored instead, and a new snapshot is saved after classifying.
         """
         try:
             config = get_config()
@@ -175,12 +780,16 @@ class DataContext:
             # Load the first CSV file (or combine all if multiple)
             if len(csv_files) == 1:
                 logger.info(f"Auto-loading data from {csv_files[0]}")
-                result = self.load_data(csv_files[0])
             else:
                 # If multiple CSV files, load the first one
                 # (you could enhance this to combine multiple files)
                 logger.info(f"Found {len(csv_files)} CSV files, loading {csv_files[0]}")
-                result = self.load_data(csv_files[0])
+
+            store = self.store if config.mcp.use_disk_snapshot else None
+            if store is not None and self.restore_snapshot(store, csv_files[0]):
+                return
+
+            result = self.load_data(csv_files[0])
 
             if result.get("success"):
                 logger.info(f"Successfully loaded {result.get('rows')} rows")
@@ -192,6 +801,8 @@ class DataContext:
                         f"Successfully classified {classify_result.get('total_farms')} farms "
                         f"into {len(classify_result.get('group_counts', {}))} groups"
                     )
+                    if store is not None:
+                        self.save_snapshot(store)
                 else:
                     logger.error(f"Auto-classification failed: {classify_result.get('error')}")
             else:
@@ -200,26 +811,181 @@ class DataContext:
         except Exception as e:
             logger.error(f"Auto-load data failed: {e}", exc_info=True)
 
-    def get_data_summary(self) -> Dict[str, Any]:
-        """Get summary of current data state."""
-        if not self.data_loaded:
-            return {
-                "loaded": False,
-                "message": "No data loaded",
+    def restore_snapshot(self, store: SnapshotStore, file_path: Path) -> bool:
+        """
+        Publish the saved snapshot of a CSV file, if it is still valid.
+
+        Args:
+            store: Snapshot store
+            file_path: Source CSV file
+
+        Returns:
+            True if a snapshot was restored
+        """
+        with self._write_lock:
+            self._start_progress("restoring", file=str(file_path))
+            snapshot = store.load(file_path, self._next_version())
+            if snapshot is None:
+                self._update_progress(phase="idle")
+                return False
+            total_rows = len(snapshot.raw_df) if snapshot.raw_df is not None else 0
+            self._update_progress(phase="ready", total_rows=total_rows, restored=True)
+            self._publish(snapshot)
+        return True
+
+    def save_snapshot(self, store: SnapshotStore) -> None:
+        """
+        Save the current classified snapshot for the next start-up.
+
+        Failures are logged; the server keeps running without a disk snapshot.
+
+        Args:
+            store: Snapshot store
+        """
+        with self.pin() as snapshot:
+            try:
+                store.save(snapshot)
+            except Exception as e:
+                logger.warning(f"Could not save data snapshot: {e}")
+
+    def sql_mirror(self, snapshot: DatasetSnapshot) -> SqlMirror:
+        """
+        Get the SQL mirror of a classified snapshot, building it on first use.
+
+        Args:
+            snapshot: Pinned, classified snapshot
+
+        Returns:
+            SqlMirror over the snapshot's analysis data (freed with the snapshot)
+
+        Raises:
+            ValueError: If the snapshot is not classified
+        """
+        if snapshot.analyzer is None:
+            raise ValueError("Data not loaded or classified. Load and classify data first.")
+        with self._sql_lock:
+            if snapshot.sql_mirror is None:
+                snapshot.sql_mirror = SqlMirror(snapshot.analyzer.df, snapshot.mode_group_codes)
+            return snapshot.sql_mirror
+
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        Measure the memory held by datasets, their indexes and SQL mirrors.
+
+        Returns:
+            Dictionary with the heap memory counted against the budget, the
+            footprint of each in-memory dataset and the number of superseded
+            snapshots still pinned by running requests
+        """
+        with self._lock:
+            snapshots = [s for s in self._snapshots.values() if s.data_loaded]
+            retired = len(self._retired)
+        datasets = {}
+        for snapshot in snapshots:
+            mirror = snapshot.sql_mirror
+            datasets[snapshot.name] = {
+                **snapshot.memory_footprint(),
+                "sql_mirror_bytes": mirror.nbytes if mirror is not None else 0,
+            }
+        return {
+            "dataset_heap_bytes": sum(d["heap_bytes"] for d in datasets.values()),
+            "memory_budget_bytes": self.memory_budget,
+            "datasets": dict(sorted(datasets.items())),
+            "retired_snapshots": retired,
+        }
+
+    def list_datasets(self) -> List[Dict[str, Any]]:
+        """
+        Describe all datasets with their state and memory footprint.
+
+        Returns:
+            One dictionary per dataset, sorted by name
+        """
+        with self._lock:
+            snapshots = list(self._snapshots.values())
+            spilled = dict(self._spilled)
+
+        datasets = [
+            {
+                "name": snapshot.name,
+                "state": "in_memory",
+                "source": str(snapshot.source) if snapshot.source else None,
+                "rows": snapshot.rows,
+                "classified": snapshot.classified,
+                "data_version": snapshot.version,
+                "memory": snapshot.memory_footprint(),
+            }
+            for snapshot in snapshots
+            if snapshot.data_loaded
+        ]
+        datasets.extend(
+            {
+                "name": name,
+                "state": "spilled",
+                "source": str(source) if source else None,
+                "rows": rows,
+                "data_version": version,
+                "path": str(path),
             }
+            for name, (path, version, rows, source) in spilled.items()
+        )
+        return sorted(datasets, key=lambda d: d["name"])
+
+    def get_data_summary(self, dataset: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get summary of current data state.
+
+        Args:
+            dataset: Dataset to summarize, or None for the default dataset
 
-        summary: Dict[str, Any] = {
-            "loaded": True,
-            "classified": self.classified,
-            "total_rows": len(self.raw_df) if self.raw_df is not None else 0,
+        Returns:
+            Dictionary with the dataset's state plus all datasets and memory use
+        """
+        memory = {
+            "datasets": self.list_datasets(),
+            "memory_used_bytes": self.memory_used(),
+            "memory_budget_bytes": self.memory_budget,
         }
+        if not self.has_dataset(dataset):
+            return {"loaded": False, "message": f"Unknown dataset '{dataset}'", **memory}
+
+        with self.pin(dataset) as snapshot:
+            if not snapshot.data_loaded:
+                return {
+                    "loaded": False,
+                    "dataset": snapshot.name,
+                    "message": (
+                        "Data is loading in the background" if self.warming_up else "No data loaded"
+                    ),
+                    "progress": self.get_progress(),
+                    **memory,
+                }
+
+            summary: Dict[str, Any] = {
+                "loaded": True,
+                "dataset": snapshot.name,
+                "classified": snapshot.classified,
+                "total_rows": snapshot.rows,
+                "data_version": snapshot.version,
+                "retired_snapshots": len(self._retired),
+                "progress": self.get_progress(),
+            }
+
+            if snapshot.classified and snapshot.analyzer:
+                # Convert numpy types to Python types for JSON serialization
+                group_counts = snapshot.analyzer.get_group_counts()
+                summary["group_counts"] = {k: int(v) for k, v in group_counts.items()}
 
-        if self.classified and self.analyzer:
-            # Convert numpy types to Python types for JSON serialization
-            group_counts = self.analyzer.get_group_counts()
-            summary["group_counts"] = {k: int(v) for k, v in group_counts.items()}
+            if snapshot.mode_group_codes is not None:
+                summary["mode_group_counts"] = {
+                    mode: MultiModeAnalyzer.group_counts_dict(
+                        np.bincount(codes, minlength=len(GROUP_LABELS))
+                    )
+                    for mode, codes in snapshot.mode_group_codes.items()
+                }
 
-        return summary
+            summary.update(memory)
+            return summary
 
 
 # Initialize MCP server
@@ -228,6 +994,15 @@ server = Server("muka-analysis")
 # Global data context - will be initialized with auto-load in main()
 data_context = DataContext(auto_load=False)
 
+# Thread pools running the (synchronous) tool handlers off the event loop
+dispatcher = ToolDispatcher.from_config()
+
+# Background jobs (exports) that outlive the tool call submitting them
+job_manager = JobManager.from_config()
+
+# Per-tool call counts, latencies and sizes (get_server_metrics)
+metrics = MetricsRegistry()
+
 
 @server.list_tools()
 async def list_tools() -> List[Tool]:
@@ -244,11 +1019,14 @@ async def list_tools() -> List[Tool]:
             description=(
                 "Load farm data from a CSV file. Use this as the first step before any analysis. "
                 "If no file path is provided, loads the default configured file. "
-                "Returns information about the loaded data including row count and column names."
+                "Returns information about the loaded data including row count and column names. "
+                "Pass a dataset name to keep several files loaded side by side (e.g. two years) "
+                "and use the same name with the other tools."
             ),
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "dataset": DATASET_PROPERTY,
                     "file_path": {
                         "type": "string",
                         "description": "Path to CSV file (optional, uses default if not provided)",
@@ -265,21 +1043,53 @@ async def list_tools() -> List[Tool]:
                 "Milchvieh (dairy), BKMmZ (combined dairy with breeding), BKMoZ (combined dairy without breeding), "
                 "or IKM (intensive calf rearing). Returns classification summary with counts per group."
             ),
+            inputSchema={
+                "type": "object",
+                "properties": {"dataset": DATASET_PROPERTY},
+            },
+        ),
+        Tool(
+            name="get_cache_stats",
+            description=(
+                "Get statistics of the result cache for analytical tools: hits, misses, "
+                "hit rate, evictions, number of cached results and memory used. "
+                "Cached results are dropped whenever data is loaded or classified."
+            ),
             inputSchema={
                 "type": "object",
                 "properties": {},
             },
         ),
+        Tool(
+            name="get_server_metrics",
+            description=(
+                "Get server metrics: per-tool call counts, error counts, throughput, "
+                "latency percentiles (p50/p95/p99) and argument and response sizes, "
+                "plus process memory (RSS), dataset, index and SQL mirror sizes, "
+                "cache and result store usage and background job counts."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "reset": {
+                        "type": "boolean",
+                        "description": "Reset the per-tool metrics after reading them",
+                        "default": False,
+                    },
+                },
+            },
+        ),
         Tool(
             name="get_data_info",
             description=(
                 "Get information about currently loaded data and classification status. "
                 "Shows whether data is loaded, whether it's classified, and basic counts. "
-                "Use this to check the current state before running other operations."
+                "Use this to check the current state before running other operations. "
+                "Also lists all datasets with their memory footprint and the memory budget."
             ),
             inputSchema={
                 "type": "object",
-                "properties": {},
+                "properties": {"dataset": DATASET_PROPERTY},
             },
         ),
         # Data Query Tools
@@ -292,13 +1102,18 @@ async def list_tools() -> List[Tool]:
                 "- year: Year of data "
                 "- min_animals: Minimum total animals "
                 "- max_animals: Maximum total animals "
-                "Returns matching farms with all their data. "
+                "Returns one page of matching farms with the requested fields, the total "
+                "number of matches and a next_cursor to fetch the following page. "
+                "Use order_by (any numeric field) and descending to sort. "
                 "Examples: 'Show me dairy farms with more than 100 animals', "
-                "'Find all Muku farms from 2024', 'Get farms with TVD 12345'"
+                "'Find all Muku farms from 2024', 'Get farms with TVD 12345', "
+                "'The 10 largest Milchvieh farms'"
             ),
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "dataset": DATASET_PROPERTY,
+                    "layout": LAYOUT_PROPERTY,
                     "group": {
                         "type": "string",
                         "description": "Filter by farm group (e.g., 'Muku', 'Milchvieh')",
@@ -321,9 +1136,34 @@ async def list_tools() -> List[Tool]:
                     },
                     "limit": {
                         "type": "integer",
-                        "description": "Maximum number of results to return (default: 100)",
+                        "description": (
+                            "Maximum number of results per page (default: 100, at most "
+                            f"{get_config().mcp.inline_max_rows}); follow next_cursor for "
+                            "more farms"
+                        ),
                         "default": 100,
                     },
+                    "fields": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": (
+                            "Fields to return per farm (optional, default: tvd, year, group, "
+                            "n_animals_total, n_females_age3_dairy, n_females_age3_total)"
+                        ),
+                    },
+                    "order_by": {
+                        "type": "string",
+                        "description": "Numeric field to sort by (optional, default: file order)",
+                    },
+                    "descending": {
+                        "type": "boolean",
+                        "description": "Sort in descending order (default: false)",
+                        "default": False,
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "next_cursor from the previous page (optional)",
+                    },
                 },
             },
         ),
@@ -338,6 +1178,7 @@ async def list_tools() -> List[Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "dataset": DATASET_PROPERTY,
                     "tvd": {
                         "type": "string",
                         "description": "Farm TVD ID to retrieve",
@@ -346,6 +1187,133 @@ async def list_tools() -> List[Tool]:
                 "required": ["tvd"],
             },
         ),
+        Tool(
+            name="benchmark_farm",
+            description=(
+                "Compare a farm with the other farms of its group. Returns the farm's "
+                "percentile rank (0-100) within its group on every numeric metric, together "
+                "with the group's quartiles, from rank tables precomputed for every indicator "
+                "mode. Examples: 'How does farm TVD 12345 compare with other farms in its "
+                "group?', 'How would farm 12345 rank among Milchvieh farms?'"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "dataset": DATASET_PROPERTY,
+                    "tvd": {
+                        "type": "string",
+                        "description": "Farm TVD ID to benchmark",
+                    },
+                    "year": {
+                        "type": "integer",
+                        "description": "Data year (default: the farm's first row)",
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": [mode.value for mode in IndicatorMode],
+                        "description": (
+                            "Indicator mode defining the farm's group "
+                            "(default: classification.indicator_mode)"
+                        ),
+                    },
+                    "group": {
+                        "type": "string",
+                        "description": (
+                            "Peer group to compare with (default: the farm's group in the "
+                            "mode; required for farms that are unclassified in the mode)"
+                        ),
+                    },
+                },
+                "required": ["tvd"],
+            },
+        ),
+        Tool(
+            name="find_similar_farms",
+            description=(
+                "Find the farms most similar to a given farm, or to a profile of metric values, "
+                "by Euclidean distance over the standardized numeric metrics. Useful to check "
+                "borderline classifications: the groups of a farm's nearest neighbours show "
+                "which profile it resembles. Give either 'tvd' or 'profile'. Examples: "
+                "'Which farms are most similar to TVD 12345?', 'Farms like one with 120 "
+                "animals and 30 calf arrivals'"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "dataset": DATASET_PROPERTY,
+                    "tvd": {
+                        "type": "string",
+                        "description": "Farm to find neighbours of (its other years are excluded)",
+                    },
+                    "year": {
+                        "type": "integer",
+                        "description": "Data year of the farm (default: the farm's first row)",
+                    },
+                    "profile": {
+                        "type": "object",
+                        "description": (
+                            "Metric values of a hypothetical farm, e.g. "
+                            '{"n_animals_total": 120, "n_total_entries_younger85": 30}; '
+                            "only these metrics are compared"
+                        ),
+                        "additionalProperties": {"type": "number"},
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": [mode.value for mode in IndicatorMode],
+                        "description": (
+                            "Indicator mode of the reported groups and of the group filter "
+                            "(default: classification.indicator_mode)"
+                        ),
+                    },
+                    "group": {
+                        "type": "string",
+                        "description": "Only farms of this group in the mode",
+                    },
+                    "k": {
+                        "type": "integer",
+                        "description": "Number of neighbours",
+                        "default": 10,
+                    },
+                    "layout": LAYOUT_PROPERTY,
+                },
+            },
+        ),
+        Tool(
+            name="cluster_unclassified_farms",
+            description=(
+                "Cluster the farms that match none of the group profiles in a mode with "
+                "mini-batch k-means over their standardized metrics and indicator bits. "
+                "Each cluster reports its size, majority indicator pattern, share of farms "
+                "per indicator, metric centroid and the nearest existing profile with the "
+                "indicators it contradicts - candidates for new or adjusted profiles. "
+                "Examples: 'What do the unclassified farms look like?', "
+                "'Propose new profiles for unclassified farms in 4-indicators mode'"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "dataset": DATASET_PROPERTY,
+                    "mode": {
+                        "type": "string",
+                        "enum": [mode.value for mode in IndicatorMode],
+                        "description": (
+                            "Indicator mode whose unclassified farms are clustered "
+                            "(default: classification.indicator_mode)"
+                        ),
+                    },
+                    "k": {
+                        "type": "integer",
+                        "description": "Number of clusters (default: analysis.cluster_count)",
+                    },
+                    "seed": {
+                        "type": "integer",
+                        "description": "Random seed; the same seed gives the same clusters",
+                        "default": 0,
+                    },
+                },
+            },
+        ),
         # Statistical Analysis Tools
         Tool(
             name="calculate_group_statistics",
@@ -361,6 +1329,8 @@ async def list_tools() -> List[Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "dataset": DATASET_PROPERTY,
+                    "layout": LAYOUT_PROPERTY,
                     "group": {
                         "type": "string",
                         "description": "Specific group to analyze (optional, analyzes all if not provided)",
@@ -380,6 +1350,8 @@ async def list_tools() -> List[Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "dataset": DATASET_PROPERTY,
+                    "layout": LAYOUT_PROPERTY,
                     "groups": {
                         "type": "array",
                         "items": {"type": "string"},
@@ -407,7 +1379,9 @@ async def list_tools() -> List[Tool]:
                 "- Between: n_animals_total.between(50, 100).sum()\n"
                 "- Multiple conditions: ((n_animals_total > 20) & (n_animals_total <= 50)).sum()\n"
                 "- Methods: n_animals_total.gt(500).sum(), n_animals_total.lt(20).sum()\n"
-                "- DataFrame access: df['column'].method() or df.column.method()\n"
+                "- Functions: abs, sqrt, log, log10, exp, round, minimum, maximum, where\n"
+                "- Column access by name: df['column'].method() or df.column.method()\n"
+                "Only these operations are allowed; other Python code is rejected.\n"
                 "\nExamples:\n"
                 "'n_animals_total.sum()' - Sum all animals\n"
                 "'n_animals_total.mean()' - Average animals per farm\n"
@@ -418,22 +1392,30 @@ async def list_tools() -> List[Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "dataset": DATASET_PROPERTY,
                     "expression": {
                         "type": "string",
                         "description": (
                             "Pandas-style calculation expression. "
                             "Column names can be used directly (e.g., n_animals_total.sum()). "
-                            "Supports comparisons, boolean operations, and pandas methods."
+                            "Supports arithmetic, comparisons, boolean operations and the "
+                            "whitelisted methods listed above."
                         ),
                     },
                     "group_by": {
                         "type": "array",
                         "items": {"type": "string"},
-                        "description": "Fields to group by (optional)",
+                        "description": (
+                            "Fields to group by (optional); the expression is evaluated "
+                            "once per group"
+                        ),
                     },
                     "filter": {
                         "type": "string",
-                        "description": "Filter expression (optional, pandas query syntax)",
+                        "description": (
+                            "Filter condition in the same expression syntax (optional), "
+                            "e.g. year == 2023 and group == 'Muku'"
+                        ),
                     },
                 },
                 "required": ["expression"],
@@ -452,6 +1434,8 @@ async def list_tools() -> List[Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "dataset": DATASET_PROPERTY,
+                    "layout": LAYOUT_PROPERTY,
                     "group_by": {
                         "type": "array",
                         "items": {"type": "string"},
@@ -465,6 +1449,99 @@ async def list_tools() -> List[Tool]:
                 "required": ["group_by", "aggregate"],
             },
         ),
+        Tool(
+            name="sql_query",
+            description=(
+                f"Run a read-only SQL SELECT on the table '{TABLE_NAME}' (SQLite dialect). "
+                "Use it for joins (e.g. a farm's years against each other), HAVING clauses, "
+                "window functions and other queries the other tools cannot express. "
+                "The table has one row per farm and year with all analysis fields, "
+                "indexed on tvd, year and group, plus one group column per indicator mode "
+                f"({', '.join(mode_column(mode.value) for mode in IndicatorMode)}). "
+                "Examples: "
+                f"'SELECT \"group\", year, COUNT(*) FROM {TABLE_NAME} GROUP BY 1, 2', "
+                f"'SELECT tvd FROM {TABLE_NAME} GROUP BY tvd HAVING COUNT(DISTINCT \"group\") > 1'"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "dataset": DATASET_PROPERTY,
+                    "sql": {
+                        "type": "string",
+                        "description": (
+                            'A single SELECT statement; quote the group column as "group"'
+                        ),
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": (
+                            "Maximum rows to return (default and maximum: "
+                            f"{get_config().mcp.sql_max_rows})"
+                        ),
+                    },
+                },
+                "required": ["sql"],
+            },
+        ),
+        Tool(
+            name="batch",
+            description=(
+                "Run several read-only requests in one call over one shared filter. "
+                "The filter is evaluated once and groupings are computed once and shared, "
+                "so prefer this over a series of similar calls. Operations: "
+                "'query' (fields, limit, order_by, descending), "
+                "'aggregate' (group_by, aggregate: {field: function}), "
+                "'statistics' (group, fields; min/max/mean/median per farm group), "
+                "'metric' (expression, group_by; same expressions as calculate_custom_metric). "
+                "A failing request reports its own error; the others still run. "
+                "Example: filter 'year == 2023' with requests "
+                "[{'operation': 'statistics'}, "
+                "{'operation': 'metric', 'expression': 'n_animals_total.median()', "
+                "'group_by': ['group']}]"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "dataset": DATASET_PROPERTY,
+                    "filter": {
+                        "type": "string",
+                        "description": (
+                            "Condition selecting the farms all requests work on "
+                            "(optional, e.g. 'year == 2023'; same syntax as "
+                            "calculate_custom_metric)"
+                        ),
+                    },
+                    "requests": {
+                        "type": "array",
+                        "description": (
+                            "Requests to evaluate, at most "
+                            f"{get_config().mcp.batch_max_requests}"
+                        ),
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "operation": {"type": "string", "enum": BATCH_OPERATIONS},
+                                "id": {
+                                    "type": "string",
+                                    "description": "Label echoed in the result (optional)",
+                                },
+                                "fields": {"type": "array", "items": {"type": "string"}},
+                                "limit": {"type": "integer"},
+                                "order_by": {"type": "string"},
+                                "descending": {"type": "boolean"},
+                                "group_by": {"type": "array", "items": {"type": "string"}},
+                                "aggregate": {"type": "object"},
+                                "group": {"type": "string"},
+                                "expression": {"type": "string"},
+                                "layout": LAYOUT_PROPERTY,
+                            },
+                            "required": ["operation"],
+                        },
+                    },
+                },
+                "required": ["requests"],
+            },
+        ),
         # Insight Generation Tools
         Tool(
             name="get_data_insights",
@@ -480,62 +1557,154 @@ async def list_tools() -> List[Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "dataset": DATASET_PROPERTY,
                     "focus": {
                         "type": "string",
                         "description": "What to focus on (optional: 'outliers', 'trends', 'distribution', 'general')",
                     },
-                    "group": {
+                    "group": {
+                        "type": "string",
+                        "description": "Specific group to analyze (optional)",
+                    },
+                },
+            },
+        ),
+        Tool(
+            name="answer_question",
+            description=(
+                "Answer a natural language question about the data. "
+                "This is the most flexible tool - ask anything about the farm data, "
+                "and it will use appropriate analysis methods to answer. "
+                "Examples: "
+                "'How many farms have more dairy cattle than other cattle?', "
+                "'What percentage of farms are classified as Muku?', "
+                "'Which group has the highest average animal count?', "
+                "'Are there any farms with unusual calf movement patterns?'"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "dataset": DATASET_PROPERTY,
+                    "question": {
+                        "type": "string",
+                        "description": "Natural language question about the data",
+                    },
+                },
+                "required": ["question"],
+            },
+        ),
+        Tool(
+            name="find_outliers",
+            description=(
+                "Find farms with unusual values compared with the other farms of their group. "
+                "Every numeric metric of every farm has a precomputed robust z-score "
+                "((value - group median) / (1.4826 * group MAD)); farms above the threshold "
+                "are outliers. Returns the most unusual farms and outlier counts per metric. "
+                "Examples: 'Which farms are most unusual?', "
+                "'Farms with unusually many calf arrivals among Muku farms'"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "dataset": DATASET_PROPERTY,
+                    "field": {
+                        "type": "string",
+                        "description": (
+                            "Numeric metric to check (default: each farm's most unusual metric)"
+                        ),
+                    },
+                    "group": {
+                        "type": "string",
+                        "description": "Only farms of this group",
+                    },
+                    "direction": {
+                        "type": "string",
+                        "enum": OUTLIER_DIRECTIONS,
+                        "description": "'high' (above the group median), 'low' or 'both'",
+                        "default": "both",
+                    },
+                    "threshold": {
+                        "type": "number",
+                        "description": (
+                            "Minimum |robust z-score| (default: analysis.outlier_threshold, 3.5)"
+                        ),
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum number of farms returned",
+                        "default": 20,
+                    },
+                    "layout": LAYOUT_PROPERTY,
+                },
+            },
+        ),
+        # Export Tools
+        Tool(
+            name="export_analysis",
+            description=(
+                "Export analysis results in the background. Returns a job ID right away; "
+                "follow the job with get_job_status and stop it with cancel_job. Formats: "
+                "'excel' (summary statistics, detailed stats and group counts), "
+                "'csv' and 'parquet' (classified farm data), "
+                "'all_modes' (workbook comparing all indicator modes). "
+                "Example: 'Export the analysis to Excel'"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "dataset": DATASET_PROPERTY,
+                    "format": {
+                        "type": "string",
+                        "enum": EXPORT_FORMATS,
+                        "description": "Export format (default: excel)",
+                        "default": "excel",
+                    },
+                    "file_path": {
                         "type": "string",
-                        "description": "Specific group to analyze (optional)",
+                        "description": "Path for the output file (optional, uses default if not provided)",
+                    },
+                    "include_data": {
+                        "type": "boolean",
+                        "description": (
+                            "Include the farm data sheets of every mode "
+                            "(all_modes only, default: true)"
+                        ),
+                        "default": True,
                     },
                 },
             },
         ),
         Tool(
-            name="answer_question",
+            name="get_job_status",
             description=(
-                "Answer a natural language question about the data. "
-                "This is the most flexible tool - ask anything about the farm data, "
-                "and it will use appropriate analysis methods to answer. "
-                "Examples: "
-                "'How many farms have more dairy cattle than other cattle?', "
-                "'What percentage of farms are classified as Muku?', "
-                "'Which group has the highest average animal count?', "
-                "'Are there any farms with unusual calf movement patterns?'"
+                "Get the state and progress of a background job (e.g. an export), "
+                "or list all jobs when no job_id is given. With wait_seconds, waits for "
+                "the job to finish and sends progress notifications meanwhile."
             ),
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "question": {
-                        "type": "string",
-                        "description": "Natural language question about the data",
+                    "job_id": {"type": "string", "description": "Job ID (optional)"},
+                    "wait_seconds": {
+                        "type": "number",
+                        "description": (
+                            "Seconds to wait for the job to finish (default: 0, maximum: "
+                            f"{get_config().mcp.job_status_max_wait_seconds:g})"
+                        ),
                     },
                 },
-                "required": ["question"],
             },
         ),
-        # Export Tools
         Tool(
-            name="export_analysis",
+            name="cancel_job",
             description=(
-                "Export analysis results to Excel file with multiple sheets. "
-                "Includes summary statistics, detailed stats, and group counts. "
-                "Optionally includes validation comparison sheets. "
-                "Example: 'Export the analysis to Excel'"
+                "Cancel a background job. A queued job never starts; a running job "
+                "stops at its next step and leaves no partial file."
             ),
             inputSchema={
                 "type": "object",
-                "properties": {
-                    "file_path": {
-                        "type": "string",
-                        "description": "Path for output Excel file (optional, uses default if not provided)",
-                    },
-                    "include_validation": {
-                        "type": "boolean",
-                        "description": "Include validation comparison sheets (default: false)",
-                        "default": False,
-                    },
-                },
+                "properties": {"job_id": {"type": "string", "description": "Job ID"}},
+                "required": ["job_id"],
             },
         ),
     ]
@@ -553,6 +1722,10 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
     Returns:
         List of TextContent with results
     """
+    tool = name
+    started = metrics.call_started()
+    text = ""
+    error = True
     try:
         if name == "load_farm_data":
             result = await handle_load_data(arguments)
@@ -564,6 +1737,12 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
             result = await handle_query_farms(arguments)
         elif name == "get_farm_details":
             result = await handle_get_farm_details(arguments)
+        elif name == "benchmark_farm":
+            result = await handle_benchmark_farm(arguments)
+        elif name == "find_similar_farms":
+            result = await handle_find_similar_farms(arguments)
+        elif name == "cluster_unclassified_farms":
+            result = await handle_cluster_unclassified_farms(arguments)
         elif name == "calculate_group_statistics":
             result = await handle_calculate_statistics(arguments)
         elif name == "compare_groups":
@@ -572,166 +1751,619 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
             result = await handle_custom_metric(arguments)
         elif name == "aggregate_by_field":
             result = await handle_aggregate(arguments)
+        elif name == "sql_query":
+            result = await handle_sql_query(arguments)
+        elif name == "batch":
+            result = await handle_batch(arguments)
         elif name == "get_data_insights":
             result = await handle_get_insights(arguments)
         elif name == "answer_question":
             result = await handle_answer_question(arguments)
+        elif name == "find_outliers":
+            result = await handle_find_outliers(arguments)
         elif name == "export_analysis":
             result = await handle_export(arguments)
+        elif name == "get_job_status":
+            result = await handle_get_job_status(arguments)
+        elif name == "cancel_job":
+            result = await handle_cancel_job(arguments)
+        elif name == "get_cache_stats":
+            result = await handle_get_cache_stats(arguments)
+        elif name == "get_server_metrics":
+            result = await handle_get_server_metrics(arguments)
         else:
+            # Unknown names share one entry, so clients cannot grow the metrics
+            tool = "unknown"
             result = {"error": f"Unknown tool: {name}"}
 
-        return [TextContent(type="text", text=str(result))]
+        # Large tables are stored and returned as resource references
+        snapshot = data_context.current(arguments.get("dataset"))
+        result = await asyncio.to_thread(
+            data_context.result_store.offload,
+            name,
+            result,
+            snapshot.version if snapshot is not None else 0,
+        )
+        error = isinstance(result, dict) and "error" in result
+        text = to_json(result)
+        return [TextContent(type="text", text=text)]
+
+    except ToolTimeout as e:
+        logger.warning(str(e))
+        text = to_json({"error": str(e)})
+        return [TextContent(type="text", text=text)]
 
     except Exception as e:
         logger.error(f"Tool call failed: {e}", exc_info=True)
-        return [TextContent(type="text", text=f"Error: {str(e)}")]
+        text = to_json({"error": str(e)})
+        return [TextContent(type="text", text=text)]
+
+    finally:
+        metrics.call_finished(tool, started, len(to_json(arguments)), len(text), error)
+
+
+@server.list_resources()
+async def list_resources() -> List[Resource]:
+    """List the rows of every dataset and all stored large results."""
+    resources = [
+        Resource(
+            uri=AnyUrl(dataset_rows_uri(name)),
+            name=f"dataset-{name}",
+            description=f"Rows of dataset '{name}', in pages (offset, limit, fields, layout)",
+            mimeType="application/json",
+        )
+        for name in data_context.dataset_names()
+    ]
+    resources.extend(
+        Resource(
+            uri=AnyUrl(result_uri(stored.result_id)),
+            name=f"result-{stored.result_id}",
+            description=f"{stored.tool} result with {stored.rows} rows, in pages",
+            mimeType="application/json",
+        )
+        for stored in data_context.result_store.list()
+    )
+    return resources
+
+
+@server.list_resource_templates()
+async def list_resource_templates() -> List[ResourceTemplate]:
+    """List the URI templates of paged resources."""
+    return [
+        ResourceTemplate(
+            uriTemplate=DATASET_ROWS_TEMPLATE,
+            name="dataset-rows",
+            description=(
+                "Rows of a loaded dataset (classified fields if classified). "
+                "fields: comma-separated columns; layout: records or columns"
+            ),
+            mimeType="application/json",
+        ),
+        ResourceTemplate(
+            uriTemplate=RESULT_TEMPLATE,
+            name="tool-result",
+            description=(
+                "A large tool result stored on the server; tools return its URI "
+                "instead of inlining the rows"
+            ),
+            mimeType="application/json",
+        ),
+    ]
+
+
+@server.read_resource()
+async def read_resource(uri: AnyUrl) -> List[ReadResourceContents]:
+    """Read a page of a dataset or stored result."""
+    page = await handle_read_resource({"uri": str(uri)})
+    return [ReadResourceContents(content=to_json(page), mime_type="application/json")]
+
+
+def snapshot_tool(tool: str, kind: str = "compute") -> Callable[
+    [Callable[[Dict[str, Any], DatasetSnapshot], Dict[str, Any]]],
+    Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+]:
+    """
+    Register a read-only tool handler.
+
+    The handler runs on the dispatcher's thread pools with the current
+    snapshot of the requested dataset (the "dataset" argument) pinned for the
+    whole call; results of CACHED_TOOLS are cached per snapshot version.
+
+    Args:
+        tool: Tool name
+        kind: Dispatcher tool kind ("lookup" or "compute")
+
+    Returns:
+        Decorator turning handler(arguments, snapshot) into an async handler(arguments)
+    """
+
+    def decorator(
+        func: Callable[[Dict[str, Any], DatasetSnapshot], Dict[str, Any]],
+    ) -> Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]:
+        @functools.wraps(func)
+        def run(arguments: Dict[str, Any]) -> Dict[str, Any]:
+            # During start-up warm-up, wait a bounded time for the data
+            if data_context.warming_up and not data_context.snapshot.classified:
+                data_context.wait_for_warmup(get_config().mcp.warmup_wait_seconds)
+
+            dataset = arguments.get("dataset")
+            if not data_context.has_dataset(dataset):
+                return {
+                    "error": f"Unknown dataset '{dataset}'. "
+                    f"Datasets: {', '.join(data_context.dataset_names())}"
+                }
+
+            with data_context.pin(dataset) as snapshot:
+                if data_context.warming_up and not snapshot.classified:
+                    return {
+                        "status": "warming_up",
+                        "message": "Farm data is still loading. Try again shortly.",
+                        "progress": data_context.get_progress(),
+                    }
+                if tool not in CACHED_TOOLS:
+                    return func(arguments, snapshot)
+
+                cache_key = ResultCache.make_key(tool, arguments, snapshot.version)
+                cached = data_context.result_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+                result = func(arguments, snapshot)
+                # Results of a superseded snapshot would never be looked up again
+                if "error" not in result and snapshot is data_context.current(snapshot.name):
+                    data_context.result_cache.put(cache_key, result)
+                return result
+
+        return offloaded(dispatcher, tool, kind)(run)
+
+    return decorator
 
 
 # Tool Handler Functions
-async def handle_load_data(arguments: Dict[str, Any]) -> Dict[str, Any]:
+#
+# Handlers are synchronous and run on the dispatcher's thread pools. Read-only
+# handlers (@snapshot_tool) get the pinned data snapshot; loading and
+# classifying (@offloaded "write") publish new snapshots.
+@offloaded(dispatcher, "load_farm_data", "write")
+def handle_load_data(arguments: Dict[str, Any]) -> Dict[str, Any]:
     """Load farm data from CSV file."""
     file_path = arguments.get("file_path")
     if file_path:
         file_path = Path(file_path)
-    return data_context.load_data(file_path)
+    return data_context.load_data(file_path, arguments.get("dataset"))
 
 
-async def handle_classify_farms(arguments: Dict[str, Any]) -> Dict[str, Any]:
+@offloaded(dispatcher, "classify_farms", "write")
+def handle_classify_farms(arguments: Dict[str, Any]) -> Dict[str, Any]:
     """Classify farms into groups."""
-    return data_context.classify_farms()
+    return data_context.classify_farms(arguments.get("dataset"))
 
 
-async def handle_get_data_info(arguments: Dict[str, Any]) -> Dict[str, Any]:
+@offloaded(dispatcher, "get_data_info", "lookup")
+def handle_get_data_info(arguments: Dict[str, Any]) -> Dict[str, Any]:
     """Get current data state information."""
-    return data_context.get_data_summary()
+    return data_context.get_data_summary(arguments.get("dataset"))
 
 
-async def handle_query_farms(arguments: Dict[str, Any]) -> Dict[str, Any]:
-    """Query farms with filters."""
-    if not data_context.classified or data_context.farms is None:
-        return {"error": "Data not loaded or classified. Load and classify data first."}
+@offloaded(dispatcher, "get_cache_stats", "lookup")
+def handle_get_cache_stats(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Get result cache counters."""
+    return {
+        "data_version": data_context.data_version,
+        "cached_tools": sorted(CACHED_TOOLS),
+        **data_context.result_cache.stats(),
+        "result_store": data_context.result_store.stats(),
+    }
 
-    # Extract filters
-    group = arguments.get("group")
-    tvd = arguments.get("tvd")
-    year = arguments.get("year")
-    min_animals = arguments.get("min_animals")
-    max_animals = arguments.get("max_animals")
-    limit = arguments.get("limit", 100)
 
-    # Filter farms
-    filtered = data_context.farms
+def collect_server_metrics() -> Dict[str, Any]:
+    """
+    Collect the server metrics reported by get_server_metrics and the metrics file.
+
+    Returns:
+        Dictionary with tool metrics, memory, cache, result store and job usage
+    """
+    return {
+        **metrics.snapshot(),
+        "memory": {**process_memory(), **data_context.memory_report()},
+        "result_cache": data_context.result_cache.stats(),
+        "result_store": data_context.result_store.stats(),
+        "jobs": job_manager.stats(),
+    }
 
-    if group:
-        filtered = [
-            f
-            for f in filtered
-            if f.group and (f.group.value if hasattr(f.group, "value") else f.group) == group
-        ]
 
-    if tvd:
-        filtered = [f for f in filtered if f.tvd == tvd]
+@offloaded(dispatcher, "get_server_metrics", "lookup")
+def handle_get_server_metrics(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the server metrics, optionally resetting the per-tool metrics."""
+    result = collect_server_metrics()
+    if arguments.get("reset", False):
+        metrics.reset()
+        result["reset"] = True
+    return result
 
-    if year:
-        filtered = [f for f in filtered if f.year == year]
 
-    if min_animals is not None:
-        filtered = [f for f in filtered if f.n_animals_total >= min_animals]
+@offloaded(dispatcher, "read_resource", "lookup")
+def handle_read_resource(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Read a page of a resource.
+
+    Raises:
+        ValueError: If the URI, the dataset or result, or a parameter is invalid
+    """
+    kind, name, params = parse_resource_uri(arguments["uri"])
+    if kind == "result":
+        return data_context.result_store.read(name, params)
+
+    name = validate_dataset_name(name)
+    offset, limit = page_bounds(params)
+    layout = check_layout(params.get("layout"))
+    with data_context.pin(name) as snapshot:
+        df = snapshot.analyzer.df if snapshot.analyzer is not None else snapshot.raw_df
+        if df is None:
+            raise ValueError(f"Dataset '{name}' has no data loaded")
+        fields = [f.strip() for f in params.get("fields", "").split(",") if f.strip()]
+        unknown = [f for f in fields if f not in df.columns]
+        if unknown:
+            raise ValueError(
+                f"Unknown fields: {', '.join(unknown)}. Available fields: {', '.join(df.columns)}"
+            )
+        fields = fields or list(df.columns)
+
+        stop = min(offset + limit, len(df))
+        return {
+            "dataset": name,
+            "data_version": snapshot.version,
+            "classified": snapshot.classified,
+            "offset": offset,
+            "count": max(stop - offset, 0),
+            "total_rows": len(df),
+            "fields": fields,
+            "rows": encode_columns(
+                {field: df[field].to_numpy()[offset:stop] for field in fields}, layout
+            ),
+            "next": (
+                dataset_rows_uri(
+                    name,
+                    offset=stop,
+                    limit=limit,
+                    fields=params.get("fields"),
+                    layout=params.get("layout"),
+                )
+                if stop < len(df)
+                else None
+            ),
+        }
 
-    if max_animals is not None:
-        filtered = [f for f in filtered if f.n_animals_total <= max_animals]
 
-    # Limit results
-    filtered = filtered[:limit]
+@snapshot_tool("query_farms", "lookup")
+def handle_query_farms(arguments: Dict[str, Any], snapshot: DatasetSnapshot) -> Dict[str, Any]:
+    """Query farms with filters, projection, ordering and cursor pagination."""
+    if not snapshot.classified or snapshot.analyzer is None or snapshot.index is None:
+        return {"error": "Data not loaded or classified. Load and classify data first."}
 
-    # Convert to dict format
-    results = []
-    for farm in filtered:
-        group_value = None
-        if farm.group:
-            group_value = farm.group.value if hasattr(farm.group, "value") else farm.group
+    df = snapshot.analyzer.df
 
-        results.append(
-            {
-                "tvd": farm.tvd,
-                "year": farm.year,
-                "group": group_value,
-                "n_animals_total": farm.n_animals_total,
-                "n_females_age3_dairy": farm.n_females_age3_dairy,
-                "n_females_age3_total": farm.n_females_age3_total,
-            }
-        )
+    # Extract filters
+    group = arguments.get("group")
+    min_animals = arguments.get("min_animals")
+    max_animals = arguments.get("max_animals")
+    order_by = arguments.get("order_by")
+    descending = bool(arguments.get("descending", False))
+
+    fields = arguments.get("fields") or QUERY_DEFAULT_FIELDS
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in df.columns]
+    if unknown:
+        return {
+            "error": f"Unknown fields: {', '.join(unknown)}. "
+            f"Available fields: {', '.join(df.columns)}"
+        }
+    if order_by is not None and (
+        order_by not in df.columns or not pd.api.types.is_numeric_dtype(df[order_by])
+    ):
+        return {"error": f"Cannot order by '{order_by}': not a numeric field"}
 
-    result = {
-        "count": len(results),
-        "filters_applied": {k: v for k, v in arguments.items() if v is not None and k != "limit"},
-        "farms": results,
+    try:
+        tvd = parse_tvd(arguments.get("tvd"))
+        year = int(arguments["year"]) if arguments.get("year") not in (None, "") else None
+        # Larger result sets are read page by page through next_cursor
+        limit = arguments.get("limit")
+        limit = max(1, min(int(100 if limit is None else limit), get_config().mcp.inline_max_rows))
+        layout = check_layout(arguments.get("layout"))
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}
+
+    filters = {
+        k: v for k, v in arguments.items() if v is not None and k not in QUERY_PAGING_ARGUMENTS
+    }
+    query_key = {
+        "filters": filters,
+        "order_by": order_by,
+        "descending": descending,
+        "data_version": snapshot.version,
+    }
+    try:
+        offset = decode_cursor(arguments.get("cursor"), query_key)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    # Filter through the index (boolean masks over the candidate rows)
+    positions = snapshot.index.query(
+        tvd=tvd,
+        group=group or None,
+        year=year,
+        ranges={"n_animals_total": (min_animals, max_animals)},
+    )
+
+    # Row position breaks ties, so the order (and every page) is stable
+    if order_by is not None:
+        values = df[order_by].to_numpy(dtype=np.float64)[positions]
+        positions = positions[np.lexsort((positions, -values if descending else values))]
+
+    page = positions[offset : offset + limit]
+    next_offset = offset + len(page)
+
+    # Serialize only the requested page and fields, column by column
+    farms = encode_columns({field: df[field].to_numpy()[page] for field in fields}, layout)
+
+    return {
+        "count": len(page),
+        "total_matches": len(positions),
+        "filters_applied": to_jsonable(filters),
+        "fields": fields,
+        "farms": farms,
+        "next_cursor": (
+            encode_cursor(next_offset, query_key) if next_offset < len(positions) else None
+        ),
     }
-    return to_json_serializable(result)
 
 
-async def handle_get_farm_details(arguments: Dict[str, Any]) -> Dict[str, Any]:
+@snapshot_tool("get_farm_details", "lookup")
+def handle_get_farm_details(arguments: Dict[str, Any], snapshot: DatasetSnapshot) -> Dict[str, Any]:
     """Get detailed information for a specific farm."""
-    if not data_context.classified or data_context.farms is None:
+    if not snapshot.classified or snapshot.analyzer is None or snapshot.index is None:
         return {"error": "Data not loaded or classified. Load and classify data first."}
 
-    tvd = arguments.get("tvd")
-
-    # Find farm
-    farm = next((f for f in data_context.farms if f.tvd == tvd), None)
+    try:
+        tvd = parse_tvd(arguments.get("tvd"))
+    except ValueError as e:
+        return {"error": str(e)}
 
-    if not farm:
-        return {"error": f"Farm with TVD {tvd} not found"}
+    # Find farm (first row if the farm has data for several years)
+    positions = snapshot.index.lookup_tvd(tvd) if tvd is not None else np.empty(0, np.int64)
+    if len(positions) == 0:
+        return {"error": f"Farm with TVD {arguments.get('tvd')} not found"}
+    farm = snapshot.analyzer.df.iloc[int(positions[0])]
 
     # Return all fields
-    group_value = None
-    if farm.group:
-        group_value = farm.group.value if hasattr(farm.group, "value") else farm.group
-
     result = {
-        "tvd": farm.tvd,
-        "year": farm.year,
-        "group": group_value,
+        "tvd": farm["tvd"],
+        "year": farm["year"],
+        "group": farm["group"] if pd.notna(farm["group"]) else None,
         "classification_indicators": {
-            "female_dairy_cattle_v2": farm.indicator_female_dairy_cattle_v2,
-            "female_cattle": farm.indicator_female_cattle,
-            "calf_arrivals": farm.indicator_calf_arrivals,
-            "calf_leavings": farm.indicator_calf_leavings,
-            "female_slaughterings": farm.indicator_female_slaughterings,
-            "young_slaughterings": farm.indicator_young_slaughterings,
+            "female_dairy_cattle_v2": farm["indicator_female_dairy_cattle_v2"],
+            "female_cattle": farm["indicator_female_cattle"],
+            "calf_arrivals": farm["indicator_calf_arrivals"],
+            "calf_leavings": farm["indicator_calf_leavings"],
+            "female_slaughterings": farm["indicator_female_slaughterings"],
+            "young_slaughterings": farm["indicator_young_slaughterings"],
         },
         "animal_counts": {
-            "n_animals_total": farm.n_animals_total,
-            "n_females_age3_dairy": farm.n_females_age3_dairy,
-            "n_females_age3_total": farm.n_females_age3_total,
-            "n_females_younger731": farm.n_females_younger731,
-            "n_animals_from51_to730": farm.n_animals_from51_to730,
+            "n_animals_total": farm["n_animals_total"],
+            "n_females_age3_dairy": farm["n_females_age3_dairy"],
+            "n_females_age3_total": farm["n_females_age3_total"],
+            "n_females_younger731": farm["n_females_younger731"],
+            "n_animals_from51_to730": farm["n_animals_from51_to730"],
         },
         "movements": {
-            "n_total_entries_younger85": farm.n_total_entries_younger85,
-            "n_total_leavings_younger51": farm.n_total_leavings_younger51,
+            "n_total_entries_younger85": farm["n_total_entries_younger85"],
+            "n_total_leavings_younger51": farm["n_total_leavings_younger51"],
         },
         "proportions": {
-            "n_days_female_age3_dairy": farm.n_days_female_age3_dairy,
-            "n_days_female_age3_double": farm.n_days_female_age3_double,
-            "n_days_female_age3_dairydouble_V2": farm.n_days_female_age3_dairydouble_V2,
-            "animalyear_days_female_age3_dairy": farm.animalyear_days_female_age3_dairy,
-            "animalyear_days_female_age3_double": farm.animalyear_days_female_age3_double,
-            "animalyear_days_female_age3_dairydouble_V2": farm.animalyear_days_female_age3_dairydouble_V2,
-            "prop_days_female_age3_dairy": farm.prop_days_female_age3_dairy,
-            "prop_females_slaughterings_younger731": farm.prop_females_slaughterings_younger731,
+            "n_days_female_age3_dairy": farm["n_days_female_age3_dairy"],
+            "n_days_female_age3_double": farm["n_days_female_age3_double"],
+            "n_days_female_age3_dairydouble_V2": farm["n_days_female_age3_dairydouble_V2"],
+            "animalyear_days_female_age3_dairy": farm["animalyear_days_female_age3_dairy"],
+            "animalyear_days_female_age3_double": farm["animalyear_days_female_age3_double"],
+            "animalyear_days_female_age3_dairydouble_V2": farm[
+                "animalyear_days_female_age3_dairydouble_V2"
+            ],
+            "prop_days_female_age3_dairy": farm["prop_days_female_age3_dairy"],
+            "prop_females_slaughterings_younger731": farm["prop_females_slaughterings_younger731"],
         },
     }
-    return to_json_serializable(result)
+    return to_jsonable(result)
+
+
+@snapshot_tool("benchmark_farm", "lookup")
+def handle_benchmark_farm(arguments: Dict[str, Any], snapshot: DatasetSnapshot) -> Dict[str, Any]:
+    """Rank a farm among the farms of its group with the precomputed rank tables."""
+    if (
+        not snapshot.classified
+        or snapshot.analyzer is None
+        or snapshot.index is None
+        or snapshot.peer_ranks is None
+        or snapshot.mode_group_codes is None
+    ):
+        return {"error": "Data not loaded or classified. Load and classify data first."}
+
+    peer_ranks = snapshot.peer_ranks
+    mode = arguments.get("mode") or get_config().classification.indicator_mode
+    group = arguments.get("group") or None
+    try:
+        tvd = parse_tvd(arguments.get("tvd"))
+        year = int(arguments["year"]) if arguments.get("year") not in (None, "") else None
+        if mode not in peer_ranks.modes:
+            raise ValueError(
+                f"Unknown mode '{mode}'. Must be one of: {', '.join(peer_ranks.modes)}"
+            )
+        if group is not None and group not in GROUP_LABELS[:UNCLASSIFIED_CODE]:
+            raise ValueError(
+                f"Unknown group '{group}'. "
+                f"Must be one of: {', '.join(GROUP_LABELS[:UNCLASSIFIED_CODE])}"
+            )
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}
+
+    df = snapshot.analyzer.df
+    positions = snapshot.index.lookup_tvd(tvd) if tvd is not None else np.empty(0, np.int64)
+    if year is not None and len(positions) > 0:
+        positions = positions[df["year"].to_numpy()[positions] == year]
+    if len(positions) == 0:
+        year_text = f" in {year}" if year is not None else ""
+        return {"error": f"Farm with TVD {arguments.get('tvd')} not found{year_text}"}
+    position = int(positions[0])
+
+    farm_group = GROUP_LABELS[int(snapshot.mode_group_codes[mode][position])]
+    peer_group = group or farm_group
+    if peer_group == GROUP_LABELS[UNCLASSIFIED_CODE]:
+        return {
+            "error": (
+                f"Farm {tvd} is unclassified in mode {mode} and has no peer group. "
+                "Pass 'group' to compare it with a group."
+            )
+        }
+
+    code = GROUP_LABELS.index(peer_group)
+    values = np.array([df[field].iat[position] for field in peer_ranks.fields], dtype=np.float64)
+    return to_jsonable(
+        {
+            "tvd": tvd,
+            "year": df["year"].iloc[position],
+            "mode": mode,
+            "farm_group": farm_group,
+            "peer_group": peer_group,
+            "peers": peer_ranks.group_size(mode, code),
+            "metrics": peer_ranks.benchmark(values, mode, code),
+        }
+    )
+
+
+@snapshot_tool("find_similar_farms", "lookup")
+def handle_find_similar_farms(
+    arguments: Dict[str, Any], snapshot: DatasetSnapshot
+) -> Dict[str, Any]:
+    """Find the nearest neighbours of a farm or a profile in the similarity index."""
+    if (
+        not snapshot.classified
+        or snapshot.analyzer is None
+        or snapshot.index is None
+        or snapshot.similarity is None
+        or snapshot.mode_group_codes is None
+    ):
+        return {"error": "Data not loaded or classified. Load and classify data first."}
+
+    similarity = snapshot.similarity
+    df = snapshot.analyzer.df
+    mode = arguments.get("mode") or get_config().classification.indicator_mode
+    group = arguments.get("group") or None
+    profile = arguments.get("profile")
+    try:
+        tvd = parse_tvd(arguments.get("tvd"))
+        year = int(arguments["year"]) if arguments.get("year") not in (None, "") else None
+        k = int(arguments["k"]) if arguments.get("k") not in (None, "") else 10
+        if k < 1:
+            raise ValueError(f"Number of neighbours must be positive, got {k}")
+        layout = check_layout(arguments.get("layout"))
+        if (tvd is None) == (profile is None):
+            raise ValueError("Give either 'tvd' or 'profile'")
+        if profile is not None and not isinstance(profile, dict):
+            raise ValueError("'profile' must be an object of metric values")
+        if mode not in snapshot.mode_group_codes:
+            raise ValueError(
+                f"Unknown mode '{mode}'. Must be one of: {', '.join(snapshot.mode_group_codes)}"
+            )
+        if group is not None and group not in GROUP_LABELS:
+            raise ValueError(f"Unknown group '{group}'. Must be one of: {', '.join(GROUP_LABELS)}")
+        columns = None
+        if profile is not None:
+            columns, query = similarity.profile_query(profile)
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}
+
+    codes = snapshot.mode_group_codes[mode]
+    mask = codes == GROUP_LABELS.index(group) if group else np.ones(len(df), dtype=bool)
+    if tvd is not None:
+        rows = snapshot.index.lookup_tvd(tvd)
+        farm_rows = rows if year is None else rows[df["year"].to_numpy()[rows] == year]
+        if len(farm_rows) == 0:
+            year_text = f" in {year}" if year is not None else ""
+            return {"error": f"Farm with TVD {arguments.get('tvd')} not found{year_text}"}
+        position = int(farm_rows[0])
+        query = similarity.vectors[position]
+        # The farm's other years would be its nearest neighbours
+        mask[rows] = False
+        query_info: Dict[str, Any] = {
+            "tvd": tvd,
+            "year": df["year"].iloc[position],
+            "group": GROUP_LABELS[int(codes[position])],
+        }
+    else:
+        query_info = {"profile": profile}
+
+    positions, distances = similarity.search(query, columns, k=k, mask=mask)
+    groups = np.asarray(GROUP_LABELS, dtype=object)[codes[positions]]
+    neighbours = {
+        "tvd": df["tvd"].to_numpy()[positions],
+        "year": df["year"].to_numpy()[positions],
+        "group": groups,
+        "distance": np.round(distances, 3),
+    }
+    labels, counts = np.unique(groups.astype(str), return_counts=True)
+    return to_jsonable(
+        {
+            "query": query_info,
+            "mode": mode,
+            "group": group,
+            "neighbour_groups": dict(zip(labels.tolist(), counts.tolist())),
+            "neighbours": encode_columns(neighbours, layout),
+        }
+    )
+
+
+@snapshot_tool("cluster_unclassified_farms", "compute")
+def handle_cluster_unclassified_farms(
+    arguments: Dict[str, Any], snapshot: DatasetSnapshot
+) -> Dict[str, Any]:
+    """Cluster the unclassified farms of a mode with mini-batch k-means."""
+    if not snapshot.classified or snapshot.analyzer is None or snapshot.mode_group_codes is None:
+        return {"error": "Data not loaded or classified. Load and classify data first."}
+
+    mode = arguments.get("mode") or get_config().classification.indicator_mode
+    try:
+        k = int(arguments["k"]) if arguments.get("k") not in (None, "") else None
+        seed = int(arguments.get("seed") or 0)
+        if mode not in snapshot.mode_group_codes:
+            raise ValueError(
+                f"Unknown mode '{mode}'. Must be one of: {', '.join(snapshot.mode_group_codes)}"
+            )
+        return to_jsonable(
+            cluster_unclassified(
+                snapshot.analyzer.df,
+                snapshot.mode_group_codes[mode],
+                mode,
+                k=k,
+                seed=seed,
+                check=check_deadline,
+            )
+        )
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}
 
 
-async def handle_calculate_statistics(arguments: Dict[str, Any]) -> Dict[str, Any]:
+@snapshot_tool("calculate_group_statistics", "compute")
+def handle_calculate_statistics(
+    arguments: Dict[str, Any], snapshot: DatasetSnapshot
+) -> Dict[str, Any]:
     """Calculate group statistics."""
-    if not data_context.classified or data_context.analyzer is None:
+    if not snapshot.classified or snapshot.analyzer is None:
         return {"error": "Data not loaded or classified. Load and classify data first."}
 
     group_name = arguments.get("group")
+    try:
+        layout = check_layout(arguments.get("layout"))
+    except ValueError as e:
+        return {"error": str(e)}
 
     # Convert group name to FarmGroup enum if provided
     from muka_analysis.models import FarmGroup
@@ -749,19 +2381,25 @@ async def handle_calculate_statistics(arguments: Dict[str, Any]) -> Dict[str, An
         except Exception as e:
             return {"error": f"Invalid group name: {e}"}
 
-    stats_df = data_context.analyzer.calculate_group_statistics(group)
+    stats_df = snapshot.analyzer.calculate_group_statistics(group)
 
     return {
-        "statistics": to_json_serializable(stats_df.to_dict(orient="records")),
+        "statistics": encode_table(stats_df, layout),
     }
 
 
-async def handle_compare_groups(arguments: Dict[str, Any]) -> Dict[str, Any]:
+@snapshot_tool("compare_groups", "compute")
+def handle_compare_groups(arguments: Dict[str, Any], snapshot: DatasetSnapshot) -> Dict[str, Any]:
     """Compare metrics between groups."""
-    if not data_context.classified or data_context.analyzer is None:
+    if not snapshot.classified or snapshot.analyzer is None:
         return {"error": "Data not loaded or classified. Load and classify data first."}
 
-    summary = data_context.analyzer.get_summary_by_group()
+    try:
+        layout = check_layout(arguments.get("layout"))
+    except ValueError as e:
+        return {"error": str(e)}
+
+    summary = snapshot.analyzer.get_summary_by_group()
 
     groups_to_compare = arguments.get("groups")
     if groups_to_compare:
@@ -782,13 +2420,14 @@ async def handle_compare_groups(arguments: Dict[str, Any]) -> Dict[str, Any]:
         summary = summary[[col for col in cols_to_keep if col in summary.columns]]
 
     return {
-        "comparison": to_json_serializable(summary.to_dict(orient="records")),
+        "comparison": encode_table(summary, layout),
     }
 
 
-async def handle_custom_metric(arguments: Dict[str, Any]) -> Dict[str, Any]:
-    """Calculate custom metric using pandas expressions."""
-    if not data_context.classified or data_context.analyzer is None:
+@snapshot_tool("calculate_custom_metric", "compute")
+def handle_custom_metric(arguments: Dict[str, Any], snapshot: DatasetSnapshot) -> Dict[str, Any]:
+    """Calculate a custom metric with the safe expression engine (see expressions.py)."""
+    if not snapshot.classified or snapshot.analyzer is None:
         return {"error": "Data not loaded or classified. Load and classify data first."}
 
     expression = arguments.get("expression")
@@ -798,66 +2437,38 @@ async def handle_custom_metric(arguments: Dict[str, Any]) -> Dict[str, Any]:
     group_by = arguments.get("group_by")
     filter_expr = arguments.get("filter")
 
-    df = data_context.analyzer.df.copy()
-
-    # Apply filter if provided
-    if filter_expr:
-        try:
-            df = df.query(filter_expr)
-        except Exception as e:
-            return {"error": f"Filter expression failed: {e}"}
-
-    # Apply grouping if provided
-    if group_by:
-        # Handle string format for group_by (comma-separated)
-        if isinstance(group_by, str):
-            group_by = [g.strip() for g in group_by.split(",")]
+    # Handle string format for group_by (comma-separated)
+    if isinstance(group_by, str):
+        group_by = [g.strip() for g in group_by.split(",")]
 
-        try:
-            # Evaluate expression on grouped data
-            result = df.groupby(group_by).agg(eval(f"lambda x: {expression}"))
-            return {"result": to_json_serializable(result.to_dict())}
-        except Exception as e:
-            return {"error": f"Calculation failed: {e}"}
-    else:
-        try:
-            # Create a safe evaluation context with access to df, pd, and individual columns
-            # This allows expressions like: n_animals_total.sum(), (n_animals_total > 100).sum(), etc.
-            eval_context = {
-                "df": df,
-                "pd": pd,
-                "__builtins__": {},  # Restrict built-ins for safety
-            }
+    try:
+        metric = compile_expression(expression)
+        condition = compile_expression(filter_expr) if filter_expr else None
+    except ExpressionError as e:
+        return {"error": f"Invalid expression: {e}"}
 
-            # Add all column names as variables pointing to the Series
-            for col in df.columns:
-                eval_context[col] = df[col]
+    # Apply filter if provided
+    try:
+        scope = BatchScope(snapshot.analyzer.df, condition)
+    except Exception as e:
+        return {"error": f"Filter expression failed: {e}"}
 
-            # Evaluate the expression with the enriched context
-            # This supports both df.column.method() and column.method() syntax
-            if expression.startswith("df.") or expression.startswith("df["):
-                # Expression already references df explicitly
-                result = eval(expression, eval_context)
-            else:
-                # Expression uses column names directly or pandas methods
-                result = eval(expression, eval_context)
-
-            # Handle different result types and ensure JSON serializability
-            if isinstance(result, pd.Series):
-                return {"result": to_json_serializable(result.to_dict())}
-            elif isinstance(result, pd.DataFrame):
-                return {"result": to_json_serializable(result.to_dict(orient="records"))}
-            else:
-                # Convert numpy/pandas types to native Python types for JSON serialization
-                return {"result": to_json_serializable(result)}
-        except Exception as e:
-            logger.error(f"Custom metric calculation failed: {expression}", exc_info=True)
-            return {"error": f"Calculation failed: {e}"}
+    # Evaluate on all selected rows, or once per group (rows with missing keys are skipped)
+    try:
+        return {"result": scope.metric(metric, group_by or None)}
+    except ExpressionError as e:
+        return {"error": f"Invalid expression: {e}"}
+    except (CostLimitError, ToolTimeout) as e:
+        return {"error": str(e)}
+    except Exception as e:
+        logger.error(f"Custom metric calculation failed: {expression}", exc_info=True)
+        return {"error": f"Calculation failed: {e}"}
 
 
-async def handle_aggregate(arguments: Dict[str, Any]) -> Dict[str, Any]:
+@snapshot_tool("aggregate_by_field", "compute")
+def handle_aggregate(arguments: Dict[str, Any], snapshot: DatasetSnapshot) -> Dict[str, Any]:
     """Aggregate data by fields."""
-    if not data_context.classified or data_context.analyzer is None:
+    if not snapshot.classified or snapshot.analyzer is None:
         return {"error": "Data not loaded or classified. Load and classify data first."}
 
     group_by = arguments.get("group_by", [])
@@ -866,6 +2477,11 @@ async def handle_aggregate(arguments: Dict[str, Any]) -> Dict[str, Any]:
     if not group_by or not aggregate:
         return {"error": "Both group_by and aggregate are required"}
 
+    try:
+        layout = check_layout(arguments.get("layout"))
+    except ValueError as e:
+        return {"error": str(e)}
+
     # Handle string format for group_by (comma-separated)
     if isinstance(group_by, str):
         group_by = [g.strip() for g in group_by.split(",")]
@@ -882,20 +2498,149 @@ async def handle_aggregate(arguments: Dict[str, Any]) -> Dict[str, Any]:
                 "error": f"Invalid aggregate format. Expected dict like {{'column':'operation'}}, got: {aggregate}"
             }
 
-    df = data_context.analyzer.df
+    df = snapshot.analyzer.df
 
     try:
-        result = df.groupby(group_by).agg(aggregate).reset_index()
+        grouped = df.groupby(group_by)
+        check_group_cost(len(df), grouped.ngroups, group_by)
+        result = grouped.agg(aggregate).reset_index()
         return {
-            "result": to_json_serializable(result.to_dict(orient="records")),
+            "result": encode_table(result, layout),
         }
     except Exception as e:
         return {"error": f"Aggregation failed: {e}"}
 
 
-async def handle_get_insights(arguments: Dict[str, Any]) -> Dict[str, Any]:
+@snapshot_tool("sql_query", "compute")
+def handle_sql_query(arguments: Dict[str, Any], snapshot: DatasetSnapshot) -> Dict[str, Any]:
+    """Run a read-only SQL query on the SQLite mirror of the classified data."""
+    if not snapshot.classified or snapshot.analyzer is None:
+        return {"error": "Data not loaded or classified. Load and classify data first."}
+
+    sql = arguments.get("sql")
+    if not sql:
+        return {"error": "SQL query is required"}
+
+    config = get_config()
+    try:
+        limit = int(arguments.get("limit") or config.mcp.sql_max_rows)
+    except (TypeError, ValueError):
+        return {"error": f"Invalid limit '{arguments.get('limit')}': expected a number"}
+    limit = max(1, min(limit, config.mcp.sql_max_rows))
+
+    try:
+        # Statements never outlive the tool call's time budget
+        timeout = config.mcp.sql_timeout_seconds
+        remaining = remaining_time()
+        if remaining is not None:
+            timeout = max(min(timeout, remaining), 0.001)
+        result = data_context.sql_mirror(snapshot).query(sql, max_rows=limit, timeout=timeout)
+    except SqlError as e:
+        return {"error": f"SQL query failed: {e}"}
+    return result
+
+
+@snapshot_tool("batch", "compute")
+def handle_batch(arguments: Dict[str, Any], snapshot: DatasetSnapshot) -> Dict[str, Any]:
+    """Evaluate several requests over one shared filter (see batch.py)."""
+    if not snapshot.classified or snapshot.analyzer is None:
+        return {"error": "Data not loaded or classified. Load and classify data first."}
+
+    requests = arguments.get("requests")
+    if not isinstance(requests, list) or not requests:
+        return {"error": "requests must be a non-empty list of {operation, ...} objects"}
+    max_requests = get_config().mcp.batch_max_requests
+    if len(requests) > max_requests:
+        return {"error": f"Too many requests: {len(requests)} (maximum {max_requests})"}
+
+    filter_expr = arguments.get("filter")
+    try:
+        condition = compile_expression(filter_expr) if filter_expr else None
+        scope = BatchScope(snapshot.analyzer.df, condition)
+    except Exception as e:
+        return {"error": f"Filter expression failed: {e}"}
+
+    results: List[Dict[str, Any]] = []
+    for i, request in enumerate(requests):
+        if not isinstance(request, dict):
+            results.append({"id": str(i), "error": "Request must be an object"})
+            continue
+        entry = {"id": str(request.get("id", i)), "operation": request.get("operation")}
+        try:
+            entry["result"] = run_batch_request(scope, request)
+        except ToolTimeout:
+            # The remaining requests would fail the same way
+            raise
+        except ExpressionError as e:
+            entry["error"] = f"Invalid expression: {e}"
+        except Exception as e:
+            logger.debug(f"Batch request {entry['id']} failed", exc_info=True)
+            entry["error"] = str(e)
+        results.append(entry)
+
+    return {
+        "filter": filter_expr or None,
+        "matched_rows": scope.n_rows,
+        "groupings_computed": scope.groupings_computed,
+        "results": results,
+    }
+
+
+def run_batch_request(scope: BatchScope, request: Dict[str, Any]) -> Any:
+    """
+    Evaluate one request of a batch call.
+
+    Args:
+        scope: Rows selected by the batch filter
+        request: Request with "operation" and its parameters
+
+    Returns:
+        JSON-ready result of the operation
+
+    Raises:
+        ValueError: If the operation or a parameter is invalid
+    """
+    operation = request.get("operation")
+    layout = check_layout(request.get("layout"))
+
+    def field_list(key: str) -> Optional[List[str]]:
+        value = request.get(key)
+        if isinstance(value, str):
+            value = [v.strip() for v in value.split(",") if v.strip()]
+        return value or None
+
+    if operation == "query":
+        inline_max_rows = get_config().mcp.inline_max_rows
+        limit = max(0, min(int(request.get("limit", 100)), inline_max_rows))
+        return scope.query(
+            field_list("fields") or QUERY_DEFAULT_FIELDS,
+            limit,
+            order_by=request.get("order_by"),
+            descending=bool(request.get("descending", False)),
+            layout=layout,
+        )
+    if operation == "aggregate":
+        group_by = field_list("group_by")
+        aggregate = request.get("aggregate")
+        if not group_by or not isinstance(aggregate, dict) or not aggregate:
+            raise ValueError("aggregate needs group_by and aggregate ({field: function})")
+        return scope.aggregate(group_by, aggregate, layout)
+    if operation == "statistics":
+        return scope.statistics(request.get("group"), field_list("fields"), layout)
+    if operation == "metric":
+        expression = request.get("expression")
+        if not expression:
+            raise ValueError("metric needs an expression")
+        return scope.metric(compile_expression(expression), field_list("group_by"))
+    raise ValueError(
+        f"Unknown operation '{operation}'. Must be one of: {', '.join(BATCH_OPERATIONS)}"
+    )
+
+
+@snapshot_tool("get_data_insights", "compute")
+def handle_get_insights(arguments: Dict[str, Any], snapshot: DatasetSnapshot) -> Dict[str, Any]:
     """Generate data insights."""
-    if not data_context.classified or data_context.analyzer is None:
+    if not snapshot.classified or snapshot.analyzer is None:
         return {"error": "Data not loaded or classified. Load and classify data first."}
 
     focus = arguments.get("focus", "general")
@@ -903,7 +2648,7 @@ async def handle_get_insights(arguments: Dict[str, Any]) -> Dict[str, Any]:
 
     insights = []
 
-    df = data_context.analyzer.df
+    df = snapshot.analyzer.df
     if group:
         df = df[df["group"] == group]
 
@@ -911,7 +2656,7 @@ async def handle_get_insights(arguments: Dict[str, Any]) -> Dict[str, Any]:
     insights.append(f"Total farms: {len(df)}")
 
     # Group distribution
-    group_counts = data_context.analyzer.get_group_counts()
+    group_counts = snapshot.analyzer.get_group_counts()
     insights.append(f"Group distribution: {group_counts}")
 
     # Statistical insights
@@ -921,31 +2666,54 @@ async def handle_get_insights(arguments: Dict[str, Any]) -> Dict[str, Any]:
         insights.append(f"Average animals per farm: {avg_animals:.1f}")
         insights.append(f"Median animals per farm: {median_animals:.1f}")
 
-    # Outlier detection
-    if focus in ["general", "outliers"]:
-        Q1 = df["n_animals_total"].quantile(0.25)
-        Q3 = df["n_animals_total"].quantile(0.75)
-        IQR = Q3 - Q1
-        outliers = df[
-            (df["n_animals_total"] < Q1 - 1.5 * IQR) | (df["n_animals_total"] > Q3 + 1.5 * IQR)
-        ]
-        if len(outliers) > 0:
-            insights.append(f"Found {len(outliers)} outlier farms based on animal count")
+    # Outlier detection (from the outlier index, within each farm's group)
+    outlier_counts = None
+    if focus in ["general", "outliers"] and snapshot.outliers is not None:
+        outliers = snapshot.outliers
+        threshold = get_config().analysis.outlier_threshold
+        # Positions into the full frame the index covers, not into the filtered df
+        try:
+            positions = (
+                np.flatnonzero(outliers.codes == outliers.group_code(group)) if group else None
+            )
+        except ValueError as e:
+            return {"error": str(e)}
+        n_farms = len(positions) if positions is not None else outliers.n_rows
+        outlier_counts = outliers.outlier_counts(threshold, positions)
+        if outlier_counts.get("n_animals_total"):
+            insights.append(
+                f"Found {outlier_counts['n_animals_total']} outlier farms based on animal count"
+            )
+        outlier_rows = outliers.count_outlier_rows(threshold, positions)
+        if outlier_rows > 0:
+            insights.append(
+                f"{outlier_rows} farms ({outlier_rows / max(n_farms, 1):.1%}) have at least one "
+                f"unusual metric within their group (robust z-score above {threshold:g})"
+            )
+            frequent = sorted(outlier_counts.items(), key=lambda item: -item[1])[:3]
+            insights.append(
+                "Most frequent unusual metrics: "
+                + ", ".join(f"{field} ({count})" for field, count in frequent if count)
+            )
 
-    return {
+    result: Dict[str, Any] = {
         "insights": insights,
         "focus": focus,
     }
+    if outlier_counts is not None:
+        result["outlier_counts"] = outlier_counts
+    return result
 
 
-async def handle_answer_question(arguments: Dict[str, Any]) -> Dict[str, Any]:
+@snapshot_tool("answer_question", "compute")
+def handle_answer_question(arguments: Dict[str, Any], snapshot: DatasetSnapshot) -> Dict[str, Any]:
     """Answer natural language question about the data."""
-    if not data_context.classified or data_context.analyzer is None:
+    if not snapshot.classified or snapshot.analyzer is None:
         return {"error": "Data not loaded or classified. Load and classify data first."}
 
     question = arguments.get("question", "").lower()
 
-    df = data_context.analyzer.df
+    df = snapshot.analyzer.df
 
     answer_parts = []
 
@@ -988,18 +2756,8 @@ async def handle_answer_question(arguments: Dict[str, Any]) -> Dict[str, Any]:
                 f"The group with highest average animals is {highest} with {highest_avg:.1f} animals."
             )
 
-    if "unusual" in question or "outlier" in question:
-        Q1 = df["n_animals_total"].quantile(0.25)
-        Q3 = df["n_animals_total"].quantile(0.75)
-        IQR = Q3 - Q1
-        outliers = df[
-            (df["n_animals_total"] < Q1 - 1.5 * IQR) | (df["n_animals_total"] > Q3 + 1.5 * IQR)
-        ]
-        answer_parts.append(f"Found {len(outliers)} farms with unusual values.")
-        if len(outliers) > 0:
-            answer_parts.append(
-                f"Animal count range for outliers: {outliers['n_animals_total'].min():.0f} to {outliers['n_animals_total'].max():.0f}"
-            )
+    if ("unusual" in question or "outlier" in question) and snapshot.outliers is not None:
+        answer_parts.extend(describe_outliers(question, df, snapshot.outliers))
 
     if not answer_parts:
         answer_parts.append(
@@ -1012,34 +2770,204 @@ async def handle_answer_question(arguments: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-async def handle_export(arguments: Dict[str, Any]) -> Dict[str, Any]:
-    """Export analysis to Excel file."""
-    if not data_context.classified or data_context.analyzer is None:
+def describe_outliers(question: str, df: pd.DataFrame, outliers: OutlierIndex) -> List[str]:
+    """
+    Describe the unusual farms for answer_question.
+
+    Args:
+        question: Lower-case question (words select the metrics, see OUTLIER_QUESTION_FIELDS)
+        df: Analysis DataFrame the outlier index was built from
+        outliers: Outlier index
+
+    Returns:
+        Answer lines
+    """
+    threshold = get_config().analysis.outlier_threshold
+    fields: List[str] = []
+    for word, word_fields in OUTLIER_QUESTION_FIELDS.items():
+        if word in question:
+            fields.extend(f for f in word_fields if f in outliers.fields and f not in fields)
+    fields = fields or outliers.fields
+
+    columns = [outliers.field_column(f) for f in fields]
+    with np.errstate(invalid="ignore"):
+        unusual = np.any(np.abs(outliers.scores[:, columns]) > threshold, axis=1)
+    lines = [
+        f"Found {int(unusual.sum())} farms with unusual values "
+        f"(robust z-score above {threshold:g} within their group)."
+    ]
+    if len(fields) < len(outliers.fields):
+        counts = outliers.outlier_counts(threshold)
+        lines.extend(f"  {field}: {counts[field]} farms" for field in fields)
+
+    positions, score_columns, scores, _ = outliers.find(
+        threshold, fields if len(fields) < len(outliers.fields) else None, limit=3
+    )
+    for position, column, score in zip(positions, score_columns, scores):
+        row = df.iloc[int(position)]
+        field = outliers.fields[column]
+        lines.append(
+            f"  TVD {row['tvd']} ({row['year']}, {row['group'] or 'Unclassified'}): "
+            f"{field} = {row[field]:g} (z = {score:+.1f})"
+        )
+    return lines
+
+
+@snapshot_tool("find_outliers", "lookup")
+def handle_find_outliers(arguments: Dict[str, Any], snapshot: DatasetSnapshot) -> Dict[str, Any]:
+    """Find the most unusual farms from the outlier index."""
+    if not snapshot.classified or snapshot.analyzer is None or snapshot.outliers is None:
         return {"error": "Data not loaded or classified. Load and classify data first."}
 
-    config = get_config()
+    outliers = snapshot.outliers
+    field = arguments.get("field") or None
+    group = arguments.get("group") or None
+    direction = arguments.get("direction") or "both"
+    try:
+        threshold = arguments.get("threshold")
+        if threshold is None:
+            threshold = get_config().analysis.outlier_threshold
+        threshold = float(threshold)
+        if not threshold > 0:
+            raise ValueError(f"Threshold must be positive, got {threshold:g}")
+        limit = max(1, int(arguments.get("limit", 20)))
+        layout = check_layout(arguments.get("layout"))
+        positions, columns, scores, total = outliers.find(
+            threshold, [field] if field else None, group=group, direction=direction, limit=limit
+        )
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}
+
+    df = snapshot.analyzer.df
+    values = np.full(len(positions), np.nan)
+    for column in np.unique(columns):
+        rows = columns == column
+        values[rows] = df[outliers.fields[column]].to_numpy(dtype=np.float64)[positions[rows]]
+    codes = outliers.codes[positions]
+    farms = {
+        "tvd": df["tvd"].to_numpy()[positions],
+        "year": df["year"].to_numpy()[positions],
+        "group": np.asarray(GROUP_LABELS, dtype=object)[codes],
+        "field": np.asarray(outliers.fields, dtype=object)[columns],
+        "value": values,
+        "group_median": outliers.stats["median"][codes, columns],
+        "score": np.round(scores.astype(np.float64), 2),
+    }
+    group_rows = np.flatnonzero(outliers.codes == outliers.group_code(group)) if group else None
+    return {
+        "threshold": threshold,
+        "field": field,
+        "group": group,
+        "direction": direction,
+        "total_outliers": total,
+        "outlier_counts": outliers.outlier_counts(threshold, group_rows),
+        "farms": encode_columns(farms, layout),
+    }
+
+
+@snapshot_tool("export_analysis", "lookup")
+def handle_export(arguments: Dict[str, Any], snapshot: DatasetSnapshot) -> Dict[str, Any]:
+    """Submit an export of the analysis as a background job."""
+    if not snapshot.classified or snapshot.analyzer is None:
+        return {"error": "Data not loaded or classified. Load and classify data first."}
+
+    try:
+        export_format = check_export_format(arguments.get("format"))
+    except ValueError as e:
+        return {"error": str(e)}
+
     file_path = arguments.get("file_path")
     if not file_path:
-        file_path = config.paths.output_dir / "analysis_summary.xlsx"
+        file_path = default_export_path(export_format)
     else:
         file_path = Path(file_path)
 
-    include_validation = arguments.get("include_validation", False)
+    include_data = bool(arguments.get("include_data", True))
+    analyzer = snapshot.analyzer
 
+    # The job keeps this snapshot alive, even if the data is reloaded meanwhile
+    release = data_context.hold(snapshot)
     try:
-        data_context.analyzer.export_summary_to_excel(
-            str(file_path), include_validation=include_validation
+        job = job_manager.submit(
+            "export",
+            f"{export_format} export of dataset '{snapshot.name}' to {file_path}",
+            lambda job: run_export(job, analyzer, export_format, file_path, include_data),
+            on_finish=release,
         )
+    except RuntimeError as e:
+        release()
+        return {"error": str(e)}
+
+    return {
+        "job_id": job.job_id,
+        "state": job.state,
+        "format": export_format,
+        "file": str(file_path),
+        "message": "Export started. Check its progress with get_job_status.",
+    }
+
+
+async def handle_get_job_status(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the status of a background job (all jobs without job_id), optionally waiting."""
+    job_id = arguments.get("job_id")
+    if not job_id:
         return {
-            "success": True,
-            "file": str(file_path),
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "error": str(e),
+            "jobs": [job.to_dict() for job in job_manager.list()],
+            "counts": job_manager.stats(),
         }
 
+    job = job_manager.get(job_id)
+    if job is None:
+        return {"error": f"Unknown job '{job_id}'"}
+
+    try:
+        wait = float(arguments.get("wait_seconds") or 0)
+    except (TypeError, ValueError):
+        return {"error": f"Invalid wait_seconds '{arguments.get('wait_seconds')}'"}
+    wait = min(max(wait, 0.0), get_config().mcp.job_status_max_wait_seconds)
+
+    # Poll the job (it runs on a worker thread), forwarding its progress to the client
+    notify = progress_notifier()
+    deadline = time.monotonic() + wait
+    reported = None
+    while not job.done and time.monotonic() < deadline:
+        if notify is not None and (job.progress, job.message) != reported:
+            reported = (job.progress, job.message)
+            await notify(job.progress, job.message)
+        await asyncio.sleep(min(JOB_POLL_SECONDS, max(deadline - time.monotonic(), 0)))
+    return job.to_dict()
+
+
+async def handle_cancel_job(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Request cancellation of a background job."""
+    try:
+        job = job_manager.cancel(arguments.get("job_id") or "")
+    except ValueError as e:
+        return {"error": str(e)}
+    return job.to_dict()
+
+
+def progress_notifier() -> Optional[Callable[[float, str], Awaitable[None]]]:
+    """
+    Get a function sending MCP progress notifications for the current request.
+
+    Returns:
+        Async function(progress, message), or None outside an MCP request or
+        if the client did not ask for progress (no progress token)
+    """
+    try:
+        ctx = server.request_context
+    except LookupError:
+        return None
+    token = ctx.meta.progressToken if ctx.meta is not None else None
+    if token is None:
+        return None
+
+    async def notify(progress: float, message: str) -> None:
+        await ctx.session.send_progress_notification(token, progress, total=1.0, message=message)
+
+    return notify
+
 
 def main() -> None:
     """Run the MCP server."""
@@ -1054,18 +2982,16 @@ def main() -> None:
 
     logger.info("Starting MuKa Analysis MCP Server...")
 
-    # Auto-load data from CSV directory
-    logger.info("Auto-loading farm data from CSV directory...")
-    data_context._auto_load_data()
+    # Auto-load data from CSV directory in the background, so the server
+    # answers the client's initialization right away
+    logger.info("Auto-loading farm data from CSV directory in the background...")
+    data_context.start_warmup()
 
-    if data_context.data_loaded:
-        logger.info("✓ Data loaded and classified, ready for queries!")
-    else:
-        logger.warning("⚠ No data loaded - server starting without data")
+    metrics_dumper = MetricsDumper.from_config(collect_server_metrics)
+    if metrics_dumper is not None:
+        metrics_dumper.start()
 
     # Run the server
-    import asyncio
-
     from mcp.server.stdio import stdio_server
 
     async def run() -> None:
@@ -1076,7 +3002,13 @@ def main() -> None:
                 server.create_initialization_options(),
             )
 
-    asyncio.run(run())
+    try:
+        asyncio.run(run())
+    finally:
+        if metrics_dumper is not None:
+            metrics_dumper.stop()
+        job_manager.shutdown()
+        dispatcher.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,236 @@
+"""
+Immutable dataset snapshots for the MCP server.
+
+DataContext publishes the loaded (and classified) data as a DatasetSnapshot.
+Tool handlers pin the current snapshot for the duration of a request, so a
+reload that runs concurrently can never show them a half-updated state: it
+builds a new snapshot and swaps it in, and the old one is released once the
+last request holding it finishes.
+
+The server can hold several named datasets; each has its own sequence of
+snapshots.
+"""
+
+import logging
+import mmap
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from mcp_server.index import FarmIndex
+from mcp_server.outliers import OutlierIndex
+from mcp_server.sql import SqlMirror
+from muka_analysis.analyzer import FarmAnalyzer
+from muka_analysis.benchmark import PeerRankTables
+from muka_analysis.classifier import FarmClassifier
+from muka_analysis.models import IndicatorMode
+from muka_analysis.similarity import SimilarityIndex
+
+logger = logging.getLogger(__name__)
+
+# Dataset used when a tool call does not name one
+DEFAULT_DATASET = "default"
+
+# Dataset names double as directory names of spilled snapshots
+DATASET_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+def validate_dataset_name(name: Optional[str]) -> str:
+    """
+    Check a dataset name, defaulting to DEFAULT_DATASET.
+
+    Args:
+        name: Dataset name from a tool call, or None
+
+    Returns:
+        Valid dataset name
+
+    Raises:
+        ValueError: If the name contains unsupported characters
+    """
+    if name is None or name == "":
+        return DEFAULT_DATASET
+    if not DATASET_NAME_PATTERN.match(name):
+        raise ValueError(
+            f"Invalid dataset name '{name}': use up to 64 letters, digits, '_', '-' or '.'"
+        )
+    return name
+
+
+def is_memory_mapped(array: np.ndarray) -> bool:
+    """Whether an array's memory belongs to a memory-mapped file."""
+    base: Any = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return True
+        base = getattr(base, "base", None)
+    return False
+
+
+def compute_mode_group_codes(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Classify every farm under every indicator mode.
+
+    Args:
+        df: Analysis DataFrame with FarmAnalyzer.CLASSIFICATION_FIELDS
+
+    Returns:
+        Dictionary mapping mode names to int8 group codes in row order
+        (see classifier.GROUP_LABELS)
+    """
+    patterns = FarmClassifier.encode_patterns(df[FarmAnalyzer.CLASSIFICATION_FIELDS].to_numpy())
+    return {
+        mode.value: FarmClassifier(indicator_mode=mode.value).pattern_lookup[patterns]
+        for mode in IndicatorMode
+    }
+
+
+class DatasetSnapshot:
+    """
+    One published version of a dataset.
+
+    Snapshots are never modified after publication; loading or classifying
+    data creates a new snapshot with a higher version. Only derived data
+    built on demand (the SQL mirror) is attached later.
+
+    Attributes:
+        version: Data version, unique across datasets (part of cache keys and query cursors)
+        name: Dataset name
+        source: CSV file the data was loaded from
+        raw_df: Raw input DataFrame, None if no data is loaded
+        classifier: Classifier used for the farms
+        analyzer: Analyzer over the classified farms
+        index: Lookup index over analyzer.df
+        outliers: Outlier index over analyzer.df
+        peer_ranks: Per-group rank tables of analyzer.df for every indicator mode
+        similarity: Nearest-neighbour index over analyzer.df
+        mode_group_codes: Group codes of every farm per indicator mode
+        backing: Snapshot directory the arrays are memory-mapped from, if any
+        sql_mirror: SQLite copy of the data, built by the first sql_query call
+        pins: Number of requests currently holding the snapshot (managed by DataContext)
+    """
+
+    def __init__(
+        self,
+        version: int,
+        name: str = DEFAULT_DATASET,
+        source: Optional[Path] = None,
+        raw_df: Optional[pd.DataFrame] = None,
+        classifier: Optional[FarmClassifier] = None,
+        analyzer: Optional[FarmAnalyzer] = None,
+        index: Optional[FarmIndex] = None,
+        outliers: Optional[OutlierIndex] = None,
+        peer_ranks: Optional[PeerRankTables] = None,
+        similarity: Optional[SimilarityIndex] = None,
+        mode_group_codes: Optional[Dict[str, np.ndarray]] = None,
+        backing: Optional[Path] = None,
+    ) -> None:
+        """
+        Initialize a snapshot.
+
+        Args:
+            version: Data version
+            name: Dataset name
+            source: CSV file the data was loaded from
+            raw_df: Raw input DataFrame
+            classifier: Classifier used for the farms
+            analyzer: Analyzer over the classified farms
+            index: Lookup index over analyzer.df
+            outliers: Outlier index over analyzer.df
+            peer_ranks: Per-group rank tables of analyzer.df for every indicator mode
+            similarity: Nearest-neighbour index over analyzer.df
+            mode_group_codes: Group codes of every farm per indicator mode
+            backing: Snapshot directory the arrays are memory-mapped from
+        """
+        self.version = version
+        self.name = name
+        self.source = source
+        self.raw_df = raw_df
+        self.classifier = classifier
+        self.analyzer = analyzer
+        self.index = index
+        self.outliers = outliers
+        self.peer_ranks = peer_ranks
+        self.similarity = similarity
+        self.mode_group_codes = mode_group_codes
+        self.backing = backing
+        self.sql_mirror: Optional[SqlMirror] = None
+        self.pins = 0
+        self.released = False
+        self._footprint: Optional[Dict[str, int]] = None
+
+    @property
+    def data_loaded(self) -> bool:
+        """Whether the snapshot contains loaded data."""
+        return self.raw_df is not None
+
+    @property
+    def classified(self) -> bool:
+        """Whether the snapshot's farms are classified."""
+        return self.analyzer is not None and self.index is not None
+
+    @property
+    def rows(self) -> int:
+        """Number of loaded rows."""
+        return len(self.raw_df) if self.raw_df is not None else 0
+
+    def memory_footprint(self) -> Dict[str, int]:
+        """
+        Measure the memory held by the snapshot's data.
+
+        Arrays backed by a memory-mapped snapshot file are counted separately:
+        the operating system pages them in on demand and can drop them again.
+
+        Returns:
+            Dictionary with heap_bytes (counted against the dataset memory
+            budget), mapped_bytes and index_bytes (the part of both held by
+            the lookup, outlier, rank and similarity indexes)
+        """
+        if self._footprint is None:
+            heap = mapped = 0
+            for array, size in self._arrays():
+                if is_memory_mapped(array):
+                    mapped += size
+                else:
+                    heap += size
+            index = sum(a.nbytes for a in self._index_arrays())
+            self._footprint = {"heap_bytes": heap, "mapped_bytes": mapped, "index_bytes": index}
+        return self._footprint
+
+    def _arrays(self) -> Iterator[Tuple[np.ndarray, int]]:
+        """Yield (array, bytes) for all data held by the snapshot."""
+        for df in (self.raw_df, self.analyzer.df if self.analyzer is not None else None):
+            if df is None:
+                continue
+            for column in df.columns:
+                series = df[column]
+                yield series.to_numpy(), int(series.memory_usage(index=False, deep=True))
+        for array in self._index_arrays():
+            yield array, array.nbytes
+        for array in (self.mode_group_codes or {}).values():
+            yield array, array.nbytes
+
+    def _index_arrays(self) -> Iterator[np.ndarray]:
+        """Yield the arrays of the lookup, outlier, rank and similarity indexes."""
+        for index in (self.index, self.outliers, self.peer_ranks, self.similarity):
+            if index is not None:
+                yield from index.iter_arrays()
+
+    def release(self) -> None:
+        """Drop the references to the data once no request holds the snapshot."""
+        logger.debug(f"Releasing snapshot version {self.version} of dataset '{self.name}'")
+        self.raw_df = None
+        self.classifier = None
+        self.analyzer = None
+        self.index = None
+        self.outliers = None
+        self.peer_ranks = None
+        self.similarity = None
+        self.mode_group_codes = None
+        if self.sql_mirror is not None:
+            self.sql_mirror.close()
+            self.sql_mirror = None
+        self.released = True
@@ -0,0 +1,210 @@
+"""
+Read-only SQL over an in-memory SQLite mirror of the classified farm data.
+
+LLM clients often need joins, HAVING clauses or window functions, which the
+pandas-based tools cannot express. SqlMirror copies a snapshot's analysis
+DataFrame once into a stdlib ``sqlite3`` in-memory database (table ``farms``)
+with indexes on ``tvd``, ``year`` and ``group`` and one group column per
+indicator mode, and answers SELECT statements on it.
+
+Queries are read-only: an authorizer rejects everything except reading
+tables and calling functions, the connection is switched to ``query_only``
+after loading, and a progress handler interrupts statements that run longer
+than their time limit.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from muka_analysis.classifier import GROUP_LABELS, UNCLASSIFIED_CODE
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = "farms"
+
+# Columns with an index (besides the per-mode group columns)
+INDEXED_COLUMNS: List[str] = ["tvd", "year", "group"]
+
+# SQLite virtual machine instructions between time limit checks
+PROGRESS_INTERVAL = 10_000
+
+# Authorizer actions a read-only query needs
+ALLOWED_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_RECURSIVE,
+}
+
+
+class SqlError(ValueError):
+    """Raised when a SQL query is rejected or fails."""
+
+
+def mode_column(mode: str) -> str:
+    """
+    Get the column holding the farm groups under an indicator mode.
+
+    Args:
+        mode: Indicator mode value (e.g. "6-indicators")
+
+    Returns:
+        Column name (e.g. "group_6_indicators")
+    """
+    return "group_" + mode.replace("-", "_")
+
+
+def _quote(name: str) -> str:
+    """Quote an SQL identifier (column names such as "group" are keywords)."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_type(series: pd.Series) -> str:
+    """Map a column's dtype to an SQLite column type."""
+    kind = series.dtype.kind if isinstance(series.dtype, np.dtype) else "O"
+    if kind in "biu":
+        return "INTEGER"
+    if kind == "f":
+        return "REAL"
+    return "TEXT"
+
+
+class SqlMirror:
+    """
+    In-memory SQLite copy of a classified dataset for read-only queries.
+
+    One connection serves all queries; they run one at a time.
+
+    Attributes:
+        columns: Column names of the farms table
+        rows: Number of rows in the farms table
+        nbytes: Size of the database (table and indexes)
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        mode_group_codes: Optional[Dict[str, np.ndarray]] = None,
+    ) -> None:
+        """
+        Create the database and load the data in bulk.
+
+        Args:
+            df: Analysis DataFrame (FarmAnalyzer.df)
+            mode_group_codes: Group codes per indicator mode (see
+                snapshot.compute_mode_group_codes()), added as group columns
+        """
+        start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._deadline = 0.0
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+
+        columns: Dict[str, Iterable[Any]] = {}
+        types: Dict[str, str] = {}
+        for name in df.columns:
+            series = df[name]
+            types[name] = _sql_type(series)
+            columns[name] = series.to_numpy().tolist()
+
+        labels = np.array(GROUP_LABELS, dtype=object)
+        labels[UNCLASSIFIED_CODE] = None
+        for mode, codes in (mode_group_codes or {}).items():
+            name = mode_column(mode)
+            types[name] = "TEXT"
+            columns[name] = labels[codes].tolist()
+
+        self.columns = list(columns)
+        self.rows = len(df)
+
+        definition = ", ".join(f"{_quote(name)} {types[name]}" for name in self.columns)
+        placeholders = ", ".join("?" * len(self.columns))
+        with self._conn:
+            self._conn.execute(f"CREATE TABLE {TABLE_NAME} ({definition})")
+            self._conn.executemany(
+                f"INSERT INTO {TABLE_NAME} VALUES ({placeholders})", zip(*columns.values())
+            )
+            for name in INDEXED_COLUMNS + [mode_column(m) for m in mode_group_codes or {}]:
+                if name in columns:
+                    self._conn.execute(
+                        f"CREATE INDEX {_quote('idx_' + name)} ON {TABLE_NAME} ({_quote(name)})"
+                    )
+            self._conn.execute(f"ANALYZE {TABLE_NAME}")
+
+        # The table is never written after this, so its size is measured once
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        self.nbytes = page_count * page_size
+
+        self._conn.execute("PRAGMA query_only = ON")
+        self._conn.set_authorizer(self._authorize)
+        self._conn.set_progress_handler(self._check_deadline, PROGRESS_INTERVAL)
+
+        logger.info(
+            f"Built SQL mirror: {self.rows} rows, {len(self.columns)} columns "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+
+    def query(self, sql: str, max_rows: int, timeout: float) -> Dict[str, Any]:
+        """
+        Run a read-only SELECT statement.
+
+        Args:
+            sql: A single SELECT (or WITH ... SELECT) statement
+            max_rows: Maximum number of rows to return
+            timeout: Seconds after which the statement is interrupted
+
+        Returns:
+            Dictionary with columns, rows (lists in column order), row_count
+            and truncated (whether more rows were available)
+
+        Raises:
+            SqlError: If the statement is not a read-only query, is invalid,
+                or exceeds the time limit
+        """
+        statement = sql.strip().rstrip(";").strip()
+        first_word = statement.split(None, 1)[0].upper() if statement else ""
+        if first_word not in ("SELECT", "WITH"):
+            raise SqlError("Only SELECT statements are allowed")
+
+        with self._lock:
+            self._deadline = time.monotonic() + timeout
+            try:
+                cursor = self._conn.execute(statement)
+                rows = cursor.fetchmany(max_rows + 1)
+                columns = [description[0] for description in cursor.description or []]
+                cursor.close()
+            except sqlite3.OperationalError as e:
+                if str(e) == "interrupted":
+                    raise SqlError(f"Query exceeded the time limit of {timeout:g}s") from e
+                raise SqlError(str(e)) from e
+            except (sqlite3.DatabaseError, sqlite3.ProgrammingError, sqlite3.Warning) as e:
+                raise SqlError(str(e)) from e
+            finally:
+                self._deadline = 0.0
+
+        truncated = len(rows) > max_rows
+        return {
+            "columns": columns,
+            "rows": [list(row) for row in rows[:max_rows]],
+            "row_count": min(len(rows), max_rows),
+            "truncated": truncated,
+        }
+
+    def close(self) -> None:
+        """Free the database."""
+        self._conn.close()
+
+    def _check_deadline(self) -> int:
+        """Progress handler: a non-zero result interrupts the running statement."""
+        return int(self._deadline > 0 and time.monotonic() > self._deadline)
+
+    @staticmethod
+    def _authorize(action: int, arg1: Any, arg2: Any, database: Any, source: Any) -> int:
+        """Authorizer allowing only reads (no writes, PRAGMA, ATTACH, ...)."""
+        return sqlite3.SQLITE_OK if action in ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
@@ -0,0 +1,395 @@
+"""
+Memory-mapped binary snapshots of the MCP server's classified data.
+
+Parsing the CSV, converting rows to FarmData objects, classifying them and
+building the lookup indexes dominates MCP server (and interactive client)
+start-up. SnapshotStore saves the result of that work once as plain ``.npy``
+arrays plus a ``manifest.json``; later start-ups map the arrays with
+``np.load(mmap_mode="r")`` instead of recomputing anything, so restoring is
+independent of the CSV size and pages are read lazily by the OS.
+
+A snapshot records the source file's size and modification time and a hash of
+the settings that affect classification. If any of them changed the snapshot
+is ignored and rebuilt.
+
+The same format holds datasets spilled to disk when the server's dataset
+memory budget is exceeded; those are restored as they were, without checking
+the source file.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from mcp_server.index import FarmIndex
+from mcp_server.outliers import OutlierIndex
+from mcp_server.snapshot import DEFAULT_DATASET, DatasetSnapshot
+from muka_analysis.analyzer import FarmAnalyzer
+from muka_analysis.benchmark import PeerRankTables
+from muka_analysis.classifier import FarmClassifier
+from muka_analysis.config import get_config
+from muka_analysis.similarity import SimilarityIndex
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout changes; older snapshots are then rebuilt
+FORMAT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+
+
+class SnapshotStore:
+    """
+    Save and restore classified DatasetSnapshots as memory-mapped arrays.
+
+    Each source CSV gets its own snapshot directory below the store
+    directory, and each spilled dataset one below its ``datasets``
+    subdirectory. Snapshots are written to a temporary directory and renamed
+    into place, so a crashed or concurrent save never leaves a partial
+    snapshot behind.
+
+    Attributes:
+        directory: Directory holding one snapshot directory per source file
+    """
+
+    def __init__(self, directory: Path) -> None:
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory holding one snapshot directory per source file
+        """
+        self.directory = Path(directory)
+
+    @classmethod
+    def from_config(cls) -> "SnapshotStore":
+        """Create a store in the directory from the [mcp] configuration section."""
+        config = get_config()
+        directory = config.mcp.snapshot_dir or config.paths.output_dir / "snapshots"
+        return cls(directory)
+
+    def snapshot_path(self, source: Path) -> Path:
+        """
+        Get the snapshot directory of a source file.
+
+        Args:
+            source: Source CSV file
+
+        Returns:
+            Directory of the source's snapshot (may not exist)
+        """
+        resolved = str(Path(source).resolve())
+        digest = hashlib.sha1(resolved.encode("utf-8")).hexdigest()[:12]
+        return self.directory / f"{Path(source).stem}-{digest}"
+
+    def dataset_path(self, name: str) -> Path:
+        """
+        Get the directory a dataset is spilled to.
+
+        Args:
+            name: Dataset name (see snapshot.validate_dataset_name())
+
+        Returns:
+            Directory of the dataset's spilled snapshot (may not exist)
+        """
+        return self.directory / "datasets" / name
+
+    @staticmethod
+    def fingerprint(source: Path) -> Dict[str, Any]:
+        """
+        Describe the inputs a snapshot was built from.
+
+        Args:
+            source: Source CSV file
+
+        Returns:
+            JSON-serializable fingerprint; a snapshot is valid only while it
+            equals the fingerprint stored in its manifest
+        """
+        config = get_config()
+        settings = json.dumps(
+            {
+                "classification": config.classification.model_dump(mode="json"),
+                "validation": config.validation.model_dump(mode="json"),
+            },
+            sort_keys=True,
+        )
+        stat = Path(source).stat()
+        return {
+            "format_version": FORMAT_VERSION,
+            "source": str(Path(source).resolve()),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "settings": hashlib.sha256(settings.encode("utf-8")).hexdigest(),
+        }
+
+    def save(self, snapshot: DatasetSnapshot, target: Optional[Path] = None) -> Path:
+        """
+        Save a snapshot.
+
+        Args:
+            snapshot: Snapshot with loaded (and possibly classified) data
+            target: Directory to save to, or None for the source file's
+                snapshot directory (only classified snapshots, validated on load)
+
+        Returns:
+            Directory the snapshot was saved to
+
+        Raises:
+            ValueError: If the snapshot has no data, or target is None and the
+                snapshot is not classified or has no source file
+        """
+        if snapshot.raw_df is None:
+            raise ValueError("Cannot save a snapshot without data")
+        fingerprint = None
+        if target is None:
+            if not snapshot.classified or snapshot.source is None:
+                raise ValueError("Only classified snapshots with a source file can be saved")
+            target = self.snapshot_path(snapshot.source)
+            fingerprint = self.fingerprint(snapshot.source)
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        staging = target.with_name(f"{target.name}.tmp-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+
+        try:
+            manifest: Dict[str, Any] = {
+                # Spilled datasets are restored as they are (no fingerprint)
+                "fingerprint": fingerprint,
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "source": str(snapshot.source) if snapshot.source is not None else None,
+                "rows": snapshot.rows,
+                "raw_columns": self._save_frame(snapshot.raw_df, staging, "raw"),
+            }
+            if snapshot.analyzer is not None and snapshot.index is not None:
+                index_arrays, index_metadata = snapshot.index.to_arrays()
+                manifest["analysis_columns"] = self._save_frame(
+                    snapshot.analyzer.df, staging, "analysis"
+                )
+                manifest["modes"] = self._save_arrays(
+                    snapshot.mode_group_codes or {}, staging, "modes"
+                )
+                manifest["index"] = {
+                    "arrays": self._save_arrays(index_arrays, staging, "index"),
+                    "metadata": index_metadata,
+                }
+                if snapshot.outliers is not None:
+                    outlier_arrays, outlier_metadata = snapshot.outliers.to_arrays()
+                    manifest["outliers"] = {
+                        "arrays": self._save_arrays(outlier_arrays, staging, "outliers"),
+                        "metadata": outlier_metadata,
+                    }
+                if snapshot.peer_ranks is not None:
+                    rank_arrays, rank_metadata = snapshot.peer_ranks.to_arrays()
+                    manifest["peer_ranks"] = {
+                        "arrays": self._save_arrays(rank_arrays, staging, "peer_ranks"),
+                        "metadata": rank_metadata,
+                    }
+                if snapshot.similarity is not None:
+                    similarity_arrays, similarity_metadata = snapshot.similarity.to_arrays()
+                    manifest["similarity"] = {
+                        "arrays": self._save_arrays(similarity_arrays, staging, "similarity"),
+                        "metadata": similarity_metadata,
+                    }
+            with open(staging / MANIFEST_FILE, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+
+            # Swap the new snapshot in; readers may still map the old files
+            retired = target.with_name(f"{target.name}.old-{os.getpid()}")
+            if target.exists():
+                target.rename(retired)
+            staging.rename(target)
+            shutil.rmtree(retired, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        logger.info(f"Saved snapshot of dataset '{snapshot.name}' to {target}")
+        return target
+
+    def load(
+        self, source: Path, version: int, name: str = DEFAULT_DATASET
+    ) -> Optional[DatasetSnapshot]:
+        """
+        Restore the snapshot of a source file if it is still valid.
+
+        Args:
+            source: Source CSV file
+            version: Data version of the restored snapshot
+            name: Dataset name of the restored snapshot
+
+        Returns:
+            Classified DatasetSnapshot backed by memory-mapped arrays, or None
+            if there is no snapshot or it is outdated or unreadable
+        """
+        path = self.snapshot_path(source)
+        manifest = self._read_manifest(path)
+        if manifest is None:
+            logger.info(f"No data snapshot for {source}")
+            return None
+        if manifest.get("fingerprint") != self.fingerprint(source):
+            logger.info(f"Data snapshot of {source} is outdated, rebuilding")
+            return None
+        return self.load_path(path, version, name)
+
+    def load_path(self, path: Path, version: int, name: str) -> Optional[DatasetSnapshot]:
+        """
+        Restore a saved snapshot without checking its source file.
+
+        Args:
+            path: Snapshot directory
+            version: Data version of the restored snapshot
+            name: Dataset name of the restored snapshot
+
+        Returns:
+            DatasetSnapshot backed by memory-mapped arrays, or None if the
+            snapshot is missing or unreadable
+        """
+        manifest = self._read_manifest(path)
+        if manifest is None:
+            return None
+
+        try:
+            raw_df = self._load_frame(manifest["raw_columns"], path, missing=np.nan)
+            snapshot = DatasetSnapshot(
+                version=version,
+                name=name,
+                source=Path(manifest["source"]) if manifest.get("source") else None,
+                raw_df=raw_df,
+                backing=path,
+            )
+            if "analysis_columns" in manifest:
+                analysis_df = self._load_frame(manifest["analysis_columns"], path, missing=None)
+                index_arrays = self._load_arrays(manifest["index"]["arrays"], path)
+                snapshot.classifier = FarmClassifier()
+                snapshot.analyzer = FarmAnalyzer.from_dataframe(analysis_df)
+                snapshot.index = FarmIndex.from_arrays(index_arrays, manifest["index"]["metadata"])
+                snapshot.mode_group_codes = self._load_arrays(manifest["modes"], path)
+                if "outliers" in manifest:
+                    snapshot.outliers = OutlierIndex.from_arrays(
+                        self._load_arrays(manifest["outliers"]["arrays"], path),
+                        manifest["outliers"]["metadata"],
+                    )
+                else:
+                    # Saved before outlier indexes existed
+                    snapshot.outliers = OutlierIndex(analysis_df)
+                if "peer_ranks" in manifest:
+                    snapshot.peer_ranks = PeerRankTables.from_arrays(
+                        self._load_arrays(manifest["peer_ranks"]["arrays"], path),
+                        manifest["peer_ranks"]["metadata"],
+                    )
+                else:
+                    # Saved before rank tables existed
+                    snapshot.peer_ranks = PeerRankTables(analysis_df, snapshot.mode_group_codes)
+                if "similarity" in manifest:
+                    snapshot.similarity = SimilarityIndex.from_arrays(
+                        self._load_arrays(manifest["similarity"]["arrays"], path),
+                        manifest["similarity"]["metadata"],
+                    )
+                else:
+                    # Saved before similarity indexes existed
+                    snapshot.similarity = SimilarityIndex(analysis_df)
+        except Exception as e:
+            logger.warning(f"Could not read data snapshot {path}: {e}")
+            return None
+
+        logger.info(f"Restored dataset '{name}' ({manifest['rows']} rows) from {path}")
+        return snapshot
+
+    @staticmethod
+    def _read_manifest(path: Path) -> Optional[Dict[str, Any]]:
+        """Read the manifest of a snapshot directory, None if missing or unreadable."""
+        try:
+            with open(path / MANIFEST_FILE, "r", encoding="utf-8") as f:
+                manifest: Dict[str, Any] = json.load(f)
+            return manifest
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read data snapshot manifest in {path}: {e}")
+            return None
+
+    @staticmethod
+    def _save_arrays(arrays: Dict[str, np.ndarray], root: Path, prefix: str) -> Dict[str, str]:
+        """Save named arrays as .npy files and return their relative paths by name."""
+        (root / prefix).mkdir(exist_ok=True)
+        files = {}
+        for i, (name, array) in enumerate(arrays.items()):
+            files[name] = f"{prefix}/{i}.npy"
+            np.save(root / files[name], np.ascontiguousarray(array), allow_pickle=False)
+        return files
+
+    @staticmethod
+    def _load_arrays(files: Dict[str, str], root: Path) -> Dict[str, np.ndarray]:
+        """Memory-map arrays saved with _save_arrays()."""
+        return {
+            name: np.load(root / file, mmap_mode="r", allow_pickle=False)
+            for name, file in files.items()
+        }
+
+    @classmethod
+    def _save_frame(cls, df: pd.DataFrame, root: Path, prefix: str) -> List[Dict[str, Any]]:
+        """
+        Save a DataFrame column by column.
+
+        Numeric columns are saved as they are; text columns as integer codes
+        with their distinct values listed in the manifest.
+
+        Returns:
+            Column descriptions for the manifest
+        """
+        columns: List[Dict[str, Any]] = []
+        arrays: Dict[str, np.ndarray] = {}
+        for i, name in enumerate(df.columns):
+            values, categories = cls._encode_column(df[name])
+            column: Dict[str, Any] = {"name": name}
+            if categories is not None:
+                column["categories"] = categories
+            columns.append(column)
+            arrays[str(i)] = values
+
+        files = cls._save_arrays(arrays, root, prefix)
+        for i, column in enumerate(columns):
+            column["file"] = files[str(i)]
+        return columns
+
+    @classmethod
+    def _load_frame(cls, columns: List[Dict[str, Any]], root: Path, missing: Any) -> pd.DataFrame:
+        """
+        Restore a DataFrame saved with _save_frame().
+
+        Numeric columns keep referencing the memory-mapped files.
+
+        Args:
+            columns: Column descriptions from the manifest
+            root: Snapshot directory
+            missing: Value for missing text values (None or NaN, as in the original)
+        """
+        data: Dict[str, Any] = {}
+        for column in columns:
+            values = np.load(root / column["file"], mmap_mode="r", allow_pickle=False)
+            if "categories" in column:
+                lookup = np.array(column["categories"] + [missing], dtype=object)
+                values = lookup[values]
+            data[column["name"]] = values
+        return pd.DataFrame(data, copy=False)
+
+    @staticmethod
+    def _encode_column(series: pd.Series) -> Tuple[np.ndarray, Optional[List[Any]]]:
+        """Split a column into a savable array and, for text columns, its categories."""
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biuf":
+            return series.to_numpy(), None
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        categories = [value.item() if hasattr(value, "item") else value for value in uniques]
+        # Missing values (-1) map to the extra last entry appended on load
+        codes = np.where(codes < 0, len(categories), codes).astype(np.int32)
+        return codes, categories
@@ -11,11 +11,13 @@ Features:
 - Export capabilities to CSV and Excel formats
 """
 
-from muka_analysis.analyzer import FarmAnalyzer
+from muka_analysis.analyzer import FarmAnalyzer, MultiModeAnalyzer
 from muka_analysis.classifier import FarmClassifier
+from muka_analysis.comparison import ModeComparator
 from muka_analysis.config import AppConfig, get_config, init_config
 from muka_analysis.models import FarmData, FarmGroup, GroupProfile
 from muka_analysis.output import ColorScheme, OutputInterface, get_output, init_output
+from muka_analysis.partials import PartialAggregate
 from muka_analysis.validators import DataValidator
 
 __version__ = "0.1.0"
@@ -25,8 +27,11 @@ __all__ = [
     "FarmGroup",
     "GroupProfile",
     "FarmAnalyzer",
+    "MultiModeAnalyzer",
     "DataValidator",
     "FarmClassifier",
+    "ModeComparator",
+    "PartialAggregate",
     "OutputInterface",
     "ColorScheme",
     "get_output",
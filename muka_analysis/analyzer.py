@@ -8,9 +8,11 @@ generate summary statistics by group.
 import logging
 from typing import Any, Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 
-from muka_analysis.models import FarmData, FarmGroup, GroupSummaryStats
+from muka_analysis.classifier import GROUP_LABELS, N_PATTERNS, UNCLASSIFIED_CODE, FarmClassifier
+from muka_analysis.models import FarmData, FarmGroup, GroupSummaryStats, IndicatorMode
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +52,25 @@ class FarmAnalyzer:
         "indicator_young_slaughterings",
     ]
 
+    # Display order of farm groups in all statistics tables
+    GROUP_ORDER: List[str] = ["Muku", "Muku_Amme", "Milchvieh", "BKMmZ", "BKMoZ", "IKM"]
+
+    # Key columns shown in the condensed summary table
+    SUMMARY_COLUMNS: List[str] = [
+        "group",
+        "count",
+        "n_animals_total_mean",
+        "n_animals_total_median",
+        "animalyear_days_female_age3_dairy_mean",
+        "animalyear_days_female_age3_dairy_median",
+        "animalyear_days_female_age3_double_mean",
+        "animalyear_days_female_age3_double_median",
+        "animalyear_days_female_age3_dairydouble_V2_mean",
+        "animalyear_days_female_age3_dairydouble_V2_median",
+        "n_total_entries_younger85_mean",
+        "n_total_leavings_younger51_mean",
+    ]
+
     def __init__(self, farms: List[FarmData]) -> None:
         """
         Initialize analyzer with farm data.
@@ -63,10 +84,36 @@ class FarmAnalyzer:
         if not farms:
             raise ValueError("Cannot initialize analyzer with empty farms list")
 
-        self.farms = farms
+        self.farms: Optional[List[FarmData]] = farms
         self.df = self._create_dataframe()
         logger.info(f"Analyzer initialized with {len(farms)} farms")
 
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "FarmAnalyzer":
+        """
+        Create an analyzer from an existing analysis DataFrame.
+
+        Used to restore an analyzer without FarmData objects (e.g. from a
+        saved snapshot); methods returning FarmData objects are unavailable.
+
+        Args:
+            df: DataFrame in the layout of farms_to_dataframe()
+
+        Returns:
+            Initialized FarmAnalyzer
+
+        Raises:
+            ValueError: If the DataFrame is empty
+        """
+        if df.empty:
+            raise ValueError("Cannot initialize analyzer with empty DataFrame")
+
+        analyzer = cls.__new__(cls)
+        analyzer.farms = None
+        analyzer.df = df
+        logger.info(f"Analyzer initialized with {len(df)} farms from DataFrame")
+        return analyzer
+
     def _create_dataframe(self) -> pd.DataFrame:
         """
         Create a pandas DataFrame from farm data for analysis.
@@ -74,8 +121,28 @@ class FarmAnalyzer:
         Returns:
             DataFrame with all farm data including classification indicators
         """
+        return self.farms_to_dataframe(self._require_farms())
+
+    def _require_farms(self) -> List[FarmData]:
+        """Return the farm objects, raising ValueError for DataFrame-only analyzers."""
+        if self.farms is None:
+            raise ValueError("Analyzer was created from a DataFrame and has no FarmData objects")
+        return self.farms
+
+    @staticmethod
+    def farms_to_dataframe(farms: List[FarmData]) -> pd.DataFrame:
+        """
+        Build the analysis DataFrame for a list of farms.
+
+        Args:
+            farms: List of FarmData objects (classified or not)
+
+        Returns:
+            DataFrame with identifiers, classification indicators, assigned
+            group and all NUMERIC_FIELDS
+        """
         data = []
-        for farm in self.farms:
+        for farm in farms:
             data.append(
                 {
                     "tvd": farm.tvd,
@@ -194,16 +261,7 @@ class FarmAnalyzer:
 
             all_stats.append(stats_dict)
 
-        stats_df = pd.DataFrame(all_stats)
-
-        # Sort by group name for consistent ordering
-        if not stats_df.empty and "group" in stats_df.columns:
-            # Define desired group order
-            group_order = ["Muku", "Muku_Amme", "Milchvieh", "BKMmZ", "BKMoZ", "IKM"]
-            stats_df["group"] = pd.Categorical(
-                stats_df["group"], categories=group_order, ordered=True
-            )
-            stats_df = stats_df.sort_values("group").reset_index(drop=True)
+        stats_df = self.order_by_group(pd.DataFrame(all_stats))
 
         logger.info(f"Calculated statistics for {len(all_stats)} groups")
 
@@ -220,26 +278,39 @@ class FarmAnalyzer:
             This provides a condensed view with the most important metrics.
             Only includes classified farms (excludes Unclassified).
         """
-        summary_stats = self.calculate_group_statistics()
-
-        # Select key columns for summary
-        key_columns = [
-            "group",
-            "count",
-            "n_animals_total_mean",
-            "n_animals_total_median",
-            "animalyear_days_female_age3_dairy_mean",
-            "animalyear_days_female_age3_dairy_median",
-            "animalyear_days_female_age3_double_mean",
-            "animalyear_days_female_age3_double_median",
-            "animalyear_days_female_age3_dairydouble_V2_mean",
-            "animalyear_days_female_age3_dairydouble_V2_median",
-            "n_total_entries_younger85_mean",
-            "n_total_leavings_younger51_mean",
-        ]
+        return self.summarize_statistics(self.calculate_group_statistics())
+
+    @classmethod
+    def order_by_group(cls, stats_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Sort a per-group statistics table into the standard group order.
 
-        available_columns = [col for col in key_columns if col in summary_stats.columns]
-        summary = summary_stats[available_columns].copy()
+        Args:
+            stats_df: DataFrame with a 'group' column
+
+        Returns:
+            DataFrame with 'group' as ordered categorical, sorted by GROUP_ORDER
+        """
+        if not stats_df.empty and "group" in stats_df.columns:
+            stats_df["group"] = pd.Categorical(
+                stats_df["group"], categories=cls.GROUP_ORDER, ordered=True
+            )
+            stats_df = stats_df.sort_values("group").reset_index(drop=True)
+        return stats_df
+
+    @classmethod
+    def summarize_statistics(cls, stats_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Condense a detailed statistics table to the key summary columns.
+
+        Args:
+            stats_df: Output of calculate_group_statistics()
+
+        Returns:
+            DataFrame with SUMMARY_COLUMNS (where available), rounded to 2 decimals
+        """
+        available_columns = [col for col in cls.SUMMARY_COLUMNS if col in stats_df.columns]
+        summary = stats_df[available_columns].copy()
 
         # Round numeric columns
         numeric_cols = summary.select_dtypes(include=["float64"]).columns
@@ -247,6 +318,24 @@ class FarmAnalyzer:
 
         return summary
 
+    @classmethod
+    def group_counts_frame(cls, counts: Dict[str, int]) -> pd.DataFrame:
+        """
+        Convert group counts into a sorted two-column table for export.
+
+        Args:
+            counts: Dictionary mapping group names to farm counts
+
+        Returns:
+            DataFrame with 'Group' and 'Count' columns in standard group order
+            (Unclassified last)
+        """
+        counts_df = pd.DataFrame(list(counts.items()), columns=["Group", "Count"])
+        counts_df["Group"] = pd.Categorical(
+            counts_df["Group"], categories=cls.GROUP_ORDER + ["Unclassified"], ordered=True
+        )
+        return counts_df.sort_values("Group").reset_index(drop=True)
+
     def get_farms_by_group(self, group: FarmGroup) -> List[FarmData]:
         """
         Get all farms belonging to a specific group.
@@ -256,8 +345,11 @@ class FarmAnalyzer:
 
         Returns:
             List of FarmData objects in the specified group
+
+        Raises:
+            ValueError: If the analyzer has no FarmData objects
         """
-        return [farm for farm in self.farms if farm.group == group]
+        return [farm for farm in self._require_farms() if farm.group == group]
 
     def get_unclassified_farms(self) -> List[FarmData]:
         """
@@ -265,8 +357,11 @@ class FarmAnalyzer:
 
         Returns:
             List of FarmData objects with group=None
+
+        Raises:
+            ValueError: If the analyzer has no FarmData objects
         """
-        return [farm for farm in self.farms if farm.group is None]
+        return [farm for farm in self._require_farms() if farm.group is None]
 
     def export_summary_to_excel(self, file_path: str, mode_name: Optional[str] = None) -> None:
         """
@@ -282,41 +377,47 @@ class FarmAnalyzer:
             - Detailed_Stats[_{mode}]: Full statistics for all metrics by farm group
             - Group_Counts[_{mode}]: Counts of farms in each group
         """
+        self.write_summary_workbook(
+            file_path,
+            summary=self.get_summary_by_group(),
+            detailed_stats=self.calculate_group_statistics(),
+            group_counts=self.get_group_counts(),
+            mode_name=mode_name,
+        )
+
+        mode_info = f" with mode {mode_name}" if mode_name else ""
+        logger.info(f"Exported analysis summary to {file_path}{mode_info}")
+
+    @classmethod
+    def write_summary_workbook(
+        cls,
+        file_path: str,
+        summary: pd.DataFrame,
+        detailed_stats: pd.DataFrame,
+        group_counts: Dict[str, int],
+        mode_name: Optional[str] = None,
+    ) -> None:
+        """
+        Write summary, detailed statistics and group counts to an Excel workbook.
+
+        Args:
+            file_path: Path to output Excel file
+            summary: Condensed summary table (see summarize_statistics)
+            detailed_stats: Full statistics table (see calculate_group_statistics)
+            group_counts: Dictionary mapping group names to farm counts
+            mode_name: Optional indicator mode name for sheet naming
+        """
         with pd.ExcelWriter(file_path, engine="openpyxl") as writer:
             # Use mode-specific names if provided
             summary_sheet = f"Summary_{mode_name}" if mode_name else "Summary"
             detailed_sheet = f"Detailed_Stats_{mode_name}" if mode_name else "Detailed_Stats"
             counts_sheet = f"Group_Counts_{mode_name}" if mode_name else "Group_Counts"
 
-            # Summary sheet - based on assigned groups
-            summary = self.get_summary_by_group()
             summary.to_excel(writer, sheet_name=summary_sheet, index=False)
-
-            # Detailed statistics sheet - based on assigned groups
-            detailed_stats = self.calculate_group_statistics()
             detailed_stats.to_excel(writer, sheet_name=detailed_sheet, index=False)
-
-            # Group counts
-            counts = self.get_group_counts()
-            counts_df = pd.DataFrame(list(counts.items()), columns=["Group", "Count"])
-            # Sort by group name
-            group_order = [
-                "Muku",
-                "Muku_Amme",
-                "Milchvieh",
-                "BKMmZ",
-                "BKMoZ",
-                "IKM",
-                "Unclassified",
-            ]
-            counts_df["Group"] = pd.Categorical(
-                counts_df["Group"], categories=group_order, ordered=True
+            cls.group_counts_frame(group_counts).to_excel(
+                writer, sheet_name=counts_sheet, index=False
             )
-            counts_df = counts_df.sort_values("Group").reset_index(drop=True)
-            counts_df.to_excel(writer, sheet_name=counts_sheet, index=False)
-
-        mode_info = f" with mode {mode_name}" if mode_name else ""
-        logger.info(f"Exported analysis summary to {file_path}{mode_info}")
 
     def export_with_mode_name(
         self, file_path: str, mode_name: str, include_detailed_stats: bool = True
@@ -348,22 +449,7 @@ class FarmAnalyzer:
                 detailed_stats.to_excel(writer, sheet_name=sheet_name, index=False)
 
             # Group counts with mode suffix
-            counts = self.get_group_counts()
-            counts_df = pd.DataFrame(list(counts.items()), columns=["Group", "Count"])
-            # Sort by group name
-            group_order = [
-                "Muku",
-                "Muku_Amme",
-                "Milchvieh",
-                "BKMmZ",
-                "BKMoZ",
-                "IKM",
-                "Unclassified",
-            ]
-            counts_df["Group"] = pd.Categorical(
-                counts_df["Group"], categories=group_order, ordered=True
-            )
-            counts_df = counts_df.sort_values("Group").reset_index(drop=True)
+            counts_df = self.group_counts_frame(self.get_group_counts())
             sheet_name = f"Group_Counts_{mode_name}"
             counts_df.to_excel(writer, sheet_name=sheet_name, index=False)
 
@@ -495,8 +581,8 @@ class FarmAnalyzer:
         print("=" * 70)
 
         # Overall counts
-        total_farms = len(self.farms)
-        classified_farms = sum(1 for farm in self.farms if farm.group is not None)
+        total_farms = len(self.df)
+        classified_farms = int(self.df["group"].notna().sum())
         unclassified_farms = total_farms - classified_farms
 
         print(f"\nTotal farms analyzed: {total_farms}")
@@ -525,3 +611,354 @@ class FarmAnalyzer:
         print(summary.to_string(index=False))
 
         print("\n" + "=" * 70 + "\n")
+
+
+class MultiModeAnalyzer:
+    """
+    Group statistics for several indicator modes from a single aggregation.
+
+    A farm's group under any mode depends only on its 6-bit indicator pattern,
+    so the numeric data is aggregated once per pattern (at most 64 cells) and
+    every (mode, group) statistic is assembled from the pattern aggregates of
+    the patterns that mode maps to that group:
+
+    - count, sum, min and max merge directly across patterns
+    - medians use one (pattern, value) sort per field; the k-th smallest value
+      of any union of patterns is then found by a binary search over value
+      ranks with ``np.searchsorted`` on the sorted keys, without touching the
+      numeric data again
+
+    The cost of adding a mode is therefore independent of the number of farms.
+    Results match FarmAnalyzer.calculate_group_statistics(),
+    get_summary_by_group() and get_group_counts() for a farm list classified
+    with the same mode.
+    """
+
+    def __init__(self, df: pd.DataFrame, modes: Optional[List[str]] = None) -> None:
+        """
+        Initialize the analyzer and aggregate all numeric fields per pattern.
+
+        Args:
+            df: Analysis DataFrame with FarmAnalyzer.CLASSIFICATION_FIELDS and
+                FarmAnalyzer.NUMERIC_FIELDS columns (e.g. FarmAnalyzer.df).
+                Numeric columns must not contain missing values, which
+                FarmData validation guarantees.
+            modes: Indicator modes to analyze, or None for all modes
+
+        Raises:
+            ValueError: If the DataFrame is empty or a mode is unknown
+        """
+        if df.empty:
+            raise ValueError("Cannot initialize analyzer with empty DataFrame")
+
+        if modes is None:
+            modes = [mode.value for mode in IndicatorMode]
+
+        self.modes: List[str] = list(modes)
+        self.total_farms = len(df)
+        self.fields = [field for field in FarmAnalyzer.NUMERIC_FIELDS if field in df.columns]
+
+        self.patterns = FarmClassifier.encode_patterns(
+            df[FarmAnalyzer.CLASSIFICATION_FIELDS].to_numpy()
+        )
+        self.pattern_counts = np.bincount(self.patterns, minlength=N_PATTERNS).astype(np.int64)
+
+        # Per mode: pattern -> group code lookup (64 entries)
+        self.lookups: Dict[str, np.ndarray] = {
+            mode: FarmClassifier(indicator_mode=mode).pattern_lookup for mode in self.modes
+        }
+
+        self._aggregate_patterns(df)
+
+        self._stats_cache: Dict[str, pd.DataFrame] = {}
+        logger.info(
+            f"Multi-mode analyzer initialized with {self.total_farms} farms "
+            f"and {len(self.modes)} modes"
+        )
+
+    @classmethod
+    def from_farms(
+        cls, farms: List[FarmData], modes: Optional[List[str]] = None
+    ) -> "MultiModeAnalyzer":
+        """
+        Create a multi-mode analyzer from FarmData objects.
+
+        Args:
+            farms: List of FarmData objects (group assignment is ignored)
+            modes: Indicator modes to analyze, or None for all modes
+
+        Returns:
+            Initialized MultiModeAnalyzer
+
+        Raises:
+            ValueError: If farms list is empty
+        """
+        if not farms:
+            raise ValueError("Cannot initialize analyzer with empty farms list")
+        return cls(FarmAnalyzer.farms_to_dataframe(farms), modes)
+
+    def _aggregate_patterns(self, df: pd.DataFrame) -> None:
+        """
+        Compute per-pattern sums, minima, maxima and sorted keys for all fields.
+
+        Args:
+            df: Analysis DataFrame passed to the constructor
+        """
+        n_fields = len(self.fields)
+        pattern_ids = np.arange(N_PATTERNS, dtype=np.int64)
+
+        self.pattern_sums = np.zeros((N_PATTERNS, n_fields), dtype=np.float64)
+        self._uniques: List[np.ndarray] = []
+        self._sorted_keys: List[np.ndarray] = []
+        self._pattern_starts: List[np.ndarray] = []
+        self._pattern_min_rank = np.zeros((N_PATTERNS, n_fields), dtype=np.int64)
+        self._pattern_max_rank = np.zeros((N_PATTERNS, n_fields), dtype=np.int64)
+
+        patterns = self.patterns.astype(np.int64)
+        nonempty = self.pattern_counts > 0
+
+        for j, field in enumerate(self.fields):
+            values = df[field].to_numpy()
+            self.pattern_sums[:, j] = np.bincount(patterns, weights=values, minlength=N_PATTERNS)
+
+            # Dense value ranks; keys sort by pattern first, then by value
+            uniques, ranks = np.unique(values, return_inverse=True)
+            n_unique = len(uniques)
+            keys = np.sort(patterns * n_unique + ranks)
+            starts = np.searchsorted(keys, pattern_ids * n_unique, side="left")
+            ends = starts + self.pattern_counts
+
+            min_rank = np.zeros(N_PATTERNS, dtype=np.int64)
+            max_rank = np.zeros(N_PATTERNS, dtype=np.int64)
+            min_rank[nonempty] = keys[starts[nonempty]] - pattern_ids[nonempty] * n_unique
+            max_rank[nonempty] = keys[ends[nonempty] - 1] - pattern_ids[nonempty] * n_unique
+
+            self._uniques.append(uniques)
+            self._sorted_keys.append(keys)
+            self._pattern_starts.append(starts)
+            self._pattern_min_rank[:, j] = min_rank
+            self._pattern_max_rank[:, j] = max_rank
+
+    def _group_membership(self, mode: str) -> np.ndarray:
+        """
+        Build the boolean (group, pattern) membership matrix for a mode.
+
+        Args:
+            mode: Indicator mode name
+
+        Returns:
+            Array of shape (len(FarmGroup), 64); True where the pattern occurs
+            in the data and maps to the group
+        """
+        lookup = self.lookups[mode]
+        group_codes = np.arange(len(FarmGroup))
+        return (lookup[None, :] == group_codes[:, None]) & (self.pattern_counts > 0)[None, :]
+
+    def _kth_ranks(self, field_idx: int, membership: np.ndarray, k: np.ndarray) -> np.ndarray:
+        """
+        Find the value rank of the k-th smallest value within each pattern union.
+
+        Args:
+            field_idx: Index into self.fields
+            membership: Boolean (targets, 64) pattern membership matrix
+            k: Zero-based order statistic per target
+
+        Returns:
+            Value rank (index into the field's unique values) per target
+        """
+        uniques = self._uniques[field_idx]
+        keys = self._sorted_keys[field_idx]
+        starts = self._pattern_starts[field_idx]
+        n_unique = len(uniques)
+        pattern_offsets = np.arange(N_PATTERNS, dtype=np.int64) * n_unique
+
+        lo = np.zeros(len(k), dtype=np.int64)
+        hi = np.full(len(k), n_unique - 1, dtype=np.int64)
+        while np.any(lo < hi):
+            mid = (lo + hi) // 2
+            # Number of values <= mid in every pattern, summed over member patterns
+            counts = np.searchsorted(keys, pattern_offsets[None, :] + mid[:, None], side="right")
+            at_most = ((counts - starts[None, :]) * membership).sum(axis=1)
+            enough = at_most >= k + 1
+            hi = np.where(enough, mid, hi)
+            lo = np.where(enough, lo, mid + 1)
+        return lo
+
+    def calculate_group_statistics(self, mode: str) -> pd.DataFrame:
+        """
+        Calculate descriptive statistics per farm group for one mode.
+
+        Args:
+            mode: Indicator mode name (must be one of self.modes)
+
+        Returns:
+            DataFrame identical in layout to FarmAnalyzer.calculate_group_statistics()
+
+        Raises:
+            ValueError: If the mode was not analyzed
+        """
+        if mode not in self.lookups:
+            raise ValueError(f"Mode {mode} not analyzed (available: {', '.join(self.modes)})")
+        if mode in self._stats_cache:
+            return self._stats_cache[mode].copy()
+
+        membership = self._group_membership(mode)
+        counts = membership.astype(np.int64) @ self.pattern_counts
+        present = np.flatnonzero(counts > 0)
+        membership = membership[present]
+        counts = counts[present]
+
+        if len(present) == 0:
+            logger.warning(f"No classified farms found for mode {mode}")
+            self._stats_cache[mode] = pd.DataFrame()
+            return pd.DataFrame()
+
+        sums = membership.astype(np.float64) @ self.pattern_sums
+        member = membership[:, :, None]
+        no_rank = np.iinfo(np.int64).max
+        min_ranks = np.where(member, self._pattern_min_rank[None], no_rank).min(axis=1)
+        max_ranks = np.where(member, self._pattern_max_rank[None], -1).max(axis=1)
+
+        lower_k = (counts - 1) // 2
+        upper_k = counts // 2
+
+        field_stats: Dict[str, Any] = {}
+        for j, field in enumerate(self.fields):
+            uniques = self._uniques[j]
+            lower = uniques[self._kth_ranks(j, membership, lower_k)].astype(np.float64)
+            upper = uniques[self._kth_ranks(j, membership, upper_k)].astype(np.float64)
+            field_stats[field] = (
+                uniques[min_ranks[:, j]],
+                uniques[max_ranks[:, j]],
+                sums[:, j] / counts,
+                (lower + upper) / 2,
+            )
+
+        stats_df = self.build_statistics_frame(present, counts, field_stats)
+        self._stats_cache[mode] = stats_df
+        logger.info(f"Calculated statistics for {len(present)} groups in mode {mode}")
+        return stats_df.copy()
+
+    @staticmethod
+    def build_statistics_frame(
+        group_codes: np.ndarray, counts: np.ndarray, field_stats: Dict[str, Any]
+    ) -> pd.DataFrame:
+        """
+        Assemble a Detailed_Stats table from per-group statistic arrays.
+
+        Args:
+            group_codes: Group code per row (see classifier.GROUP_LABELS)
+            counts: Number of farms per row
+            field_stats: Mapping of field name to (min, max, mean, median)
+                arrays aligned with group_codes
+
+        Returns:
+            DataFrame in the layout of FarmAnalyzer.calculate_group_statistics()
+        """
+        columns: Dict[str, Any] = {
+            "group": [GROUP_LABELS[code] for code in group_codes],
+            "count": counts,
+        }
+        for field, (minimum, maximum, mean, median) in field_stats.items():
+            columns[f"{field}_min"] = minimum
+            columns[f"{field}_max"] = maximum
+            columns[f"{field}_mean"] = mean
+            columns[f"{field}_median"] = median
+        return FarmAnalyzer.order_by_group(pd.DataFrame(columns))
+
+    @staticmethod
+    def group_counts_dict(code_counts: np.ndarray) -> Dict[str, int]:
+        """
+        Convert farm counts per group code into the get_group_counts() format.
+
+        Args:
+            code_counts: Farm count per group code (length len(GROUP_LABELS))
+
+        Returns:
+            Dictionary mapping group names to farm counts, largest group first,
+            with 'Unclassified' last (only present if non-zero)
+        """
+        counts = {
+            GROUP_LABELS[code]: int(code_counts[code])
+            for code in np.argsort(-code_counts[:UNCLASSIFIED_CODE], kind="stable")
+            if code_counts[code] > 0
+        }
+        if code_counts[UNCLASSIFIED_CODE] > 0:
+            counts["Unclassified"] = int(code_counts[UNCLASSIFIED_CODE])
+        return counts
+
+    def get_summary_by_group(self, mode: str) -> pd.DataFrame:
+        """
+        Get the condensed summary table for one mode.
+
+        Args:
+            mode: Indicator mode name
+
+        Returns:
+            DataFrame identical in layout to FarmAnalyzer.get_summary_by_group()
+        """
+        return FarmAnalyzer.summarize_statistics(self.calculate_group_statistics(mode))
+
+    def get_group_codes(self, mode: str) -> np.ndarray:
+        """
+        Get the per-farm group code for one mode.
+
+        Args:
+            mode: Indicator mode name
+
+        Returns:
+            int8 array of group codes in input row order (see classifier.GROUP_LABELS)
+        """
+        return self.lookups[mode][self.patterns]
+
+    def get_group_counts(self, mode: str) -> Dict[str, int]:
+        """
+        Get count of farms in each group for one mode.
+
+        Args:
+            mode: Indicator mode name
+
+        Returns:
+            Dictionary mapping group names to farm counts, largest group first,
+            with 'Unclassified' last (only present if non-zero)
+        """
+        code_counts = np.bincount(
+            self.lookups[mode], weights=self.pattern_counts, minlength=len(GROUP_LABELS)
+        ).astype(np.int64)
+        return self.group_counts_dict(code_counts)
+
+    def classified_count(self, mode: str) -> int:
+        """
+        Get the number of farms assigned to a group in one mode.
+
+        Args:
+            mode: Indicator mode name
+
+        Returns:
+            Number of classified farms
+        """
+        classified = self.lookups[mode] != UNCLASSIFIED_CODE
+        return int(self.pattern_counts[classified].sum())
+
+    def get_mode_results(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Collect per-mode results in the format used by the all-modes export.
+
+        Returns:
+            Dictionary mapping mode names to dicts with 'total_farms',
+            'classified_count', 'unclassified_count', 'group_counts',
+            'summary_df' and 'detailed_stats_df'
+            (see FarmAnalyzer.create_comparison_summary)
+        """
+        mode_results: Dict[str, Dict[str, Any]] = {}
+        for mode in self.modes:
+            classified_count = self.classified_count(mode)
+            mode_results[mode] = {
+                "total_farms": self.total_farms,
+                "classified_count": classified_count,
+                "unclassified_count": self.total_farms - classified_count,
+                "group_counts": self.get_group_counts(mode),
+                "summary_df": self.get_summary_by_group(mode),
+                "detailed_stats_df": self.calculate_group_statistics(mode),
+            }
+        return mode_results
@@ -0,0 +1,232 @@
+"""
+Peer benchmarking of farms within their group.
+
+PeerRankTables keeps, for every indicator mode, the values of every numeric
+metric (FarmAnalyzer.NUMERIC_FIELDS) sorted within each farm group. A farm's
+percentile rank among its peers is then two binary searches per metric
+instead of a scan of the data:
+
+    percentile = 100 * (peers below + 0.5 * peers with the same value) / peers
+
+Missing values are sorted to the end of each group and do not count as
+peers. Unclassified farms are not kept: they have no peer group, but they
+can still be ranked against any group.
+"""
+
+import logging
+import math
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from muka_analysis.analyzer import FarmAnalyzer
+from muka_analysis.classifier import GROUP_LABELS, UNCLASSIFIED_CODE
+
+logger = logging.getLogger(__name__)
+
+# Quantiles reported next to a farm's percentile rank
+BENCHMARK_QUANTILES: Dict[str, float] = {"group_p25": 0.25, "group_median": 0.5, "group_p75": 0.75}
+
+
+class PeerRankTables:
+    """
+    Per-mode, per-group sorted values of the numeric metrics.
+
+    For each mode, the classified farms are ordered by group and the values
+    of every field are sorted within each group segment.
+
+    Attributes:
+        fields: Numeric fields with rank tables
+        modes: Indicator modes with rank tables
+        values: Mode -> float32 array of shape (len(fields), classified farms)
+        bounds: Mode -> start of every group's segment, plus the end (int64)
+        counts: Mode -> non-missing values per group and field, shape (groups, len(fields))
+    """
+
+    def __init__(self, df: pd.DataFrame, mode_codes: Dict[str, np.ndarray]) -> None:
+        """
+        Build the rank tables.
+
+        Args:
+            df: Farm DataFrame as produced by FarmAnalyzer.farms_to_dataframe()
+            mode_codes: Mode name -> group code of every row (see classifier.GROUP_LABELS)
+        """
+        self.fields: List[str] = [f for f in FarmAnalyzer.NUMERIC_FIELDS if f in df.columns]
+        self.modes: List[str] = list(mode_codes)
+        self.values: Dict[str, np.ndarray] = {}
+        self.bounds: Dict[str, np.ndarray] = {}
+        self.counts: Dict[str, np.ndarray] = {}
+
+        # float32 halves the memory; ranks only need the order of the values
+        values = df[self.fields].to_numpy(dtype=np.float32).T
+        for mode, codes in mode_codes.items():
+            classified = np.flatnonzero(codes < UNCLASSIFIED_CODE)
+            order = classified[np.argsort(codes[classified], kind="stable")]
+            sizes = np.bincount(codes[classified], minlength=UNCLASSIFIED_CODE)
+            bounds = np.concatenate(([0], np.cumsum(sizes))).astype(np.int64)
+            table = values[:, order]
+            for code in range(UNCLASSIFIED_CODE):
+                start, stop = bounds[code], bounds[code + 1]
+                # NaN sorts last, so each segment starts with its counts[code] valid values
+                table[:, start:stop] = np.sort(table[:, start:stop], axis=1)
+            self.values[mode] = np.ascontiguousarray(table)
+            self.bounds[mode] = bounds
+            self.counts[mode] = np.stack(
+                [
+                    np.sum(~np.isnan(table[:, bounds[code] : bounds[code + 1]]), axis=1)
+                    for code in range(UNCLASSIFIED_CODE)
+                ]
+            ).astype(np.int64)
+
+        logger.info(
+            f"Built peer rank tables: {len(df)} rows, {len(self.fields)} fields, "
+            f"{len(self.modes)} modes"
+        )
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """
+        Export the tables as flat arrays plus JSON-serializable metadata.
+
+        Returns:
+            Tuple of (arrays by name, metadata) accepted by from_arrays()
+        """
+        arrays: Dict[str, np.ndarray] = {}
+        for mode in self.modes:
+            arrays[f"{mode}/values"] = self.values[mode]
+            arrays[f"{mode}/bounds"] = self.bounds[mode]
+            arrays[f"{mode}/counts"] = self.counts[mode]
+        return arrays, {"fields": self.fields, "modes": self.modes}
+
+    @classmethod
+    def from_arrays(
+        cls, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]
+    ) -> "PeerRankTables":
+        """
+        Restore tables exported with to_arrays() without rebuilding them.
+
+        Args:
+            arrays: Arrays by name from to_arrays() (e.g. memory-mapped)
+            metadata: Metadata from to_arrays()
+
+        Returns:
+            Restored PeerRankTables
+        """
+        tables = cls.__new__(cls)
+        tables.fields = list(metadata["fields"])
+        tables.modes = list(metadata["modes"])
+        tables.values = {mode: arrays[f"{mode}/values"] for mode in tables.modes}
+        tables.bounds = {mode: arrays[f"{mode}/bounds"] for mode in tables.modes}
+        tables.counts = {mode: arrays[f"{mode}/counts"] for mode in tables.modes}
+        return tables
+
+    def iter_arrays(self) -> Iterator[np.ndarray]:
+        """Yield every array held by the tables (for memory accounting)."""
+        for mode in self.modes:
+            yield from (self.values[mode], self.bounds[mode], self.counts[mode])
+
+    def group_size(self, mode: str, code: int) -> int:
+        """Number of farms of a group in a mode."""
+        bounds = self.bounds[mode]
+        return int(bounds[code + 1] - bounds[code])
+
+    def rank(self, values: np.ndarray, mode: str, code: int) -> Dict[str, np.ndarray]:
+        """
+        Rank a farm's values among the farms of a group.
+
+        Args:
+            values: Value of every field (in fields order; NaN if missing)
+            mode: Indicator mode
+            code: Group code (below UNCLASSIFIED_CODE)
+
+        Returns:
+            Dictionary of arrays over fields: below (peers with a lower value),
+            equal (peers with the same value), peers (peers with a value) and
+            percentile (NaN for missing values or an empty group)
+
+        Raises:
+            ValueError: If the mode or the group has no rank table
+        """
+        if mode not in self.values:
+            raise ValueError(f"Unknown mode '{mode}'. Must be one of: {', '.join(self.modes)}")
+        if not 0 <= code < UNCLASSIFIED_CODE:
+            raise ValueError(f"No peer group for '{GROUP_LABELS[code]}' farms")
+
+        table = self.values[mode]
+        start = int(self.bounds[mode][code])
+        peers = self.counts[mode][code]
+        keys = np.asarray(values, dtype=np.float32)
+        below = np.zeros(len(self.fields), dtype=np.int64)
+        equal = np.zeros(len(self.fields), dtype=np.int64)
+        for j, (key, count) in enumerate(zip(keys, peers.tolist())):
+            if count == 0 or np.isnan(key):
+                continue
+            segment = table[j, start : start + count]
+            below[j] = segment.searchsorted(key, side="left")
+            equal[j] = segment.searchsorted(key, side="right") - below[j]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            percentile = 100.0 * (below + 0.5 * equal) / peers
+        percentile[np.isnan(keys)] = np.nan
+        return {"below": below, "equal": equal, "peers": peers, "percentile": percentile}
+
+    def quantiles(self, mode: str, code: int, q: float) -> np.ndarray:
+        """
+        Get a quantile of every field within a group (linear interpolation).
+
+        Args:
+            mode: Indicator mode
+            code: Group code (below UNCLASSIFIED_CODE)
+            q: Quantile between 0 and 1
+
+        Returns:
+            Quantile of every field (NaN for fields without values)
+        """
+        table = self.values[mode]
+        start = int(self.bounds[mode][code])
+        counts = self.counts[mode][code]
+        position = q * np.maximum(counts - 1, 0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+        columns = np.arange(len(self.fields))
+        low = table[columns, start + lower].astype(np.float64)
+        high = table[columns, start + upper].astype(np.float64)
+        return np.where(counts > 0, low + (high - low) * (position - lower), np.nan)
+
+    def benchmark(
+        self, values: np.ndarray, mode: str, code: int, digits: int = 1
+    ) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Benchmark a farm against a group on every field.
+
+        Args:
+            values: Value of every field (in fields order; NaN if missing)
+            mode: Indicator mode
+            code: Group code of the peers (below UNCLASSIFIED_CODE)
+            digits: Decimal places of the percentiles
+
+        Returns:
+            Field -> {value, percentile, peers, group_p25, group_median, group_p75}
+            (None for missing values)
+        """
+        ranks = self.rank(values, mode, code)
+        percentiles = np.round(ranks["percentile"], digits).tolist()
+        peers = ranks["peers"].tolist()
+        # Values from the tables carry float32 precision (about 7 digits)
+        quantiles = {
+            name: [float(f"{x:.7g}") for x in self.quantiles(mode, code, q).tolist()]
+            for name, q in BENCHMARK_QUANTILES.items()
+        }
+
+        def number(value: float) -> Optional[float]:
+            return None if math.isnan(value) else value
+
+        return {
+            field: {
+                "value": number(float(values[j])),
+                "percentile": number(percentiles[j]),
+                "peers": peers[j],
+                **{name: number(quantiles[name][j]) for name in BENCHMARK_QUANTILES},
+            }
+            for j, field in enumerate(self.fields)
+        }
@@ -8,11 +8,24 @@ based on their cattle type and movement patterns.
 import logging
 from typing import List, Optional
 
+import numpy as np
+
 from muka_analysis.config import get_config
 from muka_analysis.models import FarmData, FarmGroup, GroupProfile, IndicatorMode
 
 logger = logging.getLogger(__name__)
 
+# Integer group codes used by the vectorized classification paths.
+# Codes 0-5 follow the FarmGroup declaration order (which is also the display
+# order used throughout the analysis); UNCLASSIFIED_CODE marks farms without a match.
+GROUP_LABELS: List[str] = [group.value for group in FarmGroup] + ["Unclassified"]
+UNCLASSIFIED_CODE: int = len(FarmGroup)
+N_GROUP_CODES: int = len(GROUP_LABELS)
+
+# Six binary indicators give 2**6 possible indicator patterns
+N_INDICATORS: int = 6
+N_PATTERNS: int = 2**N_INDICATORS
+
 
 class FarmClassifier:
     """
@@ -50,6 +63,7 @@ class FarmClassifier:
             )
 
         self.profiles: List[GroupProfile] = self._create_profiles(self.indicator_mode)
+        self.pattern_lookup: np.ndarray = self._create_pattern_lookup(self.profiles)
         logger.info(
             f"Classifier initialized with {len(self.profiles)} group profiles "
             f"(mode: {self.indicator_mode.value})"
@@ -480,6 +494,86 @@ class FarmClassifier:
 
         return profiles
 
+    @staticmethod
+    def _create_pattern_lookup(profiles: List[GroupProfile]) -> np.ndarray:
+        """
+        Precompute the group code for every possible indicator pattern.
+
+        Args:
+            profiles: Ordered group profiles of the classifier
+
+        Returns:
+            Array of length N_PATTERNS mapping a pattern code to a group code
+
+        Note:
+            The lookup applies exactly the same first-match rule as
+            classify_farm(), so both paths always agree.
+        """
+        lookup = np.full(N_PATTERNS, UNCLASSIFIED_CODE, dtype=np.int8)
+        group_codes = {group.value: code for code, group in enumerate(FarmGroup)}
+
+        for pattern in range(N_PATTERNS):
+            bits = FarmClassifier.decode_pattern(pattern)
+            for profile in profiles:
+                if profile.matches(*bits):
+                    lookup[pattern] = group_codes[profile.group_name.value]
+                    break
+
+        return lookup
+
+    @staticmethod
+    def encode_patterns(indicators: np.ndarray) -> np.ndarray:
+        """
+        Encode binary indicator rows as integer pattern codes.
+
+        Args:
+            indicators: Array of shape (n_farms, 6) with 0/1 values in the
+                classification field order (field 1 is the most significant bit)
+
+        Returns:
+            Array of uint8 pattern codes in the range [0, N_PATTERNS)
+
+        Raises:
+            ValueError: If the array does not have 6 columns
+
+        Example:
+            >>> FarmClassifier.encode_patterns(np.array([[1, 0, 0, 1, 0, 0]]))
+            array([36], dtype=uint8)
+        """
+        indicators = np.asarray(indicators)
+        if indicators.ndim != 2 or indicators.shape[1] != N_INDICATORS:
+            raise ValueError(
+                f"Expected indicator array of shape (n, {N_INDICATORS}), got {indicators.shape}"
+            )
+
+        weights = 1 << np.arange(N_INDICATORS - 1, -1, -1, dtype=np.uint8)
+        return (indicators.astype(np.uint8) * weights).sum(axis=1, dtype=np.uint8)
+
+    @staticmethod
+    def decode_pattern(pattern: int) -> List[int]:
+        """
+        Decode a pattern code back into its six binary indicators.
+
+        Args:
+            pattern: Pattern code in the range [0, N_PATTERNS)
+
+        Returns:
+            List of six 0/1 values in classification field order
+        """
+        return [(pattern >> shift) & 1 for shift in range(N_INDICATORS - 1, -1, -1)]
+
+    def classify_patterns(self, patterns: np.ndarray) -> np.ndarray:
+        """
+        Classify farms given as pattern codes in a single vectorized lookup.
+
+        Args:
+            patterns: Pattern codes as returned by encode_patterns()
+
+        Returns:
+            Array of int8 group codes (index into GROUP_LABELS)
+        """
+        return self.pattern_lookup[patterns]
+
     def classify_farm(self, farm: FarmData) -> Optional[FarmGroup]:
         """
         Classify a single farm based on its binary indicators.
@@ -573,7 +667,7 @@ class FarmClassifier:
 
         for farm in farms:
             group = self.classify_farm(farm)
-            farm.group = group
+            farm.assign_group(group)
 
             if group is not None:
                 classified_count += 1
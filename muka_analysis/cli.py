@@ -10,13 +10,17 @@ from collections import Counter
 from pathlib import Path
 from typing import Annotated, Any, Dict, Optional
 
+import numpy as np
+import pandas as pd
 import typer
 
-from muka_analysis.analyzer import FarmAnalyzer
-from muka_analysis.classifier import FarmClassifier
+from muka_analysis.analyzer import FarmAnalyzer, MultiModeAnalyzer
+from muka_analysis.classifier import GROUP_LABELS, FarmClassifier
 from muka_analysis.io_utils import IOUtils
 from muka_analysis.models import FarmData
 from muka_analysis.output import ColorScheme, OutputInterface, init_output
+from muka_analysis.parallel import ParallelAnalysis
+from muka_analysis.partials import PartialAggregate, parse_shard_spec, select_shard
 
 # Create Typer app
 app = typer.Typer(
@@ -221,6 +225,192 @@ def _show_unclassified_analysis(
     output.print("")
 
 
+def _show_group_tables(
+    output: OutputInterface,
+    group_counts: Dict[str, int],
+    classified_count: int,
+    summary_df: pd.DataFrame,
+) -> None:
+    """
+    Show the farm distribution and summary statistics tables by group.
+
+    Args:
+        output: OutputInterface for displaying results
+        group_counts: Farm counts per group (may include 'Unclassified')
+        classified_count: Number of classified farms
+        summary_df: Summary table from get_summary_by_group()
+    """
+    output.header("Farm Distribution by Group")
+
+    # Create table for group distribution
+    group_table = output.create_table(
+        "Groups", [("Group", "header"), ("Count", "data"), ("Percentage", "highlight")]
+    )
+
+    for group, count in sorted(group_counts.items()):
+        if group != "Unclassified":
+            percentage = (count / classified_count * 100) if classified_count > 0 else 0
+            group_table.add_row(group, f"{count:,}", f"{percentage:.1f}%")
+
+    output.show_table(group_table)
+    output.print("")
+
+    # Show summary statistics
+    output.header("Summary Statistics by Farm Group")
+
+    if not summary_df.empty:
+        # Create table for summary statistics - simple terminal view
+        stats_table = output.create_table(
+            "Statistics",
+            [
+                ("Farm Group", "header"),
+                ("Count", "data"),
+                ("Avg Animals", "data"),
+                ("Dairy Years", "highlight"),
+                ("Double Years", "highlight"),
+                ("Dairy+Double Years", "highlight"),
+            ],
+        )
+
+        for _, row in summary_df.iterrows():
+            stats_table.add_row(
+                str(row.get("group", "N/A")),
+                f"{int(row.get('count', 0)):,}",
+                f"{row.get('n_animals_total_mean', 0):.1f}",
+                f"{row.get('animalyear_days_female_age3_dairy_mean', 0):.1f}",
+                f"{row.get('animalyear_days_female_age3_double_mean', 0):.1f}",
+                f"{row.get('animalyear_days_female_age3_dairydouble_V2_mean', 0):.1f}",
+            )
+
+        output.show_table(stats_table)
+        output.print("")
+
+
+def _run_shard_analysis(
+    output: OutputInterface,
+    input_file: Path,
+    partial_file: Path,
+    shard_index: int,
+    n_shards: int,
+    force: bool,
+) -> None:
+    """
+    Analyze one TVD-hash shard of the input and write its partial aggregate.
+
+    Args:
+        output: OutputInterface for displaying results
+        input_file: Path to the full input CSV file
+        partial_file: Path of the partial-aggregate file to write
+        shard_index: 1-based shard number
+        n_shards: Total number of shards
+        force: Overwrite an existing partial file without prompting
+    """
+    logger = logging.getLogger(__name__)
+
+    if not force and partial_file.exists():
+        output.show_file_list("⚠️  The following file already exists:", [partial_file])
+        if not output.confirm("\nDo you want to overwrite it?"):
+            output.error("Analysis cancelled.")
+            raise typer.Exit(1)
+
+    with output.simple_progress() as progress:
+        task1 = progress.add_task(f"Loading shard {shard_index}/{n_shards}...", total=None)
+        logger.info(f"Loading shard {shard_index}/{n_shards} from: {input_file}")
+        df = IOUtils.read_csv(input_file, validate=True)
+        shard_df = select_shard(df, shard_index, n_shards)
+        farms = IOUtils.dataframe_to_farm_data(shard_df)
+        progress.update(
+            task1, description=f"✓ Shard {shard_index}/{n_shards}: {len(farms):,} farms loaded"
+        )
+
+        task2 = progress.add_task("Aggregating partial statistics...", total=None)
+        partial = PartialAggregate.from_dataframe(
+            FarmAnalyzer.farms_to_dataframe(farms),
+            shard_index=shard_index,
+            n_shards=n_shards,
+            n_rows=len(shard_df),
+        )
+        partial.save(partial_file)
+        progress.update(task2, description="✓ Partial aggregate saved")
+
+    output.success(f"Shard {shard_index}/{n_shards} analyzed: {len(farms):,} of {len(df):,} farms")
+    output.section("Output Files")
+    output.data(f"Partial aggregate: {partial_file}")
+    output.info("Combine all shard files with [bold]merge-shards[/bold]")
+    output.print("")
+
+
+def _run_parallel_analysis(
+    output: OutputInterface,
+    input_file: Path,
+    output_file: Path,
+    excel_file: Optional[Path],
+    mode: str,
+    workers: int,
+    partition_by: str,
+) -> None:
+    """
+    Run the analyze pipeline on a process pool and show the results.
+
+    Args:
+        output: OutputInterface for displaying results
+        input_file: Path to input CSV file
+        output_file: Path to output CSV file for classified farms
+        excel_file: Optional path to output Excel file for the analysis summary
+        mode: Indicator mode
+        workers: Number of worker processes
+        partition_by: Partition scheme ('tvd' or 'year')
+    """
+    logger = logging.getLogger(__name__)
+
+    with output.simple_progress() as progress:
+        task1 = progress.add_task("Loading data...", total=None)
+        logger.info(f"Loading data from: {input_file}")
+        df = IOUtils.read_csv(input_file, validate=True)
+        progress.update(task1, description=f"✓ Loaded {len(df):,} rows")
+
+        task2 = progress.add_task(f"Classifying and analyzing on {workers} workers...", total=None)
+        result = ParallelAnalysis(workers, indicator_mode=mode, partition_by=partition_by).run(df)
+        progress.update(task2, description=f"✓ Farms classified and analyzed ({workers} workers)")
+
+        task3 = progress.add_task("Saving results...", total=None)
+        IOUtils.write_csv(result.classified_df, output_file)
+        if excel_file:
+            FarmAnalyzer.write_summary_workbook(
+                str(excel_file),
+                summary=result.summary,
+                detailed_stats=result.detailed_stats,
+                group_counts=result.group_counts,
+                mode_name=mode,
+            )
+            logger.info(f"Analysis summary saved to {excel_file}")
+        progress.update(task3, description="✓ Results saved")
+
+    output.success("Analysis completed successfully!")
+    output.print("")
+
+    output.section("Classification Results")
+    total_farms = result.total_farms
+    classified_count = result.classified_count
+    unclassified_count = total_farms - classified_count
+    output.data(f"Total Farms: {total_farms:,}")
+    output.data(f"Classified: {classified_count:,} ({classified_count/total_farms*100:.1f}%)")
+    output.data(f"Unclassified: {unclassified_count:,} ({unclassified_count/total_farms*100:.1f}%)")
+    output.print("")
+
+    if classified_count > 0:
+        _show_group_tables(output, result.group_counts, classified_count, result.summary)
+    else:
+        output.warning("No farms were successfully classified.")
+        output.print("")
+
+    output.section("Output Files")
+    output.data(f"Classified data: {output_file}")
+    if excel_file:
+        output.data(f"Analysis summary: {excel_file}")
+    output.print("")
+
+
 @app.command()
 def analyze(
     input_file: Annotated[
@@ -299,6 +489,32 @@ def analyze(
             ),
         ),
     ] = None,
+    shard: Annotated[
+        Optional[str],
+        typer.Option(
+            "--shard",
+            help=(
+                "Analyze only shard i of N (e.g. 2/8, hash-partitioned on tvd) and write a "
+                "partial-aggregate file for merge-shards instead of the regular outputs"
+            ),
+        ),
+    ] = None,
+    workers: Annotated[
+        int,
+        typer.Option(
+            "--workers",
+            "-w",
+            min=1,
+            help="Number of worker processes for validation, classification and statistics",
+        ),
+    ] = 1,
+    partition_by: Annotated[
+        str,
+        typer.Option(
+            "--partition-by",
+            help="How to split the input across workers: tvd (hash) or year",
+        ),
+    ] = "tvd",
     use_four_indicators: Annotated[
         bool,
         typer.Option(
@@ -325,9 +541,15 @@ def analyze(
     - Generates summary statistics and analysis
     - Saves classified data and analysis results
 
+    With --shard i/N only the farms of one TVD-hash shard are analyzed and a
+    partial-aggregate file (all indicator modes) is written to --output; combine
+    the shard files with merge-shards.
+
     Example:
         [bold]muka-analysis analyze --save-analysis[/bold]
         [bold]muka-analysis analyze --input data.csv --output results.csv[/bold]
+        [bold]muka-analysis analyze --shard 2/8[/bold]
+        [bold]muka-analysis analyze --workers 8 --save-analysis[/bold]
     """
     # Initialize output interface
     output = init_output(color_scheme=theme, verbose=verbose)
@@ -365,6 +587,26 @@ def analyze(
         logger.info(f"Classification mode: {config.classification.indicator_mode}")
 
     try:
+        if shard is not None:
+            shard_index, n_shards = parse_shard_spec(shard)
+            if excel_file or save_analysis:
+                output.warning(
+                    "--excel/--save-analysis are ignored with --shard (use merge-shards)"
+                )
+            _run_shard_analysis(
+                output,
+                input_file if input_file else config.paths.get_default_input_path(),
+                (
+                    output_file
+                    if output_file
+                    else config.paths.get_partial_output_path(shard_index, n_shards)
+                ),
+                shard_index,
+                n_shards,
+                force,
+            )
+            return
+
         # Determine the actual mode being used (from CLI or config)
         actual_mode = indicator_mode if indicator_mode else config.classification.indicator_mode
 
@@ -409,6 +651,14 @@ def analyze(
         if excel_file:
             excel_file.parent.mkdir(parents=True, exist_ok=True)
 
+        if workers > 1:
+            if show_unclassified_analysis:
+                output.warning("--show-unclassified is not available with --workers")
+            _run_parallel_analysis(
+                output, input_file, output_file, excel_file, actual_mode, workers, partition_by
+            )
+            return
+
         # Run analysis with progress indicators
         with output.simple_progress() as progress:
 
@@ -487,51 +737,9 @@ def analyze(
 
         # Show group distribution table if there are classified farms
         if classified_count > 0:
-            output.header("Farm Distribution by Group")
-
-            # Create table for group distribution
-            group_table = output.create_table(
-                "Groups", [("Group", "header"), ("Count", "data"), ("Percentage", "highlight")]
+            _show_group_tables(
+                output, group_counts, classified_count, analyzer.get_summary_by_group()
             )
-
-            for group, count in sorted(group_counts.items()):
-                if group != "Unclassified":
-                    percentage = (count / classified_count * 100) if classified_count > 0 else 0
-                    group_table.add_row(group, f"{count:,}", f"{percentage:.1f}%")
-
-            output.show_table(group_table)
-            output.print("")
-
-            # Show summary statistics
-            output.header("Summary Statistics by Farm Group")
-            summary_df = analyzer.get_summary_by_group()
-
-            if not summary_df.empty:
-                # Create table for summary statistics - simple terminal view
-                stats_table = output.create_table(
-                    "Statistics",
-                    [
-                        ("Farm Group", "header"),
-                        ("Count", "data"),
-                        ("Avg Animals", "data"),
-                        ("Dairy Years", "highlight"),
-                        ("Double Years", "highlight"),
-                        ("Dairy+Double Years", "highlight"),
-                    ],
-                )
-
-                for _, row in summary_df.iterrows():
-                    stats_table.add_row(
-                        str(row.get("group", "N/A")),
-                        f"{int(row.get('count', 0)):,}",
-                        f"{row.get('n_animals_total_mean', 0):.1f}",
-                        f"{row.get('animalyear_days_female_age3_dairy_mean', 0):.1f}",
-                        f"{row.get('animalyear_days_female_age3_double_mean', 0):.1f}",
-                        f"{row.get('animalyear_days_female_age3_dairydouble_V2_mean', 0):.1f}",
-                    )
-
-                output.show_table(stats_table)
-                output.print("")
         else:
             output.warning("No farms were successfully classified.")
             output.info(
@@ -691,10 +899,7 @@ def analyze_all_modes(
         output.info(f"Output: {output_file}")
         output.print("")
 
-        # Dictionary to store results from each mode
-        mode_results: Dict[str, Dict[str, Any]] = {}
-
-        # Run analysis with each mode
+        # Run analysis with all modes
         with output.simple_progress() as progress:
             # Load data once (outside the mode loop)
             task_load = progress.add_task("Loading farm data...", total=None)
@@ -702,41 +907,28 @@ def analyze_all_modes(
             total_farms = len(farms_original)
             progress.update(task_load, description=f"✓ Loaded {total_farms:,} farms")
 
-            # Analyze each mode
+            # Aggregate all modes at once: numeric data is scanned a single time
+            task_aggregate = progress.add_task(
+                "Aggregating statistics for all modes...", total=None
+            )
+            multi_analyzer = MultiModeAnalyzer.from_farms(farms_original, modes=all_modes)
+            mode_results: Dict[str, Dict[str, Any]] = multi_analyzer.get_mode_results()
+            progress.update(task_aggregate, description="✓ Aggregated statistics for all modes")
+
+            if include_data:
+                base_df = IOUtils.farm_data_to_dataframe(farms_original)
+                for mode in all_modes:
+                    data_df = base_df.copy()
+                    data_df["group"] = np.asarray(GROUP_LABELS)[
+                        multi_analyzer.get_group_codes(mode)
+                    ]
+                    mode_results[mode]["data_df"] = data_df
+
             for mode_idx, mode in enumerate(all_modes, 1):
-                task_mode = progress.add_task(f"[{mode_idx}/5] Analyzing {mode}...", total=None)
-
-                # Create a fresh copy of farms for this mode
-                import copy
-
-                farms = copy.deepcopy(farms_original)
-
-                # Classify with this mode
-                classifier = FarmClassifier(indicator_mode=mode)
-                farms = classifier.classify_farms(farms)
-
-                # Analyze results
-                analyzer = FarmAnalyzer(farms)
-                summary_df = analyzer.get_summary_by_group()
-                group_counts = analyzer.get_group_counts()
-
-                # Calculate metrics
-                classified_count = sum(1 for f in farms if f.group is not None)
-                unclassified_count = total_farms - classified_count
-
-                # Store results
-                mode_results[mode] = {
-                    "farms": farms if include_data else None,
-                    "total_farms": total_farms,
-                    "classified_count": classified_count,
-                    "unclassified_count": unclassified_count,
-                    "group_counts": group_counts,
-                    "summary_df": summary_df,
-                }
-
-                progress.update(
-                    task_mode,
-                    description=f"✓ [{mode_idx}/5] {mode}: {classified_count}/{total_farms} classified",
+                classified_count = mode_results[mode]["classified_count"]
+                progress.add_task(
+                    f"✓ [{mode_idx}/5] {mode}: {classified_count}/{total_farms} classified",
+                    total=None,
                 )
 
             # Generate comparison summary
@@ -827,6 +1019,156 @@ def analyze_all_modes(
         raise typer.Exit(1)
 
 
+@app.command()
+def merge_shards(
+    partial_files: Annotated[
+        list[Path],
+        typer.Argument(
+            help="Partial-aggregate files written by analyze --shard",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            readable=True,
+        ),
+    ],
+    excel_file: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--excel",
+            "-x",
+            help="Path to output Excel file (default: mode-specific analysis summary path)",
+        ),
+    ] = None,
+    indicator_mode: Annotated[
+        Optional[str],
+        typer.Option(
+            "--mode",
+            "-m",
+            help="Indicator mode to report (default from config)",
+        ),
+    ] = None,
+    allow_missing: Annotated[
+        bool,
+        typer.Option(
+            "--allow-missing",
+            help="Write results even if some shards are missing",
+        ),
+    ] = False,
+    verbose: Annotated[
+        bool,
+        typer.Option(
+            "--verbose",
+            "-v",
+            help="Enable verbose logging",
+        ),
+    ] = False,
+    force: Annotated[
+        bool,
+        typer.Option(
+            "--force",
+            "-f",
+            help="Overwrite existing output files without prompting",
+        ),
+    ] = False,
+    theme: Annotated[
+        ColorScheme,
+        typer.Option(
+            "--theme",
+            "-t",
+            help="Color scheme: dark, light, or auto",
+        ),
+    ] = ColorScheme.DARK,
+) -> None:
+    """
+    Merge shard partial aggregates into the regular analysis outputs.
+
+    Combines the files written by [bold]analyze --shard i/N[/bold] on one or more
+    machines and writes the same Summary, Detailed_Stats and Group_Counts sheets
+    as [bold]analyze --save-analysis[/bold]. Counts, min, max and mean are exact;
+    medians are quantile-sketch estimates (see analysis.sketch_relative_accuracy).
+
+    Example:
+        [bold]muka-analysis merge-shards output/partial_aggregate_*_of_8.npz[/bold]
+        [bold]muka-analysis merge-shards shards/*.npz --mode 4-indicators -x merged.xlsx[/bold]
+    """
+    output = init_output(color_scheme=theme, verbose=verbose)
+    logger = logging.getLogger(__name__)
+
+    from muka_analysis.config import get_config
+
+    config = get_config()
+
+    output.section("MuKa Farm Analysis - Merge Shards")
+
+    try:
+        mode = indicator_mode if indicator_mode else config.classification.indicator_mode
+        if excel_file is None:
+            excel_file = config.paths.get_summary_output_path_with_mode(mode)
+
+        partials = [PartialAggregate.load(path) for path in partial_files]
+        merged = PartialAggregate.merge(partials)
+        logger.info(f"Merged {len(partials)} partial files: {merged.shards}")
+
+        if merged.missing_shards:
+            message = (
+                f"Missing shard(s) {merged.missing_shards} of {merged.n_shards}; "
+                "results cover only part of the input"
+            )
+            if not allow_missing:
+                output.error(message)
+                output.info("Use --allow-missing to write partial results anyway")
+                raise typer.Exit(1)
+            output.warning(message)
+
+        if not force and excel_file.exists():
+            output.show_file_list("⚠️  The following file already exists:", [excel_file])
+            if not output.confirm("\nDo you want to overwrite it?"):
+                output.error("Merge cancelled.")
+                raise typer.Exit(1)
+
+        excel_file.parent.mkdir(parents=True, exist_ok=True)
+        merged.export_summary_to_excel(str(excel_file), mode_name=mode)
+
+        total_farms = merged.total_farms
+        classified_count = merged.classified_count(mode)
+        unclassified_count = total_farms - classified_count
+
+        output.success(f"Merged {len(partials)} shard file(s) for mode {mode}")
+        output.print("")
+
+        output.section("Classification Results")
+        output.data(f"Shards: {len(merged.shards)} of {merged.n_shards}")
+        output.data(f"Total Farms: {total_farms:,}")
+        if total_farms > 0:
+            output.data(
+                f"Classified: {classified_count:,} ({classified_count/total_farms*100:.1f}%)"
+            )
+            output.data(
+                f"Unclassified: {unclassified_count:,} "
+                f"({unclassified_count/total_farms*100:.1f}%)"
+            )
+        output.print("")
+
+        if classified_count > 0:
+            _show_group_tables(
+                output,
+                merged.get_group_counts(mode),
+                classified_count,
+                merged.get_summary_by_group(mode),
+            )
+
+        output.section("Output Files")
+        output.data(f"Analysis summary: {excel_file}")
+        output.print("")
+
+    except typer.Exit:
+        raise
+    except Exception as e:
+        logger.error(f"Merge failed: {e}", exc_info=True)
+        output.error(f"Merge failed: {e}")
+        raise typer.Exit(1)
+
+
 @app.command()
 def validate(
     input_file: Annotated[
@@ -919,6 +1261,27 @@ def compare_modes(
             help="Save comparison to Excel file",
         ),
     ] = None,
+    mode_a: Annotated[
+        str,
+        typer.Option(
+            "--mode-a",
+            help="Mode shown on the rows of the displayed crosstab",
+        ),
+    ] = "6-indicators",
+    mode_b: Annotated[
+        str,
+        typer.Option(
+            "--mode-b",
+            help="Mode shown on the columns of the displayed crosstab",
+        ),
+    ] = "4-indicators",
+    show_farms: Annotated[
+        int,
+        typer.Option(
+            "--show-farms",
+            help="Number of farms with mode-dependent classification to list",
+        ),
+    ] = 10,
     verbose: Annotated[
         bool,
         typer.Option(
@@ -939,34 +1302,129 @@ def compare_modes(
     """
     Compare all indicator modes side-by-side.
 
-    Runs classification with all 4 indicator modes (6-indicators, 4-indicators,
-    5-indicators, 5-indicators-flex) and shows a comprehensive comparison:
-    - Classification counts per group
-    - Unclassified farms for each mode
-    - Key differences between modes
+    Classifies the farms with all 5 indicator modes in a single pass and shows
+    a comprehensive comparison:
+    - Classification counts per group for each mode
+    - Pairwise agreement between modes
+    - Group-by-group crosstab for a chosen pair of modes
+    - Farms whose classification depends on the mode
     - Optional Excel export for detailed analysis
 
     Example:
         [bold]muka-analysis compare-modes[/bold]
+        [bold]muka-analysis compare-modes --mode-a 6-indicators-flex --mode-b 5-indicators[/bold]
         [bold]muka-analysis compare-modes --save-excel comparison.xlsx[/bold]
     """
-    # Use the standalone comparison script
-    import subprocess
-    import sys
+    output = init_output(color_scheme=theme, verbose=verbose)
+    logger = logging.getLogger(__name__)
 
-    cmd = [sys.executable, "compare_indicator_modes.py"]
+    from muka_analysis.comparison import ModeComparator
+    from muka_analysis.config import get_config
 
-    if input_file:
-        cmd.extend(["--input", str(input_file)])
-    if save_excel:
-        cmd.extend(["--save-excel", str(save_excel)])
-    if verbose:
-        cmd.append("--verbose")
-    cmd.extend(["--theme", theme.value])
+    config = get_config()
+
+    output.section("MuKa Indicator Mode Comparison")
+
+    try:
+        if input_file is None:
+            input_file = config.paths.get_default_input_path()
+
+        if not input_file.exists():
+            output.error(f"Input file not found: {input_file}")
+            raise typer.Exit(1)
+
+        with output.simple_progress() as progress:
+            task_load = progress.add_task("Loading farm data...", total=None)
+            farms = IOUtils.read_and_parse(input_file)
+            progress.update(task_load, description=f"✓ Loaded {len(farms):,} farms")
+
+            task_classify = progress.add_task("Classifying with all modes...", total=None)
+            comparator = ModeComparator.from_farms(farms)
+            progress.update(task_classify, description="✓ Farms classified with all modes")
+
+            if save_excel:
+                task_save = progress.add_task("Writing Excel workbook...", total=None)
+                comparator.export_to_excel(save_excel)
+                progress.update(task_save, description="✓ Excel workbook saved")
+
+        summary = comparator.summary(max_farms=max(show_farms, 0))
+        total_farms = summary.total_farms
+
+        # Group counts per mode
+        output.header("Classification per Mode")
+        overview_table = output.create_table(
+            "Mode Overview",
+            [("Group", "header")] + [(mode, "data") for mode in comparator.modes],
+        )
+        for _, row in comparator.overview().iterrows():
+            label = row["Group"]
+            if label == "Success Rate (%)":
+                values = [f"{row[mode]:.1f}%" for mode in comparator.modes]
+            else:
+                values = [f"{int(row[mode]):,}" for mode in comparator.modes]
+            overview_table.add_row(label, *values)
+        output.show_table(overview_table)
+        output.print("")
+
+        # Pairwise agreement
+        output.header("Pairwise Agreement (% of farms with identical group)")
+        agreement = comparator.agreement_matrix()
+        agreement_table = output.create_table(
+            "Agreement",
+            [("Mode", "header")] + [(mode, "highlight") for mode in comparator.modes],
+        )
+        for mode in comparator.modes:
+            agreement_table.add_row(
+                mode, *[f"{agreement.loc[mode, other]:.1f}%" for other in comparator.modes]
+            )
+        output.show_table(agreement_table)
+        output.print("")
+
+        # Crosstab for the selected mode pair
+        output.header(f"Crosstab: {mode_a} (rows) vs {mode_b} (columns)")
+        crosstab = comparator.crosstab(mode_a, mode_b)
+        crosstab_table = output.create_table(
+            "Crosstab",
+            [(mode_a, "header")] + [(label, "data") for label in crosstab.columns],
+        )
+        for label, row in crosstab.iterrows():
+            crosstab_table.add_row(str(label), *[f"{int(value):,}" for value in row])
+        output.show_table(crosstab_table)
+        output.print("")
+
+        # Farms with mode-dependent classification
+        n_different = int(comparator.disagreement_mask().sum())
+        output.header("Farms with Mode-Dependent Classification")
+        output.data(
+            f"{n_different:,} of {total_farms:,} farms "
+            f"({n_different / total_farms * 100:.1f}%) change group between modes"
+        )
+        if summary.farms_with_different_classifications:
+            farms_table = output.create_table(
+                "Different Classifications",
+                [("TVD", "header"), ("Year", "data"), ("Pattern", "data")]
+                + [(mode, "highlight") for mode in summary.modes],
+            )
+            for farm in summary.farms_with_different_classifications:
+                farms_table.add_row(
+                    str(farm["tvd"]),
+                    str(farm["year"]),
+                    farm["pattern"],
+                    *[str(farm[mode]) for mode in summary.modes],
+                )
+            output.show_table(farms_table)
+        output.print("")
 
-    result = subprocess.run(cmd, check=False)
-    if result.returncode != 0:
-        raise typer.Exit(result.returncode)
+        if save_excel:
+            output.success(f"Comparison saved to: {save_excel}")
+            output.print("")
+
+    except typer.Exit:
+        raise
+    except Exception as e:
+        logger.error(f"Mode comparison failed: {e}", exc_info=True)
+        output.error(f"Mode comparison failed: {e}")
+        raise typer.Exit(1)
 
 
 @app.command()
@@ -1135,6 +1593,543 @@ def show_matrices(
             raise typer.Exit(1)
 
 
+@app.command()
+def benchmark(
+    tvd: Annotated[
+        int,
+        typer.Argument(help="TVD number of the farm to benchmark"),
+    ],
+    input_file: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--input",
+            "-i",
+            help="Path to input CSV file",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+        ),
+    ] = None,
+    year: Annotated[
+        Optional[int],
+        typer.Option(
+            "--year",
+            "-y",
+            help="Data year of the farm (default: its first row)",
+        ),
+    ] = None,
+    indicator_mode: Annotated[
+        Optional[str],
+        typer.Option(
+            "--mode",
+            "-m",
+            help="Indicator mode defining the farm's group (default from config)",
+        ),
+    ] = None,
+    group: Annotated[
+        Optional[str],
+        typer.Option(
+            "--group",
+            "-g",
+            help="Peer group to compare with (default: the farm's own group)",
+        ),
+    ] = None,
+    verbose: Annotated[
+        bool,
+        typer.Option(
+            "--verbose",
+            "-v",
+            help="Enable verbose logging",
+        ),
+    ] = False,
+    theme: Annotated[
+        ColorScheme,
+        typer.Option(
+            "--theme",
+            "-t",
+            help="Color scheme: dark, light, or auto",
+        ),
+    ] = ColorScheme.DARK,
+) -> None:
+    """
+    Compare a farm with the other farms of its group.
+
+    Shows the farm's percentile rank within its group on every numeric
+    metric (0 = lowest, 100 = highest), next to the group's quartiles.
+    Farms that are unclassified in the chosen mode can be compared with any
+    group via --group.
+
+    Example:
+        [bold]muka-analysis benchmark 1234567[/bold]
+        [bold]muka-analysis benchmark 1234567 --year 2024 --mode 4-indicators[/bold]
+        [bold]muka-analysis benchmark 1234567 --group Milchvieh[/bold]
+    """
+    output = init_output(color_scheme=theme, verbose=verbose)
+    logger = logging.getLogger(__name__)
+
+    from muka_analysis.benchmark import PeerRankTables
+    from muka_analysis.classifier import UNCLASSIFIED_CODE
+    from muka_analysis.config import get_config
+    from muka_analysis.models import IndicatorMode
+
+    config = get_config()
+
+    output.section(f"MuKa Farm Benchmark - TVD {tvd}")
+
+    try:
+        mode = indicator_mode if indicator_mode else config.classification.indicator_mode
+        modes = [m.value for m in IndicatorMode]
+        if mode not in modes:
+            output.error(f"Unknown mode '{mode}'. Must be one of: {', '.join(modes)}")
+            raise typer.Exit(1)
+        if group is not None and group not in GROUP_LABELS[:UNCLASSIFIED_CODE]:
+            output.error(
+                f"Unknown group '{group}'. "
+                f"Must be one of: {', '.join(GROUP_LABELS[:UNCLASSIFIED_CODE])}"
+            )
+            raise typer.Exit(1)
+
+        if input_file is None:
+            input_file = config.paths.get_default_input_path()
+
+        if not input_file.exists():
+            output.error(f"Input file not found: {input_file}")
+            raise typer.Exit(1)
+
+        with output.simple_progress() as progress:
+            task_load = progress.add_task("Loading farm data...", total=None)
+            farms = IOUtils.read_and_parse(input_file)
+            df = FarmAnalyzer.farms_to_dataframe(farms)
+            del farms
+            progress.update(task_load, description=f"✓ Loaded {len(df):,} farms")
+
+            task_rank = progress.add_task("Building rank tables...", total=None)
+            patterns = FarmClassifier.encode_patterns(
+                df[FarmAnalyzer.CLASSIFICATION_FIELDS].to_numpy()
+            )
+            codes = FarmClassifier(indicator_mode=mode).classify_patterns(patterns)
+            tables = PeerRankTables(df, {mode: codes})
+            progress.update(task_rank, description="✓ Rank tables built")
+
+        rows = np.flatnonzero(df["tvd"].to_numpy() == tvd)
+        if year is not None:
+            rows = rows[df["year"].to_numpy()[rows] == year]
+        if len(rows) == 0:
+            year_text = f" in {year}" if year is not None else ""
+            output.error(f"Farm with TVD {tvd} not found{year_text}")
+            raise typer.Exit(1)
+        position = int(rows[0])
+
+        farm_group = GROUP_LABELS[int(codes[position])]
+        peer_group = group or farm_group
+        if peer_group == GROUP_LABELS[UNCLASSIFIED_CODE]:
+            output.error(f"Farm {tvd} is unclassified in mode {mode} and has no peer group")
+            output.info("Use --group to compare it with a group")
+            raise typer.Exit(1)
+
+        code = GROUP_LABELS.index(peer_group)
+        values = df[tables.fields].iloc[position].to_numpy(dtype=np.float64)
+        results = tables.benchmark(values, mode, code)
+
+        output.header(
+            f"Farm {tvd} ({df['year'].iloc[position]}, {farm_group}) vs "
+            f"{tables.group_size(mode, code):,} {peer_group} farms ({mode})"
+        )
+        table = output.create_table(
+            "Percentile Rank within Group",
+            [
+                ("Metric", "header"),
+                ("Value", "data"),
+                ("Percentile", "highlight"),
+                ("Group P25", "data"),
+                ("Group Median", "data"),
+                ("Group P75", "data"),
+            ],
+        )
+
+        def fmt(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value:,.2f}"
+
+        for field, result in results.items():
+            table.add_row(
+                field,
+                fmt(result["value"]),
+                "-" if result["percentile"] is None else f"{result['percentile']:.1f}",
+                fmt(result["group_p25"]),
+                fmt(result["group_median"]),
+                fmt(result["group_p75"]),
+            )
+        output.show_table(table)
+        output.print("")
+
+    except typer.Exit:
+        raise
+    except Exception as e:
+        logger.error(f"Benchmark failed: {e}", exc_info=True)
+        output.error(f"Benchmark failed: {e}")
+        raise typer.Exit(1)
+
+
+@app.command()
+def similar_farms(
+    tvd: Annotated[
+        Optional[int],
+        typer.Argument(help="TVD number of the farm to find neighbours of"),
+    ] = None,
+    profile: Annotated[
+        Optional[str],
+        typer.Option(
+            "--profile",
+            "-p",
+            help=(
+                "Metric values of a hypothetical farm instead of a TVD, e.g. "
+                "n_animals_total=120,n_total_entries_younger85=30"
+            ),
+        ),
+    ] = None,
+    input_file: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--input",
+            "-i",
+            help="Path to input CSV file",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+        ),
+    ] = None,
+    year: Annotated[
+        Optional[int],
+        typer.Option(
+            "--year",
+            "-y",
+            help="Data year of the farm (default: its first row)",
+        ),
+    ] = None,
+    indicator_mode: Annotated[
+        Optional[str],
+        typer.Option(
+            "--mode",
+            "-m",
+            help="Indicator mode of the shown groups and of --group (default from config)",
+        ),
+    ] = None,
+    group: Annotated[
+        Optional[str],
+        typer.Option(
+            "--group",
+            "-g",
+            help="Only search farms of this group",
+        ),
+    ] = None,
+    k: Annotated[
+        int,
+        typer.Option(
+            "--k",
+            "-k",
+            help="Number of neighbours",
+        ),
+    ] = 10,
+    verbose: Annotated[
+        bool,
+        typer.Option(
+            "--verbose",
+            "-v",
+            help="Enable verbose logging",
+        ),
+    ] = False,
+    theme: Annotated[
+        ColorScheme,
+        typer.Option(
+            "--theme",
+            "-t",
+            help="Color scheme: dark, light, or auto",
+        ),
+    ] = ColorScheme.DARK,
+) -> None:
+    """
+    Find the farms most similar to a farm or to a metric profile.
+
+    Farms are compared by Euclidean distance over the standardized numeric
+    metrics (a profile is compared on its metrics only). The groups of a
+    farm's nearest neighbours help to judge borderline classifications.
+
+    Example:
+        [bold]muka-analysis similar-farms 1234567[/bold]
+        [bold]muka-analysis similar-farms 1234567 --mode 4-indicators --group Milchvieh[/bold]
+        [bold]muka-analysis similar-farms --profile n_animals_total=120,n_total_entries_younger85=30[/bold]
+    """
+    output = init_output(color_scheme=theme, verbose=verbose)
+    logger = logging.getLogger(__name__)
+
+    from muka_analysis.config import get_config
+    from muka_analysis.models import IndicatorMode
+    from muka_analysis.similarity import SimilarityIndex
+
+    config = get_config()
+
+    output.section("MuKa Similar Farms")
+
+    try:
+        if (tvd is None) == (profile is None):
+            output.error("Give either a TVD number or --profile")
+            raise typer.Exit(1)
+        mode = indicator_mode if indicator_mode else config.classification.indicator_mode
+        modes = [m.value for m in IndicatorMode]
+        if mode not in modes:
+            output.error(f"Unknown mode '{mode}'. Must be one of: {', '.join(modes)}")
+            raise typer.Exit(1)
+        if group is not None and group not in GROUP_LABELS:
+            output.error(f"Unknown group '{group}'. Must be one of: {', '.join(GROUP_LABELS)}")
+            raise typer.Exit(1)
+        profile_values: Dict[str, str] = {}
+        if profile is not None:
+            for item in profile.split(","):
+                field, _, value = item.partition("=")
+                profile_values[field.strip()] = value.strip()
+
+        if input_file is None:
+            input_file = config.paths.get_default_input_path()
+
+        if not input_file.exists():
+            output.error(f"Input file not found: {input_file}")
+            raise typer.Exit(1)
+
+        with output.simple_progress() as progress:
+            task_load = progress.add_task("Loading farm data...", total=None)
+            farms = IOUtils.read_and_parse(input_file)
+            df = FarmAnalyzer.farms_to_dataframe(farms)
+            del farms
+            progress.update(task_load, description=f"✓ Loaded {len(df):,} farms")
+
+            task_index = progress.add_task("Building similarity index...", total=None)
+            patterns = FarmClassifier.encode_patterns(
+                df[FarmAnalyzer.CLASSIFICATION_FIELDS].to_numpy()
+            )
+            codes = FarmClassifier(indicator_mode=mode).classify_patterns(patterns)
+            index = SimilarityIndex(df)
+            progress.update(task_index, description="✓ Similarity index built")
+
+        mask = codes == GROUP_LABELS.index(group) if group else np.ones(len(df), dtype=bool)
+        columns = None
+        if tvd is not None:
+            rows = np.flatnonzero(df["tvd"].to_numpy() == tvd)
+            farm_rows = rows if year is None else rows[df["year"].to_numpy()[rows] == year]
+            if len(farm_rows) == 0:
+                year_text = f" in {year}" if year is not None else ""
+                output.error(f"Farm with TVD {tvd} not found{year_text}")
+                raise typer.Exit(1)
+            position = int(farm_rows[0])
+            query = index.vectors[position]
+            # The farm's other years would be its nearest neighbours
+            mask[rows] = False
+            title = (
+                f"Farms similar to {tvd} ({df['year'].iloc[position]}, "
+                f"{GROUP_LABELS[int(codes[position])]})"
+            )
+        else:
+            try:
+                columns, query = index.profile_query(profile_values)
+            except ValueError as e:
+                output.error(str(e))
+                raise typer.Exit(1)
+            title = f"Farms similar to {', '.join(f'{f}={v}' for f, v in profile_values.items())}"
+
+        positions, distances = index.search(query, columns, k=k, mask=mask)
+
+        output.header(f"{title} ({mode})")
+        table = output.create_table(
+            "Nearest Farms",
+            [("TVD", "header"), ("Year", "data"), ("Group", "highlight"), ("Distance", "data")],
+        )
+        for position, distance in zip(positions, distances):
+            table.add_row(
+                str(df["tvd"].iloc[position]),
+                str(df["year"].iloc[position]),
+                GROUP_LABELS[int(codes[position])],
+                f"{distance:.3f}",
+            )
+        output.show_table(table)
+
+        neighbour_groups = Counter(GROUP_LABELS[int(code)] for code in codes[positions])
+        output.data(
+            "Neighbour groups: "
+            + ", ".join(f"{label} {count}" for label, count in neighbour_groups.most_common())
+        )
+        output.print("")
+
+    except typer.Exit:
+        raise
+    except Exception as e:
+        logger.error(f"Similar farm search failed: {e}", exc_info=True)
+        output.error(f"Similar farm search failed: {e}")
+        raise typer.Exit(1)
+
+
+@app.command()
+def cluster_unclassified(
+    input_file: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--input",
+            "-i",
+            help="Path to input CSV file",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+        ),
+    ] = None,
+    indicator_mode: Annotated[
+        Optional[str],
+        typer.Option(
+            "--mode",
+            "-m",
+            help="Indicator mode whose unclassified farms are clustered (default from config)",
+        ),
+    ] = None,
+    clusters: Annotated[
+        Optional[int],
+        typer.Option(
+            "--clusters",
+            "-k",
+            help="Number of clusters (default: analysis.cluster_count)",
+        ),
+    ] = None,
+    seed: Annotated[
+        int,
+        typer.Option(
+            "--seed",
+            help="Random seed; the same seed gives the same clusters",
+        ),
+    ] = 0,
+    verbose: Annotated[
+        bool,
+        typer.Option(
+            "--verbose",
+            "-v",
+            help="Enable verbose logging",
+        ),
+    ] = False,
+    theme: Annotated[
+        ColorScheme,
+        typer.Option(
+            "--theme",
+            "-t",
+            help="Color scheme: dark, light, or auto",
+        ),
+    ] = ColorScheme.DARK,
+) -> None:
+    """
+    Cluster unclassified farms to propose new profiles.
+
+    Farms matching none of the group profiles are clustered with mini-batch
+    k-means over their standardized metrics and indicator bits. Each cluster
+    shows its majority indicator pattern, the nearest existing profile and
+    the indicators that contradict it.
+
+    Example:
+        [bold]muka-analysis cluster-unclassified[/bold]
+        [bold]muka-analysis cluster-unclassified --mode 4-indicators --clusters 5[/bold]
+    """
+    output = init_output(color_scheme=theme, verbose=verbose)
+    logger = logging.getLogger(__name__)
+
+    from muka_analysis.clustering import cluster_unclassified as cluster_farms
+    from muka_analysis.config import get_config
+    from muka_analysis.models import IndicatorMode
+
+    config = get_config()
+
+    output.section("MuKa Unclassified Farm Clusters")
+
+    try:
+        mode = indicator_mode if indicator_mode else config.classification.indicator_mode
+        modes = [m.value for m in IndicatorMode]
+        if mode not in modes:
+            output.error(f"Unknown mode '{mode}'. Must be one of: {', '.join(modes)}")
+            raise typer.Exit(1)
+
+        if input_file is None:
+            input_file = config.paths.get_default_input_path()
+
+        if not input_file.exists():
+            output.error(f"Input file not found: {input_file}")
+            raise typer.Exit(1)
+
+        with output.simple_progress() as progress:
+            task_load = progress.add_task("Loading farm data...", total=None)
+            farms = IOUtils.read_and_parse(input_file)
+            df = FarmAnalyzer.farms_to_dataframe(farms)
+            del farms
+            progress.update(task_load, description=f"✓ Loaded {len(df):,} farms")
+
+            task_cluster = progress.add_task("Clustering unclassified farms...", total=None)
+            patterns = FarmClassifier.encode_patterns(
+                df[FarmAnalyzer.CLASSIFICATION_FIELDS].to_numpy()
+            )
+            codes = FarmClassifier(indicator_mode=mode).classify_patterns(patterns)
+            try:
+                result = cluster_farms(df, codes, mode, k=clusters, seed=seed)
+            except ValueError as e:
+                output.error(str(e))
+                raise typer.Exit(1)
+            progress.update(
+                task_cluster,
+                description=f"✓ Clustered in {result['iterations']} iterations",
+            )
+
+        output.header(
+            f"{result['unclassified_farms']:,} of {result['total_farms']:,} farms "
+            f"unclassified ({mode})"
+        )
+        if not result["clusters"]:
+            output.success("All farms match a group profile")
+            return
+
+        table = output.create_table(
+            "Clusters",
+            [
+                ("Cluster", "header"),
+                ("Farms", "data"),
+                ("Share", "data"),
+                ("Pattern", "highlight"),
+                ("Nearest", "highlight"),
+                ("Mismatched", "data"),
+                ("Animals", "data"),
+                ("Entries <85d", "data"),
+                ("Leavings <51d", "data"),
+            ],
+        )
+        for cluster in result["clusters"]:
+            centroid = cluster["centroid"]
+            table.add_row(
+                str(cluster["cluster"]),
+                f"{cluster['farms']:,}",
+                f"{cluster['share'] * 100:.1f}%",
+                cluster["pattern"],
+                f"{cluster['nearest_profile']} ({cluster['profile_distance']:.2f})",
+                ", ".join(
+                    field.removeprefix("indicator_") for field in cluster["mismatched_indicators"]
+                ),
+                f"{centroid.get('n_animals_total', float('nan')):.1f}",
+                f"{centroid.get('n_total_entries_younger85', float('nan')):.1f}",
+                f"{centroid.get('n_total_leavings_younger51', float('nan')):.1f}",
+            )
+        output.show_table(table)
+        output.data(
+            "Pattern: majority indicator bits in the order "
+            + ", ".join(f.removeprefix("indicator_") for f in FarmAnalyzer.CLASSIFICATION_FIELDS)
+        )
+        output.print("")
+
+    except typer.Exit:
+        raise
+    except Exception as e:
+        logger.error(f"Clustering of unclassified farms failed: {e}", exc_info=True)
+        output.error(f"Clustering of unclassified farms failed: {e}")
+        raise typer.Exit(1)
+
+
 @app.command()
 def version(
     theme: Annotated[
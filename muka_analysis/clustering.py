@@ -0,0 +1,306 @@
+"""
+Clustering of unclassified farms to propose new profiles.
+
+Farms whose indicator pattern matches none of the six group profiles are
+clustered with mini-batch k-means (Sculley, 2010) over
+
+- their numeric metrics (FarmAnalyzer.NUMERIC_FIELDS), standardized over
+  the unclassified farms, and
+- their six indicator bits, weighted by ``analysis.cluster_indicator_weight``
+  so that one differing indicator weighs as much as that many standard
+  deviations of a metric.
+
+Each iteration assigns one random batch of farms to the nearest centroids
+and moves every centroid towards the mean of its batch farms with a
+per-centroid learning rate of (batch farms / all farms seen so far). Work
+and temporary memory per iteration depend on the batch size only; the final
+assignment of all farms runs block by block.
+
+Each cluster is reported with its size, the centroid in the original units
+(indicator bits as the share of farms with the indicator) and the group
+profile of the chosen mode nearest to its indicator shares.
+"""
+
+import logging
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from muka_analysis.analyzer import FarmAnalyzer
+from muka_analysis.classifier import UNCLASSIFIED_CODE, FarmClassifier
+from muka_analysis.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# GroupProfile attributes in FarmAnalyzer.CLASSIFICATION_FIELDS order
+PROFILE_FIELDS: List[str] = [
+    "female_dairy_cattle",
+    "female_cattle",
+    "calf_arrivals",
+    "calf_non_slaughter_leavings",
+    "female_slaughterings",
+    "young_slaughterings",
+]
+
+# Upper limit of mini-batch iterations
+MAX_ITERATIONS = 300
+
+# Iterations stop once no centroid moves farther than this (standardized units)
+CONVERGENCE_TOLERANCE = 1e-3
+
+# Farms sampled for the k-means++ initialization
+INIT_SAMPLE_ROWS = 10_000
+
+# Farms per block of the final assignment
+ASSIGN_BLOCK_ROWS = 65_536
+
+
+def nearest_centroids(features: np.ndarray, centroids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Assign rows to their nearest centroid.
+
+    Args:
+        features: Array of shape (n, d)
+        centroids: Array of shape (k, d)
+
+    Returns:
+        Tuple of (centroid of every row, squared distance to it)
+    """
+    # |x - c|^2 = |x|^2 - 2 x.c + |c|^2; |x|^2 does not change the nearest centroid
+    scores = (centroids * centroids).sum(axis=1) - 2.0 * (features @ centroids.T)
+    labels = np.argmin(scores, axis=1)
+    distances = scores[np.arange(len(features)), labels] + (features * features).sum(axis=1)
+    return labels, np.maximum(distances, 0.0)
+
+
+def cluster_sums(labels: np.ndarray, values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Sum rows per cluster.
+
+    Args:
+        labels: Cluster of every row
+        values: Array of shape (n, d)
+        k: Number of clusters
+
+    Returns:
+        Array of shape (k, d)
+    """
+    return np.stack(
+        [np.bincount(labels, weights=values[:, j], minlength=k) for j in range(values.shape[1])],
+        axis=1,
+    )
+
+
+def kmeans_plus_plus(features: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Choose k initial centroids with k-means++ seeding.
+
+    Args:
+        features: Array of shape (n, d) with n >= k
+        k: Number of centroids
+        rng: Random generator
+
+    Returns:
+        Array of shape (k, d)
+    """
+    centroids = [features[rng.integers(len(features))]]
+    distances = ((features - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = distances.sum()
+        if total <= 0:
+            # Fewer distinct rows than centroids
+            index = int(rng.integers(len(features)))
+        else:
+            index = int(rng.choice(len(features), p=distances / total))
+        centroids.append(features[index])
+        distances = np.minimum(distances, ((features - features[index]) ** 2).sum(axis=1))
+    return np.array(centroids)
+
+
+def minibatch_kmeans(
+    features: np.ndarray,
+    k: int,
+    batch_size: int,
+    seed: int = 0,
+    check: Optional[Callable[[], None]] = None,
+) -> Tuple[np.ndarray, int]:
+    """
+    Cluster rows with mini-batch k-means.
+
+    Args:
+        features: Array of shape (n, d)
+        k: Number of clusters (at most n)
+        batch_size: Rows per iteration
+        seed: Seed of the random generator (same seed, same clusters)
+        check: Called once per iteration, e.g. to enforce a time budget
+
+    Returns:
+        Tuple of (centroids of shape (k, d), number of iterations run)
+    """
+    rng = np.random.default_rng(seed)
+    sample = features[rng.choice(len(features), min(len(features), INIT_SAMPLE_ROWS), False)]
+    centroids = kmeans_plus_plus(sample.astype(np.float64), k, rng)
+    seen = np.zeros(k)
+
+    iteration = 0
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        if check is not None:
+            check()
+        batch = features[rng.integers(len(features), size=batch_size)].astype(np.float64)
+        labels, _ = nearest_centroids(batch, centroids)
+        counts = np.bincount(labels, minlength=k).astype(np.float64)
+        sums = cluster_sums(labels, batch, k)
+
+        hit = counts > 0
+        seen += counts
+        rate = counts[hit] / seen[hit]
+        target = sums[hit] / counts[hit, None]
+        moved = centroids[hit] + rate[:, None] * (target - centroids[hit])
+        shift = np.sqrt(((moved - centroids[hit]) ** 2).sum(axis=1)).max(initial=0.0)
+        centroids[hit] = moved
+        if shift < CONVERGENCE_TOLERANCE:
+            break
+    return centroids, iteration
+
+
+def profile_patterns(mode: str) -> Dict[str, np.ndarray]:
+    """
+    Get the indicator patterns of the group profiles of a mode.
+
+    Args:
+        mode: Indicator mode
+
+    Returns:
+        Group name -> float array of the six indicators (NaN where any value matches)
+    """
+    patterns = {}
+    for profile in FarmClassifier(indicator_mode=mode).get_all_profiles():
+        values = [getattr(profile, field) for field in PROFILE_FIELDS]
+        patterns[profile.group_name.value] = np.array(
+            [np.nan if value is None else value for value in values], dtype=np.float64
+        )
+    return patterns
+
+
+def cluster_unclassified(
+    df: pd.DataFrame,
+    codes: np.ndarray,
+    mode: str,
+    k: Optional[int] = None,
+    seed: int = 0,
+    check: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Cluster the farms that are unclassified in a mode.
+
+    Args:
+        df: Farm DataFrame as produced by FarmAnalyzer.farms_to_dataframe()
+        codes: Group code of every row in the mode (see classifier.GROUP_LABELS)
+        mode: Indicator mode the codes come from
+        k: Number of clusters (default: analysis.cluster_count)
+        seed: Seed of the random generator
+        check: Called once per iteration, e.g. to enforce a time budget
+
+    Returns:
+        Dictionary with the mode, numbers of farms, iterations, and the
+        clusters (largest first), each with its size, share, indicator
+        shares, majority pattern, nearest profile and metric centroid
+
+    Raises:
+        ValueError: If k is not positive
+    """
+    config = get_config().analysis
+    k = config.cluster_count if k is None else k
+    if k < 1:
+        raise ValueError(f"Number of clusters must be positive, got {k}")
+
+    rows = np.flatnonzero(codes == UNCLASSIFIED_CODE)
+    result: Dict[str, Any] = {
+        "mode": mode,
+        "total_farms": len(df),
+        "unclassified_farms": len(rows),
+        "iterations": 0,
+        "clusters": [],
+    }
+    if len(rows) == 0:
+        return result
+
+    fields = [f for f in FarmAnalyzer.NUMERIC_FIELDS if f in df.columns]
+    metrics = df[fields].to_numpy(dtype=np.float64)[rows]
+    with warnings.catch_warnings():
+        # Fields without values yield NaN statistics
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nan_to_num(np.nanmean(metrics, axis=0))
+        std = np.nan_to_num(np.nanstd(metrics, axis=0))
+    scale = np.where(std > 0, std, 1.0)
+    weight = config.cluster_indicator_weight
+    indicators = df[FarmAnalyzer.CLASSIFICATION_FIELDS].to_numpy(dtype=np.float64)[rows]
+    features = np.hstack([np.nan_to_num((metrics - mean) / scale), weight * indicators]).astype(
+        np.float32
+    )
+    del metrics
+
+    k = min(k, len(rows))
+    centroids, iterations = minibatch_kmeans(
+        features, k, min(config.cluster_batch_size, len(rows)), seed=seed, check=check
+    )
+
+    labels = np.empty(len(rows), dtype=np.int64)
+    squared = np.empty(len(rows))
+    for start in range(0, len(rows), ASSIGN_BLOCK_ROWS):
+        if check is not None:
+            check()
+        block = features[start : start + ASSIGN_BLOCK_ROWS].astype(np.float64)
+        labels[start : start + len(block)], squared[start : start + len(block)] = nearest_centroids(
+            block, centroids
+        )
+
+    sizes = np.bincount(labels, minlength=k)
+    distance_sums = np.bincount(labels, weights=np.sqrt(squared), minlength=k)
+    # Report exact per-cluster means of the assigned farms rather than the running centroids
+    metric_sums = cluster_sums(labels, features[:, : len(fields)], k)
+    indicator_sums = cluster_sums(labels, indicators, k)
+
+    patterns = profile_patterns(mode)
+    for cluster in np.argsort(-sizes, kind="stable"):
+        size = int(sizes[cluster])
+        if size == 0:
+            continue
+        shares = indicator_sums[cluster] / size
+        majority = (shares >= 0.5).astype(int)
+        nearest, nearest_distance, mismatched = None, np.inf, []
+        for group, pattern in patterns.items():
+            defined = ~np.isnan(pattern)
+            distance = float(np.abs(shares[defined] - pattern[defined]).sum())
+            if distance < nearest_distance:
+                nearest, nearest_distance = group, distance
+                mismatched = [
+                    FarmAnalyzer.CLASSIFICATION_FIELDS[i]
+                    for i in np.flatnonzero(defined & (majority != np.nan_to_num(pattern)))
+                ]
+        centroid = metric_sums[cluster] / size * scale + mean
+        result["clusters"].append(
+            {
+                "cluster": len(result["clusters"]) + 1,
+                "farms": size,
+                "share": round(size / len(rows), 4),
+                "pattern": "".join(str(bit) for bit in majority),
+                "indicator_shares": dict(
+                    zip(FarmAnalyzer.CLASSIFICATION_FIELDS, np.round(shares, 3).tolist())
+                ),
+                "nearest_profile": nearest,
+                "profile_distance": round(nearest_distance, 3),
+                "mismatched_indicators": mismatched,
+                "mean_distance": round(float(distance_sums[cluster] / size), 3),
+                "centroid": dict(zip(fields, np.round(centroid, 3).tolist())),
+            }
+        )
+
+    result["iterations"] = iterations
+    logger.info(
+        f"Clustered {len(rows)} unclassified farms ({mode}) into {len(result['clusters'])} "
+        f"clusters in {iterations} iterations"
+    )
+    return result
@@ -0,0 +1,411 @@
+"""
+Cross-mode classification comparison for MuKa farm data.
+
+This module classifies farms under several indicator modes in a single pass
+and reports where the modes agree and disagree: per-mode group counts,
+pairwise mode-by-mode crosstabs and the list of farms whose group assignment
+depends on the chosen mode.
+"""
+
+import logging
+from itertools import combinations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from muka_analysis.analyzer import FarmAnalyzer
+from muka_analysis.classifier import (
+    GROUP_LABELS,
+    N_GROUP_CODES,
+    N_PATTERNS,
+    UNCLASSIFIED_CODE,
+    FarmClassifier,
+)
+from muka_analysis.models import FarmData, IndicatorMode, ModeComparisonSummary
+
+logger = logging.getLogger(__name__)
+
+# Short mode aliases for Excel sheet names (limited to 31 characters)
+MODE_ABBREVIATIONS: Dict[str, str] = {
+    "6-indicators": "6",
+    "6-indicators-flex": "6f",
+    "4-indicators": "4",
+    "5-indicators": "5",
+    "5-indicators-flex": "5f",
+}
+
+# Excel worksheets hold at most 1,048,576 rows including the header
+EXCEL_MAX_DATA_ROWS: int = 1_048_575
+
+
+class ModeComparator:
+    """
+    Classify farms with several indicator modes at once and compare results.
+
+    Every farm's six binary indicators are encoded once as a pattern code;
+    each mode is then a single table lookup over all farms. Crosstabs are
+    computed with ``np.bincount`` over combined group codes and disagreeing
+    farms are found with a vectorized inequality mask, so no per-farm Python
+    work is needed after the indicators have been extracted.
+    """
+
+    def __init__(
+        self,
+        tvd: np.ndarray,
+        year: np.ndarray,
+        indicators: np.ndarray,
+        modes: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Initialize the comparator and classify all farms with every mode.
+
+        Args:
+            tvd: Farm TVD numbers, one per farm
+            year: Data year, one per farm
+            indicators: Array of shape (n_farms, 6) with the binary indicators
+                in classification field order
+            modes: Indicator modes to compare, or None for all modes
+
+        Raises:
+            ValueError: If fewer than 2 modes are given, a mode is unknown,
+                or the input arrays have inconsistent lengths
+        """
+        if modes is None:
+            modes = [mode.value for mode in IndicatorMode]
+        if len(modes) < 2:
+            raise ValueError("Must compare at least 2 modes")
+
+        tvd = np.asarray(tvd)
+        year = np.asarray(year)
+        if not len(tvd) == len(year) == len(indicators):
+            raise ValueError(
+                f"Inconsistent input lengths: tvd={len(tvd)}, year={len(year)}, "
+                f"indicators={len(indicators)}"
+            )
+        if len(tvd) == 0:
+            raise ValueError("Cannot compare modes on an empty farm list")
+
+        self.modes: List[str] = list(modes)
+        self.tvd = tvd
+        self.year = year
+        self.patterns = FarmClassifier.encode_patterns(indicators)
+
+        self.mode_codes: Dict[str, np.ndarray] = {}
+        for mode in self.modes:
+            classifier = FarmClassifier(indicator_mode=mode)
+            self.mode_codes[mode] = classifier.classify_patterns(self.patterns)
+
+        logger.info(f"Classified {len(self.tvd)} farms with {len(self.modes)} indicator modes")
+
+    @classmethod
+    def from_farms(
+        cls, farms: List[FarmData], modes: Optional[List[str]] = None
+    ) -> "ModeComparator":
+        """
+        Create a comparator from validated FarmData objects.
+
+        Args:
+            farms: List of FarmData objects (group assignment is ignored)
+            modes: Indicator modes to compare, or None for all modes
+
+        Returns:
+            Initialized ModeComparator
+        """
+        tvd = np.fromiter((farm.tvd for farm in farms), dtype=np.int64, count=len(farms))
+        year = np.fromiter((farm.year for farm in farms), dtype=np.int32, count=len(farms))
+        indicators = np.array(
+            [
+                (
+                    farm.indicator_female_dairy_cattle_v2,
+                    farm.indicator_female_cattle,
+                    farm.indicator_calf_arrivals,
+                    farm.indicator_calf_leavings,
+                    farm.indicator_female_slaughterings,
+                    farm.indicator_young_slaughterings,
+                )
+                for farm in farms
+            ],
+            dtype=np.int8,
+        ).reshape(-1, len(FarmAnalyzer.CLASSIFICATION_FIELDS))
+        return cls(tvd, year, indicators, modes)
+
+    @classmethod
+    def from_dataframe(
+        cls, df: pd.DataFrame, modes: Optional[List[str]] = None
+    ) -> "ModeComparator":
+        """
+        Create a comparator from an analysis DataFrame.
+
+        Args:
+            df: DataFrame with 'tvd', 'year' and the FarmAnalyzer.CLASSIFICATION_FIELDS
+                columns (e.g. FarmAnalyzer.df)
+            modes: Indicator modes to compare, or None for all modes
+
+        Returns:
+            Initialized ModeComparator
+
+        Raises:
+            ValueError: If required columns are missing
+        """
+        required = ["tvd", "year"] + FarmAnalyzer.CLASSIFICATION_FIELDS
+        missing = [col for col in required if col not in df.columns]
+        if missing:
+            raise ValueError(f"Missing columns for mode comparison: {missing}")
+
+        return cls(
+            df["tvd"].to_numpy(),
+            df["year"].to_numpy(),
+            df[FarmAnalyzer.CLASSIFICATION_FIELDS].to_numpy(dtype=np.int8),
+            modes,
+        )
+
+    @property
+    def total_farms(self) -> int:
+        """Number of farms being compared."""
+        return len(self.tvd)
+
+    def _check_mode(self, mode: str) -> None:
+        """Raise ValueError if the mode is not part of this comparison."""
+        if mode not in self.mode_codes:
+            raise ValueError(f"Mode '{mode}' is not part of this comparison: {self.modes}")
+
+    def get_group_counts(self, mode: str) -> Dict[str, int]:
+        """
+        Get farm counts per group for one mode.
+
+        Args:
+            mode: Indicator mode name
+
+        Returns:
+            Dictionary mapping group names (including 'Unclassified') to counts,
+            omitting groups without farms
+        """
+        self._check_mode(mode)
+        counts = np.bincount(self.mode_codes[mode], minlength=N_GROUP_CODES)
+        return {GROUP_LABELS[code]: int(count) for code, count in enumerate(counts) if count > 0}
+
+    def classified_count(self, mode: str) -> int:
+        """
+        Get the number of classified farms for one mode.
+
+        Args:
+            mode: Indicator mode name
+
+        Returns:
+            Number of farms assigned to a group
+        """
+        self._check_mode(mode)
+        return int(np.count_nonzero(self.mode_codes[mode] != UNCLASSIFIED_CODE))
+
+    def crosstab(self, mode_a: str, mode_b: str) -> pd.DataFrame:
+        """
+        Build the group-by-group crosstab of two modes.
+
+        Args:
+            mode_a: Mode shown on the rows
+            mode_b: Mode shown on the columns
+
+        Returns:
+            DataFrame of farm counts with one row per group of mode_a and one
+            column per group of mode_b (including 'Unclassified')
+
+        Example:
+            >>> comparator.crosstab("6-indicators", "4-indicators").loc["Unclassified", "Muku"]
+            1234
+        """
+        self._check_mode(mode_a)
+        self._check_mode(mode_b)
+
+        combined = self.mode_codes[mode_a].astype(np.int32) * N_GROUP_CODES + self.mode_codes[
+            mode_b
+        ].astype(np.int32)
+        counts = np.bincount(combined, minlength=N_GROUP_CODES * N_GROUP_CODES)
+
+        table = pd.DataFrame(
+            counts.reshape(N_GROUP_CODES, N_GROUP_CODES),
+            index=pd.Index(GROUP_LABELS, name=mode_a),
+            columns=pd.Index(GROUP_LABELS, name=mode_b),
+        )
+        return table
+
+    def pairwise_crosstabs(self) -> Dict[Tuple[str, str], pd.DataFrame]:
+        """
+        Build crosstabs for every pair of compared modes.
+
+        Returns:
+            Dictionary mapping (mode_a, mode_b) to their crosstab
+        """
+        return {(a, b): self.crosstab(a, b) for a, b in combinations(self.modes, 2)}
+
+    def agreement_matrix(self) -> pd.DataFrame:
+        """
+        Calculate the share of farms assigned to the same group by each mode pair.
+
+        Returns:
+            Square DataFrame of agreement percentages (0-100) between modes
+        """
+        matrix = pd.DataFrame(100.0, index=self.modes, columns=self.modes)
+        for mode_a, mode_b in combinations(self.modes, 2):
+            same = np.count_nonzero(self.mode_codes[mode_a] == self.mode_codes[mode_b])
+            pct = same / self.total_farms * 100
+            matrix.loc[mode_a, mode_b] = pct
+            matrix.loc[mode_b, mode_a] = pct
+        return matrix
+
+    def disagreement_mask(self, modes: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Find farms whose group differs between at least two of the given modes.
+
+        Args:
+            modes: Modes to consider, or None for all compared modes
+
+        Returns:
+            Boolean array, True for farms with mode-dependent classification
+        """
+        modes = modes or self.modes
+        for mode in modes:
+            self._check_mode(mode)
+
+        reference = self.mode_codes[modes[0]]
+        mask = np.zeros(self.total_farms, dtype=bool)
+        for mode in modes[1:]:
+            mask |= self.mode_codes[mode] != reference
+        return mask
+
+    def disagreeing_farms(self, modes: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        List farms whose classification depends on the indicator mode.
+
+        Args:
+            modes: Modes to consider, or None for all compared modes
+
+        Returns:
+            DataFrame with 'tvd', 'year', 'pattern' (six indicator digits) and
+            one group column per mode
+        """
+        modes = modes or self.modes
+        rows = np.flatnonzero(self.disagreement_mask(modes))
+
+        pattern_strings = np.array(
+            ["".join(map(str, FarmClassifier.decode_pattern(p))) for p in range(N_PATTERNS)]
+        )
+        labels = np.array(GROUP_LABELS)
+
+        data: Dict[str, Any] = {
+            "tvd": self.tvd[rows],
+            "year": self.year[rows],
+            "pattern": pattern_strings[self.patterns[rows]],
+        }
+        for mode in modes:
+            data[mode] = labels[self.mode_codes[mode][rows]]
+
+        return pd.DataFrame(data)
+
+    def overview(self) -> pd.DataFrame:
+        """
+        Create a per-mode overview of classification results.
+
+        Returns:
+            DataFrame with one row per group plus classified/unclassified totals
+            and one column per mode
+        """
+        rows: List[Dict[str, Any]] = []
+        counts_by_mode = {mode: self.get_group_counts(mode) for mode in self.modes}
+
+        for label in GROUP_LABELS:
+            row: Dict[str, Any] = {"Group": label}
+            for mode in self.modes:
+                row[mode] = counts_by_mode[mode].get(label, 0)
+            rows.append(row)
+
+        classified_row: Dict[str, Any] = {"Group": "Classified"}
+        rate_row: Dict[str, Any] = {"Group": "Success Rate (%)"}
+        for mode in self.modes:
+            classified = self.classified_count(mode)
+            classified_row[mode] = classified
+            rate_row[mode] = round(classified / self.total_farms * 100, 1)
+        rows.extend([classified_row, rate_row])
+
+        return pd.DataFrame(rows)
+
+    def summary(self, max_farms: Optional[int] = None) -> ModeComparisonSummary:
+        """
+        Build a ModeComparisonSummary including the disagreeing farms.
+
+        Args:
+            max_farms: Maximum number of disagreeing farms to include, or None for all
+
+        Returns:
+            Populated ModeComparisonSummary
+        """
+        group_distribution = {mode: self.get_group_counts(mode) for mode in self.modes}
+        classified = {mode: self.classified_count(mode) for mode in self.modes}
+        mode_results = {
+            mode: {
+                "total_farms": self.total_farms,
+                "classified_count": classified[mode],
+                "unclassified_count": self.total_farms - classified[mode],
+                "group_counts": group_distribution[mode],
+            }
+            for mode in self.modes
+        }
+        success_rates = {mode: classified[mode] / self.total_farms * 100 for mode in self.modes}
+
+        different = self.disagreeing_farms()
+        if max_farms is not None:
+            different = different.head(max_farms)
+        farms = [
+            {str(key): value for key, value in record.items()}
+            for record in different.to_dict(orient="records")
+        ]
+
+        return ModeComparisonSummary(
+            modes=self.modes,
+            total_farms=self.total_farms,
+            mode_results=mode_results,
+            classification_success_rates=success_rates,
+            group_distribution_comparison=group_distribution,
+            farms_with_different_classifications=farms,
+        )
+
+    def export_to_excel(self, file_path: Path, include_farms: bool = True) -> None:
+        """
+        Export the comparison to an Excel workbook.
+
+        Args:
+            file_path: Output Excel file path
+            include_farms: Whether to include the list of disagreeing farms
+
+        Note:
+            Sheets included:
+            - Mode_Overview: Group counts and success rate per mode
+            - Agreement: Percentage of identical assignments per mode pair
+            - Crosstab_{a}_vs_{b}: Group-by-group crosstab for every mode pair
+              (modes abbreviated, e.g. '6f' for 6-indicators-flex)
+            - Different_Classifications: Farms with mode-dependent groups
+        """
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with pd.ExcelWriter(file_path, engine="openpyxl") as writer:
+            self.overview().to_excel(writer, sheet_name="Mode_Overview", index=False)
+            self.agreement_matrix().round(2).to_excel(writer, sheet_name="Agreement")
+
+            for (mode_a, mode_b), table in self.pairwise_crosstabs().items():
+                short_a = MODE_ABBREVIATIONS.get(mode_a, mode_a)
+                short_b = MODE_ABBREVIATIONS.get(mode_b, mode_b)
+                sheet_name = f"Crosstab_{short_a}_vs_{short_b}"[:31]
+                table.to_excel(writer, sheet_name=sheet_name)
+
+            if include_farms:
+                different = self.disagreeing_farms()
+                if len(different) > EXCEL_MAX_DATA_ROWS:
+                    logger.warning(
+                        f"{len(different)} disagreeing farms exceed the Excel row limit, "
+                        f"writing the first {EXCEL_MAX_DATA_ROWS}"
+                    )
+                    different = different.head(EXCEL_MAX_DATA_ROWS)
+                different.to_excel(writer, sheet_name="Different_Classifications", index=False)
+
+        logger.info(f"Exported mode comparison to {file_path}")
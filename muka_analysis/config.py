@@ -58,6 +58,10 @@ class PathsConfig(BaseModel):
         default=True,
         description="Include indicator mode name in output filenames",
     )
+    partial_output_file: str = Field(
+        default="partial_aggregate.npz",
+        description="Default filename for shard partial-aggregate files (analyze --shard)",
+    )
 
     @field_validator("csv_dir", "output_dir", mode="before")
     @classmethod
@@ -85,6 +89,20 @@ class PathsConfig(BaseModel):
         """Get full path to all-modes analysis output file."""
         return self.output_dir / self.all_modes_output_file
 
+    def get_partial_output_path(self, shard_index: int, n_shards: int) -> Path:
+        """
+        Get full path to the partial-aggregate file of one shard.
+
+        Args:
+            shard_index: 1-based shard number
+            n_shards: Total number of shards
+
+        Returns:
+            Path with the shard number included (e.g. partial_aggregate_2_of_8.npz)
+        """
+        base = Path(self.partial_output_file)
+        return self.output_dir / f"{base.stem}_{shard_index}_of_{n_shards}{base.suffix}"
+
     def get_classified_output_path_with_mode(self, mode: str) -> Path:
         """
         Get full path to classified output file with mode name.
@@ -185,6 +203,38 @@ class AnalysisConfig(BaseModel):
         description="Minimum number of farms in a group for reporting",
     )
 
+    # Quantile sketches in shard partial aggregates
+    sketch_relative_accuracy: float = Field(
+        default=0.01,
+        gt=0.0,
+        lt=1.0,
+        description="Relative accuracy of quantile sketches used for merged shard medians",
+    )
+
+    # Outlier detection (robust z-score within the farm's group)
+    outlier_threshold: float = Field(
+        default=3.5,
+        gt=0.0,
+        description="Robust z-score above which a farm's metric counts as an outlier",
+    )
+
+    # Mini-batch k-means clustering of unclassified farms
+    cluster_count: int = Field(
+        default=8,
+        ge=1,
+        description="Number of clusters of unclassified farms",
+    )
+    cluster_batch_size: int = Field(
+        default=4096,
+        ge=16,
+        description="Farms per mini-batch k-means iteration",
+    )
+    cluster_indicator_weight: float = Field(
+        default=2.0,
+        gt=0.0,
+        description="Weight of an indicator bit relative to one standard deviation of a metric",
+    )
+
     @field_validator("percentiles")
     @classmethod
     def validate_percentiles(cls, v: List[float]) -> List[float]:
@@ -307,6 +357,185 @@ class LoggingConfig(BaseModel):
         return v_upper
 
 
+class MCPConfig(BaseModel):
+    """Configuration for the MCP server."""
+
+    # Result cache for analytical tools
+    cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        ge=0,
+        description="Memory budget of the tool result cache in bytes (0 disables caching)",
+    )
+    cache_max_entries: int = Field(
+        default=512,
+        ge=1,
+        description="Maximum number of cached tool results",
+    )
+
+    # Start-up warm-up
+    warmup_wait_seconds: float = Field(
+        default=10.0,
+        ge=0.0,
+        description="Seconds a data tool waits for the start-up data load before "
+        "returning a warming-up status",
+    )
+
+    # Named datasets
+    dataset_memory_budget_bytes: int = Field(
+        default=2 * 1024 * 1024 * 1024,
+        ge=0,
+        description="Memory budget of all loaded datasets in bytes; least recently used "
+        "datasets are spilled to disk beyond it (0 disables the budget)",
+    )
+
+    # Binary snapshot of the classified data for fast restarts
+    use_disk_snapshot: bool = Field(
+        default=True,
+        description="Save the classified data as a memory-mapped snapshot and reuse it "
+        "on start-up while the source CSV and configuration are unchanged",
+    )
+    snapshot_dir: Optional[Path] = Field(
+        default=None,
+        description="Directory for data snapshots (default: <output_dir>/snapshots)",
+    )
+
+    # Large results as paged resources
+    inline_max_rows: int = Field(
+        default=200,
+        ge=1,
+        description="Tool results with larger tables are stored on the server and "
+        "returned as a muka://result/{id} resource reference",
+    )
+    resource_page_rows: int = Field(
+        default=500,
+        ge=1,
+        description="Default rows per page when reading a resource",
+    )
+    resource_max_page_rows: int = Field(
+        default=5000,
+        ge=1,
+        description="Maximum rows per page when reading a resource",
+    )
+    result_store_max_bytes: int = Field(
+        default=256 * 1024 * 1024,
+        ge=0,
+        description="Memory budget of stored large results in bytes (0 disables storing; "
+        "results are then always inlined)",
+    )
+    result_store_max_entries: int = Field(
+        default=64,
+        ge=1,
+        description="Maximum number of stored large results",
+    )
+
+    # Read-only SQL tool
+    sql_max_rows: int = Field(
+        default=1000,
+        ge=1,
+        description="Maximum rows returned by one sql_query call",
+    )
+    sql_timeout_seconds: float = Field(
+        default=5.0,
+        gt=0.0,
+        description="Seconds after which a sql_query statement is interrupted",
+    )
+
+    # Batch tool
+    batch_max_requests: int = Field(
+        default=20,
+        ge=1,
+        description="Maximum number of requests in one batch call",
+    )
+
+    # Background jobs (exports)
+    max_concurrent_jobs: int = Field(
+        default=1,
+        ge=1,
+        description="Maximum number of background jobs running at a time",
+    )
+    max_queued_jobs: int = Field(
+        default=8,
+        ge=0,
+        description="Maximum number of background jobs waiting to run",
+    )
+    job_history: int = Field(
+        default=50,
+        ge=1,
+        description="Number of finished jobs kept for get_job_status",
+    )
+    job_status_max_wait_seconds: float = Field(
+        default=30.0,
+        ge=0.0,
+        description="Maximum seconds get_job_status waits for a job to finish",
+    )
+
+    # Server metrics (get_server_metrics)
+    metrics_file: Optional[Path] = Field(
+        default=None,
+        description="JSON-lines file the server metrics are appended to (None: no dump)",
+    )
+    metrics_interval_seconds: float = Field(
+        default=60.0,
+        gt=0.0,
+        description="Seconds between two server metrics reports in metrics_file",
+    )
+
+    # Executor dispatch of tool handlers
+    executor_workers: int = Field(
+        default=4,
+        ge=1,
+        description="Threads for CPU-bound tool handlers (statistics, metrics, exports)",
+    )
+    lookup_workers: int = Field(
+        default=2,
+        ge=1,
+        description="Threads reserved for fast lookups (query_farms, get_farm_details)",
+    )
+    default_tool_concurrency: int = Field(
+        default=2,
+        ge=1,
+        description="Maximum concurrent calls of one tool",
+    )
+    tool_concurrency: Dict[str, int] = Field(
+        default={"calculate_custom_metric": 1, "export_analysis": 1},
+        description="Per-tool overrides of default_tool_concurrency",
+    )
+
+    # Time budgets and cost limits of read-only tools
+    default_time_budget_seconds: float = Field(
+        default=60.0,
+        ge=0.0,
+        description="Seconds after which a read-only tool call is stopped (0: no limit)",
+    )
+    tool_time_budgets: Dict[str, float] = Field(
+        default={"calculate_custom_metric": 30.0, "aggregate_by_field": 30.0},
+        description="Per-tool overrides of default_time_budget_seconds",
+    )
+    max_group_cost: float = Field(
+        default=1e10,
+        ge=0.0,
+        description="Largest rows x groups of a grouped metric or aggregation (0: no limit)",
+    )
+
+    @field_validator("tool_time_budgets")
+    @classmethod
+    def validate_tool_time_budgets(cls, v: Dict[str, float]) -> Dict[str, float]:
+        """Validate per-tool time budgets are not negative."""
+        for tool, budget in v.items():
+            if budget < 0:
+                raise ValueError(f"Time budget for '{tool}' must not be negative, got {budget}")
+        return v
+
+    @field_validator("tool_concurrency")
+    @classmethod
+    def validate_tool_concurrency(cls, v: Dict[str, int]) -> Dict[str, int]:
+        """Validate per-tool limits are positive."""
+        for tool, limit in v.items():
+            if limit < 1:
+                raise ValueError(f"Concurrency limit for '{tool}' must be at least 1, got {limit}")
+        return v
+
+
 class AppConfig(BaseSettings):
     """
     Main application configuration with all subsections.
@@ -334,6 +563,7 @@ class AppConfig(BaseSettings):
     validation: ValidationConfig = Field(default_factory=ValidationConfig)
     output: OutputConfig = Field(default_factory=OutputConfig)
     logging: LoggingConfig = Field(default_factory=LoggingConfig)
+    mcp: MCPConfig = Field(default_factory=MCPConfig)
 
     # Application metadata
     app_name: str = Field(
@@ -7,10 +7,12 @@ and error handling.
 
 import logging
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from muka_analysis.analyzer import FarmAnalyzer
 from muka_analysis.models import FarmData
 from muka_analysis.validators import DataValidator
 
@@ -25,6 +27,9 @@ class IOUtils:
     write results back to CSV files with proper validation and error handling.
     """
 
+    # Rows of a large Excel sheet written per step (see write_all_modes_excel)
+    EXCEL_CHUNK_ROWS: int = 20_000
+
     @staticmethod
     def read_csv(file_path: Path, validate: bool = True) -> pd.DataFrame:
         """
@@ -82,6 +87,181 @@ class IOUtils:
             logger.error(f"Unexpected error reading {file_path}: {e}")
             raise
 
+    @staticmethod
+    def row_to_farm_data(row: Mapping[str, Any]) -> FarmData:
+        """
+        Convert one input row to a validated FarmData object.
+
+        Args:
+            row: Row with the input CSV column names (e.g. from DataFrame.iterrows())
+
+        Returns:
+            Validated FarmData object (animal-year fields derived from day counts)
+
+        Raises:
+            ValueError: If a value cannot be converted or fails validation
+            KeyError: If a required column is missing
+        """
+        # Read n_days columns
+        n_days_dairy = float(row["n_days_female_age3_dairy"])
+        n_days_double = float(row["n_days_female_age3_double"])
+        n_days_dairydouble_v2 = float(row["n_days_female_age3_dairydouble_V2"])
+
+        # Calculate animalyear values (days / 365)
+        animalyear_dairy = n_days_dairy / 365.0
+        animalyear_double = n_days_double / 365.0
+        animalyear_dairydouble_v2 = n_days_dairydouble_v2 / 365.0
+
+        return FarmData(
+            tvd=int(row["tvd"]),
+            farm_type_name=str(row["farmTypeName"]),
+            year=int(row["Jahr"]),
+            n_animals_total=int(row["n_animals_total"]),
+            n_females_age3_dairy=int(row["n_females_age3_dairy"]),
+            n_days_female_age3_dairy=n_days_dairy,
+            n_days_female_age3_double=n_days_double,
+            n_days_female_age3_dairydouble_V2=n_days_dairydouble_v2,
+            animalyear_days_female_age3_dairy=animalyear_dairy,
+            animalyear_days_female_age3_double=animalyear_double,
+            animalyear_days_female_age3_dairydouble_V2=animalyear_dairydouble_v2,
+            prop_days_female_age3_dairy=float(row["prop_days_female_age3_dairy"]),
+            n_females_age3_total=int(row["n_females_age3_total"]),
+            n_total_entries_younger85=int(row["n_total_entries_younger85"]),
+            n_total_leavings_younger51=int(row["n_total_leavings_younger51"]),
+            n_females_younger731=int(row["n_females_younger731"]),
+            prop_females_slaughterings_younger731=float(
+                row["prop_females_slaughterings_younger731"]
+            ),
+            n_animals_from51_to730=int(row["n_animals_from51_to730"]),
+            indicator_female_dairy_cattle_v2=int(row["1_femaleDairyCattle_V2"]),
+            indicator_female_cattle=int(row["2_femaleCattle"]),
+            indicator_calf_arrivals=int(row["3_calf85Arrivals"]),
+            indicator_calf_leavings=int(row["5_calf51nonSlaughterLeavings"]),
+            indicator_female_slaughterings=int(row["6_female731Slaughterings"]),
+            indicator_young_slaughterings=int(row["7_young51to730Slaughterings"]),
+            group=None,
+        )
+
+    @staticmethod
+    def construct_trusted_farms(df: pd.DataFrame) -> List[FarmData]:
+        """
+        Build FarmData objects for pre-validated rows without per-object validation.
+
+        Performs the same conversions as row_to_farm_data(), column-wise, and
+        creates the objects with FarmData.model_construct(). Only call this for
+        rows accepted by DataValidator.validate_farm_records().
+
+        Args:
+            df: Rows that passed DataValidator.validate_farm_records()
+
+        Returns:
+            FarmData objects in row order, equal to what row_to_farm_data() returns
+        """
+
+        def as_int(column: str) -> List[int]:
+            values = df[column].to_numpy()
+            if not np.issubdtype(values.dtype, np.integer):
+                values = np.trunc(values.astype(np.float64)).astype(np.int64)
+            return values.tolist()
+
+        def as_float(column: str) -> np.ndarray:
+            return df[column].to_numpy(dtype=np.float64)
+
+        n_days_dairy = as_float("n_days_female_age3_dairy")
+        n_days_double = as_float("n_days_female_age3_double")
+        n_days_dairydouble_v2 = as_float("n_days_female_age3_dairydouble_V2")
+
+        columns: Dict[str, List[Any]] = {
+            "tvd": as_int("tvd"),
+            "farm_type_name": [str(v) for v in df["farmTypeName"].tolist()],
+            "year": as_int("Jahr"),
+            "n_animals_total": as_int("n_animals_total"),
+            "n_females_age3_dairy": as_int("n_females_age3_dairy"),
+            "n_days_female_age3_dairy": n_days_dairy.tolist(),
+            "n_days_female_age3_double": n_days_double.tolist(),
+            "n_days_female_age3_dairydouble_V2": n_days_dairydouble_v2.tolist(),
+            "animalyear_days_female_age3_dairy": (n_days_dairy / 365.0).tolist(),
+            "animalyear_days_female_age3_double": (n_days_double / 365.0).tolist(),
+            "animalyear_days_female_age3_dairydouble_V2": (n_days_dairydouble_v2 / 365.0).tolist(),
+            "prop_days_female_age3_dairy": as_float("prop_days_female_age3_dairy").tolist(),
+            "n_females_age3_total": as_int("n_females_age3_total"),
+            "n_total_entries_younger85": as_int("n_total_entries_younger85"),
+            "n_total_leavings_younger51": as_int("n_total_leavings_younger51"),
+            "n_females_younger731": as_int("n_females_younger731"),
+            "prop_females_slaughterings_younger731": as_float(
+                "prop_females_slaughterings_younger731"
+            ).tolist(),
+            "n_animals_from51_to730": as_int("n_animals_from51_to730"),
+            "indicator_female_dairy_cattle_v2": as_int("1_femaleDairyCattle_V2"),
+            "indicator_female_cattle": as_int("2_femaleCattle"),
+            "indicator_calf_arrivals": as_int("3_calf85Arrivals"),
+            "indicator_calf_leavings": as_int("5_calf51nonSlaughterLeavings"),
+            "indicator_female_slaughterings": as_int("6_female731Slaughterings"),
+            "indicator_young_slaughterings": as_int("7_young51to730Slaughterings"),
+        }
+
+        names = list(columns)
+        fields_set = set(names)
+        return [
+            FarmData.model_construct(_fields_set=set(fields_set), **dict(zip(names, values)))
+            for values in zip(*columns.values())
+        ]
+
+    @staticmethod
+    def convert_rows(df: pd.DataFrame) -> Tuple[List[FarmData], List[Any], List[str]]:
+        """
+        Convert DataFrame rows to FarmData objects, collecting per-row errors.
+
+        Rows accepted by DataValidator.validate_farm_records() are built without
+        per-object validation; all other rows go through row_to_farm_data() so
+        that invalid rows are reported with the usual Pydantic error messages.
+
+        Args:
+            df: DataFrame containing farm data
+
+        Returns:
+            Tuple of (farms, index labels of the converted rows, error messages),
+            farms in input row order
+        """
+        trusted = DataValidator.validate_farm_records(df)
+        converted: List[Optional[FarmData]] = [None] * len(df)
+        for pos, farm in zip(
+            np.flatnonzero(trusted).tolist(), IOUtils.construct_trusted_farms(df[trusted])
+        ):
+            converted[pos] = farm
+
+        errors: List[str] = []
+        for pos in np.flatnonzero(~trusted).tolist():
+            idx = df.index[pos]
+            try:
+                converted[pos] = IOUtils.row_to_farm_data(df.iloc[pos])
+            except Exception as e:
+                errors.append(f"Row {idx}: {str(e)}")
+
+        labels = [df.index[pos] for pos, farm in enumerate(converted) if farm is not None]
+        farms = [farm for farm in converted if farm is not None]
+        return farms, labels, errors
+
+    @staticmethod
+    def report_conversion_errors(errors: List[str], n_rows: int) -> None:
+        """
+        Log row conversion errors and fail if no row could be converted.
+
+        Args:
+            errors: Error messages from convert_rows()
+            n_rows: Number of rows that were converted
+
+        Raises:
+            ValueError: If every row failed
+        """
+        if not errors:
+            return
+        for error_msg in errors:
+            logger.error(error_msg)
+        logger.error(f"Failed to parse {len(errors)} rows out of {n_rows}")
+        if len(errors) == n_rows:
+            raise ValueError(f"Failed to parse all rows. First error: {errors[0]}")
+
     @staticmethod
     def dataframe_to_farm_data(df: pd.DataFrame) -> List[FarmData]:
         """
@@ -97,63 +277,12 @@ class IOUtils:
             ValueError: If data validation fails for any row
 
         Note:
-            This method uses Pydantic validation, so any data quality
-            issues will raise detailed validation errors.
+            Rows are validated in bulk first (DataValidator.validate_farm_records);
+            only rows failing the bulk check are validated one by one with
+            Pydantic, which raises the detailed validation errors.
         """
-        farms: List[FarmData] = []
-        errors: List[str] = []
-
-        for idx, row in df.iterrows():
-            try:
-                # Read n_days columns
-                n_days_dairy = float(row["n_days_female_age3_dairy"])
-                n_days_double = float(row["n_days_female_age3_double"])
-                n_days_dairydouble_v2 = float(row["n_days_female_age3_dairydouble_V2"])
-
-                # Calculate animalyear values (days / 365)
-                animalyear_dairy = n_days_dairy / 365.0
-                animalyear_double = n_days_double / 365.0
-                animalyear_dairydouble_v2 = n_days_dairydouble_v2 / 365.0
-
-                farm = FarmData(
-                    tvd=int(row["tvd"]),
-                    farm_type_name=str(row["farmTypeName"]),
-                    year=int(row["Jahr"]),
-                    n_animals_total=int(row["n_animals_total"]),
-                    n_females_age3_dairy=int(row["n_females_age3_dairy"]),
-                    n_days_female_age3_dairy=n_days_dairy,
-                    n_days_female_age3_double=n_days_double,
-                    n_days_female_age3_dairydouble_V2=n_days_dairydouble_v2,
-                    animalyear_days_female_age3_dairy=animalyear_dairy,
-                    animalyear_days_female_age3_double=animalyear_double,
-                    animalyear_days_female_age3_dairydouble_V2=animalyear_dairydouble_v2,
-                    prop_days_female_age3_dairy=float(row["prop_days_female_age3_dairy"]),
-                    n_females_age3_total=int(row["n_females_age3_total"]),
-                    n_total_entries_younger85=int(row["n_total_entries_younger85"]),
-                    n_total_leavings_younger51=int(row["n_total_leavings_younger51"]),
-                    n_females_younger731=int(row["n_females_younger731"]),
-                    prop_females_slaughterings_younger731=float(
-                        row["prop_females_slaughterings_younger731"]
-                    ),
-                    n_animals_from51_to730=int(row["n_animals_from51_to730"]),
-                    indicator_female_dairy_cattle_v2=int(row["1_femaleDairyCattle_V2"]),
-                    indicator_female_cattle=int(row["2_femaleCattle"]),
-                    indicator_calf_arrivals=int(row["3_calf85Arrivals"]),
-                    indicator_calf_leavings=int(row["5_calf51nonSlaughterLeavings"]),
-                    indicator_female_slaughterings=int(row["6_female731Slaughterings"]),
-                    indicator_young_slaughterings=int(row["7_young51to730Slaughterings"]),
-                )
-                farms.append(farm)
-
-            except Exception as e:
-                error_msg = f"Row {idx}: {str(e)}"
-                errors.append(error_msg)
-                logger.error(error_msg)
-
-        if errors:
-            logger.error(f"Failed to parse {len(errors)} rows out of {len(df)}")
-            if len(errors) == len(df):
-                raise ValueError(f"Failed to parse all rows. First error: {errors[0]}")
+        farms, _, errors = IOUtils.convert_rows(df)
+        IOUtils.report_conversion_errors(errors, len(df))
 
         logger.info(f"Successfully converted {len(farms)} rows to FarmData objects")
         return farms
@@ -340,15 +469,19 @@ class IOUtils:
         mode_results: Dict[str, Any],
         file_path: Path,
         comparison_summary: Optional[pd.DataFrame] = None,
+        progress: Optional[Callable[[int, int, str], None]] = None,
     ) -> None:
         """
         Write comprehensive Excel workbook with results from all indicator modes.
 
         Args:
             mode_results: Dictionary mapping mode names to their analysis results
-                Each result should contain: 'farms', 'summary_df', 'group_counts'
+                Each result should contain: 'summary_df', 'group_counts' and
+                either 'data_df' (classified farm data) or 'farms'
             file_path: Output Excel file path
             comparison_summary: Optional DataFrame with cross-mode comparison
+            progress: Optional callback(rows written, total rows, sheet name), called
+                before each sheet and every EXCEL_CHUNK_ROWS rows of large sheets
 
         Note:
             Creates a multi-sheet workbook with:
@@ -359,49 +492,50 @@ class IOUtils:
         """
         file_path.parent.mkdir(parents=True, exist_ok=True)
 
-        with pd.ExcelWriter(file_path, engine="openpyxl") as writer:
-            # Write comparison summary first (if provided)
-            if comparison_summary is not None:
-                comparison_summary.to_excel(writer, sheet_name="Comparison_Summary", index=False)
-                logger.info("Wrote Comparison_Summary sheet")
-
-            # Write sheets for each mode
-            for mode_name, results in mode_results.items():
-                # Data sheet
-                farms = results.get("farms", [])
-                if farms:
-                    farms_df = IOUtils.farm_data_to_dataframe(farms)
-                    sheet_name = f"Data_{mode_name}"
-                    farms_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                    logger.info(f"Wrote {sheet_name} sheet")
-
-                # Summary sheet
-                summary_df = results.get("summary_df")
-                if summary_df is not None and not summary_df.empty:
-                    sheet_name = f"Summary_{mode_name}"
-                    summary_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                    logger.info(f"Wrote {sheet_name} sheet")
-
-                # Group counts sheet
-                group_counts = results.get("group_counts")
-                if group_counts:
-                    counts_df = pd.DataFrame(list(group_counts.items()), columns=["Group", "Count"])
-                    # Sort by group name
-                    group_order = [
-                        "Muku",
-                        "Muku_Amme",
-                        "Milchvieh",
-                        "BKMmZ",
-                        "BKMoZ",
-                        "IKM",
-                        "Unclassified",
-                    ]
-                    counts_df["Group"] = pd.Categorical(
-                        counts_df["Group"], categories=group_order, ordered=True
+        # Sheets in workbook order: comparison summary first (if provided),
+        # then data, summary and group counts of each mode
+        sheets: List[Tuple[str, pd.DataFrame]] = []
+        if comparison_summary is not None:
+            sheets.append(("Comparison_Summary", comparison_summary))
+        for mode_name, results in mode_results.items():
+            # Data sheet (pre-built DataFrame or list of classified farms)
+            farms_df = results.get("data_df")
+            farms = results.get("farms", [])
+            if farms_df is None and farms:
+                farms_df = IOUtils.farm_data_to_dataframe(farms)
+            if farms_df is not None:
+                sheets.append((f"Data_{mode_name}", farms_df))
+
+            summary_df = results.get("summary_df")
+            if summary_df is not None and not summary_df.empty:
+                sheets.append((f"Summary_{mode_name}", summary_df))
+
+            group_counts = results.get("group_counts")
+            if group_counts:
+                sheets.append(
+                    (f"Counts_{mode_name}", FarmAnalyzer.group_counts_frame(group_counts))
+                )
+
+        total_rows = sum(len(df) for _, df in sheets)
+        written = 0
+        with open(file_path, "wb") as handle:
+            # The workbook is saved by close(); if writing is interrupted (e.g. by
+            # the progress callback), saving the incomplete workbook is skipped
+            writer = pd.ExcelWriter(handle, engine="openpyxl")
+            for sheet_name, df in sheets:
+                # Large sheets are written in chunks below the header row
+                for start in range(0, max(len(df), 1), IOUtils.EXCEL_CHUNK_ROWS):
+                    if progress is not None:
+                        progress(written + start, total_rows, sheet_name)
+                    df.iloc[start : start + IOUtils.EXCEL_CHUNK_ROWS].to_excel(
+                        writer,
+                        sheet_name=sheet_name,
+                        index=False,
+                        header=start == 0,
+                        startrow=start + 1 if start else 0,
                     )
-                    counts_df = counts_df.sort_values("Group").reset_index(drop=True)
-                    sheet_name = f"Counts_{mode_name}"
-                    counts_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                    logger.info(f"Wrote {sheet_name} sheet")
+                written += len(df)
+                logger.info(f"Wrote {sheet_name} sheet")
+            writer.close()
 
         logger.info(f"Successfully wrote all-modes Excel to {file_path}")
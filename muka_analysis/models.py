@@ -267,6 +267,20 @@ class FarmData(BaseModel):
             raise ValueError(f"Proportion must be between 0 and 1, got {v}")
         return v
 
+    def assign_group(self, group: Optional[FarmGroup]) -> None:
+        """
+        Set the classification result without re-running model validation.
+
+        Plain assignment (``farm.group = group``) re-validates the whole model
+        because of validate_assignment; the classifier only ever assigns a
+        FarmGroup or None, so this skips that work.
+
+        Args:
+            group: Assigned farm group, or None if unclassified
+        """
+        self.__dict__["group"] = group.value if isinstance(group, FarmGroup) else group
+        self.__pydantic_fields_set__.add("group")
+
     class Config:
         """Pydantic model configuration."""
 
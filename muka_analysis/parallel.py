@@ -0,0 +1,439 @@
+"""
+Process-pool execution of the analysis pipeline.
+
+The input columns are copied once into POSIX shared memory
+(``multiprocessing.shared_memory``) and worker processes attach to them by
+name instead of receiving pickled row data. Work is split in two stages:
+
+1. Ingestion: the rows are partitioned by TVD hash or by year. Each worker
+   validates its partition into FarmData objects, writes the validated
+   values and indicator patterns into shared output arrays, and returns a
+   PartialAggregate of its farms together with its row errors.
+2. Analysis: the parent merges the partial aggregates (counts, sums, min,
+   max). Exact medians are computed by one task per numeric field over the
+   shared validated values.
+
+The results equal a sequential ``analyze`` run with the same mode.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from muka_analysis.analyzer import FarmAnalyzer
+from muka_analysis.classifier import GROUP_LABELS, N_PATTERNS, FarmClassifier
+from muka_analysis.io_utils import IOUtils
+from muka_analysis.models import FarmGroup
+from muka_analysis.partials import INTEGER_FIELDS, PartialAggregate, shard_of
+from muka_analysis.validators import DataValidator
+
+logger = logging.getLogger(__name__)
+
+PARTITION_SCHEMES: List[str] = ["tvd", "year"]
+
+# Input columns read by IOUtils.row_to_farm_data (farmTypeName is factorized)
+INPUT_NUMERIC_COLUMNS: List[str] = DataValidator.NUMERIC_COLUMNS + [
+    "6_female731Slaughterings",
+    "7_young51to730Slaughterings",
+]
+
+# Input indicator columns in FarmAnalyzer.CLASSIFICATION_FIELDS order
+INDICATOR_COLUMNS: List[str] = [
+    "1_femaleDairyCattle_V2",
+    "2_femaleCattle",
+    "3_calf85Arrivals",
+    "5_calf51nonSlaughterLeavings",
+    "6_female731Slaughterings",
+    "7_young51to730Slaughterings",
+]
+
+# Shared array specification: key -> (shared memory name, dtype, shape)
+ArraySpecs = Dict[str, Tuple[str, str, Tuple[int, ...]]]
+
+
+class SharedArrays:
+    """
+    Named numpy arrays backed by shared memory blocks owned by this process.
+
+    Use as a context manager; all blocks are unlinked on exit. Worker
+    processes attach with attach_arrays(specs).
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty collection."""
+        self._blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self.arrays: Dict[str, np.ndarray] = {}
+        self.specs: ArraySpecs = {}
+
+    def create(self, key: str, shape: Tuple[int, ...], dtype: Any) -> np.ndarray:
+        """
+        Allocate a zero-filled shared array.
+
+        Args:
+            key: Name of the array within this collection
+            shape: Array shape
+            dtype: numpy dtype
+
+        Returns:
+            Array view on the shared block
+        """
+        dtype = np.dtype(dtype)
+        nbytes = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        block = shared_memory.SharedMemory(create=True, size=nbytes)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array.fill(0)
+        self._blocks[key] = block
+        self.arrays[key] = array
+        self.specs[key] = (block.name, dtype.str, tuple(shape))
+        return array
+
+    def put(self, key: str, values: np.ndarray) -> np.ndarray:
+        """
+        Copy an array into shared memory.
+
+        Args:
+            key: Name of the array within this collection
+            values: Array to copy
+
+        Returns:
+            Shared copy of the array
+        """
+        array = self.create(key, values.shape, values.dtype)
+        array[...] = values
+        return array
+
+    def close(self) -> None:
+        """Release and unlink all shared blocks."""
+        self.arrays.clear()
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+        self._blocks.clear()
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def attach_arrays(
+    specs: ArraySpecs,
+) -> Tuple[Dict[str, np.ndarray], List[shared_memory.SharedMemory]]:
+    """
+    Attach to shared arrays created by another process.
+
+    Args:
+        specs: Array specifications from SharedArrays.specs
+
+    Returns:
+        Tuple of (arrays by key, attached blocks); close the blocks when done
+    """
+    arrays: Dict[str, np.ndarray] = {}
+    blocks: List[shared_memory.SharedMemory] = []
+    for key, (name, dtype, shape) in specs.items():
+        # Pool workers share the parent's resource tracker, so attaching does
+        # not create a second owner; the parent unlinks the blocks
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return arrays, blocks
+
+
+def _close_blocks(arrays: Dict[str, np.ndarray], blocks: List[shared_memory.SharedMemory]) -> None:
+    """Drop array views and close attached blocks."""
+    arrays.clear()
+    for block in blocks:
+        block.close()
+
+
+def partition_rows(
+    tvd: np.ndarray, year: np.ndarray, n_partitions: int, scheme: str = "tvd"
+) -> np.ndarray:
+    """
+    Assign input rows to partitions.
+
+    Args:
+        tvd: TVD number per row
+        year: Data year per row
+        n_partitions: Number of partitions
+        scheme: 'tvd' (hash of the TVD number, see partials.shard_of) or
+            'year' (whole years, balanced greedily by row count)
+
+    Returns:
+        Partition number (0-based) per row
+
+    Raises:
+        ValueError: If the scheme is unknown
+    """
+    if scheme == "tvd":
+        return shard_of(tvd, n_partitions)
+    if scheme != "year":
+        raise ValueError(
+            f"Unknown partition scheme '{scheme}' (use {', '.join(PARTITION_SCHEMES)})"
+        )
+
+    years, inverse, counts = np.unique(year, return_inverse=True, return_counts=True)
+    loads = np.zeros(n_partitions, dtype=np.int64)
+    year_partition = np.zeros(len(years), dtype=np.int64)
+    for year_idx in np.argsort(-counts, kind="stable"):
+        target = int(np.argmin(loads))
+        year_partition[year_idx] = target
+        loads[target] += counts[year_idx]
+    return year_partition[inverse]
+
+
+def _ingest_partition(
+    specs: ArraySpecs, farm_type_names: List[str], partition: int, n_partitions: int
+) -> Tuple[List[str], PartialAggregate]:
+    """
+    Worker task: validate one partition and aggregate its farms.
+
+    Args:
+        specs: Shared array specifications (inputs and outputs)
+        farm_type_names: Categories of the factorized farmTypeName column
+        partition: Partition number (0-based)
+        n_partitions: Total number of partitions
+
+    Returns:
+        Tuple of (row error messages, partial aggregate of the partition)
+    """
+    arrays, blocks = attach_arrays(specs)
+    try:
+        positions = np.flatnonzero(arrays["partition"] == partition)
+        type_codes = arrays["farmTypeName"][positions]
+        part_df = pd.DataFrame(
+            {column: arrays[column][positions] for column in INPUT_NUMERIC_COLUMNS},
+            index=positions,
+        )
+        part_df["farmTypeName"] = np.asarray(farm_type_names, dtype=object)[type_codes]
+
+        farms, valid_positions, errors = IOUtils.convert_rows(part_df)
+
+        farm_df = FarmAnalyzer.farms_to_dataframe(farms)
+        if farms:
+            valid = np.asarray(valid_positions, dtype=np.int64)
+            arrays["valid"][valid] = 1
+            arrays["pattern"][valid] = FarmClassifier.encode_patterns(
+                farm_df[FarmAnalyzer.CLASSIFICATION_FIELDS].to_numpy()
+            )
+            arrays["values"][valid] = farm_df[FarmAnalyzer.NUMERIC_FIELDS].to_numpy(
+                dtype=np.float64
+            )
+            arrays["tvd_out"][valid] = farm_df["tvd"].to_numpy()
+            arrays["year_out"][valid] = farm_df["year"].to_numpy()
+
+        partial = PartialAggregate.from_dataframe(
+            farm_df, shard_index=partition + 1, n_shards=n_partitions, n_rows=len(part_df)
+        )
+        return errors, partial
+    finally:
+        _close_blocks(arrays, blocks)
+
+
+def _field_medians(specs: ArraySpecs, lookup: np.ndarray, field_idx: int) -> np.ndarray:
+    """
+    Worker task: exact median of one numeric field per farm group.
+
+    Args:
+        specs: Shared array specifications
+        lookup: Pattern -> group code lookup of the analyzed mode
+        field_idx: Column of the shared 'values' array
+
+    Returns:
+        Median per group code (NaN for empty groups), length len(FarmGroup)
+    """
+    arrays, blocks = attach_arrays(specs)
+    try:
+        valid = arrays["valid"].astype(bool)
+        codes = lookup[arrays["pattern"][valid]]
+        values = arrays["values"][valid, field_idx]
+    finally:
+        _close_blocks(arrays, blocks)
+
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    counts = np.bincount(codes, minlength=len(GROUP_LABELS))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    medians = np.full(len(FarmGroup), np.nan)
+    for code in range(len(FarmGroup)):
+        if counts[code] > 0:
+            lower = starts[code] + (counts[code] - 1) // 2
+            upper = starts[code] + counts[code] // 2
+            medians[code] = (sorted_values[lower] + sorted_values[upper]) / 2
+    return medians
+
+
+class ParallelAnalysis:
+    """
+    Partitioned classify-and-analyze run on a process pool.
+
+    Attributes (after run()):
+        total_farms: Number of successfully validated farms
+        errors: Row error messages (same format as IOUtils.dataframe_to_farm_data)
+        group_counts: Farm counts per group
+        classified_count: Number of classified farms
+        detailed_stats: Detailed_Stats table
+        summary: Summary table
+        classified_df: Classified farm data in the layout of
+            IOUtils.farm_data_to_dataframe()
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        indicator_mode: Optional[str] = None,
+        partition_by: str = "tvd",
+    ) -> None:
+        """
+        Initialize the run.
+
+        Args:
+            workers: Number of worker processes (>= 1)
+            indicator_mode: Indicator mode, or None for the configured mode
+            partition_by: Partition scheme, 'tvd' or 'year'
+
+        Raises:
+            ValueError: If workers < 1 or the partition scheme is unknown
+        """
+        if workers < 1:
+            raise ValueError(f"Number of workers must be at least 1, got {workers}")
+        if partition_by not in PARTITION_SCHEMES:
+            raise ValueError(
+                f"Unknown partition scheme '{partition_by}' (use {', '.join(PARTITION_SCHEMES)})"
+            )
+        self.workers = workers
+        self.partition_by = partition_by
+        self.classifier = FarmClassifier(indicator_mode=indicator_mode)
+        self.mode = self.classifier.indicator_mode.value
+
+        self.total_farms = 0
+        self.errors: List[str] = []
+        self.group_counts: Dict[str, int] = {}
+        self.classified_count = 0
+        self.detailed_stats = pd.DataFrame()
+        self.summary = pd.DataFrame()
+        self.classified_df = pd.DataFrame()
+
+    def run(self, df: pd.DataFrame) -> "ParallelAnalysis":
+        """
+        Validate, classify and analyze a raw input DataFrame.
+
+        Args:
+            df: DataFrame from IOUtils.read_csv()
+
+        Returns:
+            self, with result attributes populated
+
+        Raises:
+            ValueError: If required columns are missing or no row can be parsed
+        """
+        missing = [c for c in INPUT_NUMERIC_COLUMNS + ["farmTypeName"] if c not in df.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+        n_rows = len(df)
+        with SharedArrays() as shared, ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for column in INPUT_NUMERIC_COLUMNS:
+                values = df[column].to_numpy()
+                if not np.issubdtype(values.dtype, np.number):
+                    values = pd.to_numeric(df[column], errors="coerce").to_numpy()
+                shared.put(column, values)
+            type_codes, farm_type_names = pd.factorize(df["farmTypeName"].astype(str))
+            shared.put("farmTypeName", type_codes.astype(np.int32))
+
+            tvd = pd.to_numeric(df["tvd"], errors="coerce").fillna(0).to_numpy(np.int64)
+            year = pd.to_numeric(df["Jahr"], errors="coerce").fillna(0).to_numpy(np.int64)
+            n_partitions = self.workers
+            if self.partition_by == "year":
+                n_partitions = max(1, min(self.workers, len(np.unique(year))))
+            shared.put("partition", partition_rows(tvd, year, n_partitions, self.partition_by))
+
+            shared.create("valid", (n_rows,), np.uint8)
+            shared.create("pattern", (n_rows,), np.uint8)
+            shared.create("values", (n_rows, len(FarmAnalyzer.NUMERIC_FIELDS)), np.float64)
+            shared.create("tvd_out", (n_rows,), np.int64)
+            shared.create("year_out", (n_rows,), np.int64)
+
+            # Stage 1: partitioned validation and aggregation
+            logger.info(
+                f"Ingesting {n_rows} rows in {n_partitions} partitions "
+                f"(by {self.partition_by}) on {self.workers} workers"
+            )
+            futures = [
+                pool.submit(_ingest_partition, shared.specs, list(farm_type_names), p, n_partitions)
+                for p in range(n_partitions)
+            ]
+            partials = []
+            for future in futures:
+                errors, partial = future.result()
+                self.errors.extend(errors)
+                partials.append(partial)
+
+            IOUtils.report_conversion_errors(self.errors, n_rows)
+            merged = PartialAggregate.merge(partials)
+
+            # Stage 2: exact medians, one task per numeric field
+            lookup = self.classifier.pattern_lookup
+            median_futures = [
+                pool.submit(_field_medians, shared.specs, lookup, j)
+                for j in range(len(FarmAnalyzer.NUMERIC_FIELDS))
+            ]
+            medians = {
+                field: future.result()
+                for field, future in zip(FarmAnalyzer.NUMERIC_FIELDS, median_futures)
+            }
+
+            self.total_farms = merged.total_farms
+            self.group_counts = merged.get_group_counts(self.mode)
+            self.classified_count = merged.classified_count(self.mode)
+            self.detailed_stats = merged.calculate_group_statistics(
+                self.mode, exact_medians=medians
+            )
+            self.summary = FarmAnalyzer.summarize_statistics(self.detailed_stats)
+            self.classified_df = self._build_classified_frame(shared.arrays, farm_type_names)
+
+        logger.info(f"Parallel analysis finished: {self.total_farms} farms, mode {self.mode}")
+        return self
+
+    def _build_classified_frame(
+        self, arrays: Dict[str, np.ndarray], farm_type_names: pd.Index
+    ) -> pd.DataFrame:
+        """
+        Build the classified output table from the shared validated values.
+
+        Args:
+            arrays: Shared arrays (parent views)
+            farm_type_names: Categories of the factorized farmTypeName column
+
+        Returns:
+            DataFrame in the layout of IOUtils.farm_data_to_dataframe()
+        """
+        valid = np.flatnonzero(arrays["valid"])
+        values = arrays["values"][valid]
+        numeric = {field: values[:, j] for j, field in enumerate(FarmAnalyzer.NUMERIC_FIELDS)}
+        patterns = arrays["pattern"][valid]
+        indicators = np.array(
+            [FarmClassifier.decode_pattern(p) for p in range(N_PATTERNS)], dtype=np.int64
+        )[patterns]
+        codes = self.classifier.pattern_lookup[patterns]
+
+        data: Dict[str, Any] = {
+            "tvd": arrays["tvd_out"][valid].copy(),
+            "farmTypeName": np.asarray(farm_type_names, dtype=object)[
+                arrays["farmTypeName"][valid]
+            ],
+            "Jahr": arrays["year_out"][valid].copy(),
+        }
+        for field in FarmAnalyzer.NUMERIC_FIELDS:
+            column = numeric[field]
+            data[field] = column.astype(np.int64) if field in INTEGER_FIELDS else column.copy()
+        for j, name in enumerate(INDICATOR_COLUMNS):
+            data[name] = indicators[:, j]
+        data["group"] = np.asarray(GROUP_LABELS, dtype=object)[codes]
+        return pd.DataFrame(data)
@@ -0,0 +1,630 @@
+"""
+Mergeable partial aggregates for sharded (multi-node) analysis.
+
+A large extract can be split by TVD hash into N shards that are analyzed on
+different machines. Each shard produces a compact PartialAggregate holding,
+per 6-bit indicator pattern, the farm count and per-field sums, sums of
+squares, minima, maxima and a quantile sketch. Because a farm's group under
+any indicator mode depends only on its pattern, these pattern cells can be
+merged and then re-assembled into the per-(mode, group) Summary,
+Detailed_Stats and Group_Counts tables of FarmAnalyzer.
+
+Counts, minima and maxima of the merged result are exact; means are exact up
+to floating-point summation order. Medians are estimated from the merged
+quantile sketches with the configured relative accuracy.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from muka_analysis.analyzer import FarmAnalyzer, MultiModeAnalyzer
+from muka_analysis.classifier import GROUP_LABELS, N_PATTERNS, UNCLASSIFIED_CODE, FarmClassifier
+from muka_analysis.config import get_config
+from muka_analysis.models import FarmData, FarmGroup, IndicatorMode
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout of partial-aggregate files changes
+PARTIAL_FORMAT_VERSION: int = 1
+
+# Numeric fields stored as integers on FarmData (min/max are reported as int)
+INTEGER_FIELDS: List[str] = [
+    field for field in FarmAnalyzer.NUMERIC_FIELDS if FarmData.model_fields[field].annotation is int
+]
+
+
+def parse_shard_spec(spec: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification of the form 'i/N'.
+
+    Args:
+        spec: Shard specification, 1-based (e.g. '2/8' for the second of 8 shards)
+
+    Returns:
+        Tuple of (shard_index, n_shards)
+
+    Raises:
+        ValueError: If the specification is malformed or out of range
+
+    Example:
+        >>> parse_shard_spec("2/8")
+        (2, 8)
+    """
+    try:
+        index_str, total_str = spec.split("/")
+        shard_index, n_shards = int(index_str), int(total_str)
+    except ValueError:
+        raise ValueError(f"Invalid shard specification '{spec}' (expected i/N, e.g. 2/8)")
+
+    if n_shards < 1 or not 1 <= shard_index <= n_shards:
+        raise ValueError(f"Invalid shard specification '{spec}': need 1 <= i <= N")
+    return shard_index, n_shards
+
+
+def shard_of(tvd: np.ndarray, n_shards: int) -> np.ndarray:
+    """
+    Assign farms to shards by a deterministic hash of their TVD number.
+
+    Uses the SplitMix64 finalizer so that consecutive TVD numbers spread
+    evenly and every machine computes the same assignment.
+
+    Args:
+        tvd: Farm TVD numbers
+        n_shards: Total number of shards
+
+    Returns:
+        0-based shard number per farm
+    """
+    x = np.asarray(tvd, dtype=np.int64).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+    return (x % np.uint64(n_shards)).astype(np.int64)
+
+
+def select_shard(df: pd.DataFrame, shard_index: int, n_shards: int) -> pd.DataFrame:
+    """
+    Select the input rows belonging to one shard.
+
+    Args:
+        df: Raw input DataFrame with a 'tvd' column
+        shard_index: 1-based shard number
+        n_shards: Total number of shards
+
+    Returns:
+        Rows of the shard (rows with a non-numeric TVD all go to the shard of TVD 0,
+        where they fail FarmData validation as usual)
+    """
+    tvd = pd.to_numeric(df["tvd"], errors="coerce").fillna(0).astype(np.int64)
+    return df[shard_of(tvd.to_numpy(), n_shards) == shard_index - 1]
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch with relative-error guarantees.
+
+    Non-negative values are mapped to bucket keys ``ceil(log_gamma(v))`` with
+    ``gamma = (1 + a) / (1 - a)``; the representative value of a bucket is
+    within relative error ``a`` of every value it holds. Zeros get a dedicated
+    bucket. Sketches are stored as (key, count) pairs, so merging is a sum of
+    counts per key.
+    """
+
+    ZERO_KEY: int = int(np.iinfo(np.int32).min)
+
+    def __init__(self, relative_accuracy: float) -> None:
+        """
+        Initialize the key mapping.
+
+        Args:
+            relative_accuracy: Maximum relative error of quantile estimates (0 < a < 1)
+
+        Raises:
+            ValueError: If relative_accuracy is out of range
+        """
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError(f"Relative accuracy must be in (0, 1), got {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+
+    def keys(self, values: np.ndarray) -> np.ndarray:
+        """
+        Map values to bucket keys.
+
+        Args:
+            values: Non-negative values
+
+        Returns:
+            int32 bucket key per value
+
+        Raises:
+            ValueError: If any value is negative or missing
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if np.any(~(values >= 0)):
+            raise ValueError("Quantile sketch only supports non-negative values")
+        keys = np.full(len(values), self.ZERO_KEY, dtype=np.int32)
+        positive = values > 0
+        keys[positive] = np.ceil(np.log(values[positive]) / self._log_gamma).astype(np.int32)
+        return keys
+
+    def values(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Map bucket keys back to representative values.
+
+        Args:
+            keys: Bucket keys
+
+        Returns:
+            Representative value per key (0.0 for the zero bucket)
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        return np.where(
+            keys == self.ZERO_KEY,
+            0.0,
+            2.0 * np.power(self.gamma, keys.astype(np.float64)) / (self.gamma + 1.0),
+        )
+
+    @staticmethod
+    def quantile_key(keys: np.ndarray, counts: np.ndarray, k: int) -> int:
+        """
+        Find the bucket holding the k-th smallest value.
+
+        Args:
+            keys: Bucket keys (any order, duplicates allowed)
+            counts: Number of values per key entry
+            k: Zero-based order statistic
+
+        Returns:
+            Bucket key containing the k-th smallest value
+        """
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        cumulative = np.cumsum(np.bincount(inverse, weights=counts))
+        return int(unique_keys[np.searchsorted(cumulative, k + 1, side="left")])
+
+
+class PartialAggregate:
+    """
+    Mergeable per-pattern aggregate of the numeric farm fields.
+
+    Attributes:
+        fields: Aggregated numeric fields (FarmAnalyzer.NUMERIC_FIELDS order)
+        integer_fields: Fields whose min/max are reported as integers
+        relative_accuracy: Relative accuracy of the quantile sketches
+        n_shards: Number of shards the input was split into (1 = unsharded)
+        shards: 1-based shard numbers contained in this aggregate
+        n_rows: Input rows assigned to the contained shards (before parsing)
+        pattern_counts: Farm count per indicator pattern (the pattern histogram)
+        sums, sums_of_squares, minima, maxima: Arrays of shape (64, n_fields);
+            minima/maxima are +inf/-inf for patterns without farms
+        sketch_field, sketch_pattern, sketch_key, sketch_count: Quantile sketch
+            buckets per (field, pattern) in coordinate form
+    """
+
+    def __init__(
+        self,
+        fields: List[str],
+        integer_fields: List[str],
+        relative_accuracy: float,
+        n_shards: int,
+        shards: List[int],
+        n_rows: int,
+        pattern_counts: np.ndarray,
+        sums: np.ndarray,
+        sums_of_squares: np.ndarray,
+        minima: np.ndarray,
+        maxima: np.ndarray,
+        sketch_field: np.ndarray,
+        sketch_pattern: np.ndarray,
+        sketch_key: np.ndarray,
+        sketch_count: np.ndarray,
+    ) -> None:
+        """
+        Initialize from already aggregated arrays.
+
+        Use from_dataframe(), merge() or load() instead of calling this directly.
+        """
+        self.fields = list(fields)
+        self.integer_fields = list(integer_fields)
+        self.relative_accuracy = relative_accuracy
+        self.n_shards = n_shards
+        self.shards = sorted(shards)
+        self.n_rows = n_rows
+        self.pattern_counts = pattern_counts
+        self.sums = sums
+        self.sums_of_squares = sums_of_squares
+        self.minima = minima
+        self.maxima = maxima
+        self.sketch_field = sketch_field
+        self.sketch_pattern = sketch_pattern
+        self.sketch_key = sketch_key
+        self.sketch_count = sketch_count
+        self.sketch = QuantileSketch(relative_accuracy)
+        self._lookups: Dict[str, np.ndarray] = {}
+
+    @property
+    def total_farms(self) -> int:
+        """Number of farms aggregated."""
+        return int(self.pattern_counts.sum())
+
+    @property
+    def missing_shards(self) -> List[int]:
+        """1-based shard numbers not (yet) contained in this aggregate."""
+        return [i for i in range(1, self.n_shards + 1) if i not in self.shards]
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        df: pd.DataFrame,
+        shard_index: int = 1,
+        n_shards: int = 1,
+        n_rows: Optional[int] = None,
+        relative_accuracy: Optional[float] = None,
+    ) -> "PartialAggregate":
+        """
+        Aggregate an analysis DataFrame into per-pattern cells.
+
+        Args:
+            df: Analysis DataFrame with FarmAnalyzer.CLASSIFICATION_FIELDS and
+                FarmAnalyzer.NUMERIC_FIELDS columns (e.g. FarmAnalyzer.df);
+                may be empty for a shard without farms
+            shard_index: 1-based shard number of the data
+            n_shards: Total number of shards
+            n_rows: Input rows assigned to this shard (defaults to len(df))
+            relative_accuracy: Sketch accuracy, or None for the configured value
+
+        Returns:
+            PartialAggregate for the given farms
+        """
+        if relative_accuracy is None:
+            relative_accuracy = get_config().analysis.sketch_relative_accuracy
+
+        fields = list(FarmAnalyzer.NUMERIC_FIELDS)
+        integer_fields = list(INTEGER_FIELDS)
+        sketch = QuantileSketch(relative_accuracy)
+
+        n_fields = len(fields)
+        if len(df) > 0:
+            patterns = FarmClassifier.encode_patterns(
+                df[FarmAnalyzer.CLASSIFICATION_FIELDS].to_numpy()
+            ).astype(np.int64)
+        else:
+            patterns = np.zeros(0, dtype=np.int64)
+        pattern_counts = np.bincount(patterns, minlength=N_PATTERNS).astype(np.int64)
+
+        sums = np.zeros((N_PATTERNS, n_fields), dtype=np.float64)
+        sums_of_squares = np.zeros((N_PATTERNS, n_fields), dtype=np.float64)
+        minima = np.full((N_PATTERNS, n_fields), np.inf)
+        maxima = np.full((N_PATTERNS, n_fields), -np.inf)
+        sketch_parts: List[np.ndarray] = []
+
+        for j, field in enumerate(fields):
+            values = df[field].to_numpy(dtype=np.float64) if len(df) > 0 else np.zeros(0)
+            sums[:, j] = np.bincount(patterns, weights=values, minlength=N_PATTERNS)
+            sums_of_squares[:, j] = np.bincount(
+                patterns, weights=values * values, minlength=N_PATTERNS
+            )
+            np.minimum.at(minima[:, j], patterns, values)
+            np.maximum.at(maxima[:, j], patterns, values)
+            sketch_parts.append(cls._encode_cells(j, patterns, sketch.keys(values)))
+
+        combined = np.concatenate(sketch_parts) if sketch_parts else np.zeros(0, np.int64)
+        cells, counts = np.unique(combined, return_counts=True)
+        sketch_field, sketch_pattern, sketch_key = cls._decode_cells(cells)
+
+        logger.info(
+            f"Aggregated {len(df)} farms of shard {shard_index}/{n_shards} "
+            f"into {int((pattern_counts > 0).sum())} indicator patterns"
+        )
+        return cls(
+            fields=fields,
+            integer_fields=integer_fields,
+            relative_accuracy=relative_accuracy,
+            n_shards=n_shards,
+            shards=[shard_index],
+            n_rows=len(df) if n_rows is None else n_rows,
+            pattern_counts=pattern_counts,
+            sums=sums,
+            sums_of_squares=sums_of_squares,
+            minima=minima,
+            maxima=maxima,
+            sketch_field=sketch_field,
+            sketch_pattern=sketch_pattern,
+            sketch_key=sketch_key,
+            sketch_count=counts.astype(np.int64),
+        )
+
+    @staticmethod
+    def _encode_cells(field_idx: Any, patterns: np.ndarray, keys: np.ndarray) -> np.ndarray:
+        """Pack (field, pattern, sketch key) into one sortable int64 per entry."""
+        key_offset = keys.astype(np.int64) - QuantileSketch.ZERO_KEY
+        return (np.int64(field_idx) << 40) | (patterns.astype(np.int64) << 32) | key_offset
+
+    @staticmethod
+    def _decode_cells(cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Inverse of _encode_cells()."""
+        sketch_field = (cells >> 40).astype(np.int16)
+        sketch_pattern = ((cells >> 32) & 0xFF).astype(np.uint8)
+        sketch_key = ((cells & 0xFFFFFFFF) + QuantileSketch.ZERO_KEY).astype(np.int32)
+        return sketch_field, sketch_pattern, sketch_key
+
+    @classmethod
+    def merge(cls, partials: List["PartialAggregate"]) -> "PartialAggregate":
+        """
+        Merge partial aggregates of disjoint shards.
+
+        Args:
+            partials: Partial aggregates of the same sharding scheme
+
+        Returns:
+            Combined PartialAggregate
+
+        Raises:
+            ValueError: If the list is empty, the partials are incompatible
+                (different shard count, fields or sketch accuracy) or a shard
+                occurs more than once
+        """
+        if not partials:
+            raise ValueError("No partial aggregates to merge")
+
+        first = partials[0]
+        shards: List[int] = []
+        for partial in partials:
+            if partial.n_shards != first.n_shards:
+                raise ValueError(
+                    f"Cannot merge partials of {first.n_shards} and {partial.n_shards} shards"
+                )
+            if partial.fields != first.fields:
+                raise ValueError("Cannot merge partials with different numeric fields")
+            if partial.relative_accuracy != first.relative_accuracy:
+                raise ValueError(
+                    f"Cannot merge sketches of relative accuracy {first.relative_accuracy} "
+                    f"and {partial.relative_accuracy}"
+                )
+            duplicates = set(shards) & set(partial.shards)
+            if duplicates:
+                raise ValueError(f"Shard(s) {sorted(duplicates)} occur more than once")
+            shards.extend(partial.shards)
+
+        combined = np.concatenate(
+            [cls._encode_cells(p.sketch_field, p.sketch_pattern, p.sketch_key) for p in partials]
+        )
+        cells, inverse = np.unique(combined, return_inverse=True)
+        counts = np.bincount(
+            inverse, weights=np.concatenate([p.sketch_count for p in partials])
+        ).astype(np.int64)
+        sketch_field, sketch_pattern, sketch_key = cls._decode_cells(cells)
+
+        logger.info(f"Merged {len(partials)} partial aggregates (shards {sorted(shards)})")
+        return cls(
+            fields=first.fields,
+            integer_fields=first.integer_fields,
+            relative_accuracy=first.relative_accuracy,
+            n_shards=first.n_shards,
+            shards=shards,
+            n_rows=sum(p.n_rows for p in partials),
+            pattern_counts=np.sum([p.pattern_counts for p in partials], axis=0),
+            sums=np.sum([p.sums for p in partials], axis=0),
+            sums_of_squares=np.sum([p.sums_of_squares for p in partials], axis=0),
+            minima=np.min([p.minima for p in partials], axis=0),
+            maxima=np.max([p.maxima for p in partials], axis=0),
+            sketch_field=sketch_field,
+            sketch_pattern=sketch_pattern,
+            sketch_key=sketch_key,
+            sketch_count=counts,
+        )
+
+    def save(self, file_path: Path) -> None:
+        """
+        Write the aggregate to a compressed .npz file.
+
+        Args:
+            file_path: Output path (conventionally with .npz suffix)
+        """
+        metadata = {
+            "format_version": PARTIAL_FORMAT_VERSION,
+            "fields": self.fields,
+            "integer_fields": self.integer_fields,
+            "relative_accuracy": self.relative_accuracy,
+            "n_shards": self.n_shards,
+            "shards": self.shards,
+            "n_rows": self.n_rows,
+        }
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(file_path, "wb") as handle:
+            np.savez_compressed(
+                handle,
+                metadata=np.array(json.dumps(metadata)),
+                pattern_counts=self.pattern_counts,
+                sums=self.sums,
+                sums_of_squares=self.sums_of_squares,
+                minima=self.minima,
+                maxima=self.maxima,
+                sketch_field=self.sketch_field,
+                sketch_pattern=self.sketch_pattern,
+                sketch_key=self.sketch_key,
+                sketch_count=self.sketch_count,
+            )
+        logger.info(f"Saved partial aggregate to {file_path}")
+
+    @classmethod
+    def load(cls, file_path: Path) -> "PartialAggregate":
+        """
+        Read an aggregate written by save().
+
+        Args:
+            file_path: Path to the .npz file
+
+        Returns:
+            Loaded PartialAggregate
+
+        Raises:
+            ValueError: If the file is not a partial aggregate or has an
+                unsupported format version
+        """
+        with np.load(file_path, allow_pickle=False) as data:
+            if "metadata" not in data:
+                raise ValueError(f"{file_path} is not a partial-aggregate file")
+            metadata = json.loads(str(data["metadata"]))
+            if metadata.get("format_version") != PARTIAL_FORMAT_VERSION:
+                raise ValueError(
+                    f"{file_path} has format version {metadata.get('format_version')}, "
+                    f"expected {PARTIAL_FORMAT_VERSION}"
+                )
+            return cls(
+                fields=metadata["fields"],
+                integer_fields=metadata["integer_fields"],
+                relative_accuracy=metadata["relative_accuracy"],
+                n_shards=metadata["n_shards"],
+                shards=metadata["shards"],
+                n_rows=metadata["n_rows"],
+                pattern_counts=data["pattern_counts"],
+                sums=data["sums"],
+                sums_of_squares=data["sums_of_squares"],
+                minima=data["minima"],
+                maxima=data["maxima"],
+                sketch_field=data["sketch_field"],
+                sketch_pattern=data["sketch_pattern"],
+                sketch_key=data["sketch_key"],
+                sketch_count=data["sketch_count"],
+            )
+
+    def _lookup(self, mode: str) -> np.ndarray:
+        """Pattern -> group code lookup of an indicator mode."""
+        if mode not in self._lookups:
+            self._lookups[mode] = FarmClassifier(
+                indicator_mode=IndicatorMode(mode).value
+            ).pattern_lookup
+        return self._lookups[mode]
+
+    def _sketch_median(self, field_idx: int, members: np.ndarray, count: int) -> float:
+        """Estimate the median of a field over the farms of the given patterns."""
+        selected = (self.sketch_field == field_idx) & np.isin(self.sketch_pattern, members)
+        keys = self.sketch_key[selected]
+        counts = self.sketch_count[selected]
+        lower = QuantileSketch.quantile_key(keys, counts, (count - 1) // 2)
+        upper = QuantileSketch.quantile_key(keys, counts, count // 2)
+        return float(self.sketch.values(np.array([lower, upper])).mean())
+
+    def calculate_group_statistics(
+        self, mode: str, exact_medians: Optional[Dict[str, np.ndarray]] = None
+    ) -> pd.DataFrame:
+        """
+        Calculate descriptive statistics per farm group for one mode.
+
+        Args:
+            mode: Indicator mode name
+            exact_medians: Optional exact medians per field, indexed by group
+                code, replacing the sketch estimates (see muka_analysis.parallel)
+
+        Returns:
+            DataFrame in the layout of FarmAnalyzer.calculate_group_statistics();
+            unless exact_medians is given, medians are sketch estimates clamped
+            to the exact group min/max
+        """
+        lookup = self._lookup(mode)
+        present: List[int] = []
+        counts: List[int] = []
+        field_values: Dict[str, List[List[float]]] = {f: [[], [], [], []] for f in self.fields}
+
+        for code in range(len(FarmGroup)):
+            members = np.flatnonzero((lookup == code) & (self.pattern_counts > 0))
+            count = int(self.pattern_counts[members].sum())
+            if count == 0:
+                continue
+            present.append(code)
+            counts.append(count)
+            for j, field in enumerate(self.fields):
+                minimum = float(self.minima[members, j].min())
+                maximum = float(self.maxima[members, j].max())
+                if exact_medians is not None:
+                    median = float(exact_medians[field][code])
+                else:
+                    median = min(max(self._sketch_median(j, members, count), minimum), maximum)
+                stats = field_values[field]
+                stats[0].append(minimum)
+                stats[1].append(maximum)
+                stats[2].append(float(self.sums[members, j].sum()) / count)
+                stats[3].append(median)
+
+        if not present:
+            logger.warning(f"No classified farms found for mode {mode}")
+            return pd.DataFrame()
+
+        field_stats: Dict[str, Any] = {}
+        for field, (minima, maxima, means, medians) in field_values.items():
+            dtype = np.int64 if field in self.integer_fields else np.float64
+            field_stats[field] = (
+                np.array(minima).astype(dtype),
+                np.array(maxima).astype(dtype),
+                np.array(means),
+                np.array(medians),
+            )
+        return MultiModeAnalyzer.build_statistics_frame(
+            np.array(present), np.array(counts, dtype=np.int64), field_stats
+        )
+
+    def get_summary_by_group(self, mode: str) -> pd.DataFrame:
+        """
+        Get the condensed summary table for one mode.
+
+        Args:
+            mode: Indicator mode name
+
+        Returns:
+            DataFrame in the layout of FarmAnalyzer.get_summary_by_group()
+        """
+        return FarmAnalyzer.summarize_statistics(self.calculate_group_statistics(mode))
+
+    def get_group_counts(self, mode: str) -> Dict[str, int]:
+        """
+        Get count of farms in each group for one mode.
+
+        Args:
+            mode: Indicator mode name
+
+        Returns:
+            Dictionary mapping group names to farm counts
+        """
+        code_counts = np.bincount(
+            self._lookup(mode), weights=self.pattern_counts, minlength=len(GROUP_LABELS)
+        ).astype(np.int64)
+        return MultiModeAnalyzer.group_counts_dict(code_counts)
+
+    def classified_count(self, mode: str) -> int:
+        """
+        Get the number of farms assigned to a group in one mode.
+
+        Args:
+            mode: Indicator mode name
+
+        Returns:
+            Number of classified farms
+        """
+        return int(self.pattern_counts[self._lookup(mode) != UNCLASSIFIED_CODE].sum())
+
+    def export_summary_to_excel(self, file_path: str, mode_name: str) -> None:
+        """
+        Export the merged analysis with the same sheets as FarmAnalyzer.
+
+        Args:
+            file_path: Path to output Excel file
+            mode_name: Indicator mode to report (also used for sheet naming)
+        """
+        detailed_stats = self.calculate_group_statistics(mode_name)
+        FarmAnalyzer.write_summary_workbook(
+            file_path,
+            summary=FarmAnalyzer.summarize_statistics(detailed_stats),
+            detailed_stats=detailed_stats,
+            group_counts=self.get_group_counts(mode_name),
+            mode_name=mode_name,
+        )
+        logger.info(f"Exported merged analysis summary to {file_path} with mode {mode_name}")
@@ -0,0 +1,193 @@
+"""
+Nearest-neighbour search for similar farms.
+
+SimilarityIndex standardizes every numeric metric (FarmAnalyzer.NUMERIC_FIELDS)
+to zero mean and unit standard deviation and keeps the farms as float32
+vectors. A search computes the squared Euclidean distance of the query to
+every farm block by block,
+
+    |x - q|^2 = |x|^2 - 2 x.q + |q|^2
+
+(one matrix-vector product per block, with |x|^2 precomputed), and picks
+the k nearest with np.argpartition. The query is a farm of the data or a
+profile of some metrics only; profiles are compared on their metrics alone.
+
+Missing values are replaced by the field mean.
+"""
+
+import logging
+import warnings
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from muka_analysis.analyzer import FarmAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# Farms per block of a search; bounds the temporary memory of a query
+SEARCH_BLOCK_ROWS = 65_536
+
+
+class SimilarityIndex:
+    """
+    Standardized metric vectors of all farms for k-nearest-neighbour search.
+
+    Row positions are positions in the DataFrame the index was built from.
+
+    Attributes:
+        n_rows: Number of indexed rows
+        fields: Numeric fields of the vectors
+        mean: Mean of every field (float64)
+        scale: Standard deviation of every field (1.0 for constant fields)
+        vectors: float32 array of shape (n_rows, len(fields))
+        norms: Squared length of every vector (float32)
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        """
+        Build the index for a DataFrame.
+
+        Args:
+            df: Farm DataFrame as produced by FarmAnalyzer.farms_to_dataframe()
+        """
+        self.n_rows = len(df)
+        self.fields: List[str] = [f for f in FarmAnalyzer.NUMERIC_FIELDS if f in df.columns]
+
+        values = df[self.fields].to_numpy(dtype=np.float64)
+        with warnings.catch_warnings():
+            # Fields without values yield NaN statistics
+            warnings.simplefilter("ignore", RuntimeWarning)
+            self.mean = np.nan_to_num(np.nanmean(values, axis=0))
+            std = np.nan_to_num(np.nanstd(values, axis=0))
+        self.scale = np.where(std > 0, std, 1.0)
+
+        self.vectors = np.nan_to_num((values - self.mean) / self.scale).astype(np.float32)
+        self.norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+
+        logger.info(f"Built similarity index: {self.n_rows} rows, {len(self.fields)} fields")
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """
+        Export the index as flat arrays plus JSON-serializable metadata.
+
+        Returns:
+            Tuple of (arrays by name, metadata) accepted by from_arrays()
+        """
+        arrays = {
+            "mean": self.mean,
+            "scale": self.scale,
+            "vectors": self.vectors,
+            "norms": self.norms,
+        }
+        return arrays, {"n_rows": self.n_rows, "fields": self.fields}
+
+    @classmethod
+    def from_arrays(
+        cls, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]
+    ) -> "SimilarityIndex":
+        """
+        Restore an index exported with to_arrays() without rebuilding it.
+
+        Args:
+            arrays: Arrays by name from to_arrays() (e.g. memory-mapped)
+            metadata: Metadata from to_arrays()
+
+        Returns:
+            Restored SimilarityIndex
+        """
+        index = cls.__new__(cls)
+        index.n_rows = int(metadata["n_rows"])
+        index.fields = list(metadata["fields"])
+        index.mean = arrays["mean"]
+        index.scale = arrays["scale"]
+        index.vectors = arrays["vectors"]
+        index.norms = arrays["norms"]
+        return index
+
+    def iter_arrays(self) -> Iterator[np.ndarray]:
+        """Yield every array held by the index (for memory accounting)."""
+        yield from (self.mean, self.scale, self.vectors, self.norms)
+
+    def profile_query(self, profile: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Standardize a profile of metric values.
+
+        Args:
+            profile: Field -> value, for some or all fields
+
+        Returns:
+            Tuple of (columns of the given fields, standardized query values)
+
+        Raises:
+            ValueError: If the profile is empty, a field is unknown or a value is not a number
+        """
+        if not profile:
+            raise ValueError("Profile must give at least one metric")
+        columns = []
+        values = []
+        for field, value in profile.items():
+            if field not in self.fields:
+                raise ValueError(
+                    f"Unknown field '{field}'. Must be one of: {', '.join(self.fields)}"
+                )
+            try:
+                values.append(float(value))
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for '{field}': {value!r} is not a number")
+            columns.append(self.fields.index(field))
+        columns_array = np.array(columns, dtype=np.int64)
+        query = (np.array(values) - self.mean[columns_array]) / self.scale[columns_array]
+        return columns_array, query.astype(np.float32)
+
+    def search(
+        self,
+        query: np.ndarray,
+        columns: Optional[np.ndarray] = None,
+        k: int = 10,
+        mask: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k farms nearest to a standardized query.
+
+        Args:
+            query: Standardized query values (one per column)
+            columns: Columns the query covers, or None for all fields
+            k: Number of neighbours
+            mask: Boolean array over rows; only rows where it is True are
+                candidates (None: all rows)
+
+        Returns:
+            Tuple of (row positions, Euclidean distances), nearest first
+        """
+        query = np.asarray(query, dtype=np.float32)
+        full = columns is None or len(columns) == len(self.fields)
+        if full and columns is not None:
+            # Profiles may list all fields in any order
+            ordered = np.empty(len(self.fields), dtype=np.float32)
+            ordered[columns] = query
+            query = ordered
+
+        distances = np.empty(self.n_rows, dtype=np.float32)
+        query_norm = float(query @ query)
+        for start in range(0, self.n_rows, SEARCH_BLOCK_ROWS):
+            stop = min(start + SEARCH_BLOCK_ROWS, self.n_rows)
+            block = self.vectors[start:stop]
+            if full:
+                norms = self.norms[start:stop]
+            else:
+                block = block[:, columns]
+                norms = np.einsum("ij,ij->i", block, block)
+            distances[start:stop] = norms - 2.0 * (block @ query) + query_norm
+        if mask is not None:
+            distances[~mask] = np.inf
+
+        candidates = int(np.count_nonzero(np.isfinite(distances)))
+        k = max(min(k, candidates), 0)
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        positions = np.argpartition(distances, k - 1)[:k]
+        positions = positions[np.argsort(distances[positions], kind="stable")]
+        # Rounding can make squared distances of (near) duplicates slightly negative
+        return positions, np.sqrt(np.maximum(distances[positions].astype(np.float64), 0.0))
@@ -6,13 +6,60 @@ catch potential issues before processing.
 """
 
 import logging
+import operator
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from muka_analysis.models import FarmData
+
 logger = logging.getLogger(__name__)
 
+# Field type ('int', 'float', or None if the bulk check cannot mirror the field's
+# constraints) and its bounds as (comparison, bound) pairs
+FieldRule = Tuple[Optional[str], List[Tuple[Callable[[Any, Any], Any], float]]]
+
+# Bound constraints of Pydantic fields (ge=, gt=, le=, lt=) and the comparison a
+# valid value passes
+BOUND_COMPARISONS: Dict[str, Callable[[Any, Any], Any]] = {
+    "ge": operator.ge,
+    "gt": operator.gt,
+    "le": operator.le,
+    "lt": operator.lt,
+}
+
+
+def farm_field_rule(field: str) -> FieldRule:
+    """
+    Derive the bulk validation rule of a FarmData field from its model definition.
+
+    Args:
+        field: FarmData field name
+
+    Returns:
+        Tuple of (type, bounds); the type is None if the field's annotation or
+        constraints cannot be checked in bulk, so no row is trusted
+    """
+    info = FarmData.model_fields[field]
+    kind: Optional[str] = None
+    if info.annotation is int or info.annotation is float:
+        kind = info.annotation.__name__
+    bounds: List[Tuple[Callable[[Any, Any], Any], float]] = []
+    for constraint in info.metadata:
+        found = [
+            (compare, float(getattr(constraint, name)))
+            for name, compare in BOUND_COMPARISONS.items()
+            if getattr(constraint, name, None) is not None
+        ]
+        if not found:
+            kind = None
+        bounds.extend(found)
+    if kind is None:
+        logger.warning(f"FarmData field '{field}' cannot be validated in bulk")
+    return kind, bounds
+
 
 class DataValidator:
     """
@@ -72,6 +119,84 @@ class DataValidator:
         "5_calf51nonSlaughterLeavings",
     ]
 
+    # Input column and divisor each FarmData field is read from by
+    # IOUtils.row_to_farm_data: int(row[column]) or float(row[column]) / divisor
+    FARM_RECORD_COLUMNS: Dict[str, Tuple[str, float]] = {
+        "tvd": ("tvd", 1.0),
+        "year": ("Jahr", 1.0),
+        "n_animals_total": ("n_animals_total", 1.0),
+        "n_females_age3_dairy": ("n_females_age3_dairy", 1.0),
+        "n_days_female_age3_dairy": ("n_days_female_age3_dairy", 1.0),
+        "n_days_female_age3_double": ("n_days_female_age3_double", 1.0),
+        "n_days_female_age3_dairydouble_V2": ("n_days_female_age3_dairydouble_V2", 1.0),
+        "animalyear_days_female_age3_dairy": ("n_days_female_age3_dairy", 365.0),
+        "animalyear_days_female_age3_double": ("n_days_female_age3_double", 365.0),
+        "animalyear_days_female_age3_dairydouble_V2": (
+            "n_days_female_age3_dairydouble_V2",
+            365.0,
+        ),
+        "prop_days_female_age3_dairy": ("prop_days_female_age3_dairy", 1.0),
+        "n_females_age3_total": ("n_females_age3_total", 1.0),
+        "n_total_entries_younger85": ("n_total_entries_younger85", 1.0),
+        "n_total_leavings_younger51": ("n_total_leavings_younger51", 1.0),
+        "n_females_younger731": ("n_females_younger731", 1.0),
+        "prop_females_slaughterings_younger731": ("prop_females_slaughterings_younger731", 1.0),
+        "n_animals_from51_to730": ("n_animals_from51_to730", 1.0),
+        "indicator_female_dairy_cattle_v2": ("1_femaleDairyCattle_V2", 1.0),
+        "indicator_female_cattle": ("2_femaleCattle", 1.0),
+        "indicator_calf_arrivals": ("3_calf85Arrivals", 1.0),
+        "indicator_calf_leavings": ("5_calf51nonSlaughterLeavings", 1.0),
+        "indicator_female_slaughterings": ("6_female731Slaughterings", 1.0),
+        "indicator_young_slaughterings": ("7_young51to730Slaughterings", 1.0),
+    }
+
+    # FarmData field constraints derived from the model: field -> (type, bounds)
+    FARM_RECORD_RULES: Dict[str, FieldRule] = {
+        field: farm_field_rule(field) for field in FARM_RECORD_COLUMNS
+    }
+
+    @staticmethod
+    def validate_farm_records(df: pd.DataFrame) -> np.ndarray:
+        """
+        Check in bulk which rows satisfy every FarmData field constraint.
+
+        Rows passing this check can be turned into FarmData objects without
+        per-object validation (see IOUtils.dataframe_to_farm_data). The check is
+        conservative: rows it rejects are not necessarily invalid, they are
+        just built through the validating constructor, which reports the
+        actual error.
+
+        Args:
+            df: Input DataFrame (after validate_all)
+
+        Returns:
+            Boolean array, True for rows that are valid FarmData records
+        """
+        trusted = np.ones(len(df), dtype=bool)
+        if "farmTypeName" not in df.columns:
+            trusted[:] = False
+
+        for field, (kind, bounds) in DataValidator.FARM_RECORD_RULES.items():
+            col, divisor = DataValidator.FARM_RECORD_COLUMNS[field]
+            if kind is None or col not in df.columns or not pd.api.types.is_numeric_dtype(df[col]):
+                trusted[:] = False
+                break
+
+            values = df[col].to_numpy(dtype=np.float64)
+            ok = np.isfinite(values)
+            if kind == "int":
+                # int() truncates; stay within the exactly representable range
+                ok &= np.abs(values) < 2**53
+                values = np.trunc(values)
+            if divisor != 1.0:
+                values = values / divisor
+            for compare, bound in bounds:
+                ok &= compare(values, bound)
+            trusted &= ok
+
+        logger.info(f"Bulk record validation: {int(trusted.sum())} of {len(df)} rows trusted")
+        return trusted
+
     @staticmethod
     def validate_file_exists(file_path: Path) -> None:
         """
@@ -0,0 +1,99 @@
+"""
+Shared fixtures: a synthetic farm CSV loaded and classified by the MCP server.
+"""
+
+import asyncio
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mcp_server import server
+from muka_analysis.clustering import profile_patterns
+
+# Indicator columns of the input CSV
+INDICATOR_COLUMNS = [
+    "1_femaleDairyCattle_V2",
+    "2_femaleCattle",
+    "3_calf85Arrivals",
+    "5_calf51nonSlaughterLeavings",
+    "6_female731Slaughterings",
+    "7_young51to730Slaughterings",
+]
+
+
+def make_farm_frame(n_farms: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Create a synthetic input DataFrame with the CSV column names.
+
+    TVD numbers repeat, so many farms have rows for several years. Most
+    indicator patterns follow a group profile (6-indicators mode) and the
+    count metrics are heavy-tailed, so every group has outliers.
+    """
+    rng = np.random.default_rng(seed)
+    days = rng.uniform(0, 365 * 80, size=(n_farms, 3)).round(1)
+
+    def counts(median: float) -> np.ndarray:
+        return np.round(rng.lognormal(np.log(median), 0.8, n_farms)).astype(np.int64)
+
+    df = pd.DataFrame(
+        {
+            "tvd": 1_000_000 + rng.integers(0, n_farms // 2, n_farms),
+            "farmTypeName": rng.choice(["Milchproduktion", "Mutterkuhhaltung", "Mast"], n_farms),
+            "Jahr": rng.integers(2018, 2025, n_farms),
+            "n_animals_total": counts(150),
+            "n_females_age3_dairy": counts(40),
+            "n_days_female_age3_dairy": days[:, 0],
+            "n_days_female_age3_double": days[:, 1],
+            "n_days_female_age3_dairydouble_V2": days[:, 2],
+            "prop_days_female_age3_dairy": rng.uniform(0, 1, n_farms).round(3),
+            "n_females_age3_total": rng.integers(0, 150, n_farms),
+            "n_total_entries_younger85": counts(20),
+            "n_total_leavings_younger51": counts(20),
+            "n_females_younger731": rng.integers(0, 80, n_farms),
+            "prop_females_slaughterings_younger731": rng.uniform(0, 1, n_farms).round(3),
+            "n_animals_from51_to730": rng.integers(0, 200, n_farms),
+        }
+    )
+    profiles = np.array(list(profile_patterns("6-indicators").values()))
+    bits = profiles[rng.integers(0, len(profiles), n_farms)]
+    # Wildcards and one farm in five get random bits
+    random_bits = np.isnan(bits) | (rng.random(n_farms) < 0.2)[:, None]
+    bits[random_bits] = rng.integers(0, 2, int(random_bits.sum()))
+    for j, column in enumerate(INDICATOR_COLUMNS):
+        df[column] = bits[:, j].astype(np.int64)
+    return df
+
+
+@pytest.fixture(scope="session")
+def farm_csv(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Path of a synthetic farm CSV with 3000 rows."""
+    path = tmp_path_factory.mktemp("data") / "farms.csv"
+    make_farm_frame(3000).to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture(scope="session")
+def loaded_server(farm_csv: Path) -> Any:
+    """The server module with the synthetic farms loaded and classified."""
+    assert server.data_context.load_data(farm_csv)["success"]
+    assert server.data_context.classify_farms()["success"]
+    return server
+
+
+@pytest.fixture(scope="session")
+def farm_df(loaded_server: Any) -> pd.DataFrame:
+    """The analyzer DataFrame of the loaded farms."""
+    return loaded_server.data_context.snapshot.analyzer.df
+
+
+@pytest.fixture
+def call_tool() -> Callable[[Callable[[Dict[str, Any]], Awaitable[Any]], Dict[str, Any]], Any]:
+    """Run an async tool handler to completion."""
+
+    def run(handler: Callable[[Dict[str, Any]], Awaitable[Any]], arguments: Dict[str, Any]) -> Any:
+        return asyncio.run(handler(arguments))
+
+    return run
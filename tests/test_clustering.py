@@ -0,0 +1,38 @@
+"""
+Tests for clustering unclassified farms through the MCP tool.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict
+
+import pytest
+
+from muka_analysis.config import get_config
+
+
+def call(server: Any, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Call a tool the way an MCP client does, including result offloading."""
+    contents = asyncio.run(server.call_tool(name, arguments))
+    return json.loads(contents[0].text)
+
+
+@pytest.mark.parametrize("k", [get_config().mcp.inline_max_rows + 50, 100_000])
+def test_more_clusters_than_inline_rows(loaded_server, farm_df, k):
+    """Cluster lists longer than inline_max_rows are returned whole, not offloaded."""
+    n_unclassified = int(farm_df["group"].isna().sum())
+    assert n_unclassified > get_config().mcp.inline_max_rows
+
+    result = call(loaded_server, "cluster_unclassified_farms", {"k": k, "seed": 1})
+    assert "error" not in result, result
+    clusters = result["clusters"]
+    assert isinstance(clusters, list)
+    assert len(clusters) > get_config().mcp.inline_max_rows
+    assert sum(cluster["farms"] for cluster in clusters) == n_unclassified
+    assert all(isinstance(cluster["mismatched_indicators"], list) for cluster in clusters)
+
+
+def test_cluster_count_must_be_positive(loaded_server):
+    """k below 1 is an error."""
+    result = call(loaded_server, "cluster_unclassified_farms", {"k": 0})
+    assert "positive" in result["error"]
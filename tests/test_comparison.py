@@ -0,0 +1,48 @@
+"""
+Tests for the in-process indicator mode comparison.
+"""
+
+import numpy as np
+import pandas as pd
+
+from muka_analysis.classifier import FarmClassifier
+from muka_analysis.comparison import ModeComparator
+from tests.conftest import INDICATOR_COLUMNS, make_farm_frame
+
+
+def make_comparator() -> ModeComparator:
+    """Comparator over the synthetic farms in all modes."""
+    df = make_farm_frame(2000, seed=5)
+    return ModeComparator(
+        df["tvd"].to_numpy(), df["Jahr"].to_numpy(), df[INDICATOR_COLUMNS].to_numpy()
+    )
+
+
+def test_disagreeing_farms_match_per_mode_classification():
+    """A farm disagrees when its per-mode groups are not all equal."""
+    comparator = make_comparator()
+    patterns = comparator.patterns
+    groups = pd.DataFrame(
+        {
+            mode: FarmClassifier(indicator_mode=mode).classify_patterns(patterns)
+            for mode in comparator.modes
+        }
+    )
+    expected = groups.nunique(axis=1).to_numpy() > 1
+    np.testing.assert_array_equal(comparator.disagreement_mask(), expected)
+
+
+def test_summary_lists_disagreeing_farms():
+    """summary() fills farms_with_different_classifications with string-keyed records."""
+    comparator = make_comparator()
+    different = comparator.disagreeing_farms()
+    assert len(different) > 5
+
+    summary = comparator.summary(max_farms=5)
+    farms = summary.farms_with_different_classifications
+    assert farms == different.head(5).to_dict(orient="records")
+    assert all(isinstance(key, str) for farm in farms for key in farm)
+    assert len(comparator.summary().farms_with_different_classifications) == len(different)
+    assert summary.group_distribution_comparison["4-indicators"] == comparator.get_group_counts(
+        "4-indicators"
+    )
@@ -0,0 +1,86 @@
+"""
+Tests for ToolDispatcher concurrency limits and time budgets.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from mcp_server import dispatch
+from mcp_server.dispatch import ToolDispatcher, ToolTimeout
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    """A dispatcher allowing one call of "slow" at a time with a short budget."""
+    monkeypatch.setattr(dispatch, "TIMEOUT_GRACE_SECONDS", 0.05)
+    dispatcher = ToolDispatcher(
+        workers=4, lookup_workers=1, tool_limits={"slow": 1}, time_budgets={"slow": 0.05}
+    )
+    yield dispatcher
+    dispatcher.shutdown()
+
+
+def test_timed_out_call_keeps_its_slot(dispatcher):
+    """A call past its budget holds the tool's slot until its thread finishes."""
+    release = threading.Event()
+    finished = threading.Event()
+    started = []
+
+    def handler(arguments):
+        started.append(arguments["call"])
+        if arguments["call"] == 1:
+            release.wait(timeout=5)
+            finished.set()
+        return arguments["call"]
+
+    async def scenario():
+        with pytest.raises(ToolTimeout):
+            await dispatcher.run("slow", "compute", handler, {"call": 1})
+        second = asyncio.ensure_future(dispatcher.run("slow", "compute", handler, {"call": 2}))
+        await asyncio.sleep(0.2)
+        assert started == [1]
+        release.set()
+        result = await second
+        assert finished.is_set()
+        return result
+
+    assert asyncio.run(scenario()) == 2
+    assert started == [1, 2]
+
+
+def test_slot_is_released_after_errors(dispatcher):
+    """Failing handlers free their slot for the next call."""
+
+    def failing(arguments):
+        raise ValueError("boom")
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await dispatcher.run("slow", "compute", failing, {})
+        return await asyncio.wait_for(
+            dispatcher.run("slow", "compute", lambda arguments: "ok", {}), timeout=1
+        )
+
+    assert asyncio.run(scenario()) == "ok"
+
+
+def test_calls_within_limit_run_concurrently(dispatcher):
+    """Tools up to their limit share the pool."""
+    dispatcher.tool_limits["pair"] = 2
+    barrier = threading.Barrier(2, timeout=2)
+
+    def handler(arguments):
+        barrier.wait()
+        return time.monotonic()
+
+    async def scenario():
+        return await asyncio.gather(
+            dispatcher.run("pair", "compute", handler, {}),
+            dispatcher.run("pair", "compute", handler, {}),
+        )
+
+    assert len(asyncio.run(scenario())) == 2
@@ -0,0 +1,299 @@
+"""
+Tests for the safe expression engine behind calculate_custom_metric.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mcp_server.batch import BatchScope
+from mcp_server.expressions import (
+    MAX_EXPRESSION_LENGTH,
+    ExpressionError,
+    compile_expression,
+    evaluate_on_frame,
+)
+
+
+@pytest.fixture(scope="module")
+def frame() -> pd.DataFrame:
+    """Small frame with missing values and a text column."""
+    rng = np.random.default_rng(7)
+    n = 500
+    animals = rng.integers(0, 400, n).astype(np.float64)
+    animals[rng.choice(n, 25, replace=False)] = np.nan
+    return pd.DataFrame(
+        {
+            "n_animals_total": animals,
+            "n_total_entries_younger85": rng.integers(0, 50, n),
+            "prop_days_female_age3_dairy": rng.uniform(0, 1, n),
+            "year": rng.integers(2020, 2024, n),
+            "group": rng.choice(["Muku", "Milchvieh", "IKM"], n).astype(object),
+        }
+    )
+
+
+def evaluate(expression: str, df: pd.DataFrame):
+    """Compile and evaluate an expression on a whole frame."""
+    return evaluate_on_frame(compile_expression(expression), df)
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        # Dunder and attribute access
+        "n_animals_total.__class__",
+        "df.__class__.__bases__",
+        "().__class__.__mro__",
+        "df.n_animals_total.values",
+        "np.sum(n_animals_total)",
+        "pd.read_csv('x')",
+        "os.system('ls')",
+        "__import__('os')",
+        # Lambdas, comprehensions and other statements as expressions
+        "(lambda: 1)()",
+        "[x for x in n_animals_total]",
+        "{x: 1 for x in n_animals_total}",
+        "sum(x for x in n_animals_total)",
+        "n_animals_total if year else 0",
+        "(x := 1)",
+        "f'{n_animals_total}'",
+        # Calls outside the whitelist
+        "open('x')",
+        "eval('1')",
+        "n_animals_total.apply(print)",
+        "n_animals_total.sum(skipna=False)",
+        # Subscripts other than df['column']
+        "n_animals_total[0]",
+        "df[0]",
+        # String arithmetic
+        "'ab' * 20000000",
+        "'a' * 10**10",
+        "'a' + 'b'",
+        "n_animals_total + 'x'",
+        "-'a'",
+        "abs('a')",
+        "where(year > 2021, 'new', 'old')",
+        "n_animals_total.clip('a', 'b')",
+        # Malformed
+        "",
+        "n_animals_total >",
+        "1" * (MAX_EXPRESSION_LENGTH + 1),
+        "18446744073709551616",
+    ],
+)
+def test_rejected_syntax(expression):
+    """Anything outside the whitelist fails at compile time."""
+    with pytest.raises(ExpressionError):
+        compile_expression(expression)
+
+
+def test_text_column_arithmetic_is_rejected(frame):
+    """Text columns cannot be repeated or concatenated either."""
+    for expression in ["group * 1000", "group + group"]:
+        with pytest.raises(ExpressionError):
+            evaluate(expression, frame)
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("group == 'Muku'", lambda g: g == "Muku"),
+        ("'Muku' != group", lambda g: g != "Muku"),
+        ("group.eq('IKM')", lambda g: g.eq("IKM")),
+        ("group.between('IKM', 'Muku')", lambda g: g.between("IKM", "Muku")),
+        ("group in ['Muku', 'IKM']", lambda g: g.isin(["Muku", "IKM"])),
+        ("group not in ('Muku',)", lambda g: ~g.isin(["Muku"])),
+        ("group.isin(['Milchvieh'])", lambda g: g.isin(["Milchvieh"])),
+        ("df['group'] == 'Milchvieh'", lambda g: g == "Milchvieh"),
+    ],
+)
+def test_string_comparisons_are_allowed(frame, expression, expected):
+    """String constants work where they are compared with text columns."""
+    np.testing.assert_array_equal(evaluate(expression, frame), expected(frame["group"]).to_numpy())
+
+
+def test_fillna_accepts_a_string(frame):
+    """fillna() may take a string constant."""
+    text = frame["group"].where(frame["year"] > 2021)
+    result = evaluate("group.fillna('none')", frame.assign(group=text))
+    np.testing.assert_array_equal(result, text.fillna("none").to_numpy())
+
+
+def test_fillna_with_a_string_needs_a_text_column(frame):
+    """A string cannot fill a numeric column, which would turn its numbers into text."""
+    with pytest.raises(ExpressionError, match="text column"):
+        evaluate("n_animals_total.fillna('x')", frame)
+
+
+def test_fillna_keeps_values_and_their_type(frame):
+    """Only missing values are replaced, as in pandas."""
+    result = evaluate("n_animals_total.fillna(-1)", frame)
+    assert result.dtype == np.float64
+    np.testing.assert_array_equal(result, frame["n_animals_total"].fillna(-1).to_numpy())
+    years = evaluate("year.fillna(0.5)", frame)
+    np.testing.assert_array_equal(years, frame["year"].to_numpy())
+    assert years.dtype == frame["year"].dtype
+
+
+@pytest.mark.parametrize(
+    "expression, pandas_expression",
+    [
+        ("n_animals_total.sum()", "s.n_animals_total.sum()"),
+        ("n_animals_total.mean()", "s.n_animals_total.mean()"),
+        ("n_animals_total.median()", "s.n_animals_total.median()"),
+        ("n_animals_total.min()", "s.n_animals_total.min()"),
+        ("n_animals_total.max()", "s.n_animals_total.max()"),
+        ("n_animals_total.std()", "s.n_animals_total.std()"),
+        ("n_animals_total.var()", "s.n_animals_total.var()"),
+        ("n_animals_total.count()", "s.n_animals_total.count()"),
+        ("n_animals_total.quantile(0.9)", "s.n_animals_total.quantile(0.9)"),
+        ("group.nunique()", "s.group.nunique()"),
+        ("year.nunique()", "s.year.nunique()"),
+        ("(n_animals_total > 100).sum()", "(s.n_animals_total > 100).sum()"),
+        (
+            "n_animals_total.between(50, 150).mean()",
+            "s.n_animals_total.between(50, 150).mean()",
+        ),
+        (
+            "(df.n_total_entries_younger85 / df['n_animals_total']).mean()",
+            "(s.n_total_entries_younger85 / s.n_animals_total).mean()",
+        ),
+        (
+            "n_animals_total.fillna(0).clip(10, 300).mean()",
+            "s.n_animals_total.fillna(0).clip(10, 300).mean()",
+        ),
+        ("n_animals_total.isna().sum()", "s.n_animals_total.isna().sum()"),
+        ("n_animals_total.notna().sum()", "s.n_animals_total.notna().sum()"),
+        ("year.isin([2020, 2021]).sum()", "s.year.isin([2020, 2021]).sum()"),
+        (
+            "((year >= 2021) & (prop_days_female_age3_dairy > 0.5)).sum()",
+            "((s.year >= 2021) & (s.prop_days_female_age3_dairy > 0.5)).sum()",
+        ),
+        ("(2020 < year <= 2022).sum()", "((2020 < s.year) & (s.year <= 2022)).sum()"),
+        (
+            "(n_animals_total.round() ** 2).max()",
+            "(s.n_animals_total.round() ** 2).max()",
+        ),
+        (
+            "prop_days_female_age3_dairy.round(2).sum()",
+            "s.prop_days_female_age3_dairy.round(2).sum()",
+        ),
+        (
+            "where(year > 2021, n_total_entries_younger85, 0).sum()",
+            "s.n_total_entries_younger85.where(s.year > 2021, 0).sum()",
+        ),
+        ("sqrt(n_total_entries_younger85).mean()", "(s.n_total_entries_younger85 ** 0.5).mean()"),
+    ],
+)
+def test_results_match_pandas(frame, expression, pandas_expression):
+    """Supported methods give the same results as pandas."""
+    expected = eval(pandas_expression, {"s": frame})
+    assert evaluate(expression, frame) == pytest.approx(expected, nan_ok=True)
+
+
+def test_describe_matches_pandas(frame):
+    """describe() has the keys and values of Series.describe()."""
+    result = evaluate("n_animals_total.describe()", frame)
+    expected = frame["n_animals_total"].describe()
+    assert list(result) == list(expected.index)
+    assert [result[key] for key in expected.index] == pytest.approx(expected.tolist())
+
+
+def test_aggregates_of_empty_selection_are_nan(frame):
+    """Reductions over no rows give NaN (counts 0), as in pandas."""
+    empty = frame.iloc[:0]
+    assert np.isnan(evaluate("n_animals_total.mean()", empty))
+    assert evaluate("n_animals_total.count()", empty) == 0
+
+
+def test_elementwise_result(frame):
+    """Elementwise expressions give one value per row."""
+    result = evaluate("n_total_entries_younger85 * 2 + 1", frame)
+    np.testing.assert_array_equal(result, (frame["n_total_entries_younger85"] * 2 + 1).to_numpy())
+
+
+def test_unknown_column(frame):
+    """Unknown columns are reported when the expression is evaluated on a frame."""
+    with pytest.raises(ExpressionError, match="Unknown column"):
+        evaluate("no_such_column.sum()", frame)
+
+
+def test_compiled_plans_are_cached():
+    """The same text compiles once."""
+    assert compile_expression("year.max()") is compile_expression("year.max()")
+
+
+def test_grouped_metric_matches_pandas_groupby(frame):
+    """Grouped metrics equal DataFrame.groupby(...).agg."""
+    scope = BatchScope(frame)
+    result = scope.metric(compile_expression("n_animals_total.mean()"), ["group"])
+    expected = frame.groupby("group")["n_animals_total"].mean()
+    assert list(result) == expected.index.tolist()
+    assert list(result.values()) == pytest.approx(expected.tolist())
+
+
+def test_grouped_metric_by_two_keys(frame):
+    """Multi-column keys are joined with ' | '."""
+    scope = BatchScope(frame)
+    result = scope.metric(compile_expression("(n_animals_total > 200).sum()"), ["group", "year"])
+    expected = (frame["n_animals_total"] > 200).groupby([frame["group"], frame["year"]]).sum()
+    assert result == {f"{g} | {y}": int(v) for (g, y), v in expected.items()}
+
+
+def test_filtered_metric_matches_pandas(frame):
+    """A filter selects the rows before the metric is evaluated."""
+    scope = BatchScope(frame, compile_expression("(year == 2022) & (group != 'IKM')"))
+    selected = frame[(frame["year"] == 2022) & (frame["group"] != "IKM")]
+    assert scope.n_rows == len(selected)
+    result = scope.metric(compile_expression("n_total_entries_younger85.median()"))
+    assert result == pytest.approx(selected["n_total_entries_younger85"].median())
+
+
+def test_filtered_and_grouped_metric(frame):
+    """Filter and grouping combine like a filtered groupby."""
+    scope = BatchScope(frame, compile_expression("n_animals_total > 100"))
+    result = scope.metric(compile_expression("prop_days_female_age3_dairy.max()"), ["year"])
+    selected = frame[frame["n_animals_total"] > 100]
+    expected = selected.groupby("year")["prop_days_female_age3_dairy"].max()
+    assert result == pytest.approx({int(k): v for k, v in expected.items()})
+
+
+def test_statistics_of_one_group(frame):
+    """Selecting a group returns its row only; unknown groups are an error."""
+    scope = BatchScope(frame)
+    result = scope.statistics(group="IKM", fields=["n_animals_total"])
+    ikm = frame.loc[frame["group"] == "IKM", "n_animals_total"]
+    assert [row["group"] for row in result] == ["IKM"]
+    assert result[0]["count"] == len(ikm)
+    assert result[0]["n_animals_total_mean"] == pytest.approx(ikm.mean())
+    with pytest.raises(ValueError, match="No farms of group"):
+        scope.statistics(group="BKMoZ")
+
+
+def test_filter_must_be_a_condition(frame):
+    """A non-boolean filter is rejected."""
+    with pytest.raises(ExpressionError):
+        BatchScope(frame, compile_expression("n_animals_total + 1"))
+
+
+def test_custom_metric_tool(loaded_server, farm_df, call_tool):
+    """calculate_custom_metric evaluates grouped and filtered metrics on the loaded data."""
+    result = call_tool(
+        loaded_server.handle_custom_metric,
+        {
+            "expression": "n_total_entries_younger85.sum()",
+            "filter": "year >= 2022",
+            "group_by": "group",
+        },
+    )
+    selected = farm_df[farm_df["year"] >= 2022]
+    expected = selected.groupby("group")["n_total_entries_younger85"].sum()
+    assert result["result"] == {k: int(v) for k, v in expected.items()}
+
+
+def test_custom_metric_tool_rejects_string_arithmetic(loaded_server, call_tool):
+    """The tool reports string arithmetic as an invalid expression."""
+    for expression in ["'ab' * 20000000", "group * 3"]:
+        result = call_tool(loaded_server.handle_custom_metric, {"expression": expression})
+        assert "Invalid expression" in result["error"]
@@ -0,0 +1,163 @@
+"""
+Tests for FarmIndex lookups and queries against brute-force pandas filters.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mcp_server.index import FarmIndex, RangeBounds
+
+GROUPS = ["Muku", "Muku_Amme", "Milchvieh", "BKMmZ", "BKMoZ", "IKM", None]
+
+
+@pytest.fixture(scope="module")
+def frame() -> pd.DataFrame:
+    """Farms with repeated TVDs, unclassified rows and missing values."""
+    rng = np.random.default_rng(11)
+    n = 4000
+    animals = rng.integers(0, 400, n).astype(np.float64)
+    animals[rng.choice(n, 200, replace=False)] = np.nan
+    return pd.DataFrame(
+        {
+            "tvd": 1_000_000 + rng.integers(0, 1500, n),
+            "year": rng.integers(2018, 2025, n),
+            "group": pd.Series(rng.choice(np.array(GROUPS, dtype=object), n), dtype=object),
+            "n_animals_total": animals,
+            "n_total_entries_younger85": rng.integers(0, 50, n),
+            "prop_days_female_age3_dairy": rng.uniform(0, 1, n).round(2),
+        }
+    )
+
+
+@pytest.fixture(scope="module", params=["built", "restored"])
+def index(request, frame) -> FarmIndex:
+    """The index as built, and as restored from its exported arrays."""
+    built = FarmIndex(frame)
+    if request.param == "built":
+        return built
+    return FarmIndex.from_arrays(*built.to_arrays())
+
+
+def brute_force(
+    df: pd.DataFrame,
+    tvd: Optional[int] = None,
+    group: Optional[str] = None,
+    year: Optional[int] = None,
+    ranges: Optional[Dict[str, RangeBounds]] = None,
+) -> np.ndarray:
+    """Row positions matching all filters, by scanning the frame."""
+    mask = np.ones(len(df), dtype=bool)
+    if tvd is not None:
+        mask &= (df["tvd"] == tvd).to_numpy()
+    if group is not None:
+        mask &= (df["group"] == group).to_numpy()
+    if year is not None:
+        mask &= (df["year"] == year).to_numpy()
+    for field, (low, high) in (ranges or {}).items():
+        if low is not None:
+            mask &= (df[field] >= low).to_numpy()
+        if high is not None:
+            mask &= (df[field] <= high).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def test_lookup_tvd(index, frame):
+    """Every TVD finds exactly its rows; unknown TVDs find none."""
+    for tvd in frame["tvd"].unique()[:200]:
+        np.testing.assert_array_equal(index.lookup_tvd(tvd), brute_force(frame, tvd=tvd))
+    assert len(index.lookup_tvd(42)) == 0
+
+
+@pytest.mark.parametrize("field", ["group", "year"])
+def test_lookup_postings(index, frame, field):
+    """Posting lists hold the ascending rows of each value."""
+    for value in frame[field].dropna().unique():
+        np.testing.assert_array_equal(
+            index.lookup(field, value), np.flatnonzero((frame[field] == value).to_numpy())
+        )
+    assert len(index.lookup(field, "no such value")) == 0
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"group": "Muku"},
+        {"year": 2021},
+        {"group": "IKM", "year": 2019},
+        {"ranges": {"n_animals_total": (100, 200)}},
+        {"ranges": {"n_animals_total": (None, 10)}},
+        {"ranges": {"n_animals_total": (390, None)}},
+        {"ranges": {"n_animals_total": (200, 100)}},
+        {"ranges": {"n_animals_total": (None, None)}},
+        {"group": "Milchvieh", "ranges": {"n_animals_total": (0, 50)}},
+        {
+            "year": 2023,
+            "ranges": {
+                "n_animals_total": (50, 350),
+                "prop_days_female_age3_dairy": (0.2, 0.4),
+            },
+        },
+        {"year": 2020, "ranges": {"n_total_entries_younger85": (10, 10)}},
+        {"group": "Nope"},
+        {"year": 1900, "ranges": {"n_animals_total": (0, 400)}},
+    ],
+)
+def test_query_matches_brute_force(index, frame, filters):
+    """Queries return the ascending rows of a full scan."""
+    np.testing.assert_array_equal(index.query(**filters), brute_force(frame, **filters))
+
+
+def test_query_with_tvd(index, frame):
+    """A TVD combines with the other filters."""
+    tvd = int(frame["tvd"].value_counts().index[0])
+    for year in range(2018, 2025):
+        np.testing.assert_array_equal(
+            index.query(tvd=tvd, year=year), brute_force(frame, tvd=tvd, year=year)
+        )
+
+
+def test_random_queries_match_brute_force(index, frame):
+    """Random filter combinations agree with a full scan."""
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        filters: Dict = {}
+        if rng.random() < 0.4:
+            filters["group"] = GROUPS[rng.integers(0, len(GROUPS) - 1)]
+        if rng.random() < 0.4:
+            filters["year"] = int(rng.integers(2017, 2026))
+        if rng.random() < 0.7:
+            low, high = sorted(rng.integers(0, 420, 2).tolist())
+            filters["ranges"] = {
+                "n_animals_total": (
+                    low if rng.random() < 0.8 else None,
+                    high if rng.random() < 0.8 else None,
+                )
+            }
+        np.testing.assert_array_equal(index.query(**filters), brute_force(frame, **filters))
+
+
+def test_range_slice_is_ordered_by_value(index, frame):
+    """range_slice returns the matching rows by ascending value."""
+    positions = index.range_slice("n_animals_total", (100, 120))
+    values = frame["n_animals_total"].to_numpy()[positions]
+    assert np.all(np.diff(values) >= 0)
+    np.testing.assert_array_equal(
+        np.sort(positions), brute_force(frame, ranges={"n_animals_total": (100, 120)})
+    )
+
+
+def test_unindexed_range_field(index):
+    """Ranges over fields without a sorted index are an error."""
+    with pytest.raises(ValueError, match="not indexed"):
+        index.query(ranges={"group": (1, 2)})
+
+
+def test_index_of_loaded_data(loaded_server, farm_df):
+    """The server's index agrees with a scan of the classified data."""
+    index = loaded_server.data_context.snapshot.index
+    filters = {"group": "Muku", "ranges": {"n_animals_total": (100, 250)}}
+    np.testing.assert_array_equal(index.query(**filters), brute_force(farm_df, **filters))
@@ -0,0 +1,55 @@
+"""
+Tests for the outlier index and the tools reading it.
+"""
+
+import numpy as np
+import pytest
+
+from muka_analysis.classifier import GROUP_LABELS
+from muka_analysis.config import get_config
+
+
+@pytest.mark.parametrize("group", ["IKM", "Milchvieh", "Unclassified"])
+def test_insights_and_find_outliers_agree_for_group(loaded_server, farm_df, call_tool, group):
+    """get_data_insights(focus=outliers) counts the same farms as find_outliers."""
+    if not (farm_df["group"].fillna("Unclassified") == group).any():
+        pytest.skip(f"No {group} farms in the synthetic data")
+
+    found = call_tool(loaded_server.handle_find_outliers, {"group": group, "limit": 1})
+    insights = call_tool(loaded_server.handle_get_insights, {"group": group, "focus": "outliers"})
+
+    assert insights["outlier_counts"] == found["outlier_counts"]
+    if found["total_outliers"]:
+        group_size = int((farm_df["group"].fillna("Unclassified") == group).sum())
+        share = found["total_outliers"] / group_size
+        assert f"{found['total_outliers']} farms ({share:.1%})" in " ".join(insights["insights"])
+
+
+def test_outlier_counts_match_scores_of_group_rows(loaded_server):
+    """Per-field counts are taken over the group's rows of the full index."""
+    outliers = loaded_server.data_context.snapshot.outliers
+    threshold = get_config().analysis.outlier_threshold
+    code = GROUP_LABELS.index("IKM")
+    rows = np.flatnonzero(outliers.codes == code)
+
+    expected = np.sum(np.abs(np.nan_to_num(outliers.scores[rows])) > threshold, axis=0)
+    assert list(outliers.outlier_counts(threshold, rows).values()) == expected.tolist()
+
+
+def test_insights_unknown_group(loaded_server, call_tool):
+    """An unknown group is an error, not an empty count."""
+    result = call_tool(loaded_server.handle_get_insights, {"group": "Nope", "focus": "outliers"})
+    assert "Unknown group" in result["error"]
+
+
+@pytest.mark.parametrize("threshold", [0, -1.5, "0"])
+def test_find_outliers_rejects_non_positive_threshold(loaded_server, call_tool, threshold):
+    """A threshold of 0 is an error instead of silently using the default."""
+    result = call_tool(loaded_server.handle_find_outliers, {"threshold": threshold})
+    assert "positive" in result["error"]
+
+
+def test_find_outliers_default_threshold(loaded_server, call_tool):
+    """Without a threshold the configured one is used."""
+    result = call_tool(loaded_server.handle_find_outliers, {"limit": 1})
+    assert result["threshold"] == get_config().analysis.outlier_threshold
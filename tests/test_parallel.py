@@ -0,0 +1,67 @@
+"""
+Tests for analyze --workers: the process-pool run against the sequential path.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from muka_analysis.analyzer import FarmAnalyzer
+from muka_analysis.classifier import FarmClassifier
+from muka_analysis.io_utils import IOUtils
+from muka_analysis.parallel import ParallelAnalysis, partition_rows
+from tests.conftest import make_farm_frame
+
+
+@pytest.fixture(scope="module")
+def raw_df() -> pd.DataFrame:
+    """Synthetic input rows, a few of them invalid."""
+    df = make_farm_frame(2500, seed=23)
+    df.loc[[3, 400], "prop_days_female_age3_dairy"] = 1.5
+    df.loc[1200, "n_animals_total"] = -4
+    return df
+
+
+@pytest.mark.parametrize("scheme", ["tvd", "year"])
+def test_partitions_cover_all_rows(raw_df, scheme):
+    """Each row gets one partition; year partitions hold whole years."""
+    tvd = raw_df["tvd"].to_numpy()
+    year = raw_df["Jahr"].to_numpy()
+    partition = partition_rows(tvd, year, 3, scheme)
+    assert partition.shape == (len(raw_df),)
+    assert set(np.unique(partition)) == {0, 1, 2}
+    key = year if scheme == "year" else tvd
+    assert (pd.Series(partition).groupby(key).nunique() == 1).all()
+
+
+@pytest.mark.parametrize("mode", ["6-indicators", "5-indicators-flex"])
+@pytest.mark.parametrize("scheme", ["tvd", "year"])
+def test_parallel_matches_sequential(raw_df, mode, scheme):
+    """Summary, Detailed_Stats, group counts and classified rows equal the sequential run."""
+    result = ParallelAnalysis(3, indicator_mode=mode, partition_by=scheme).run(raw_df)
+
+    farms, _, errors = IOUtils.convert_rows(raw_df)
+    farms = FarmClassifier(indicator_mode=mode).classify_farms(farms)
+    analyzer = FarmAnalyzer(farms)
+
+    assert len(result.errors) == len(errors) == 3
+    assert result.total_farms == len(farms)
+    assert result.group_counts == analyzer.get_group_counts()
+    pd.testing.assert_frame_equal(
+        result.detailed_stats, analyzer.calculate_group_statistics(), check_dtype=False
+    )
+    pd.testing.assert_frame_equal(
+        result.summary, analyzer.get_summary_by_group(), check_dtype=False
+    )
+    expected_rows = IOUtils.farm_data_to_dataframe(farms)
+    pd.testing.assert_frame_equal(
+        result.classified_df[expected_rows.columns],
+        expected_rows,
+        check_dtype=False,
+    )
+
+
+def test_invalid_worker_count():
+    """At least one worker is required."""
+    with pytest.raises(ValueError, match="at least 1"):
+        ParallelAnalysis(0)
@@ -0,0 +1,135 @@
+"""
+Tests for sharded analysis: merged partial aggregates against a single-node FarmAnalyzer.
+"""
+
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from muka_analysis.analyzer import FarmAnalyzer
+from muka_analysis.classifier import GROUP_LABELS, FarmClassifier
+from muka_analysis.io_utils import IOUtils
+from muka_analysis.partials import PartialAggregate, select_shard
+from tests.conftest import make_farm_frame
+
+MODES = ["6-indicators", "4-indicators", "5-indicators-flex"]
+
+
+@pytest.fixture(scope="module")
+def raw_df() -> pd.DataFrame:
+    """Synthetic input rows."""
+    return make_farm_frame(3000, seed=17)
+
+
+def shard_partials(raw_df: pd.DataFrame, n_shards: int) -> List[PartialAggregate]:
+    """Aggregate every TVD-hash shard as the --shard path of analyze does."""
+    partials = []
+    for shard_index in range(1, n_shards + 1):
+        shard_df = select_shard(raw_df, shard_index, n_shards)
+        partials.append(
+            PartialAggregate.from_dataframe(
+                FarmAnalyzer.farms_to_dataframe(IOUtils.dataframe_to_farm_data(shard_df)),
+                shard_index=shard_index,
+                n_shards=n_shards,
+                n_rows=len(shard_df),
+            )
+        )
+    return partials
+
+
+def single_node(raw_df: pd.DataFrame, mode: str) -> FarmAnalyzer:
+    """Analyzer over all farms classified with one mode."""
+    farms = IOUtils.dataframe_to_farm_data(raw_df)
+    return FarmAnalyzer(FarmClassifier(indicator_mode=mode).classify_farms(farms))
+
+
+def test_shards_partition_the_input(raw_df):
+    """Every input row lands in exactly one shard."""
+    sizes = [len(select_shard(raw_df, i, 5)) for i in range(1, 6)]
+    assert sum(sizes) == len(raw_df)
+    assert min(sizes) > 0
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("n_shards", [1, 4, 7])
+def test_merged_exact_statistics_match_single_node(raw_df, mode, n_shards):
+    """Counts, min, max and mean of merged shards equal FarmAnalyzer's."""
+    merged = PartialAggregate.merge(shard_partials(raw_df, n_shards))
+    analyzer = single_node(raw_df, mode)
+
+    assert merged.missing_shards == []
+    assert merged.n_rows == len(raw_df)
+    assert merged.total_farms == len(analyzer.df)
+    assert merged.get_group_counts(mode) == analyzer.get_group_counts()
+
+    actual = merged.calculate_group_statistics(mode)
+    expected = analyzer.calculate_group_statistics()
+    assert actual["group"].tolist() == expected["group"].tolist()
+    assert actual["count"].tolist() == expected["count"].tolist()
+    for field in FarmAnalyzer.NUMERIC_FIELDS:
+        for stat in ["min", "max"]:
+            column = f"{field}_{stat}"
+            np.testing.assert_array_equal(actual[column], expected[column], err_msg=column)
+        np.testing.assert_allclose(
+            actual[f"{field}_mean"], expected[f"{field}_mean"], rtol=1e-12, err_msg=field
+        )
+
+
+@pytest.mark.parametrize("n_shards", [1, 4, 7])
+def test_merged_sums_and_std_match_single_node(raw_df, n_shards):
+    """Per-group sums and standard deviations from the merged cells are exact."""
+    mode = "6-indicators"
+    merged = PartialAggregate.merge(shard_partials(raw_df, n_shards))
+    df = single_node(raw_df, mode).df
+    grouped = df.groupby(df["group"].fillna("Unclassified"))[FarmAnalyzer.NUMERIC_FIELDS]
+    expected_sums = grouped.sum()
+    expected_std = grouped.std()
+
+    lookup = FarmClassifier(indicator_mode=mode).pattern_lookup
+    for label in expected_sums.index:
+        members = lookup == GROUP_LABELS.index(label)
+        count = merged.pattern_counts[members].sum()
+        sums = merged.sums[members].sum(axis=0)
+        mean = sums / count
+        variance = (merged.sums_of_squares[members].sum(axis=0) - count * mean**2) / (count - 1)
+        np.testing.assert_allclose(sums, expected_sums.loc[label], rtol=1e-12)
+        np.testing.assert_allclose(np.sqrt(variance), expected_std.loc[label], rtol=1e-6)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_sketch_medians_within_relative_accuracy(raw_df, mode):
+    """Merged medians are within the sketch's relative accuracy of the exact medians."""
+    merged = PartialAggregate.merge(shard_partials(raw_df, 4))
+    actual = merged.calculate_group_statistics(mode)
+    expected = single_node(raw_df, mode).calculate_group_statistics()
+    for field in FarmAnalyzer.NUMERIC_FIELDS:
+        column = f"{field}_median"
+        exact = expected[column].to_numpy(dtype=np.float64)
+        tolerance = merged.relative_accuracy * np.abs(exact) + 1e-9
+        assert np.all(np.abs(actual[column].to_numpy() - exact) <= tolerance), column
+
+
+def test_saved_partials_merge_to_the_same_result(raw_df, tmp_path: Path):
+    """Partials written to disk and loaded again merge to identical statistics."""
+    partials = shard_partials(raw_df, 3)
+    paths = []
+    for partial in partials:
+        path = tmp_path / f"partial_{partial.shards[0]}_of_3.npz"
+        partial.save(path)
+        paths.append(path)
+
+    loaded = PartialAggregate.merge([PartialAggregate.load(path) for path in paths])
+    pd.testing.assert_frame_equal(
+        loaded.calculate_group_statistics("6-indicators"),
+        PartialAggregate.merge(partials).calculate_group_statistics("6-indicators"),
+    )
+
+
+def test_merge_rejects_duplicate_shards(raw_df):
+    """A shard cannot be merged twice."""
+    partials = shard_partials(raw_df, 2)
+    with pytest.raises(ValueError, match="more than once"):
+        PartialAggregate.merge(partials + partials[:1])
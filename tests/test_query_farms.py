@@ -0,0 +1,130 @@
+"""
+Tests for query_farms filters, ordering and cursor pagination.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from muka_analysis.config import get_config
+
+FIELDS = ["tvd", "year", "group", "n_animals_total"]
+
+
+def expected_rows(
+    df: pd.DataFrame,
+    group: Optional[str] = None,
+    year: Optional[int] = None,
+    min_animals: Optional[int] = None,
+    max_animals: Optional[int] = None,
+    order_by: Optional[str] = None,
+    descending: bool = False,
+) -> pd.DataFrame:
+    """Brute-force pandas version of a query: filter, then order with row position as tiebreak."""
+    mask = np.ones(len(df), dtype=bool)
+    if group is not None:
+        mask &= (df["group"] == group).to_numpy()
+    if year is not None:
+        mask &= (df["year"] == year).to_numpy()
+    if min_animals is not None:
+        mask &= (df["n_animals_total"] >= min_animals).to_numpy()
+    if max_animals is not None:
+        mask &= (df["n_animals_total"] <= max_animals).to_numpy()
+    rows = df.assign(_position=np.arange(len(df)))[mask]
+    if order_by is not None:
+        rows = rows.sort_values([order_by, "_position"], ascending=[not descending, True])
+    return rows[FIELDS]
+
+
+def fetch_all(call_tool: Any, handler: Any, arguments: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Follow next_cursor until the last page and collect the farms."""
+    farms: List[Dict[str, Any]] = []
+    cursor = None
+    for _ in range(1000):
+        page = call_tool(handler, {**arguments, "fields": FIELDS, "cursor": cursor})
+        assert "error" not in page, page
+        assert page["count"] == len(page["farms"])
+        farms.extend(page["farms"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return farms
+    raise AssertionError("Cursor pagination did not terminate")
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"group": "Muku"},
+        {"year": 2020},
+        {"min_animals": 100, "max_animals": 300},
+        {"group": "Milchvieh", "year": 2022, "min_animals": 50},
+        {"order_by": "n_animals_total", "descending": True},
+        {"group": "IKM", "order_by": "n_total_entries_younger85"},
+    ],
+)
+def test_pages_match_pandas_filter(loaded_server, farm_df, call_tool, filters):
+    """Concatenated pages equal the brute-force filtered and ordered rows."""
+    farms = fetch_all(call_tool, loaded_server.handle_query_farms, {**filters, "limit": 37})
+    expected = expected_rows(farm_df, **filters)
+
+    assert len(farms) == len(expected)
+    actual = pd.DataFrame(farms, columns=FIELDS)
+    pd.testing.assert_frame_equal(
+        actual.reset_index(drop=True),
+        expected.reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_total_matches(loaded_server, farm_df, call_tool):
+    """total_matches counts all matching farms, not the page."""
+    page = call_tool(loaded_server.handle_query_farms, {"group": "Muku", "limit": 5})
+    assert page["count"] == 5
+    assert page["total_matches"] == int((farm_df["group"] == "Muku").sum())
+
+
+@pytest.mark.parametrize("limit", [-3, 0, 1])
+def test_small_limits_return_one_farm_and_advance(loaded_server, call_tool, limit):
+    """Limits below 1 are clamped to 1, so every page advances the cursor."""
+    first = call_tool(loaded_server.handle_query_farms, {"limit": limit, "fields": ["tvd"]})
+    assert first["count"] == 1
+    second = call_tool(
+        loaded_server.handle_query_farms,
+        {"limit": limit, "fields": ["tvd"], "cursor": first["next_cursor"]},
+    )
+    assert second["count"] == 1
+    assert second["next_cursor"] != first["next_cursor"]
+
+
+def test_limit_is_capped_at_inline_max_rows(loaded_server, call_tool):
+    """A page never holds more than inline_max_rows farms."""
+    page = call_tool(loaded_server.handle_query_farms, {"limit": 10**9, "fields": ["tvd"]})
+    assert page["count"] == get_config().mcp.inline_max_rows
+
+
+def test_limit_as_string(loaded_server, call_tool):
+    """Numeric strings are accepted, other strings are an error."""
+    page = call_tool(loaded_server.handle_query_farms, {"limit": "5", "fields": ["tvd"]})
+    assert page["count"] == 5
+    result = call_tool(loaded_server.handle_query_farms, {"limit": "five", "fields": ["tvd"]})
+    assert "error" in result
+
+
+def test_year_zero_is_a_filter(loaded_server, call_tool):
+    """year=0 filters (and matches nothing) instead of being dropped."""
+    result = call_tool(loaded_server.handle_query_farms, {"year": 0})
+    assert result["total_matches"] == 0
+    assert result["next_cursor"] is None
+
+
+def test_cursor_of_other_query_is_rejected(loaded_server, call_tool):
+    """A cursor only continues the query it was issued for."""
+    page = call_tool(loaded_server.handle_query_farms, {"group": "Muku", "limit": 5})
+    result = call_tool(
+        loaded_server.handle_query_farms,
+        {"group": "IKM", "limit": 5, "cursor": page["next_cursor"]},
+    )
+    assert "error" in result
@@ -0,0 +1,62 @@
+"""
+Tests for offloading large tool results into paged resources.
+"""
+
+from typing import Any, Dict, List
+
+import pytest
+
+from mcp_server.resources import ResultStore, parse_resource_uri
+
+
+@pytest.fixture
+def store() -> ResultStore:
+    """A store that offloads tables of more than 3 rows."""
+    return ResultStore(inline_max_rows=3, max_bytes=10**7, max_entries=10)
+
+
+def read_all(store: ResultStore, reference: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Follow the pages of an offloaded table."""
+    rows: List[Dict[str, Any]] = []
+    uri = reference["resource"]
+    while uri is not None:
+        _, result_id, params = parse_resource_uri(uri)
+        page = store.read(result_id, {**params, "limit": "2"})
+        rows.extend(page["rows"])
+        uri = page["next"]
+    return rows
+
+
+def test_flat_records_are_paged(store):
+    """A list of flat records larger than inline_max_rows becomes a resource."""
+    records = [{"id": i, "name": f"farm {i}", "share": i / 10} for i in range(7)]
+    result = store.offload("tool", {"count": 7, "farms": records}, data_version=1)
+    assert result["count"] == 7
+    assert result["farms"]["total_rows"] == 7
+    assert read_all(store, result["farms"]) == records
+
+
+@pytest.mark.parametrize(
+    "result",
+    [
+        {"clusters": [{"id": i, "fields": ["a", "b"][: i % 3]} for i in range(6)]},
+        {"clusters": [{"id": i, "profile": {"a": i}} for i in range(6)]},
+        {"table": {"columns": ["a", "b"], "data": [[1, 2, 3, 4], [[1], [2], [3], [4]]]}},
+        {"columns": ["a", "b"], "rows": [[i, [i, i]] for i in range(5)]},
+        {"values": [[i] for i in range(5)]},
+    ],
+)
+def test_nested_tables_stay_inline(store, result):
+    """Tables with list or dict cells are returned as they are."""
+    assert store.offload("tool", result, data_version=1) is result
+
+
+def test_largest_flat_table_is_chosen(store):
+    """A nested table next to a flat one does not prevent offloading the flat one."""
+    result = {
+        "nested": [{"id": i, "fields": [i]} for i in range(10)],
+        "flat": [{"id": i} for i in range(5)],
+    }
+    offloaded = store.offload("tool", result, data_version=1)
+    assert offloaded["nested"] == result["nested"]
+    assert read_all(store, offloaded["flat"]) == result["flat"]
@@ -0,0 +1,24 @@
+"""
+Tests for the find_similar_farms tool.
+"""
+
+import pytest
+
+
+@pytest.mark.parametrize("k", [0, -3, "0"])
+def test_non_positive_k_is_an_error(loaded_server, farm_df, call_tool, k):
+    """k below 1 is rejected like the cluster count of cluster_unclassified_farms."""
+    tvd = int(farm_df["tvd"].iloc[0])
+    result = call_tool(loaded_server.handle_find_similar_farms, {"tvd": tvd, "k": k})
+    assert "Number of neighbours must be positive" in result["error"]
+
+
+def test_k_limits_neighbours(loaded_server, farm_df, call_tool):
+    """A valid k returns at most k neighbours, excluding the farm itself."""
+    tvd = int(farm_df["tvd"].iloc[0])
+    result = call_tool(
+        loaded_server.handle_find_similar_farms, {"tvd": tvd, "k": 3, "layout": "records"}
+    )
+    assert "error" not in result, result
+    assert 0 < len(result["neighbours"]) <= 3
+    assert all(farm["tvd"] != tvd for farm in result["neighbours"])
@@ -0,0 +1,104 @@
+"""
+Tests for the bulk FarmData record check behind the trusted construction path.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from muka_analysis.classifier import FarmClassifier
+from muka_analysis.io_utils import IOUtils
+from muka_analysis.models import FarmData
+from muka_analysis.validators import DataValidator
+from tests.conftest import make_farm_frame
+
+# Rows made invalid (or borderline valid) by setting one column
+EDGE_CASES = [
+    ("Jahr", 1999),
+    ("Jahr", 2000),
+    ("Jahr", 2100),
+    ("Jahr", 2101),
+    ("Jahr", 2100.5),
+    ("prop_days_female_age3_dairy", 1.0),
+    ("prop_days_female_age3_dairy", 1.0001),
+    ("prop_females_slaughterings_younger731", -0.01),
+    ("n_animals_total", -1),
+    ("n_animals_total", -0.5),
+    ("n_animals_total", 12.9),
+    ("n_days_female_age3_double", -3.0),
+    ("n_days_female_age3_dairy", np.nan),
+    ("1_femaleDairyCattle_V2", 2),
+    ("7_young51to730Slaughterings", -1),
+    ("3_calf85Arrivals", 1.5),
+    ("tvd", 2.0**60),
+    ("n_females_younger731", np.inf),
+]
+
+
+@pytest.fixture(scope="module")
+def edge_frame() -> pd.DataFrame:
+    """Synthetic rows with one edge case each in the first rows."""
+    df = make_farm_frame(1000, seed=31)
+    df = df.astype({column: np.float64 for column, _ in EDGE_CASES})
+    for pos, (column, value) in enumerate(EDGE_CASES):
+        df.loc[pos, column] = value
+    return df
+
+
+def validated_path(df: pd.DataFrame):
+    """Convert every row with the validating constructor."""
+    farms, labels, n_errors = [], [], 0
+    for idx, row in df.iterrows():
+        try:
+            farms.append(IOUtils.row_to_farm_data(row))
+            labels.append(idx)
+        except Exception:
+            n_errors += 1
+    return farms, labels, n_errors
+
+
+def test_rules_cover_every_constrained_field():
+    """Every FarmData field with constraints has a bulk rule."""
+    constrained = {name for name, info in FarmData.model_fields.items() if info.metadata}
+    assert constrained <= set(DataValidator.FARM_RECORD_RULES)
+    assert set(DataValidator.FARM_RECORD_RULES) == set(DataValidator.FARM_RECORD_COLUMNS)
+
+
+def test_rules_follow_the_model_bounds():
+    """Bounds come from the Field(ge=..., le=...) definitions."""
+    kind, bounds = DataValidator.FARM_RECORD_RULES["year"]
+    assert kind == "int"
+    assert [bound for _, bound in bounds] == [2000, 2100]
+    assert DataValidator.FARM_RECORD_RULES["tvd"] == ("int", [])
+    assert DataValidator.FARM_RECORD_RULES["prop_days_female_age3_dairy"][0] == "float"
+
+
+def test_trusted_and_validated_paths_agree(edge_frame):
+    """Bulk-checked construction gives the same farms and rejections as Pydantic."""
+    farms, labels, errors = IOUtils.convert_rows(edge_frame)
+    expected, expected_labels, n_errors = validated_path(edge_frame)
+
+    assert labels == expected_labels
+    assert len(errors) == n_errors
+    assert n_errors == 10
+    assert [farm.model_dump() for farm in farms] == [farm.model_dump() for farm in expected]
+
+    trusted = DataValidator.validate_farm_records(edge_frame)
+    assert not trusted[: len(EDGE_CASES)].all()
+    assert trusted[len(EDGE_CASES) :].all()
+
+
+def test_trusted_and_validated_groups_agree(edge_frame):
+    """Both paths classify into the same groups."""
+    farms, _, _ = IOUtils.convert_rows(edge_frame)
+    expected, _, _ = validated_path(edge_frame)
+    classifier = FarmClassifier(indicator_mode="6-indicators")
+    groups = [farm.group for farm in classifier.classify_farms(farms)]
+    assert groups == [farm.group for farm in classifier.classify_farms(expected)]
+    assert any(group is not None for group in groups)
+
+
+def test_non_numeric_column_trusts_no_row(edge_frame):
+    """A text column sends every row through the validating constructor."""
+    df = edge_frame.astype({"n_animals_total": str})
+    assert not DataValidator.validate_farm_records(df).any()
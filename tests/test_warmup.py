@@ -0,0 +1,96 @@
+"""
+Tests for the background warm-up and its serialization with write tools.
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, List, Tuple
+
+import pytest
+
+from mcp_server.server import DataContext
+from muka_analysis.config import get_config
+from tests.conftest import make_farm_frame
+
+
+@pytest.fixture
+def csv_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Tuple[Path, Path]:
+    """A configured CSV for warm-up and a separate user CSV."""
+    csv_dir = tmp_path / "csv"
+    csv_dir.mkdir()
+    configured = csv_dir / "farms.csv"
+    make_farm_frame(400, seed=1).to_csv(configured, index=False)
+    user = tmp_path / "user.csv"
+    make_farm_frame(250, seed=2).to_csv(user, index=False)
+
+    config = get_config()
+    monkeypatch.setattr(config.paths, "csv_dir", csv_dir)
+    monkeypatch.setattr(config.mcp, "use_disk_snapshot", False)
+    return configured, user
+
+
+def load_and_classify(context: DataContext, path: Path) -> None:
+    """What load_farm_data followed by classify_farms does."""
+    assert context.load_data(path)["success"]
+    assert context.classify_farms()["success"]
+
+
+def test_warmup_loads_the_configured_file(csv_files):
+    """Without concurrent writes, warm-up publishes the configured data classified."""
+    configured, _ = csv_files
+    context = DataContext()
+    context.start_warmup().join(timeout=30)
+    assert context.snapshot.source == configured
+    assert context.snapshot.analyzer is not None
+
+
+def test_user_load_during_warmup_is_not_overwritten(csv_files, monkeypatch):
+    """A load issued while warm-up runs lands after it and is what stays published."""
+    configured, user = csv_files
+    context = DataContext()
+    warmup_loaded = threading.Event()
+    user_loaded = threading.Event()
+    classified: List[Tuple[str, Any]] = []
+
+    load_data = context.load_data
+    classify_farms = context.classify_farms
+
+    def tracked_load(*args: Any, **kwargs: Any) -> Any:
+        result = load_data(*args, **kwargs)
+        if threading.current_thread().name == "muka-warmup":
+            warmup_loaded.set()
+            # Long enough for a user load that is not serialized with warm-up
+            user_loaded.wait(timeout=0.5)
+        else:
+            user_loaded.set()
+        return result
+
+    def recording_classify(*args: Any, **kwargs: Any) -> Any:
+        classified.append((threading.current_thread().name, context.snapshot.source))
+        return classify_farms(*args, **kwargs)
+
+    monkeypatch.setattr(context, "load_data", tracked_load)
+    monkeypatch.setattr(context, "classify_farms", recording_classify)
+
+    warmup = context.start_warmup()
+    assert warmup_loaded.wait(timeout=30)
+    writer = threading.Thread(target=load_and_classify, args=(context, user))
+    writer.start()
+    warmup.join(timeout=30)
+    writer.join(timeout=30)
+
+    assert classified[0] == ("muka-warmup", configured)
+    assert context.snapshot.source == user
+    assert len(context.snapshot.analyzer.df) == 250
+
+
+def test_warmup_skips_when_data_was_loaded_first(csv_files):
+    """Warm-up does not replace data a write tool published before it got the lock."""
+    _, user = csv_files
+    context = DataContext()
+    with context._write_lock:
+        warmup = context.start_warmup()
+        load_and_classify(context, user)
+    warmup.join(timeout=30)
+    assert context.snapshot.source == user
+    assert not context.warming_up